@@ -0,0 +1,195 @@
+"""
+Agenda Diff Module - Plan incremental regeneration after an agenda edit
+
+When a user tweaks a route and the planner returns a new agenda, most
+markers are unchanged. plan_regeneration() aligns the new agenda against
+the previous one by normalized marker identity, then decides per new stop:
+
+  - reuse:    same marker, same summary and directive, and nothing around it
+              invalidates the approved script
+  - recheck:  same marker, but its closing transition points at a stop that
+              is no longer next, or it calls back to an earlier stop that was
+              removed or changed; the approved script goes back to the writer
+              with feedback saying exactly what to fix
+  - generate: a new marker, or a marker whose summary/directive changed
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from continuityContext import ContinuityDigest
+
+
+REUSE = "reuse"
+RECHECK = "recheck"
+GENERATE = "generate"
+
+KEPT = "kept"
+CHANGED = "changed"
+ADDED = "added"
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Case-, punctuation- and whitespace-insensitive form of a marker field.
+
+    Args:
+        text (str): Title, summary or directive
+
+    Returns:
+        str: Lowercase words joined by single spaces
+    """
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def marker_key(point: Dict) -> str:
+    """Identity of a marker across agenda versions: its normalized title."""
+    return normalize(point.get("title"))
+
+
+def content_key(point: Dict) -> Tuple[str, str]:
+    """What the writer was asked to cover: normalized summary and directive."""
+    return normalize(point.get("summary")), normalize(point.get("directive"))
+
+
+@dataclass
+class StopPlan:
+    """
+    What to do with one stop of the new agenda.
+
+    Attributes:
+        index (int): Zero-based position in the new agenda
+        title (str): Marker title
+        status (str): KEPT, CHANGED or ADDED relative to the previous agenda
+        action (str): REUSE, RECHECK or GENERATE
+        old_index (int): Position in the previous agenda, if the marker was there
+        script (str): Previously approved script, for REUSE and RECHECK
+        feedback (str): Instructions for the writer, for RECHECK
+    """
+    index: int
+    title: str
+    status: str
+    action: str
+    old_index: Optional[int] = None
+    script: Optional[str] = None
+    feedback: str = ""
+
+
+@dataclass
+class RegenerationPlan:
+    """
+    Per-stop actions for a new agenda.
+
+    Attributes:
+        stops (list): StopPlan per new stop, in route order
+        removed (list): Previous-agenda indices of markers that were dropped
+    """
+    stops: List[StopPlan] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of stops per action, plus removed markers.
+
+        Returns:
+            dict: reuse, recheck, generate and removed counts
+        """
+        counts = {REUSE: 0, RECHECK: 0, GENERATE: 0}
+        for stop in self.stops:
+            counts[stop.action] += 1
+        counts["removed"] = len(self.removed)
+        return counts
+
+
+def diff_agendas(old_points: Sequence[Dict], new_points: Sequence[Dict]) -> Tuple[List[Tuple[str, Optional[int]]], List[int]]:
+    """
+    Align two agendas by marker identity.
+
+    Markers are matched in order (longest common subsequence of titles), so
+    a marker that moved relative to the others counts as removed and added.
+
+    Args:
+        old_points (list): Previous agenda points
+        new_points (list): New agenda points
+
+    Returns:
+        tuple: ([(status, old_index) per new point], removed old indices)
+    """
+    old_keys = [marker_key(p) for p in old_points]
+    new_keys = [marker_key(p) for p in new_points]
+    matched: List[Tuple[str, Optional[int]]] = [(ADDED, None)] * len(new_points)
+    kept_old = set()
+    for block in difflib.SequenceMatcher(a=old_keys, b=new_keys, autojunk=False).get_matching_blocks():
+        for offset in range(block.size):
+            old_i, new_i = block.a + offset, block.b + offset
+            same = content_key(old_points[old_i]) == content_key(new_points[new_i])
+            matched[new_i] = (KEPT if same else CHANGED, old_i)
+            kept_old.add(old_i)
+    removed = [i for i in range(len(old_points)) if i not in kept_old]
+    return matched, removed
+
+
+def plan_regeneration(old_points: Sequence[Dict], old_scripts: Dict[int, str],
+                      new_points: Sequence[Dict]) -> RegenerationPlan:
+    """
+    Decide which stops of a new agenda can keep their approved scripts.
+
+    Args:
+        old_points (list): Previous agenda points
+        old_scripts (dict): Previous approved scripts, old index -> transcript
+        new_points (list): New agenda points
+
+    Returns:
+        RegenerationPlan: Action per new stop
+    """
+    matched, removed = diff_agendas(old_points, new_points)
+    kept_old = {old_i for status, old_i in matched if status == KEPT}
+    # Earlier stops whose content the kept scripts may no longer call back to.
+    stale = [i for i in range(len(old_points)) if i not in kept_old]
+    digest = ContinuityDigest()
+    references = {
+        i: [old_points[i]['title']] + digest.add_stop(i, old_points[i]['title'], old_scripts[i]).topics
+        for i in stale if i in old_scripts
+    }
+
+    plan = RegenerationPlan(removed=removed)
+    for new_i, (status, old_i) in enumerate(matched):
+        title = new_points[new_i]['title']
+        if status != KEPT or old_i not in old_scripts:
+            plan.stops.append(StopPlan(new_i, title, status, GENERATE, old_i))
+            continue
+
+        script = old_scripts[old_i]
+        notes = []
+        old_next = old_points[old_i + 1]['title'] if old_i + 1 < len(old_points) else None
+        new_next = new_points[new_i + 1]['title'] if new_i + 1 < len(new_points) else None
+        if marker_key({"title": old_next}) != marker_key({"title": new_next}):
+            if new_next is None:
+                notes.append("This is now the final stop of the tour. Replace the closing transition with a "
+                             "sign-off for the whole tour.")
+            else:
+                notes.append(f"The next stop is now '{new_next}'. Rewrite the closing transition to lead into it.")
+
+        for k in stale:
+            if k >= old_i or k not in references:
+                continue
+            mentioned = [term for term in references[k] if term and term in script]
+            if mentioned:
+                notes.append(f"The earlier stop '{old_points[k]['title']}' was removed or changed; remove or "
+                             f"rework the references to {', '.join(mentioned)}.")
+
+        if notes:
+            feedback = "Keep the segment as it is apart from these edits. " + " ".join(notes)
+            plan.stops.append(StopPlan(new_i, title, status, RECHECK, old_i, script, feedback))
+        else:
+            plan.stops.append(StopPlan(new_i, title, status, REUSE, old_i, script))
+    return plan
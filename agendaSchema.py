@@ -0,0 +1,189 @@
+"""
+Agenda Schema Module - Typed planner output and agenda parsing
+
+TourAgenda is the JSON schema the planner is constrained to in structured
+output mode: the primary route plus ordered narrative markers, each with
+a summary, a script writer directive and optional coordinates.
+
+parse_agenda() turns planner output into the (points, route) pair the
+writer consumes. JSON agendas are validated against the model in one pass.
+Legacy Markdown agendas go through a line-by-line parser with precompiled
+patterns. That parser tolerates the formatting drift seen in practice:
+bold or heading-style markers, "1)" numbering, bulleted or bolded field
+labels, and a bolded "Primary Route" line.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+NOT_FOUND = "Not Found"
+ROUTE_NOT_FOUND = "Route not found"
+
+
+class NarrativeMarker(BaseModel):
+    """
+    One stop on the agenda.
+
+    Attributes:
+        title (str): Location or marker name
+        summary (str): The fact, lore or event to cover
+        directive (str): One-sentence angle for the script writer
+        latitude (float): Optional latitude of the marker
+        longitude (float): Optional longitude of the marker
+        eta_minutes (float): Optional minutes of driving from the start of the route to the marker
+    """
+    title: str = Field(description="Location or marker name")
+    summary: str = Field(description="Concise summary of the fact, lore or event to cover")
+    directive: str = Field(description="Script Writer Directive: one sentence on the angle to research and write")
+    latitude: Optional[float] = Field(default=None, description="Latitude of the marker, if known")
+    longitude: Optional[float] = Field(default=None, description="Longitude of the marker, if known")
+    eta_minutes: Optional[float] = Field(default=None, description="Minutes of driving from the start to the marker")
+
+    def to_point(self) -> Dict:
+        """
+        The point dict the writer consumes.
+
+        Returns:
+            dict: title, summary, directive, latitude/longitude when both are known, and eta_minutes when known
+        """
+        point = {"title": self.title.strip(), "summary": self.summary.strip(), "directive": self.directive.strip()}
+        if self.latitude is not None and self.longitude is not None:
+            point["latitude"] = self.latitude
+            point["longitude"] = self.longitude
+        if self.eta_minutes is not None:
+            point["eta_minutes"] = self.eta_minutes
+        return point
+
+
+class TourAgenda(BaseModel):
+    """
+    Structured planner output.
+
+    Attributes:
+        primary_route (str): Highways the route follows
+        markers (list): Narrative markers in driving order
+    """
+    primary_route: str = Field(description="Primary route, e.g. 'I-64 W and US-19 N'")
+    markers: List[NarrativeMarker] = Field(description="Narrative markers in geographic order along the route")
+
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+
+STRUCTURED OUTPUT:
+Return a single JSON object matching the response schema: "primary_route", then "markers" in driving order.
+Each marker has "title", "summary", "directive" (the Script Writer Directive) and, if known, "latitude"/"longitude"
+and "eta_minutes" (minutes of driving from the start of the route)."""
+
+
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+# One alternation over the whole text: marker headings, field lines and the route line.
+# Lines that match none of them (blank lines, prose) are skipped inside the regex engine.
+_AGENDA_LINE = re.compile(r"""
+    ^[ \t]*(?:
+        (?P<heading>\#{1,6}[ \t]*)?(?P<bold>\*\*)?[ \t]*\d+[.)][ \t]+(?P<marker>.*\S)
+      | (?:[-*\u2022][ \t]+)?\**[ \t]*(?P<field>summary|script[ \t]+writer[ \t]+directive|directive)
+        [ \t]*\**[ \t]*:[ \t]*(?P<value>.*)
+      | [^\n]*?primary[ \t]+route[ \t]*\**[ \t]*:[ \t]*(?P<route>.*)
+    )""", re.MULTILINE | re.IGNORECASE | re.VERBOSE)
+
+_INLINE_SUMMARY = re.compile(r"summary[ \t]*\**[ \t]*:[ \t]*(.*)", re.IGNORECASE)
+_INLINE_DIRECTIVE = re.compile(r"(?:script[ \t]+writer[ \t]+)?directive[ \t]*\**[ \t]*:[ \t]*(.*)", re.IGNORECASE)
+
+
+def parse_agenda(raw_response: Optional[str]) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """
+    Parse planner output, JSON or legacy Markdown.
+
+    Args:
+        raw_response (str): Planner output
+
+    Returns:
+        tuple: (points, primary_route), or (None, None) for no input
+    """
+    if raw_response is None:
+        return None, None
+    text = raw_response.strip()
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    if text.startswith("{"):
+        agenda = parse_json_agenda(text)
+        if agenda is not None:
+            return [marker.to_point() for marker in agenda.markers], agenda.primary_route.strip() or ROUTE_NOT_FOUND
+    return parse_legacy_agenda(raw_response)
+
+
+def parse_json_agenda(text: str) -> Optional[TourAgenda]:
+    """
+    Validate a JSON agenda.
+
+    Args:
+        text (str): JSON text
+
+    Returns:
+        TourAgenda: The agenda, or None if the text does not match the schema
+    """
+    try:
+        return TourAgenda.model_validate_json(text)
+    except ValidationError:
+        return None
+
+
+def parse_legacy_agenda(raw_response: str) -> Tuple[List[Dict], str]:
+    """
+    Single-pass parser for Markdown agendas.
+
+    Args:
+        raw_response (str): Planner output in the numbered-list format
+
+    Returns:
+        tuple: (points, primary_route); markers without a summary are dropped
+    """
+    route = None
+    points: List[Dict] = []
+    current: Optional[Dict] = None
+
+    for heading, bold, marker, field, value, route_text in (m.groups() for m in _AGENDA_LINE.finditer(raw_response)):
+        if marker is not None:
+            if heading or bold or "**" in marker:
+                title, tail = _split_marker(marker)
+                current = {"title": title, "summary": None, "directive": None}
+                points.append(current)
+                # Fields written on the marker line itself, after the title. As in the original parser, an
+                # inline summary runs to the end of the line.
+                for key, pattern in (("summary", _INLINE_SUMMARY), ("directive", _INLINE_DIRECTIVE)):
+                    found = pattern.search(tail)
+                    if found:
+                        current[key] = found.group(1).replace("*", "").strip()
+        elif field is not None:
+            if current is not None:
+                key = "summary" if field.lower() == "summary" else "directive"
+                if current[key] is None:
+                    current[key] = value.replace("*", "").strip()
+        elif route is None:
+            route = route_text.replace("*", "").strip()
+
+    parsed = [
+        {"title": p["title"], "summary": p["summary"], "directive": p["directive"] or NOT_FOUND}
+        for p in points if p["summary"] is not None
+    ]
+    return parsed, route or ROUTE_NOT_FOUND
+
+
+def _split_marker(rest: str) -> Tuple[str, str]:
+    # (title, text after the title) of a marker line
+    parts = rest.split("**", 2)
+    if len(parts) == 3:
+        title, tail = parts[1], parts[2]
+    else:
+        label = _INLINE_SUMMARY.search(rest)
+        title, tail = (rest[:label.start()].rstrip(" \t-\u2013\u2014"), rest[label.start():]) if label else (rest, "")
+    return title.replace("*", "").strip() or NOT_FOUND, tail
@@ -0,0 +1,362 @@
+"""
+Batch Runner Module - Generate many tours from a JSONL manifest
+
+Each manifest line is one route request:
+
+    {"id": "bburg-nrg", "start": "Blacksburg, VA", "end": "New River Gorge, WV",
+     "preferences": "coal history, quirky diners", "config": {"max_revisions": 2}}
+
+Only start and end are required. "config" overrides TourConfig fields for
+that route and "planner_model" overrides the planner model.
+
+BatchRunner runs planner + TourArchitect for every item across a thread
+or process pool. It writes <id>.agenda.md and <id>.md per route and
+appends one status/metrics line per finished item to status.jsonl. A
+failing item is recorded and does not affect the others.
+
+Every run gets a run id, recorded in status.jsonl, and each tour is
+checkpointed as "<run id>:<item id>". A later run of the same manifest
+is a new run: it replans and rewrites every item, even with a shared
+checkpoint_path. Resuming a run (resume=True, optionally with its run
+id; the latest run by default) skips the items it finished; failed items
+reuse their saved agenda and, with a checkpoint_path, resume mid-tour.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from llmBackend import LLMBackend
+from tracing import Tracer, trace_context
+
+
+STATUS_FILE = "status.jsonl"
+
+
+@dataclass
+class BatchItem:
+    """
+    One route request from the manifest.
+
+    Attributes:
+        id (str): Stable identifier, used for output names and restarts
+        start (str): Starting point
+        end (str): Destination
+        preferences (str): Free-text user preferences passed to the planner
+        config (dict): TourConfig field overrides
+        planner_model (str): Planner model override
+    """
+    id: str
+    start: str
+    end: str
+    preferences: str = ""
+    config: Dict[str, Any] = field(default_factory=dict)
+    planner_model: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "BatchItem":
+        """
+        Build an item from a manifest record.
+
+        Items without an id get one derived from start, end and preferences,
+        so reordering the manifest does not break restarts.
+
+        Args:
+            record (dict): Parsed manifest line
+
+        Returns:
+            BatchItem: The item
+
+        Raises:
+            ValueError: If start or end is missing
+        """
+        if not record.get("start") or not record.get("end"):
+            raise ValueError("manifest items need 'start' and 'end'")
+        preferences = record.get("preferences") or ""
+        if isinstance(preferences, (list, tuple)):
+            preferences = ", ".join(str(p) for p in preferences)
+        elif isinstance(preferences, dict):
+            preferences = json.dumps(preferences, sort_keys=True)
+        item_id = record.get("id")
+        if not item_id:
+            digest = hashlib.sha256(
+                "\x00".join((record["start"], record["end"], preferences)).encode("utf-8")).hexdigest()
+            item_id = digest[:12]
+        return cls(
+            id=_safe_name(str(item_id)),
+            start=record["start"],
+            end=record["end"],
+            preferences=preferences,
+            config=dict(record.get("config") or {}),
+            planner_model=record.get("planner_model")
+        )
+
+    def prompt(self) -> str:
+        """
+        Planner request for this route.
+
+        Returns:
+            str: User prompt for MasterAgent.generate_agenda
+        """
+        prompt = f"I am travelling from {self.start} to {self.end}."
+        if self.preferences:
+            prompt += f" My preferences: {self.preferences}"
+        return prompt
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._") or "route"
+
+
+def load_manifest(path: str) -> List[BatchItem]:
+    """
+    Read a JSONL manifest. Blank lines and lines starting with # are ignored.
+
+    Args:
+        path (str): Manifest file
+
+    Returns:
+        list: Items in manifest order
+
+    Raises:
+        ValueError: If a line is not valid JSON, lacks start/end, or repeats an id
+    """
+    items: List[BatchItem] = []
+    seen: Set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                item = BatchItem.from_dict(json.loads(line))
+            except (json.JSONDecodeError, ValueError, TypeError) as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from e
+            if item.id in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id {item.id!r}")
+            seen.add(item.id)
+            items.append(item)
+    return items
+
+
+def run_item(item: BatchItem, output_dir: str, base_config: Any = None,
+             backend: Optional[LLMBackend] = None, stop_concurrency: int = 1,
+             tour_id: Optional[str] = None, resume: bool = False) -> Dict[str, Any]:
+    """
+    Plan and write one tour. Never raises; failures are returned as a record.
+
+    Module-level so it can be sent to a process pool.
+
+    Args:
+        item (BatchItem): Route request
+        output_dir (str): Directory for the agenda and tour files
+        base_config (TourConfig, optional): Defaults the item's overrides apply to
+        backend (LLMBackend, optional): Backend for both agents (thread pools only)
+        stop_concurrency (int): Stops generated in parallel within the tour
+        tour_id (str, optional): Checkpoint/trace id of the tour (default: the item id)
+        resume (bool): Reuse a saved agenda instead of planning again
+
+    Returns:
+        dict: Status and metrics record
+    """
+    from masterAgent import MasterAgent
+    from wrtirAgent import TourArchitect, TourConfig
+
+    started = time.time()
+    agenda_path = os.path.join(output_dir, f"{item.id}.agenda.md")
+    output_path = os.path.join(output_dir, f"{item.id}.md")
+    tour_id = tour_id or item.id
+    tracer = Tracer()
+    record: Dict[str, Any] = {"id": item.id, "tour_id": tour_id, "start": item.start, "end": item.end,
+                              "output": output_path}
+    try:
+        config = dataclasses.replace(base_config or TourConfig(), **item.config)
+        with trace_context(tour_id=tour_id):
+            if resume and os.path.exists(agenda_path):
+                with open(agenda_path, encoding="utf-8") as f:
+                    agenda = f.read()
+            else:
+                planner_kwargs = {"model": item.planner_model} if item.planner_model else {}
+                agenda = MasterAgent(backend=backend, use_cache=config.enable_cache, tracer=tracer,
+                                     **planner_kwargs).generate_agenda(item.prompt())
+                if not agenda:
+                    raise RuntimeError("planner returned no agenda")
+                with open(agenda_path, "w", encoding="utf-8") as f:
+                    f.write(agenda)
+
+        architect = TourArchitect(config, backend=backend, tracer=tracer)
+        if stop_concurrency > 1:
+            scripts = architect.run_concurrent(agenda, stop_concurrency, filename=output_path, tour_id=tour_id)
+        else:
+            scripts = architect.run(agenda, filename=output_path, tour_id=tour_id)
+        if not scripts:
+            raise RuntimeError("no stops could be parsed from the agenda")
+        record.update(status="ok", stops=len(scripts))
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+
+    summary = tracer.tour_summary(tour_id)
+    record.update(
+        seconds=round(time.time() - started, 3),
+        llm_calls=summary["total_calls"],
+        calls_by_role=summary["calls"],
+        prompt_tokens=summary["prompt_tokens"],
+        response_tokens=summary["response_tokens"],
+        cache_hits=summary["cache_hits"],
+        critical_path_seconds=summary["critical_path_seconds"],
+        finished=time.time()
+    )
+    return record
+
+
+class BatchRunner:
+    """
+    Runs a manifest of route requests across a worker pool.
+
+    Attributes:
+        output_dir (str): Where tours, agendas and status.jsonl are written
+        workers (int): Pool size
+        use_processes (bool): Use a process pool instead of threads
+        base_config (TourConfig): Defaults for every item
+        backend (LLMBackend): Backend shared by every item (thread pools only)
+        stop_concurrency (int): Stops generated in parallel within each tour
+        run_id (str): Id of the current (or last) run, set by run()
+    """
+
+    def __init__(self, output_dir: str, workers: int = 4, use_processes: bool = False,
+                 base_config: Any = None, backend: Optional[LLMBackend] = None,
+                 stop_concurrency: int = 1) -> None:
+        """
+        Initialize the runner.
+
+        Args:
+            output_dir (str): Output directory, created if missing
+            workers (int): Pool size
+            use_processes (bool): Use a process pool instead of threads
+            base_config (TourConfig, optional): Defaults for every item
+            backend (LLMBackend, optional): Shared backend; each process uses its default backend instead
+            stop_concurrency (int): Stops generated in parallel within each tour
+
+        Raises:
+            ValueError: If workers < 1, or a backend is given with use_processes
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if use_processes and backend is not None:
+            raise ValueError("a backend instance cannot be shared with worker processes")
+        self.output_dir = output_dir
+        self.workers = workers
+        self.use_processes = use_processes
+        self.base_config = base_config
+        self.backend = backend
+        self.stop_concurrency = stop_concurrency
+        self.status_path = os.path.join(output_dir, STATUS_FILE)
+        self.run_id: Optional[str] = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _records(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.status_path):
+            return []
+        records = []
+        with open(self.status_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a killed run
+        return records
+
+    def latest_run_id(self) -> Optional[str]:
+        """
+        Run id of the most recent run recorded in status.jsonl.
+
+        Returns:
+            str: The run id, or None if no run was recorded
+        """
+        run_ids = [record["run_id"] for record in self._records() if record.get("run_id")]
+        return run_ids[-1] if run_ids else None
+
+    def completed_ids(self, run_id: str) -> Set[str]:
+        """
+        Items a run finished successfully (latest status wins).
+
+        Args:
+            run_id (str): The run
+
+        Returns:
+            set: Item ids to skip when resuming it
+        """
+        latest: Dict[str, str] = {}
+        for record in self._records():
+            if record.get("run_id") == run_id:
+                latest[record["id"]] = record["status"]
+        return {item_id for item_id, status in latest.items() if status == "ok"}
+
+    def run(self, items: Iterable[BatchItem], resume: bool = False,
+            run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run every item, or with resume every item the resumed run has not completed.
+
+        Args:
+            items (iterable): Route requests
+            resume (bool): Continue an earlier run instead of starting a new one
+            run_id (str, optional): Run to resume (default: the latest), or the id of a new run
+
+        Returns:
+            list: Status records of the items run, in completion order
+
+        Raises:
+            ValueError: If resume is set and status.jsonl records no run
+        """
+        if resume:
+            run_id = run_id or self.latest_run_id()
+            if run_id is None:
+                raise ValueError(f"no earlier batch run recorded in {self.status_path}")
+            done = self.completed_ids(run_id)
+        else:
+            run_id = run_id or uuid.uuid4().hex[:12]
+            done = set()
+        self.run_id = run_id
+        pending = [item for item in items if item.id not in done]
+        print(f"Batch {run_id}: {len(pending)} to run, {len(done)} already complete")
+        if not pending:
+            return []
+
+        records = []
+        with self._executor() as pool, open(self.status_path, "a", encoding="utf-8") as status:
+            futures = {
+                pool.submit(run_item, item, self.output_dir, self.base_config, self.backend, self.stop_concurrency,
+                            f"{run_id}:{item.id}", resume): item
+                for item in pending
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:  # the worker itself died (e.g. a broken process pool)
+                    record = {"id": item.id, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                              "finished": time.time()}
+                record["run_id"] = run_id
+                status.write(json.dumps(record) + "\n")
+                status.flush()
+                records.append(record)
+                print(f"Batch: {item.id} {record['status']}")
+        return records
+
+    def _executor(self) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="guideai-batch")
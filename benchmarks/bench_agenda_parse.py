@@ -0,0 +1,120 @@
+"""
+Agenda Parse Benchmark - legacy regex parser vs single-pass and JSON parsing
+
+Builds planner agendas with many markers and times, per size:
+  - baseline: the original split-and-regex parse_route_data
+  - legacy:   agendaSchema.parse_legacy_agenda (single pass, precompiled)
+  - json:     agendaSchema.parse_agenda on the structured (JSON) agenda
+It also counts how many markers each parser recovers from a "drifted"
+agenda that bolds field labels and numbers markers as "1)".
+
+Usage:
+    python benchmarks/bench_agenda_parse.py [--sizes 10 100 1000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendaSchema import parse_agenda, parse_legacy_agenda  # noqa: E402
+
+
+def baseline_parse(raw_response: str):
+    """The parse_route_data implementation this benchmark replaces, kept for comparison."""
+    route_match = re.search(r"(?:Primary [Rr]oute):\s*(.*)", raw_response, re.IGNORECASE)
+    primary_route = route_match.group(1).strip() if route_match else "Route not found"
+    parsed_points = []
+    for item in re.split(r'\n(?=\d+\.\s+\*\*)', raw_response):
+        if "Summary:" not in item:
+            continue
+
+        def get_match(pattern, string):
+            match = re.search(pattern, string)
+            return match.group(1).replace('*', '').strip() if match else "Not Found"
+
+        parsed_points.append({
+            "title": get_match(r'\*\*(.*?)\*\*', item),
+            "summary": get_match(r'Summary:\s*(.*)', item),
+            "directive": get_match(r'Script Writer Directive:\s*(.*)', item),
+        })
+    return parsed_points, primary_route
+
+
+def build_agendas(markers: int) -> Dict[str, str]:
+    """
+    Equivalent agendas in the legacy, drifted and JSON formats.
+
+    Args:
+        markers (int): Number of narrative markers
+
+    Returns:
+        dict: Format name -> agenda text
+    """
+    items = [
+        {"title": f"Marker {i} Overlook:", "summary": f"The story of marker {i} and its river crossing.",
+         "directive": f"Describe what a driver sees at marker {i}."}
+        for i in range(1, markers + 1)
+    ]
+    legacy = ["Primary Route: I-64 W and US-19 N", ""]
+    drifted = ["**Primary Route:** I-64 W and US-19 N", ""]
+    for i, item in enumerate(items, 1):
+        legacy += [f"{i}. **{item['title']}**", f"   Summary: {item['summary']}",
+                   f"   Script Writer Directive: {item['directive']}", ""]
+        drifted += [f"{i}) **{item['title']}**", f"   - **Summary:** {item['summary']}",
+                    f"   - **Script Writer Directive:** {item['directive']}", ""]
+    return {
+        "legacy": "\n".join(legacy),
+        "drifted": "\n".join(drifted),
+        "json": json.dumps({"primary_route": "I-64 W and US-19 N", "markers": items}),
+    }
+
+
+def time_ms(parse: Callable, text: str, repeat: int) -> float:
+    """Median milliseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict]:
+    """
+    Run the suite over several agenda sizes.
+
+    Returns:
+        list: One metrics dict per size
+    """
+    parse_agenda("{}")  # import and build the pydantic validators outside the timings
+    results = []
+    for size in sizes:
+        agendas = build_agendas(size)
+        results.append({
+            "markers": size,
+            "baseline_ms": round(time_ms(baseline_parse, agendas["legacy"], repeat), 3),
+            "legacy_ms": round(time_ms(parse_legacy_agenda, agendas["legacy"], repeat), 3),
+            "json_ms": round(time_ms(parse_agenda, agendas["json"], repeat), 3),
+            "drifted_recovered_baseline": len(baseline_parse(agendas["drifted"])[0]),
+            "drifted_recovered_legacy": len(parse_legacy_agenda(agendas["drifted"])[0]),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Best-of-N Benchmark - candidate drafts against the serial writer/director loop
+
+Runs the pipeline benchmark on FakeBackend three ways for the same agendas:
+  - loop:      one draft per writer round, one director review per draft
+  - director:  N concurrent drafts per round, judged in one batched director review
+  - local:     N concurrent drafts per round, the local ranker picks one for
+               a single-draft director review
+and reports, per mode and size, tour latency, approved stops, LLM calls per
+stop and per approved stop, and calls by role.
+
+Usage:
+    python benchmarks/bench_best_of_n.py [--sizes 20 100] [--candidates 3] [--approval-rate 0.5]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import run  # noqa: E402
+
+_FIELDS = ("stops", "tour_latency_s", "latency_per_stop_ms", "approved_stops", "llm_calls_per_stop",
+           "llm_calls_per_approved_stop", "calls_by_role", "screen_rejections")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--mode", choices=["sequential", "concurrent"], default="sequential")
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--approval-rate", type=float, default=0.5)
+    parser.add_argument("--bad-draft-rate", type=float, default=0.2,
+                        help="Share of writer drafts the fake returns as short stubs")
+    parser.add_argument("--max-revisions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The pipeline prints progress per stop; keep stdout for the report.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = []
+        for name, candidates, selection in (("loop", 1, "director"), ("director", args.candidates, "director"),
+                                            ("local", args.candidates, "local")):
+            for row in run(args.sizes, args.mode, args.approval_rate, args.seed, args.max_revisions,
+                           args.bad_draft_rate, candidates=candidates, selection=selection):
+                results.append(dict({"selection": name, "candidates": candidates},
+                                    **{field: row[field] for field in _FIELDS}))
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Simulated Drive Benchmark - stop readiness against marker ETAs
+
+Plans a route on FakeBackend and replays the drive on a compressed clock
+(--seconds-per-minute wall seconds per minute of driving). Each marker's
+ETA comes from estimate_etas on the planner's coordinates. Partway through,
+traffic clears and the rest of the route goes faster (--traffic-at,
+--traffic-factor), so later markers come up sooner than planned. The tour
+is generated three ways:
+  - sequential:  TourArchitect.stream, stops in route order one at a time
+  - concurrent:  TourArchitect.astream, stops in parallel, released in route order
+  - deadline:    TourArchitect.astream_deadline, earliest ETA first with
+                 revision caps sized to the time left, re-planned by
+                 update_etas when traffic clears
+A stop is on time when it is ready before the car reaches its marker.
+Reports, per mode, missed markers, the worst lateness in minutes of
+driving, time to the first ready stop, total time and LLM calls.
+
+Usage:
+    python benchmarks/bench_drive.py [--stops 20] [--concurrency 2] [--seconds-per-minute 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendaSchema import parse_agenda  # noqa: E402
+from deadlineScheduler import estimate_etas  # noqa: E402
+from fakeBackend import FakeBackend, FakeBackendConfig  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+# The fake planner's first marker lies one coordinate step from here.
+START = (37.2, -80.4)
+
+
+def arrivals(planned: List[float], traffic_at: float, factor: float) -> List[float]:
+    """Actual minutes to each marker when the drive speeds up by 1/factor after traffic_at minutes."""
+    return [eta if eta <= traffic_at else traffic_at + (eta - traffic_at) * factor for eta in planned]
+
+
+def report(mode: str, ready: Dict[int, float], arrival: List[float], scale: float, total: float,
+           backend: FakeBackend, **extra) -> Dict:
+    late = {i: ready[i] / scale - arrival[i] for i in ready if ready[i] / scale > arrival[i]}
+    return dict({
+        "mode": mode,
+        "stops": len(arrival),
+        "missed": len(late),
+        "missed_stops": sorted(i + 1 for i in late),
+        "max_lateness_minutes": round(max(late.values()), 1) if late else 0.0,
+        "first_ready_seconds": round(min(ready.values()), 2),
+        "total_seconds": round(total, 2),
+        "llm_calls": sum(backend.stats()["calls"].values()),
+    }, **extra)
+
+
+def drive(mode: str, agenda: str, planned: List[float], arrival: List[float], filename: str, args) -> Dict:
+    backend = FakeBackend(_backend_config(args))
+    config = TourConfig(enable_cache=False, enable_context_cache=False, max_revisions=args.max_revisions,
+                        max_concurrency=args.concurrency,
+                        deadline_round_seconds=args.round_minutes * args.seconds_per_minute)
+    architect = TourArchitect(config, backend=backend)
+    scale = args.seconds_per_minute
+    ready: Dict[int, float] = {}
+    started = time.perf_counter()
+
+    if mode == "sequential":
+        for i, _, _ in architect.stream(agenda, filename=filename):
+            ready[i] = time.perf_counter() - started
+        return report(mode, ready, arrival, scale, time.perf_counter() - started, backend)
+
+    async def run() -> None:
+        if mode == "concurrent":
+            async for i, _, _ in architect.astream(agenda, filename=filename):
+                ready[i] = time.perf_counter() - started
+            return
+
+        async def traffic_clears() -> None:
+            await asyncio.sleep(args.traffic_at * scale)
+            architect.update_etas({i: (minutes - args.traffic_at) * scale
+                                   for i, minutes in enumerate(arrival) if i not in ready})
+
+        update = asyncio.ensure_future(traffic_clears())
+        try:
+            async for i, _, _ in architect.astream_deadline(agenda, [m * scale for m in planned], filename):
+                ready[i] = time.perf_counter() - started
+        finally:
+            update.cancel()
+
+    asyncio.run(run())
+    extra = {}
+    if mode == "deadline":
+        stats = architect.deadline_scheduler.stats
+        extra = {"downgraded": stats.downgraded, "replans": stats.replans}
+    return report(mode, ready, arrival, scale, time.perf_counter() - started, backend, **extra)
+
+
+def _backend_config(args) -> FakeBackendConfig:
+    return FakeBackendConfig(seed=args.seed, markers=args.stops, time_to_first_token=0.05,
+                             tokens_per_second=args.tokens_per_second, approval_rate=args.approval_rate)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stops", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--seconds-per-minute", type=float, default=0.2,
+                        help="Wall seconds per minute of driving")
+    parser.add_argument("--avg-speed", type=float, default=70.0, help="km/h used to estimate ETAs")
+    parser.add_argument("--traffic-at", type=float, default=30.0, help="Minute of the drive when traffic clears")
+    parser.add_argument("--traffic-factor", type=float, default=0.4,
+                        help="Remaining driving time after traffic clears, relative to the plan")
+    parser.add_argument("--round-minutes", type=float, default=4.0,
+                        help="Initial guess of one writer/director round, in minutes of driving")
+    parser.add_argument("--tokens-per-second", type=float, default=1400.0, help="Fake decode speed")
+    parser.add_argument("--approval-rate", type=float, default=0.5)
+    parser.add_argument("--max-revisions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    planner = MasterAgent(backend=FakeBackend(_backend_config(args)), use_cache=False, structured_output=True)
+    agenda = planner.generate_agenda("I am travelling from Blacksburg, VA to New River Gorge, WV.")
+    points, _ = parse_agenda(agenda)
+    planned = estimate_etas(points, args.avg_speed, start=START)
+    arrival = arrivals(planned, args.traffic_at, args.traffic_factor)
+
+    # The pipeline prints progress per stop; keep stdout for the report.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "tour.md")
+            results = [drive(mode, agenda, planned, arrival, filename, args)
+                       for mode in ("sequential", "concurrent", "deadline")]
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    print(json.dumps({"drive_minutes": round(arrival[-1], 1), "planned_minutes": round(planned[-1], 1),
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
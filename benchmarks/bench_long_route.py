@@ -0,0 +1,92 @@
+"""
+Long Route Benchmark - single planner call vs parallel corridor segments
+
+Plans a cross-country route on FakeBackend three ways:
+  - single:       one generate_agenda call with the usual 5-8 marker budget
+  - single_full:  one call asked for as many markers as the segments get in total
+  - segmented:    generate_long_agenda, one concurrent call per corridor segment
+and reports planning latency, markers, and the longest gap between
+consecutive markers (km and minutes of driving). Planner output tokens scale
+with the markers asked for, so a longer single call is also a slower one.
+
+Usage:
+    python benchmarks/bench_long_route.py [--segment-km 250] [--concurrency 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendaSchema import parse_agenda  # noqa: E402
+from fakeBackend import FakeBackend, FakeBackendConfig  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from routeSegments import Waypoint, split_route  # noqa: E402
+from stopLibrary import distance_km  # noqa: E402
+
+# Washington, DC to Denver, CO along I-70.
+ROUTE = [
+    Waypoint("Washington, DC", 38.90, -77.04),
+    Waypoint("Hagerstown, MD", 39.64, -77.72),
+    Waypoint("Breezewood, PA", 39.99, -78.24),
+    Waypoint("Pittsburgh, PA", 40.44, -80.00),
+    Waypoint("Columbus, OH", 39.96, -83.00),
+    Waypoint("Indianapolis, IN", 39.77, -86.16),
+    Waypoint("Effingham, IL", 39.12, -88.54),
+    Waypoint("St. Louis, MO", 38.63, -90.20),
+    Waypoint("Columbia, MO", 38.95, -92.33),
+    Waypoint("Kansas City, MO", 39.10, -94.58),
+    Waypoint("Salina, KS", 38.84, -97.61),
+    Waypoint("Hays, KS", 38.88, -99.33),
+    Waypoint("Limon, CO", 39.26, -103.69),
+    Waypoint("Denver, CO", 39.74, -104.99),
+]
+
+
+def coverage(agenda: Optional[str], avg_speed_kmh: float) -> Dict:
+    points, _ = parse_agenda(agenda or "")
+    stops: List = [ROUTE[0].location] + [(p["latitude"], p["longitude"]) for p in points or []] + [ROUTE[-1].location]
+    gap = max(distance_km(a, b) for a, b in zip(stops, stops[1:]))
+    return {"markers": len(points or []), "max_gap_km": round(gap), "max_gap_minutes": round(gap / avg_speed_kmh * 60)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segment-km", type=float, default=250.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tokens-per-marker", type=int, default=130, help="Planner output tokens per marker")
+    parser.add_argument("--tokens-per-second", type=float, default=150.0, help="Fake decode speed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeBackendConfig(seed=args.seed, tokens_per_second=args.tokens_per_second, time_to_first_token=0.5,
+                               planner_tokens_per_marker=args.tokens_per_marker)
+    start, end = ROUTE[0], ROUTE[-1]
+    budget = sum(s.markers for s in split_route(ROUTE, args.segment_km))
+    prompt = f"I am travelling from {start.describe()} to {end.describe()}."
+
+    results = []
+    for name, markers in (("single", config.markers), ("single_full", budget)):
+        agent = MasterAgent(backend=FakeBackend(config), use_cache=False, structured_output=True)
+        started = time.perf_counter()
+        agenda = agent.generate_agenda(prompt if name == "single" else f"{prompt} Identify {markers} Narrative "
+                                                                        "Markers along the whole route.")
+        results.append(dict(mode=name, planner_calls=1, plan_seconds=round(time.perf_counter() - started, 2),
+                            **coverage(agenda, 90.0)))
+
+    agent = MasterAgent(backend=FakeBackend(config), use_cache=False)
+    started = time.perf_counter()
+    agenda = agent.generate_long_agenda(start.name, end.name, ROUTE, segment_km=args.segment_km,
+                                        max_concurrency=args.concurrency)
+    results.append(dict(mode="segmented", planner_calls=agent.segment_stats["segments"],
+                        plan_seconds=round(time.perf_counter() - started, 2), **coverage(agenda, 90.0),
+                        merge=agent.segment_stats))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
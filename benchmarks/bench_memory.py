@@ -0,0 +1,99 @@
+"""
+Memory Soak Benchmark - resident memory of a long-lived worker over thousands of stops
+
+Runs one TourArchitect over many consecutive tours on FakeBackend, as a
+worker process serving tours would, and samples the process RSS and the
+checkpoint gauges as it goes. Runs twice:
+  - bounded:   the default BoundedMemorySaver (finished stops compacted,
+               finished tours released, sections shared by reference)
+  - unbounded: keep_checkpoint_history=True, a plain MemorySaver that keeps
+               every checkpoint, with completed_sections copied into each stop
+and reports, per run, RSS after the warm-up tours and at the end, the
+growth per 1,000 stops, and the final checkpoint gauges.
+
+Usage:
+    python benchmarks/bench_memory.py [--tours 200] [--stops 12] [--samples 10]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpointStore import rss_bytes  # noqa: E402
+from fakeBackend import FakeBackend, FakeBackendConfig  # noqa: E402
+from tracing import Tracer  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+_MB = 1024 * 1024
+
+
+def soak(tours: int, stops: int, samples: int, keep_history: bool, seed: int) -> Dict:
+    """
+    Generate tours back to back on one architect.
+
+    Returns:
+        dict: RSS samples and checkpoint gauges for the run
+    """
+    backend = FakeBackend(FakeBackendConfig(seed=seed, markers=stops, time_to_first_token=0.0,
+                                            tokens_per_second=1e9, approval_rate=0.5))
+    agenda = backend.generate_content(model="planner", contents="soak route", config=_planner_config()).text
+    config = TourConfig(enable_cache=False, enable_context_cache=False, keep_checkpoint_history=keep_history)
+    # A small span buffer keeps the tracer from filling up during the run.
+    architect = TourArchitect(config, backend=backend, tracer=Tracer(max_spans=100))
+    warmup = max(1, tours // 10)
+    sample_at = {warmup + round(k * (tours - warmup) / samples) for k in range(samples + 1)}
+    rss = []
+    for tour in range(tours):
+        architect.run(agenda, filename=os.devnull, tour_id=f"tour-{tour}")
+        backend.reset_stats()
+        if tour + 1 in sample_at:
+            gc.collect()
+            rss.append(round(rss_bytes() / _MB, 1))
+
+    measured_stops = (tours - warmup) * stops
+    gauges = architect.generator.memory_stats()
+    return {
+        "mode": "unbounded" if keep_history else "bounded",
+        "stops": tours * stops,
+        "rss_after_warmup_mb": rss[0],
+        "rss_end_mb": rss[-1],
+        "rss_growth_mb_per_1000_stops": round((rss[-1] - rss[0]) / measured_stops * 1000, 2),
+        "rss_samples_mb": rss,
+        "checkpoint_threads": len(architect.generator.checkpointer.storage),
+        "checkpoint_gauges": gauges,
+    }
+
+
+def _planner_config():
+    from google.genai import types
+
+    return types.GenerateContentConfig(system_instruction="Route Narrative Architect")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tours", type=int, default=200)
+    parser.add_argument("--stops", type=int, default=12, help="Stops per tour")
+    parser.add_argument("--samples", type=int, default=10, help="RSS samples after the warm-up tours")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The pipeline prints progress per stop; keep stdout for the report.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = [soak(args.tours, args.stops, args.samples, keep_history, args.seed)
+                   for keep_history in (False, True)]
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
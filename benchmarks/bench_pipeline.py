@@ -0,0 +1,203 @@
+"""
+Pipeline Benchmark - end-to-end tour generation against the offline fake
+
+Runs planner + TourArchitect on FakeBackend for agendas of several sizes and
+reports, per size:
+  - end-to-end tour latency (planner call excluded)
+  - LLM calls per stop, split by role
+  - prompt bytes per call (mean / max)
+  - critical path through the traced calls
+  - local screen hit rate (drafts sent back without a director call)
+  - speculation success rate and restarts (pipelined mode)
+  - prompt tokens served from the context cache vs sent uncached, and
+    requests whose prefix was too small to cache
+  - estimated cost, call seconds and tokens saved against a uniform run
+    (strong model, full revision cap), calls on the fast model, and stops
+    ended early and drafts avoided by learned revision caps (--fast-model,
+    --adaptive-revisions; the caps learn across the sizes of one run)
+  - parse_route_data time
+  - approved stops and LLM calls per approved stop (--candidates N writes
+    N drafts per round; benchmarks/bench_best_of_n.py compares the modes)
+
+The response cache is disabled so every run measures real call counts.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 5 20 100] [--mode sequential|concurrent|pipelined]
+                                        [--fast-model gemini-2.5-flash-lite] [--adaptive-revisions]
+                                        [--candidates 3] [--selection director|local]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contextCache import ContextCache, ContextCacheConfig  # noqa: E402
+from fakeBackend import FakeBackend, FakeBackendConfig  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+def time_parse(architect: TourArchitect, agenda: str, repeat: int = 20) -> float:
+    """
+    Median parse_route_data time in milliseconds.
+
+    Args:
+        architect (TourArchitect): Architect whose parser is measured
+        agenda (str): Planner output to parse
+        repeat (int): Number of timed runs
+
+    Returns:
+        float: Median milliseconds per parse
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        architect.parse_route_data(agenda)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_size(stops: int, mode: str, fake_config: FakeBackendConfig, tour_config: TourConfig) -> Dict:
+    """
+    Benchmark one agenda size.
+
+    Args:
+        stops (int): Number of narrative markers in the agenda
+        mode (str): "sequential" (run), "concurrent" (run_concurrent) or "pipelined" (run_pipelined)
+        fake_config (FakeBackendConfig): Fake latency/token/approval models
+        tour_config (TourConfig): Writer configuration
+
+    Returns:
+        dict: Metrics for this size
+    """
+    fake_config.markers = stops
+    backend = FakeBackend(fake_config)
+    agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda(f"Benchmark route with {stops} stops")
+    backend.reset_stats()
+
+    # The API's minimum cacheable size applies: prefixes below it are sent inline and counted as fallbacks.
+    context_cache = ContextCache(ContextCacheConfig())
+    architect = TourArchitect(tour_config, backend=backend, context_cache=context_cache)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "tour_script.md")
+        start = time.perf_counter()
+        if mode == "concurrent":
+            scripts = architect.run_concurrent(agenda, filename=output)
+        elif mode == "pipelined":
+            scripts = architect.run_pipelined(agenda, filename=output)
+        else:
+            scripts = architect.run(agenda, filename=output)
+        elapsed = time.perf_counter() - start
+
+    stats = backend.stats()
+    summary = architect.summary()
+    screen = architect.generator.screener.stats() if architect.generator.screener else {}
+    speculation = architect.speculation_stats.to_dict() if architect.speculation_stats else {}
+    # The fake's latency scale is the fast model's true speedup; the uniform run is estimated with it.
+    model_speedups = {model: 1 / scale for model, scale in fake_config.model_latency_scale.items()}
+    policy = architect.policy_report(model_speedups=model_speedups)
+    outcomes = architect.generator.stop_outcomes
+    return {
+        "stops": stops,
+        "mode": mode,
+        "generated": len(scripts or []),
+        "tour_latency_s": round(elapsed, 3),
+        "latency_per_stop_ms": round(elapsed / stops * 1000, 2),
+        "llm_calls": stats["total_calls"],
+        "llm_calls_per_stop": round(stats["total_calls"] / stops, 2),
+        "approved_stops": outcomes["approved"],
+        "llm_calls_per_approved_stop": round(stats["total_calls"] / max(outcomes["approved"], 1), 2),
+        "calls_by_role": stats["calls"],
+        "prompt_bytes_per_call_mean": round(stats["prompt_bytes_mean"], 1),
+        "prompt_bytes_per_call_max": stats["prompt_bytes_max"],
+        "critical_path_s": round(summary["critical_path_seconds"], 3),
+        "cached_prompt_tokens": summary["cached_tokens"],
+        "uncached_prompt_tokens": summary["uncached_prompt_tokens"],
+        "context_cache_fallbacks": context_cache.stats()["fallbacks"],
+        "screened_drafts": screen.get("screened", 0),
+        "screen_rejections": screen.get("rejected", 0),
+        "screen_hit_rate": screen.get("hit_rate", 0.0),
+        "screen_reasons": screen.get("reasons", {}),
+        "speculation_success_rate": speculation.get("success_rate", 0.0),
+        "speculative_restarts": speculation.get("restarted", 0),
+        "cost_usd": policy["cost_usd"],
+        "saved_vs_uniform_share": policy["saved_share"],
+        "saved_vs_uniform_call_seconds": policy["saved_seconds"],
+        "saved_vs_uniform_tokens": policy["saved_tokens"],
+        "fast_model_calls": policy["fast_model_calls"],
+        "stops_capped_early": policy["stops_capped_early"],
+        "drafts_avoided": policy["drafts_avoided"],
+        "revision_caps": policy["caps"],
+        "parse_route_data_ms": round(time_parse(architect, agenda), 3),
+    }
+
+
+def run(sizes: List[int], mode: str, approval_rate: float, seed: int, max_revisions: int,
+        bad_draft_rate: float = 0.0, screening: bool = True, context_caching: bool = False,
+        fast_model: Optional[str] = None, fast_model_speedup: float = 2.0,
+        adaptive_revisions: bool = False, candidates: int = 1, selection: str = "director") -> List[Dict]:
+    """
+    Run the suite over several agenda sizes.
+
+    Returns:
+        list: One metrics dict per size
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tour_config = TourConfig(enable_cache=False, max_revisions=max_revisions, enable_screening=screening,
+                                 enable_context_cache=context_caching, fast_model_name=fast_model,
+                                 adaptive_revisions=adaptive_revisions, draft_candidates=candidates,
+                                 candidate_selection=selection,
+                                 revision_history_path=os.path.join(tmp, "revisions.sqlite"))
+        latency_scale = {fast_model: 1 / fast_model_speedup} if fast_model else {}
+        return [
+            bench_size(size, mode, FakeBackendConfig(seed=seed, approval_rate=approval_rate,
+                                                     bad_draft_rate=bad_draft_rate,
+                                                     model_latency_scale=latency_scale), tour_config)
+            for size in sizes
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--mode", choices=["sequential", "concurrent", "pipelined"], default="sequential")
+    parser.add_argument("--approval-rate", type=float, default=0.7)
+    parser.add_argument("--max-revisions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bad-draft-rate", type=float, default=0.0,
+                        help="Share of writer drafts the fake returns as short stubs")
+    parser.add_argument("--no-screen", action="store_true", help="Disable the local pre-director screen")
+    parser.add_argument("--context-cache", action="store_true",
+                        help="Serve system prompts and route context from (fake) server-side caches")
+    parser.add_argument("--fast-model", help="Cheap model for first drafts and director reviews")
+    parser.add_argument("--fast-model-speedup", type=float, default=2.0,
+                        help="How much faster the fake answers for the fast model")
+    parser.add_argument("--adaptive-revisions", action="store_true",
+                        help="Learn per-category revision caps from the stops already generated")
+    parser.add_argument("--candidates", type=int, default=1, help="Drafts written per writer round (best-of-N)")
+    parser.add_argument("--selection", choices=["director", "local"], default="director",
+                        help="Pick among candidates by one batched director review or the local ranker")
+    args = parser.parse_args()
+
+    # The pipeline prints progress per stop; keep stdout for the report.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = run(args.sizes, args.mode, args.approval_rate, args.seed, args.max_revisions,
+                      args.bad_draft_rate, not args.no_screen, args.context_cache, args.fast_model,
+                      args.fast_model_speedup, args.adaptive_revisions, args.candidates, args.selection)
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
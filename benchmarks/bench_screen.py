@@ -0,0 +1,112 @@
+"""
+Draft Screen Benchmark - false rejects of the local screen on recorded scripts
+
+The screen's structure checks (paragraphs, an "Easter egg" phrase, an outro
+transition) look for literal wording, so they can reject scripts a director
+would approve. This replays recorded scripts through DraftScreener with the
+structure checks advisory (the default) and required, and reports how many
+each setting rejects and why.
+
+Scripts come from:
+  --checkpoint DB   final stop scripts saved by runs with TourConfig.checkpoint_path
+                    (each stop is screened against the earlier stops of its tour)
+  --drafts FILE     JSONL, one {"draft": ..., "approved": true|false, "previous": [...]} per line,
+                    for drafts recorded together with the director's verdict
+
+A script the director approved (or that shipped) but the screen rejects is a
+false reject. Drafts recorded as not approved show what the screen catches.
+Run it on real recordings before turning require_structure on; the fake
+backend's drafts are built to pass these checks and say nothing about them.
+
+Usage:
+    python benchmarks/bench_screen.py --checkpoint tours.sqlite [--drafts drafts.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from draftScreen import STRUCTURE_CHECKS, DraftScreener, ScreenConfig  # noqa: E402
+
+# (draft, approved, previous sections)
+Sample = Tuple[str, bool, List[str]]
+
+
+def load_checkpoint(path: str) -> List[Sample]:
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT tour_id, stop_index, title, transcript FROM stops ORDER BY tour_id, stop_index")
+        samples: List[Sample] = []
+        tour, previous = None, []
+        for tour_id, index, title, transcript in rows:
+            if tour_id != tour:
+                tour, previous = tour_id, []
+            samples.append((transcript, True, list(previous)))
+            previous.append(f"STOP {index + 1}: {title}\n{transcript}")
+        return samples
+    finally:
+        db.close()
+
+
+def load_drafts(path: str) -> List[Sample]:
+    samples: List[Sample] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                samples.append((record["draft"], bool(record.get("approved", True)), list(record.get("previous", []))))
+    return samples
+
+
+def screen(samples: List[Sample], config: ScreenConfig) -> Dict:
+    screener = DraftScreener(config)
+    report = {"approved": {"scripts": 0, "rejected": 0, "reasons": {}},
+              "not_approved": {"scripts": 0, "rejected": 0, "reasons": {}}}
+    for draft, approved, previous in samples:
+        result = screener.screen(draft, previous)
+        bucket = report["approved" if approved else "not_approved"]
+        bucket["scripts"] += 1
+        bucket["rejected"] += int(not result.passed)
+        for reason in result.reasons:
+            bucket["reasons"][reason] = bucket["reasons"].get(reason, 0) + 1
+    for bucket in report.values():
+        bucket["rejected_rate"] = round(bucket["rejected"] / bucket["scripts"], 4) if bucket["scripts"] else None
+    report["approved"]["false_reject_rate"] = report["approved"].pop("rejected_rate")
+    report["advisories"] = screener.stats()["advisories"]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checkpoint", metavar="DB", help="SQLite checkpoint file with saved tour stops")
+    parser.add_argument("--drafts", metavar="FILE", help="JSONL of recorded drafts and director verdicts")
+    parser.add_argument("--min-words", type=int, default=120)
+    parser.add_argument("--max-words", type=int, default=1500)
+    parser.add_argument("--max-overlap", type=float, default=0.5)
+    args = parser.parse_args()
+    if not args.checkpoint and not args.drafts:
+        parser.error("give --checkpoint and/or --drafts")
+
+    samples: List[Sample] = []
+    if args.checkpoint:
+        samples += load_checkpoint(args.checkpoint)
+    if args.drafts:
+        samples += load_drafts(args.drafts)
+
+    results = {}
+    for name, required in (("advisory_structure", False), ("required_structure", True)):
+        config = ScreenConfig(min_words=args.min_words, max_words=args.max_words, max_overlap=args.max_overlap,
+                              require_structure=required)
+        results[name] = screen(samples, config)
+    print(json.dumps({"scripts": len(samples), "structure_checks": list(STRUCTURE_CHECKS), "results": results},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
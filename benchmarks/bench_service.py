@@ -0,0 +1,120 @@
+"""
+Service Benchmark - request bursts against the coalescing tour service
+
+Starts tourService.TourService on FakeBackend and fires a burst of
+concurrent SSE requests spread over a few distinct routes, as during a
+launch or promotion. Runs the burst with and without request coalescing
+and reports, per run:
+  - generations started and LLM calls made
+  - time to the first approved stop and to the finished tour per client (p50 / p95)
+
+Usage:
+    python benchmarks/bench_service.py [--clients 50] [--routes 3] [--stops 6]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import FakeBackend, FakeBackendConfig  # noqa: E402
+from tourService import TourService  # noqa: E402
+from wrtirAgent import TourConfig  # noqa: E402
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def client(port: int, route: Dict) -> Dict[str, float]:
+    """
+    Request one tour and follow its event stream to the end.
+
+    Returns:
+        dict: Seconds to the first stop event and to the done event
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(route).encode("utf-8")
+    writer.write(f"POST /tours HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    first_stop = done = None
+    while line := await reader.readline():
+        if line.startswith(b"event: stop") and first_stop is None:
+            first_stop = time.perf_counter() - started
+        elif line.startswith(b"event: done"):
+            done = time.perf_counter() - started
+    writer.close()
+    return {"first_stop": first_stop or 0.0, "done": done or 0.0}
+
+
+async def burst(clients: int, routes: int, stops: int, coalesce: bool, seed: int) -> Dict:
+    """
+    Fire one burst and collect its metrics.
+
+    Returns:
+        dict: Metrics for the burst
+    """
+    backend = FakeBackend(FakeBackendConfig(seed=seed, markers=stops))
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TourService(tmp, base_config=TourConfig(enable_cache=False), backend=backend, coalesce=coalesce)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        requests = [{"start": "Blacksburg, VA", "end": f"Destination {i % routes}"} for i in range(clients)]
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(client(port, route) for route in requests))
+        elapsed = time.perf_counter() - started
+        stats = service.stats()
+        await service.close()
+        server.close()
+        await server.wait_closed()
+
+    first = [t["first_stop"] for t in timings]
+    done = [t["done"] for t in timings]
+    return {
+        "coalesce": coalesce,
+        "clients": clients,
+        "routes": routes,
+        "generations": stats["generations"],
+        "coalesced_requests": stats["coalesced"],
+        "llm_calls": backend.stats()["total_calls"],
+        "first_stop_p50_s": round(statistics.median(first), 3),
+        "first_stop_p95_s": round(percentile(first, 0.95), 3),
+        "done_p50_s": round(statistics.median(done), 3),
+        "done_p95_s": round(percentile(done, 0.95), 3),
+        "burst_seconds": round(elapsed, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--routes", type=int, default=3, help="Distinct routes the burst is spread over")
+    parser.add_argument("--stops", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The pipeline prints progress per stop; keep stdout for the report.
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        # The first generation pays for importing google.genai and langgraph; keep that out of both runs.
+        asyncio.run(burst(1, 1, args.stops, True, args.seed))
+        results = [asyncio.run(burst(args.clients, args.routes, args.stops, coalesce, args.seed))
+                   for coalesce in (True, False)]
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup Benchmark - import and construction cost of the pipeline
+
+Each sample runs in a fresh interpreter so module caches do not hide the
+real cold-start cost a new worker pays. Reports the median time to import
+the GuideAI modules and construct MasterAgent / TourArchitect, and checks
+that no heavy dependency (google.genai, langgraph) was loaded on the way.
+
+Usage:
+    python benchmarks/bench_startup.py [--samples 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("google.genai", "langgraph")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import guideai, masterAgent, plannerAgent, wrtirAgent
+t1 = time.perf_counter()
+masterAgent.MasterAgent()
+wrtirAgent.TourArchitect()
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "construct_ms": (t2 - t1) * 1000,
+    "heavy_loaded": sorted(m for m in sys.modules if m.startswith(%r)),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once() -> dict:
+    """
+    Measure one cold start in a subprocess.
+
+    Returns:
+        dict: import_ms, construct_ms and any heavy modules that got imported
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=REPO_ROOT,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(samples: int) -> dict:
+    """
+    Run the benchmark.
+
+    Args:
+        samples (int): Number of cold starts to measure
+
+    Returns:
+        dict: Median timings and the heavy modules seen in any sample
+    """
+    results = [measure_once() for _ in range(samples)]
+    return {
+        "samples": samples,
+        "import_ms_median": statistics.median(r["import_ms"] for r in results),
+        "construct_ms_median": statistics.median(r["construct_ms"] for r in results),
+        "total_ms_median": statistics.median(r["import_ms"] + r["construct_ms"] for r in results),
+        "heavy_loaded": sorted({m for r in results for m in r["heavy_loaded"]}),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=10)
+    args = parser.parse_args()
+    report = run(args.samples)
+    print(json.dumps(report, indent=2))
+    if report["heavy_loaded"]:
+        sys.exit(f"heavy modules imported at startup: {report['heavy_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Checkpoint Store Module - Durable LangGraph checkpoints and tour progress
+
+BoundedMemorySaver is the in-memory checkpointer for long-lived workers.
+Once a stop's graph finishes, only its latest checkpoint is kept. A
+finished tour's threads are released, and beyond max_threads the least
+recently written threads are evicted, so a worker serving many tours holds
+a bounded number of snapshots. memory_stats() reports the gauges.
+
+SqliteCheckpointSaver is a LangGraph checkpointer that writes every
+checkpoint, pending write and channel blob through to a local SQLite file.
+It reuses InMemorySaver's read logic and keeps loaded threads in memory,
+persisting the exact serialized bytes, so a restarted worker sees the same
+writer/director checkpoints the crashed one left behind.
+
+TourStore records each tour's input and every approved stop in the same
+file, so TourArchitect.resume(tour_id) can skip finished stops and restart
+in-flight ones from their last checkpoint.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    checkpoint_type TEXT NOT NULL, checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, parent_id TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL,
+    value_type TEXT NOT NULL, value BLOB NOT NULL, task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL, version TEXT NOT NULL,
+    value_type TEXT NOT NULL, value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS tours (
+    tour_id TEXT PRIMARY KEY, raw_input TEXT NOT NULL, filename TEXT,
+    status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stops (
+    tour_id TEXT NOT NULL, stop_index INTEGER NOT NULL, title TEXT NOT NULL,
+    transcript TEXT NOT NULL, approved REAL NOT NULL,
+    PRIMARY KEY (tour_id, stop_index)
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+def rss_bytes() -> int:
+    """
+    Resident set size of this process.
+
+    Returns:
+        int: Bytes, from /proc where available, else the peak RSS reported by getrusage
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    InMemorySaver with compaction and eviction.
+
+    Attributes:
+        max_threads (int): Threads kept in memory before the least recently written is evicted
+        evicted_threads (int): Threads dropped by release() or the max_threads bound
+        pruned_checkpoints (int): Superseded checkpoints dropped by prune_thread()
+    """
+
+    def __init__(self, max_threads: int = 1000, **kwargs: Any) -> None:
+        """
+        Create an empty saver.
+
+        Args:
+            max_threads (int): Threads kept in memory
+            **kwargs: Passed to InMemorySaver (e.g. serde)
+        """
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+        self._recent: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        self._touch(config["configurable"]["thread_id"])
+        return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._recent.pop(thread_id, None)
+
+    def prune_thread(self, thread_id: str) -> int:
+        """
+        Keep only the latest checkpoint of a finished thread, with the blobs it references.
+
+        Args:
+            thread_id (str): Thread to compact
+
+        Returns:
+            int: Checkpoints dropped
+        """
+        with self._lock:
+            dropped = 0
+            for checkpoint_ns, checkpoints in list(self.storage.get(thread_id, {}).items()):
+                if len(checkpoints) < 2:
+                    continue
+                latest = max(checkpoints)
+                versions = self.serde.loads_typed(checkpoints[latest][0])["channel_versions"]
+                for checkpoint_id in [c for c in checkpoints if c != latest]:
+                    del checkpoints[checkpoint_id]
+                    self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                    dropped += 1
+                for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns
+                            and versions.get(k[2]) != k[3]]:
+                    del self.blobs[key]
+                self._prune_persisted(thread_id, checkpoint_ns, latest, versions)
+            self.pruned_checkpoints += dropped
+            return dropped
+
+    def release(self, prefix: str) -> int:
+        """
+        Drop every thread of a finished tour from memory.
+
+        Args:
+            prefix (str): Tour id; threads named "<prefix>:..." are released
+
+        Returns:
+            int: Threads released
+        """
+        with self._lock:
+            threads = [t for t in self.storage if t == prefix or t.startswith(prefix + ":")]
+            for thread_id in threads:
+                self._forget(thread_id)
+            return len(threads)
+
+    def memory_stats(self) -> Dict[str, int]:
+        """
+        Memory gauges.
+
+        Returns:
+            dict: threads, checkpoints, pending_writes, blobs and their serialized bytes,
+                  plus evicted_threads and pruned_checkpoints counters
+        """
+        with self._lock:
+            checkpoints = [saved for namespaces in self.storage.values()
+                           for checkpoints in namespaces.values() for saved in checkpoints.values()]
+            writes = [value for stored in self.writes.values() for (_, _, value, _) in stored.values()]
+            return {
+                "threads": len(self.storage),
+                "checkpoints": len(checkpoints),
+                "pending_writes": len(writes),
+                "blobs": len(self.blobs),
+                "bytes": (sum(len(c[0][1]) + len(c[1][1]) for c in checkpoints)
+                          + sum(len(v[1]) for v in writes) + sum(len(v[1]) for v in self.blobs.values())),
+                "evicted_threads": self.evicted_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+    def _touch(self, thread_id: str) -> None:
+        with self._lock:
+            self._recent[thread_id] = None
+            self._recent.move_to_end(thread_id)
+            while len(self._recent) > self.max_threads:
+                self._forget(next(iter(self._recent)))
+
+    def _forget(self, thread_id: str) -> None:
+        # Memory only: a durable subclass keeps its copy and reloads it on demand.
+        InMemorySaver.delete_thread(self, thread_id)
+        self._recent.pop(thread_id, None)
+        self.evicted_threads += 1
+
+    def _prune_persisted(self, thread_id: str, checkpoint_ns: str, latest: str, versions: Dict) -> None:
+        pass
+
+
+class SqliteCheckpointSaver(BoundedMemorySaver):
+    """
+    BoundedMemorySaver that writes through to SQLite.
+
+    Threads are loaded from disk the first time they are read, so a fresh
+    process can pick up any thread a previous one checkpointed. Evicting a
+    thread only drops the in-memory copy; pruning also compacts the file.
+
+    Attributes:
+        path (str): SQLite file
+    """
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        """
+        Open (or create) the checkpoint database.
+
+        Args:
+            path (str): SQLite file
+            **kwargs: Passed to BoundedMemorySaver (e.g. max_threads, serde)
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self._db = _connect(path)
+        self._loaded: set = set()
+
+    def get_tuple(self, config):
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is None:
+            self._load_all()
+        else:
+            self._ensure_loaded(config["configurable"]["thread_id"])
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            result = super().put(config, checkpoint, metadata, new_versions)
+            saved, saved_metadata, parent_id = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], saved[0], saved[1],
+                 saved_metadata[0], saved_metadata[1], parent_id)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, channel, str(version), *self.blobs[(thread_id, checkpoint_ns, channel, version)])
+                    for channel, version in new_versions.items()
+                ]
+            )
+            self._db.commit()
+        return result
+
+    def put_writes(self, config, writes: Sequence[tuple], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            self._ensure_loaded(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+            stored = self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {})
+            self._db.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, checkpoint_id, key[0], key[1], channel, value[0], value[1], path)
+                    for key, (_, channel, value, path) in stored.items() if key[0] == task_id
+                ]
+            )
+            self._db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            for table in ("checkpoints", "writes", "blobs"):
+                self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._db.commit()
+            self._loaded.discard(thread_id)
+
+    def _forget(self, thread_id: str) -> None:
+        with self._lock:
+            super()._forget(thread_id)
+            self._loaded.discard(thread_id)
+
+    def _prune_persisted(self, thread_id: str, checkpoint_ns: str, latest: str, versions: Dict) -> None:
+        with self._lock:
+            where = "thread_id = ? AND checkpoint_ns = ?"
+            self._db.execute(f"DELETE FROM checkpoints WHERE {where} AND checkpoint_id != ?",
+                             (thread_id, checkpoint_ns, latest))
+            self._db.execute(f"DELETE FROM writes WHERE {where} AND checkpoint_id != ?",
+                             (thread_id, checkpoint_ns, latest))
+            for channel, version in self._db.execute(
+                f"SELECT channel, version FROM blobs WHERE {where}", (thread_id, checkpoint_ns)
+            ).fetchall():
+                if channel not in versions or str(versions[channel]) != version:
+                    self._db.execute(f"DELETE FROM blobs WHERE {where} AND channel = ? AND version = ?",
+                                     (thread_id, checkpoint_ns, channel, version))
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._db.close()
+
+    def _ensure_loaded(self, thread_id: str) -> None:
+        with self._lock:
+            if thread_id in self._loaded:
+                return
+            self._loaded.add(thread_id)
+            for ns, checkpoint_id, ctype, cbytes, mtype, mbytes, parent_id in self._db.execute(
+                "SELECT checkpoint_ns, checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata, parent_id"
+                " FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ):
+                self.storage[thread_id][ns][checkpoint_id] = ((ctype, cbytes), (mtype, mbytes), parent_id)
+            for ns, checkpoint_id, task_id, idx, channel, vtype, value, path in self._db.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path"
+                " FROM writes WHERE thread_id = ?", (thread_id,)
+            ):
+                self.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (vtype, value), path)
+            for ns, channel, version, vtype, value in self._db.execute(
+                "SELECT checkpoint_ns, channel, version, value_type, value FROM blobs WHERE thread_id = ?", (thread_id,)
+            ):
+                self.blobs[(thread_id, ns, channel, version)] = (vtype, value)
+
+    def _load_all(self) -> None:
+        for (thread_id,) in self._db.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall():
+            self._ensure_loaded(thread_id)
+
+
+class TourStore:
+    """
+    Tour inputs and approved stops, for crash-resume.
+
+    Attributes:
+        path (str): SQLite file (may be shared with SqliteCheckpointSaver)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) the tour database.
+
+        Args:
+            path (str): SQLite file
+        """
+        self.path = path
+        self._db = _connect(path)
+        self._lock = threading.Lock()
+
+    def start_tour(self, tour_id: str, raw_input: str, filename: Optional[str]) -> None:
+        """
+        Record a tour's input. A tour that already exists keeps its original record.
+
+        Args:
+            tour_id (str): Tour identifier
+            raw_input (str): Planner output the tour is generated from
+            filename (str, optional): Markdown output path
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO tours VALUES (?, ?, ?, 'running', ?, ?)",
+                (tour_id, raw_input, filename, now, now)
+            )
+            self._db.execute("UPDATE tours SET status = 'running', updated = ? WHERE tour_id = ?", (now, tour_id))
+            self._db.commit()
+
+    def get_tour(self, tour_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a tour.
+
+        Args:
+            tour_id (str): Tour identifier
+
+        Returns:
+            dict: raw_input, filename and status, or None if unknown
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT raw_input, filename, status FROM tours WHERE tour_id = ?", (tour_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"tour_id": tour_id, "raw_input": row[0], "filename": row[1], "status": row[2]}
+
+    def approved_stops(self, tour_id: str) -> Dict[int, str]:
+        """
+        Approved transcripts of a tour.
+
+        Args:
+            tour_id (str): Tour identifier
+
+        Returns:
+            dict: stop index -> transcript
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stop_index, transcript FROM stops WHERE tour_id = ?", (tour_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_stop(self, tour_id: str, stop_index: int, title: str, transcript: str) -> None:
+        """
+        Record an approved stop.
+
+        Args:
+            tour_id (str): Tour identifier
+            stop_index (int): Zero-based stop position
+            title (str): Stop title
+            transcript (str): Approved script
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO stops VALUES (?, ?, ?, ?, ?)",
+                (tour_id, stop_index, title, transcript, time.time())
+            )
+            self._db.commit()
+
+    def finish_tour(self, tour_id: str) -> None:
+        """Mark a tour complete."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE tours SET status = 'complete', updated = ? WHERE tour_id = ?", (time.time(), tour_id)
+            )
+            self._db.commit()
+
+    def unfinished_tours(self) -> List[str]:
+        """
+        Tours that started but never completed.
+
+        Returns:
+            list: Tour identifiers, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT tour_id FROM tours WHERE status != 'complete' ORDER BY created"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._db.close()
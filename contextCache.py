@@ -0,0 +1,433 @@
+"""
+Context Cache Module - Server-side caching of stable prompt prefixes
+
+Writer and director calls resend the same prefix over and over.
+The prefix is the system instruction (plus tools). For the writer and
+director it also includes the tour's route. ContextCachingBackend moves that
+prefix into a Gemini explicit cache (client.caches) and sends each request
+with only cached_content plus the per-call prompt. Cached input tokens are
+billed and prefilled at a discount and show up as cached_tokens in the
+trace spans.
+
+Cache lifetimes are scoped:
+
+  - worker: prefixes that never change are shared by every call in the
+    process and expire by TTL.
+  - tour: prefixes that carry tour context live under the current
+    trace_context tour_id and are deleted by release(tour_id) when the tour
+    finishes.
+
+When caching is not available, the request is sent unchanged with the
+prefix inline. That covers a backend without cache support, a prefix below
+the model's minimum cacheable size, or a create error. A cached request
+that fails because the server cache expired or was deleted is retried once
+inline. Requests served from the cache and fallbacks by reason are counted
+for reporting.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from continuityContext import estimate_tokens
+from llmBackend import LLMBackend
+from tracing import annotate, context_attributes
+
+
+logger = logging.getLogger(__name__)
+
+WORKER = "worker"
+TOUR = "tour"
+
+UNSUPPORTED = "unsupported"
+TOO_SMALL = "too_small"
+CREATE_ERROR = "create_error"
+EXPIRED = "expired"
+
+_STALE_CACHE_CODES = {400, 403, 404}
+
+
+@dataclass
+class ContextCacheConfig:
+    """
+    Context cache settings.
+
+    Attributes:
+        enabled (bool): Use server-side caches at all
+        ttl_seconds (int): Lifetime of each cache on the server
+        min_tokens (int): Smallest prefix worth caching (the API rejects smaller ones)
+        refresh_margin_seconds (float): Recreate a cache this long before it expires
+    """
+    enabled: bool = True
+    ttl_seconds: int = 3600
+    min_tokens: int = 1024
+    refresh_margin_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ContextCacheConfig":
+        """
+        Read settings from GUIDEAI_CONTEXT_CACHE (0 disables), GUIDEAI_CONTEXT_CACHE_TTL and
+        GUIDEAI_CONTEXT_CACHE_MIN_TOKENS.
+
+        Returns:
+            ContextCacheConfig: Settings with environment overrides applied
+        """
+        config = cls()
+        if os.environ.get("GUIDEAI_CONTEXT_CACHE", "").strip().lower() in ("0", "false", "no", "off"):
+            config.enabled = False
+        if os.environ.get("GUIDEAI_CONTEXT_CACHE_TTL"):
+            config.ttl_seconds = int(os.environ["GUIDEAI_CONTEXT_CACHE_TTL"])
+        if os.environ.get("GUIDEAI_CONTEXT_CACHE_MIN_TOKENS"):
+            config.min_tokens = int(os.environ["GUIDEAI_CONTEXT_CACHE_MIN_TOKENS"])
+        return config
+
+
+@dataclass
+class _Entry:
+    name: str
+    scope: str
+    expires: float
+    tokens: int
+    backend: LLMBackend
+
+
+def prefix_of(config: Any) -> Optional[Dict[str, Any]]:
+    """
+    The cacheable prefix of a request config.
+
+    Args:
+        config (GenerateContentConfig, optional): Request config
+
+    Returns:
+        dict: system_instruction, tools and tool_config, or None if the request has no system instruction
+              or already uses a cache
+    """
+    if config is None or not getattr(config, "system_instruction", None) or getattr(config, "cached_content", None):
+        return None
+    return {
+        "system_instruction": config.system_instruction,
+        "tools": config.tools,
+        "tool_config": config.tool_config,
+    }
+
+
+def _prefix_digest(model: str, prefix: Dict[str, Any]) -> str:
+    def jsonable(value):
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json", exclude_none=True)
+        if isinstance(value, (list, tuple)):
+            return [jsonable(v) for v in value]
+        return value
+
+    payload = json.dumps({"model": model, **{k: jsonable(v) for k, v in prefix.items()}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ContextCache:
+    """
+    Registry of server-side prefix caches, keyed by scope, model and prefix.
+
+    Attributes:
+        config (ContextCacheConfig): Settings
+    """
+
+    def __init__(self, config: Optional[ContextCacheConfig] = None, clock: Callable[[], float] = time.time) -> None:
+        """
+        Initialize an empty registry.
+
+        Args:
+            config (ContextCacheConfig, optional): Settings; read from the environment if None
+            clock (callable): Time source, for tests
+        """
+        self.config = config or ContextCacheConfig.from_env()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._creating: Dict[Tuple[str, str], threading.Lock] = {}
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._unavailable: Dict[Tuple[str, str], str] = {}
+        self._counts: Dict[str, int] = {"requests": 0, "cached_requests": 0, "created": 0, "released": 0}
+        self._fallbacks: Dict[str, int] = {}
+
+    def lookup(self, backend: LLMBackend, model: str, config: Any, scope: str) -> Tuple[Optional[str], Optional[tuple]]:
+        """
+        Find or create the cache for a request's prefix.
+
+        Args:
+            backend (LLMBackend): Backend that creates (and later deletes) the cache
+            model (str): Model identifier; caches are model-specific
+            config (GenerateContentConfig): Request config
+            scope (str): WORKER, or the tour id the cache belongs to
+
+        Returns:
+            tuple: (cache name, registry key), or (None, None) to send the prefix inline
+        """
+        prefix = prefix_of(config)
+        if prefix is None or not self.config.enabled:
+            return None, None
+        key = (scope, _prefix_digest(model, prefix))
+        with self._lock:
+            self._counts["requests"] += 1
+            name = self._live(key)
+            if name is None and key in self._unavailable:
+                return self._fallback(self._unavailable[key]), None
+            creating = self._creating.setdefault(key, threading.Lock())
+        if name is not None:
+            return name, key
+
+        with creating:
+            with self._lock:
+                name = self._live(key)
+            if name is None:
+                name = self._create(backend, model, prefix, scope, key)
+        return name, key if name else None
+
+    def invalidate(self, key: tuple) -> None:
+        """
+        Forget a cache the server no longer has.
+
+        Args:
+            key (tuple): Registry key returned by lookup
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._fallbacks[EXPIRED] = self._fallbacks.get(EXPIRED, 0) + 1
+            self._counts["cached_requests"] -= 1
+
+    def release(self, scope: str) -> int:
+        """
+        Delete every server cache created for a scope (e.g. when a tour finishes).
+
+        Args:
+            scope (str): Tour id (or WORKER)
+
+        Returns:
+            int: Caches deleted
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == scope]
+            entries = [self._entries.pop(key) for key in keys]
+            for key in keys:
+                self._creating.pop(key, None)
+            self._unavailable = {k: v for k, v in self._unavailable.items() if k[0] != scope}
+        for entry in entries:
+            try:
+                entry.backend.delete_cached_content(entry.name)
+            except Exception as error:  # the TTL cleans up anything we fail to delete
+                logger.warning(f"Could not delete context cache {entry.name}: {error}")
+        with self._lock:
+            self._counts["released"] += len(entries)
+        return len(entries)
+
+    def close(self) -> None:
+        """Delete every cache this registry created."""
+        with self._lock:
+            scopes = {key[0] for key in self._entries}
+        for scope in scopes:
+            self.release(scope)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Cache usage so far.
+
+        Returns:
+            dict: requests with a cacheable prefix, cached_requests, created, released, live caches,
+                  cached prefix tokens per request (estimated), hit_rate and fallbacks per reason
+        """
+        with self._lock:
+            stats: Dict[str, object] = dict(self._counts)
+            stats["live"] = len(self._entries)
+            stats["hit_rate"] = round(self._counts["cached_requests"] / self._counts["requests"], 4) \
+                if self._counts["requests"] else 0.0
+            stats["fallbacks"] = dict(self._fallbacks)
+        return stats
+
+    def _live(self, key: tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires - self.config.refresh_margin_seconds <= self._clock():
+            return None
+        self._counts["cached_requests"] += 1
+        return entry.name
+
+    def _fallback(self, reason: str) -> None:
+        self._fallbacks[reason] = self._fallbacks.get(reason, 0) + 1
+        return None
+
+    def _create(self, backend: LLMBackend, model: str, prefix: Dict[str, Any], scope: str,
+                key: tuple) -> Optional[str]:
+        tokens = estimate_tokens(str(prefix["system_instruction"]))
+        reason = None
+        name = None
+        if tokens < self.config.min_tokens:
+            reason = TOO_SMALL
+        else:
+            try:
+                name = backend.create_cached_content(
+                    model=model, prefix=prefix, ttl_seconds=self.config.ttl_seconds,
+                    display_name=f"guideai-{scope}"[:128]
+                )
+            except NotImplementedError:
+                reason = UNSUPPORTED
+            except Exception as error:
+                logger.warning(f"Context cache create failed, sending the prefix inline: {error}")
+                reason = CREATE_ERROR
+
+        with self._lock:
+            if name is None:
+                self._unavailable[key] = reason
+                self._fallback(reason)
+                return None
+            self._entries[key] = _Entry(name, scope, self._clock() + self.config.ttl_seconds, tokens, backend)
+            self._unavailable.pop(key, None)
+            self._counts["created"] += 1
+            self._counts["cached_requests"] += 1
+        return name
+
+
+class ContextCachingBackend(LLMBackend):
+    """
+    LLMBackend wrapper that sends stable prefixes through a ContextCache.
+
+    Attributes:
+        inner (LLMBackend): Backend called with the rewritten request
+        cache (ContextCache): Cache registry
+        scope (str): WORKER for static prefixes; TOUR to scope caches to the current trace_context tour_id
+    """
+
+    def __init__(self, inner: LLMBackend, cache: ContextCache, scope: str = WORKER) -> None:
+        """
+        Initialize the wrapper.
+
+        Args:
+            inner (LLMBackend): Backend to call
+            cache (ContextCache): Cache registry
+            scope (str): WORKER or TOUR
+        """
+        self.inner = inner
+        self.cache = cache
+        self.scope = scope
+
+    def generate_content(self, *, model, contents, config=None):
+        return self._call(lambda cfg: self.inner.generate_content(model=model, contents=contents, config=cfg),
+                          model, config)
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        return await self._acall(
+            lambda cfg: self.inner.agenerate_content(model=model, contents=contents, config=cfg), model, config)
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        delivered = []
+
+        def forward(chunk):
+            delivered.append(True)
+            on_chunk(chunk)
+
+        return self._call(
+            lambda cfg: self.inner.stream_content(model=model, contents=contents, config=cfg, on_chunk=forward),
+            model, config, can_retry=lambda: not delivered)
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        delivered = []
+
+        def forward(chunk):
+            delivered.append(True)
+            on_chunk(chunk)
+
+        return await self._acall(
+            lambda cfg: self.inner.astream_content(model=model, contents=contents, config=cfg, on_chunk=forward),
+            model, config, can_retry=lambda: not delivered)
+
+    def create_cached_content(self, *, model, prefix, ttl_seconds, display_name=None):
+        return self.inner.create_cached_content(model=model, prefix=prefix, ttl_seconds=ttl_seconds,
+                                                display_name=display_name)
+
+    def delete_cached_content(self, name):
+        return self.inner.delete_cached_content(name)
+
+    def _scope(self) -> str:
+        if self.scope == TOUR:
+            return context_attributes().get("tour_id") or WORKER
+        return self.scope
+
+    def _call(self, send, model, config, can_retry=lambda: True):
+        name, key = self.cache.lookup(self.inner, model, config, self._scope())
+        if name is None:
+            return send(config)
+        annotate(context_cache=name)
+        try:
+            return send(_with_cached_content(config, name))
+        except Exception as error:
+            if not (_is_stale_cache_error(error) and can_retry()):
+                raise
+            self.cache.invalidate(key)
+            return send(config)
+
+    async def _acall(self, send, model, config, can_retry=lambda: True):
+        if prefix_of(config) is None or not self.cache.config.enabled:
+            return await send(config)
+        name, key = await asyncio.to_thread(self.cache.lookup, self.inner, model, config, self._scope())
+        if name is None:
+            return await send(config)
+        annotate(context_cache=name)
+        try:
+            return await send(_with_cached_content(config, name))
+        except Exception as error:
+            if not (_is_stale_cache_error(error) and can_retry()):
+                raise
+            self.cache.invalidate(key)
+            return await send(config)
+
+
+def _with_cached_content(config: Any, name: str) -> Any:
+    # The API rejects requests that repeat the cached system instruction or tools.
+    return config.model_copy(update={"cached_content": name, "system_instruction": None,
+                                     "tools": None, "tool_config": None})
+
+
+def _is_stale_cache_error(error: BaseException) -> bool:
+    from rateLimiter import error_code
+
+    return error_code(error) in _STALE_CACHE_CODES and "cache" in str(error).lower()
+
+
+_shared_cache: Optional[ContextCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_context_cache() -> ContextCache:
+    """
+    Get the process-wide context cache registry, configured from the environment.
+
+    Returns:
+        ContextCache: Shared registry
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ContextCache()
+        return _shared_cache
+
+
+def with_context_cache(backend: LLMBackend, cache: Optional[ContextCache], scope: str = WORKER) -> LLMBackend:
+    """
+    Wrap a backend in a ContextCachingBackend, or return it unchanged if cache is None.
+
+    Args:
+        backend (LLMBackend): Backend to wrap
+        cache (ContextCache, optional): Cache registry
+        scope (str): WORKER or TOUR
+
+    Returns:
+        LLMBackend: The wrapped (or original) backend
+    """
+    return ContextCachingBackend(backend, cache, scope) if cache is not None else backend
@@ -0,0 +1,212 @@
+"""
+Continuity Context Module - Bounded digest of previously approved stops
+
+The writer and director need to know what earlier stops covered so they can
+call back to it, but resending every approved script makes prompt size grow
+quadratically over a tour. ContinuityDigest keeps a compact per-stop summary
+plus key topics, updated incrementally as stops are approved, and renders it
+within a fixed token budget.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_STOP_HEADER_RE = re.compile(r'^STOP\s+\d+:\s*(.*)$')
+_TOPIC_RE = re.compile(r"\b(?:[A-Z][a-z'&]+|[A-Z]{2,})(?:\s+(?:of|the|&|[A-Z][a-z'&]+|[A-Z]{2,}|No\.\s*\d+))*\b")
+_YEAR_RE = re.compile(r'\b(1[5-9]\d\d|20\d\d)\b')
+_STAGE_DIRECTION_RE = re.compile(r'\*\*\(.*?\)\*\*|\(.*?\)|[*#_>]')
+_NON_TOPICS = {
+    "The", "This", "That", "These", "Those", "Now", "And", "But", "So", "As", "If", "It", "Its",
+    "We", "You", "Your", "Our", "Here", "There", "What", "When", "Imagine", "Welcome", "Alright",
+    "Speaking", "Talk", "Get", "Picture", "Well", "Oh", "Yes", "In", "On", "At", "For", "From",
+    "Just", "Remember", "Let", "Today", "Okay", "Think", "Look", "Notice", "Interestingly",
+}
+_CONNECTORS = {"of", "the", "&", "No"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count used for budgeting (about four characters per token).
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_budget(text: str, token_budget: int) -> str:
+    """
+    Cut text to fit a token budget, preferring a sentence boundary.
+
+    Args:
+        text (str): Text to shorten
+        token_budget (int): Maximum estimated tokens
+
+    Returns:
+        str: The original text if it fits, otherwise a truncated copy
+    """
+    limit = max(token_budget, 0) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind('. '), cut.rfind('! '), cut.rfind('? '))
+    if boundary > limit // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " [...]"
+
+
+@dataclass
+class StopDigest:
+    """
+    Compact record of one approved stop.
+
+    Attributes:
+        index (int): Zero-based position in the route
+        title (str): Marker title
+        summary (str): A couple of sentences capturing the segment
+        topics (list): Names, places and dates worth calling back to
+    """
+    index: int
+    title: str
+    summary: str
+    topics: List[str] = field(default_factory=list)
+
+    def render(self, with_summary: bool = True) -> str:
+        line = f"STOP {self.index + 1}: {self.title}"
+        if self.topics:
+            line += f" | Topics: {', '.join(self.topics)}"
+        if with_summary and self.summary:
+            line += f"\n{self.summary}"
+        return line
+
+
+class ContinuityDigest:
+    """
+    Rolling, size-capped continuity context for a tour.
+
+    The most recent stops keep their summaries; older stops collapse to a
+    title-and-topics line, and the oldest are dropped once even those no
+    longer fit the budget.
+
+    Attributes:
+        token_budget (int): Maximum estimated tokens of rendered context
+        stops (list): StopDigest entries in route order
+    """
+
+    SUMMARY_SENTENCES = 2
+    SUMMARY_CHARS = 320
+    MAX_TOPICS = 6
+
+    def __init__(self, token_budget: int = 600) -> None:
+        """
+        Initialize an empty digest.
+
+        Args:
+            token_budget (int): Maximum estimated tokens of rendered context
+        """
+        self.token_budget = token_budget
+        self.stops: List[StopDigest] = []
+        self._rendered: Optional[str] = None
+
+    @classmethod
+    def from_sections(cls, sections: List[str], token_budget: int = 600) -> "ContinuityDigest":
+        """
+        Build a digest from "STOP n: title\\nscript" sections.
+
+        Args:
+            sections (list): Completed sections in route order
+            token_budget (int): Maximum estimated tokens of rendered context
+
+        Returns:
+            ContinuityDigest: Digest covering every section
+        """
+        digest = cls(token_budget)
+        for i, section in enumerate(sections):
+            header, _, body = section.partition("\n")
+            match = _STOP_HEADER_RE.match(header.strip())
+            title = match.group(1) if match else header.strip()
+            digest.add_stop(i, title, body)
+        return digest
+
+    def add_stop(self, index: int, title: str, script: str) -> StopDigest:
+        """
+        Summarize an approved stop and add it to the digest.
+
+        Args:
+            index (int): Zero-based position in the route
+            title (str): Marker title
+            script (str): The approved script text
+
+        Returns:
+            StopDigest: The new entry
+        """
+        entry = StopDigest(index, title.strip(), self._summarize(script), self._topics(script, title))
+        self.stops.append(entry)
+        self._rendered = None
+        return entry
+
+    def render(self) -> str:
+        """
+        Render the digest within the token budget.
+
+        Returns:
+            str: Context text, empty if no stops have been added
+        """
+        if self._rendered is not None:
+            return self._rendered
+
+        budget = self.token_budget
+        blocks: List[str] = []
+        for entry in reversed(self.stops):
+            block = entry.render(with_summary=True)
+            if estimate_tokens(block) > budget:
+                block = entry.render(with_summary=False)
+            if estimate_tokens(block) > budget:
+                break
+            blocks.append(block)
+            budget -= estimate_tokens(block) + 1
+
+        self._rendered = "\n---\n".join(reversed(blocks))
+        return self._rendered
+
+    def _summarize(self, script: str) -> str:
+        text = " ".join(_STAGE_DIRECTION_RE.sub(" ", script).split())
+        sentences = [s for s in _SENTENCE_RE.split(text) if s]
+        summary = " ".join(sentences[:self.SUMMARY_SENTENCES])
+        if len(summary) > self.SUMMARY_CHARS:
+            summary = summary[:self.SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+        return summary
+
+    def _topics(self, script: str, title: str) -> List[str]:
+        text = _STAGE_DIRECTION_RE.sub(" ", script)
+        title_words = {w.lower() for w in re.findall(r"\w+", title)}
+        counts: Counter = Counter()
+        for match in _TOPIC_RE.finditer(text):
+            words = [re.sub(r"['’]s$", "", w) for w in match.group(0).split()]
+            while words and (words[0] in _NON_TOPICS or not words[0][:1].isupper()):
+                words = words[1:]
+            while words and words[-1] in _CONNECTORS:
+                words = words[:-1]
+            if not words:
+                continue
+            phrase = " ".join(words)
+            if {w.lower() for w in re.findall(r"\w+", phrase)} <= title_words:
+                continue
+            counts[phrase] += 1
+        for year in _YEAR_RE.findall(text):
+            counts[year] += 1
+
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], -len(item[0])))
+        return [phrase for phrase, _ in ranked[:self.MAX_TOPICS]]
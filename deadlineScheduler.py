@@ -0,0 +1,326 @@
+"""
+Deadline Scheduler Module - ETA-driven stop generation for live drives
+
+TourArchitect.run writes stops in route order and returns when the whole
+tour is done. During a drive the only thing that matters is that stop k is
+ready before the car reaches marker k. DeadlineScheduler treats each
+marker's ETA as the deadline of its stop:
+
+  - Stops that need no model call (approved by an earlier run of the tour,
+    or reused as-is from the stop library) are released first.
+  - The others are started earliest-deadline-first, up to max_concurrency
+    at a time. Stops whose deadline can no longer be met go behind the
+    ones that still can, so one late stop does not make the next ones late.
+  - Each stop's revision cap is sized to the writer/director rounds that
+    fit before its deadline. The time per round is learned from the stops
+    finished so far. A stop at risk runs with fewer rounds, down to a
+    single draft.
+  - update_etas() re-plans while the tour runs: stops not started yet are
+    re-ranked and their caps re-sized from the new ETAs.
+
+Stops are yielded as they finish, not in route order. DeadlineStats counts
+stops ready on time and missed, and how late the missed ones were.
+
+ETAs come from the planner's "eta_minutes" field, a supplied schedule, or
+estimate_etas() from marker coordinates and an average speed.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from stopLibrary import distance_km
+
+if TYPE_CHECKING:
+    from wrtirAgent import TourArchitect
+
+
+def estimate_etas(points: Sequence[Dict], avg_speed_kmh: float = 70.0, minutes_per_stop: float = 15.0,
+                  start: Optional[Tuple[float, float]] = None,
+                  schedule: Optional[Sequence[Optional[float]]] = None) -> List[float]:
+    """
+    Minutes of driving from the start of the route to each marker.
+
+    A supplied schedule entry wins, then the marker's own eta_minutes. Otherwise the ETA follows from the
+    straight-line distance to the previous marker with coordinates (or to start) at avg_speed_kmh. Markers
+    without coordinates are placed minutes_per_stop after the previous one.
+
+    Args:
+        points (list): Agenda points in route order
+        avg_speed_kmh (float): Average speed over the straight-line distance between markers
+        minutes_per_stop (float): Gap assumed where no distance is known
+        start (tuple): (latitude, longitude) of the car, if known
+        schedule (list): Supplied ETAs in minutes per marker; None entries are estimated
+
+    Returns:
+        list: ETA in minutes per marker, non-decreasing
+    """
+    if avg_speed_kmh <= 0:
+        raise ValueError("avg_speed_kmh must be positive")
+    etas: List[float] = []
+    eta, position = 0.0, start
+    for index, point in enumerate(points):
+        location = (point['latitude'], point['longitude']) if 'latitude' in point else None
+        given = schedule[index] if schedule is not None and index < len(schedule) else None
+        if given is None:
+            given = point.get('eta_minutes')
+        if given is not None:
+            eta = max(eta, float(given))
+        elif location is not None and position is not None:
+            eta += distance_km(position, location) / avg_speed_kmh * 60
+        else:
+            eta += minutes_per_stop
+        if location is not None:
+            position = location
+        etas.append(round(eta, 2))
+    return etas
+
+
+@dataclass
+class DeadlineStats:
+    """
+    Outcome counters for one deadline-driven run.
+
+    Attributes:
+        stops (int): Stops in the tour
+        ready_at_start (int): Stops released without a model call
+        generated (int): Stops run through the writer/director graph
+        on_time (int): Stops ready before their ETA
+        missed (int): Stops ready after their ETA
+        downgraded (int): Stops started with a lower revision cap than the policy's
+        replans (int): ETA updates received during the run
+        first_ready_seconds (float): Seconds from the start of the run to the first ready stop
+        missed_stops (list): Indices of the stops that missed their ETA
+        lateness_seconds (list): How late each missed stop was
+        lead_seconds (list): How early each on-time stop was
+    """
+    stops: int = 0
+    ready_at_start: int = 0
+    generated: int = 0
+    on_time: int = 0
+    missed: int = 0
+    downgraded: int = 0
+    replans: int = 0
+    first_ready_seconds: Optional[float] = None
+    missed_stops: List[int] = field(default_factory=list)
+    lateness_seconds: List[float] = field(default_factory=list)
+    lead_seconds: List[float] = field(default_factory=list)
+
+    @property
+    def missed_rate(self) -> float:
+        """Share of judged stops that missed their ETA."""
+        judged = self.on_time + self.missed
+        return round(self.missed / judged, 4) if judged else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        """Counters plus missed_rate and lateness/lead summaries, for reports."""
+        return {
+            "stops": self.stops,
+            "ready_at_start": self.ready_at_start,
+            "generated": self.generated,
+            "on_time": self.on_time,
+            "missed": self.missed,
+            "missed_rate": self.missed_rate,
+            "missed_stops": sorted(self.missed_stops),
+            "downgraded": self.downgraded,
+            "replans": self.replans,
+            "first_ready_seconds": self.first_ready_seconds,
+            "max_lateness_seconds": round(max(self.lateness_seconds), 2) if self.lateness_seconds else 0.0,
+            "mean_lateness_seconds": (round(sum(self.lateness_seconds) / len(self.lateness_seconds), 2)
+                                      if self.lateness_seconds else 0.0),
+            "min_lead_seconds": round(min(self.lead_seconds), 2) if self.lead_seconds else None,
+        }
+
+
+class DeadlineScheduler:
+    """
+    Generates a tour's stops earliest-deadline-first, trading revision depth for punctuality.
+
+    Attributes:
+        architect (TourArchitect): Supplies the async workflow, store, library and revision policy
+        max_concurrency (int): Stops in flight at once
+        round_seconds (float): Current estimate of one writer/director round, learned as stops finish
+        smoothing (float): Weight of each new observation in round_seconds
+        clock (callable): Monotonic time source in seconds
+        stats (DeadlineStats): Counters for the current run
+    """
+
+    def __init__(self, architect: "TourArchitect", max_concurrency: int = 4, round_seconds: float = 20.0,
+                 smoothing: float = 0.3, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            architect (TourArchitect): Architect whose generator runs each stop
+            max_concurrency (int): Stops in flight at once
+            round_seconds (float): Initial estimate of one writer/director round
+            smoothing (float): Weight of each finished stop in the learned round time (0 - 1)
+            clock (callable): Monotonic time source in seconds
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if round_seconds <= 0:
+            raise ValueError("round_seconds must be positive")
+        self.architect = architect
+        self.max_concurrency = max_concurrency
+        self.round_seconds = round_seconds
+        self.smoothing = smoothing
+        self.clock = clock
+        self.stats = DeadlineStats()
+        self._deadlines: Dict[int, float] = {}
+        self._started: Optional[float] = None
+
+    def update_etas(self, etas: Dict[int, float]) -> None:
+        """
+        Re-plan from fresh ETAs, e.g. after a traffic update.
+
+        Stops not started yet are re-ranked and get revision caps sized to the new deadlines at start time.
+        Call from the event loop the run is on.
+
+        Args:
+            etas (dict): Stop index -> seconds from now until the car reaches the marker
+        """
+        now = self.clock()
+        for index, seconds in etas.items():
+            self._deadlines[index] = now + seconds
+        self.stats.replans += 1
+
+    def slack(self, index: int) -> float:
+        """
+        Seconds left until the stop's deadline (negative once passed; infinite without an ETA).
+
+        Args:
+            index (int): Stop index
+        """
+        return self._deadlines.get(index, math.inf) - self.clock()
+
+    async def run(self, parsed_points: List[Dict], route_name: str, tour_id: str,
+                  etas: Sequence[Optional[float]]) -> AsyncIterator[Tuple[int, str, str]]:
+        """
+        Generate every stop, yielding (index, title, script) as each becomes ready.
+
+        Args:
+            parsed_points (list): Agenda points
+            route_name (str): Primary route
+            tour_id (str): Tour the stops belong to
+            etas (list): Seconds from now until the car reaches each marker (None for no deadline)
+
+        Yields:
+            tuple: (stop_index, title, approved script)
+        """
+        from stopLibrary import REUSE
+
+        self._started = self.clock()
+        self._deadlines = {i: self._started + eta for i, eta in enumerate(etas) if eta is not None}
+        self.stats.stops = len(parsed_points)
+
+        ready: Dict[int, str] = dict(self.architect._approved_stops(tour_id))
+        matches = {}
+        for i, point in enumerate(parsed_points):
+            if i in ready:
+                continue
+            match = self.architect._library_match(parsed_points, i, tour_id)
+            if match is not None and match.action == REUSE:
+                self.architect._record_stop(tour_id, i, point['title'], match.script)
+                ready[i] = match.script
+            else:
+                matches[i] = match
+        for i in sorted(ready, key=lambda k: (self._deadlines.get(k, math.inf), k)):
+            self.stats.ready_at_start += 1
+            self._judge(i)
+            yield i, parsed_points[i]['title'], ready[i]
+
+        pending = list(matches)
+        running: Dict[asyncio.Future, Tuple[int, float, bool]] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.max_concurrency:
+                    index = min(pending, key=self._priority)
+                    pending.remove(index)
+                    running[self._start(index, parsed_points, route_name, tour_id, matches[index])] = (
+                        index, self.clock(), matches[index] is not None)
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: running[t][0]):
+                    index, started, adapted = running.pop(task)
+                    result = task.result()
+                    self._learn(self.clock() - started, result.get('revision_count', 1) - int(adapted))
+                    self.stats.generated += 1
+                    self._judge(index)
+                    yield index, parsed_points[index]['title'], result['transcript']
+        finally:
+            for task in running:
+                task.cancel()
+
+    def _priority(self, index: int) -> Tuple[bool, float, int]:
+        # Earliest deadline first, but stops that cannot make it even with one round wait for the ones that can.
+        slack = self.slack(index)
+        return slack < self.round_seconds, slack, index
+
+    def revision_cap(self, index: int, point: Dict) -> int:
+        """
+        Revision cap for a stop that is about to start: the policy's cap, or the rounds that fit before its deadline.
+
+        Args:
+            index (int): Stop index
+            point (dict): Agenda point
+
+        Returns:
+            int: Writer drafts the stop may take (at least 1)
+        """
+        return self.deadline_cap(index, self.architect.generator.policy.revision_cap(point))
+
+    def deadline_cap(self, index: int, cap: int) -> int:
+        """
+        Lower a revision cap to the rounds that fit before the stop's deadline.
+
+        Args:
+            index (int): Stop index
+            cap (int): Cap the revision policy chose
+
+        Returns:
+            int: Writer drafts the stop may take (at least 1)
+        """
+        slack = self.slack(index)
+        if math.isinf(slack):
+            return cap
+        fits = max(1, int(slack // self.round_seconds))
+        if fits < cap:
+            self.stats.downgraded += 1
+            return fits
+        return cap
+
+    def _start(self, index: int, parsed_points: List[Dict], route_name: str, tour_id: str, match) -> asyncio.Future:
+        policy_cap = self.architect.generator.policy.revision_cap(parsed_points[index])
+        cap = self.deadline_cap(index, policy_cap)
+        slack = self.slack(index)
+        due = "no ETA" if math.isinf(slack) else f"due in {slack:.0f}s"
+        print(f"\nProcessing Point {index+1}: {parsed_points[index]['title']} ({due}, up to {cap} drafts)...")
+        return asyncio.ensure_future(
+            self.architect._agenerate_stop(index, parsed_points, route_name, tour_id, match=match, revision_cap=cap,
+                                           policy_cap=policy_cap))
+
+    def _learn(self, seconds: float, rounds: int) -> None:
+        observed = seconds / max(1, rounds)
+        self.round_seconds = (1 - self.smoothing) * self.round_seconds + self.smoothing * observed
+
+    def _judge(self, index: int) -> None:
+        now = self.clock()
+        if self.stats.first_ready_seconds is None:
+            self.stats.first_ready_seconds = round(now - self._started, 3)
+        slack = self.slack(index)
+        if math.isinf(slack):
+            return
+        if slack >= 0:
+            self.stats.on_time += 1
+            self.stats.lead_seconds.append(slack)
+        else:
+            self.stats.missed += 1
+            self.stats.missed_stops.append(index)
+            self.stats.lateness_seconds.append(-slack)
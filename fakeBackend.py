@@ -0,0 +1,356 @@
+"""
+Fake Backend Module - Deterministic offline stand-in for the Gemini API
+
+FakeBackend implements LLMBackend without network access so the planner,
+writer and director pipeline can be tested, benchmarked and load-tested
+locally. Every response is derived from a seeded hash of the request, so a
+given prompt always yields the same text, token counts and director verdict.
+
+Latency model:  time_to_first_token + prompt_tokens * prefill_seconds_per_token
+                + output_tokens / tokens_per_second, where tokens read from a
+                context cache prefill at cached_prefill_ratio of the cost; the
+                total is scaled by model_latency_scale for the requested model
+Token model:    output tokens per role drawn from a seeded normal distribution
+Approval model: the director approves a draft with probability approval_rate,
+                and always rejects stub drafts; a batched review of several
+                candidates rolls for each and picks the first approved one
+Draft model:    a writer draft is a short stub with probability bad_draft_rate
+Agenda model:   a planner prompt asking to "Identify N Narrative Markers" gets N
+                markers; markers are spaced marker_step_degrees apart, or spread
+                between the first and last "(lat, lon)" pair the prompt names
+Context caches: create_cached_content stores a prefix under a name; requests
+                naming an unknown cache fail with a 404 like the real API
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from llmBackend import LLMBackend
+
+
+PLANNER = "planner"
+WRITER = "writer"
+DIRECTOR = "director"
+
+_STUB_WORDS = 50
+
+_WORDS = (
+    "river gorge bridge coal miners railway frontier valley ridge overlook tunnel town "
+    "history legend settlers steel arch canyon forest spring mountain creek mill depot "
+    "county courthouse tavern wagon trail summit hollow quarry furnace company camp"
+).split()
+
+
+@dataclass
+class FakeBackendConfig:
+    """
+    Knobs for the fake's latency, token-count and approval models.
+
+    Attributes:
+        seed (int): Seed mixed into every response hash
+        markers (int): Narrative markers in a planner agenda
+        time_to_first_token (float): Seconds before the first chunk
+        tokens_per_second (float): Output decode speed
+        prefill_seconds_per_token (float): Cost per prompt token
+        output_tokens (dict): Mean output tokens per role
+        output_token_stddev (float): Relative standard deviation of output tokens
+        approval_rate (float): Probability the director approves a draft
+        bad_draft_rate (float): Probability a writer draft is a short, unstructured stub
+        stream_chunk_tokens (int): Tokens per streamed chunk
+        cached_prefill_ratio (float): Prefill cost of a cached prompt token relative to an uncached one
+        context_caching (bool): Whether create_cached_content is supported
+        model_latency_scale (dict): Latency multiplier per model name (1.0 for unlisted models)
+        marker_step_degrees (float): Spacing of markers when the prompt names no coordinates
+        planner_tokens_per_marker (int): Planner output tokens per marker; 0 uses output_tokens
+    """
+    seed: int = 0
+    markers: int = 7
+    time_to_first_token: float = 0.02
+    tokens_per_second: float = 20000.0
+    prefill_seconds_per_token: float = 0.000001
+    output_tokens: Dict[str, int] = field(default_factory=lambda: {PLANNER: 900, WRITER: 700, DIRECTOR: 60})
+    output_token_stddev: float = 0.15
+    approval_rate: float = 0.7
+    bad_draft_rate: float = 0.0
+    stream_chunk_tokens: int = 32
+    cached_prefill_ratio: float = 0.25
+    context_caching: bool = True
+    model_latency_scale: Dict[str, float] = field(default_factory=dict)
+    marker_step_degrees: float = 0.05
+    planner_tokens_per_marker: int = 0
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline LLMBackend.
+
+    Attributes:
+        config (FakeBackendConfig): Latency, token and approval models
+        calls (Counter): Calls per role
+        call_log (list): One record per call (role, prompt_bytes, tokens, cached tokens, latency)
+        cached_contents (dict): Live context caches, name -> cached system instruction
+    """
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None, **overrides) -> None:
+        """
+        Initialize the fake.
+
+        Args:
+            config (FakeBackendConfig, optional): Model settings
+            **overrides: Individual FakeBackendConfig fields to override
+        """
+        self.config = config or FakeBackendConfig()
+        for name, value in overrides.items():
+            setattr(self.config, name, value)
+        self.calls: Counter = Counter()
+        self.call_log: List[Dict[str, Any]] = []
+        self.cached_contents: Dict[str, str] = {}
+        self._cache_names = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, *, model, contents, config=None):
+        response, latency = self._respond(model, contents, config)
+        time.sleep(latency)
+        return response
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        response, latency = self._respond(model, contents, config)
+        await asyncio.sleep(latency)
+        return response
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        response, latency = self._respond(model, contents, config)
+        chunks = self._chunks(response.text)
+        time.sleep(self.config.time_to_first_token)
+        for chunk in chunks:
+            on_chunk(chunk)
+            time.sleep((latency - self.config.time_to_first_token) / max(len(chunks), 1))
+        return response
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        response, latency = self._respond(model, contents, config)
+        chunks = self._chunks(response.text)
+        await asyncio.sleep(self.config.time_to_first_token)
+        for chunk in chunks:
+            on_chunk(chunk)
+            await asyncio.sleep((latency - self.config.time_to_first_token) / max(len(chunks), 1))
+        return response
+
+    def create_cached_content(self, *, model, prefix, ttl_seconds, display_name=None):
+        if not self.config.context_caching:
+            raise NotImplementedError
+        with self._lock:
+            self._cache_names += 1
+            name = f"cachedContents/fake-{self._cache_names}"
+            self.cached_contents[name] = str(prefix.get("system_instruction") or "")
+        return name
+
+    def delete_cached_content(self, name):
+        with self._lock:
+            self.cached_contents.pop(name, None)
+
+    def reset_stats(self) -> None:
+        """Clear call counters and the call log."""
+        with self._lock:
+            self.calls.clear()
+            self.call_log.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Summarize the calls made so far.
+
+        Returns:
+            dict: Calls per role, total calls, prompt bytes sent per call and cached prompt tokens
+        """
+        with self._lock:
+            prompt_bytes = [entry["prompt_bytes"] for entry in self.call_log]
+            return {
+                "cached_tokens": sum(entry["cached_tokens"] for entry in self.call_log),
+                "calls": dict(self.calls),
+                "total_calls": len(self.call_log),
+                "prompt_bytes_total": sum(prompt_bytes),
+                "prompt_bytes_mean": sum(prompt_bytes) / len(prompt_bytes) if prompt_bytes else 0.0,
+                "prompt_bytes_max": max(prompt_bytes, default=0),
+            }
+
+    @staticmethod
+    def role_of(config) -> str:
+        """
+        Infer which agent made a call from its system instruction.
+
+        Args:
+            config (GenerateContentConfig, optional): The call's config
+
+        Returns:
+            str: PLANNER, WRITER or DIRECTOR
+        """
+        instruction = str(getattr(config, "system_instruction", "") or "")
+        if "Route Narrative Architect" in instruction:
+            return PLANNER
+        if "Tour Director" in instruction or getattr(config, "response_mime_type", None) == "application/json":
+            return DIRECTOR
+        return WRITER
+
+    def _respond(self, model, contents, config):
+        from google.genai import types
+
+        cached_instruction = self._cached_instruction(config)
+        if cached_instruction is not None:
+            config = config.model_copy(update={"system_instruction": cached_instruction})
+        role = self.role_of(config)
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        instruction = str(getattr(config, "system_instruction", "") or "")
+        cached_tokens = len(instruction.encode("utf-8")) // 4 if cached_instruction is not None else 0
+        prompt_bytes = len(prompt.encode("utf-8")) + (len(instruction.encode("utf-8")) if cached_instruction is None else 0)
+        prompt_tokens = prompt_bytes // 4 + cached_tokens
+
+        rng = random.Random(self._digest(role, model, prompt))
+        mean = self.config.output_tokens.get(role, 500)
+        if role == PLANNER and self.config.planner_tokens_per_marker:
+            mean = self.config.planner_tokens_per_marker * self._marker_count(prompt)
+        tokens = max(8, int(rng.gauss(mean, mean * self.config.output_token_stddev)))
+
+        if role == PLANNER:
+            text = self._agenda(rng, prompt, getattr(config, "response_mime_type", None) == "application/json")
+        elif role == DIRECTOR:
+            text = self._verdict(rng, tokens, prompt)
+        else:
+            text = self._script(rng, prompt, tokens)
+
+        latency = (
+            self.config.time_to_first_token
+            + (prompt_tokens - cached_tokens * (1 - self.config.cached_prefill_ratio))
+            * self.config.prefill_seconds_per_token
+            + tokens / self.config.tokens_per_second
+        ) * self.config.model_latency_scale.get(model, 1.0)
+        with self._lock:
+            self.calls[role] += 1
+            self.call_log.append({
+                "role": role, "model": model, "prompt_bytes": prompt_bytes,
+                "prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens, "output_tokens": tokens,
+                "latency": latency,
+            })
+
+        response = types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                finish_reason=types.FinishReason.STOP
+            )],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=cached_tokens or None,
+                candidates_token_count=tokens,
+                total_token_count=prompt_tokens + tokens
+            )
+        )
+        return response, latency
+
+    def _cached_instruction(self, config) -> Optional[str]:
+        name = getattr(config, "cached_content", None)
+        if not name:
+            return None
+        with self._lock:
+            instruction = self.cached_contents.get(name)
+        if instruction is None:
+            from google.genai import errors
+
+            raise errors.ClientError(404, {"error": {"code": 404, "status": "NOT_FOUND",
+                                                     "message": f"CachedContent not found: {name}"}})
+        return instruction
+
+    def _digest(self, *parts: str) -> int:
+        joined = "\x00".join((str(self.config.seed),) + parts)
+        return int.from_bytes(hashlib.sha256(joined.encode("utf-8")).digest()[:8], "big")
+
+    def _marker_count(self, prompt: str) -> int:
+        match = re.search(r"Identify (\d+) Narrative Markers", prompt)
+        return int(match.group(1)) if match else self.config.markers
+
+    def _agenda(self, rng: random.Random, prompt: str, as_json: bool = False) -> str:
+        route = f"I-{rng.randint(60, 99)} W and US-{rng.randint(1, 60)} N"
+        count = self._marker_count(prompt)
+        corners = re.findall(r"\((-?\d+(?:\.\d+)?), (-?\d+(?:\.\d+)?)\)", prompt)
+        step = self.config.marker_step_degrees
+        if len(corners) >= 2:
+            (lat_a, lon_a), (lat_b, lon_b) = map(float, corners[0]), map(float, corners[-1])
+            lat_step, lon_step = (lat_b - lat_a) / (count + 1), (lon_b - lon_a) / (count + 1)
+        else:
+            lat_a, lon_a, lat_step, lon_step = 37.2, -80.4, step, -step
+        markers = []
+        for i in range(1, count + 1):
+            place = " ".join(rng.choice(_WORDS).title() for _ in range(2))
+            markers.append({
+                "title": f"{place} Marker {i}:",
+                "summary": f"The {rng.choice(_WORDS)} and {rng.choice(_WORDS)} story of {place}.",
+                "directive": f"Focus on the {rng.choice(_WORDS)} a driver can see.",
+                "latitude": round(lat_a + i * lat_step, 4),
+                "longitude": round(lon_a + i * lon_step, 4),
+            })
+        if as_json:
+            return json.dumps({"primary_route": route, "markers": markers})
+        lines = [f"Primary Route: {route}", ""]
+        for i, marker in enumerate(markers, 1):
+            lines += [
+                f"{i}. **{marker['title']}**",
+                f"   Summary: {marker['summary']}",
+                f"   Script Writer Directive: {marker['directive']}",
+                "",
+            ]
+        return "\n".join(lines)
+
+    def _batch_verdict(self, rng: random.Random, tokens: int, drafts: str) -> str:
+        # Every candidate gets its own approval roll; the first approved one (else the first full one) is picked.
+        candidates = re.split(r"--- DRAFT \d+ ---", drafts)[1:]
+        full = [i for i, draft in enumerate(candidates, 1) if len(draft.split()) >= _STUB_WORDS]
+        approved = [i for i in full if rng.random() < self.config.approval_rate]
+        if not full:
+            return json.dumps({"best": 1, "is_ready": False, "feedback": "These are stubs. Write the full segment."})
+        best = approved[0] if approved else full[0]
+        feedback = "Great pacing and continuity." if approved else (
+            "Tighten the intro and call back to the " + " ".join(rng.choice(_WORDS) for _ in range(max(tokens // 4, 3))))
+        return json.dumps({"best": best, "is_ready": bool(approved), "feedback": feedback})
+
+    def _verdict(self, rng: random.Random, tokens: int, prompt: str = "") -> str:
+        batch = re.search(r"CANDIDATE DRAFTS TO REVIEW:(.*?)Review these alternative drafts", prompt, re.DOTALL)
+        if batch:
+            return self._batch_verdict(rng, tokens, batch.group(1))
+        approved = rng.random() < self.config.approval_rate
+        draft = re.search(r"CURRENT DRAFT TO REVIEW:(.*?)Review this draft", prompt, re.DOTALL)
+        if draft and len(draft.group(1).split()) < _STUB_WORDS:
+            return json.dumps({"is_ready": False, "feedback": "This is a stub. Write the full segment."})
+        feedback = "Great pacing and continuity." if approved else (
+            "Tighten the intro and call back to the " + " ".join(rng.choice(_WORDS) for _ in range(max(tokens // 4, 3))))
+        return json.dumps({"is_ready": approved, "feedback": feedback})
+
+    def _script(self, rng: random.Random, prompt: str, tokens: int) -> str:
+        match = re.search(r"Point Title:\s*(.*)", prompt)
+        title = match.group(1).strip() if match else "this stop"
+        if rng.random() < self.config.bad_draft_rate:
+            return f"{title}: " + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 30))) + "."
+        words = max(int(tokens * 0.75), 12)
+        body = " ".join(rng.choice(_WORDS) for _ in range(words))
+        quarter = max(words // 4, 1)
+        parts = body.split(" ")
+        return (
+            f"Welcome to {title}! " + " ".join(parts[:quarter]) + ".\n\n"
+            + " ".join(parts[quarter:3 * quarter]) + ".\n\n"
+            + "Here's an Easter egg: " + " ".join(parts[3 * quarter:]) + ".\n\n"
+            + "Up next, keep your eyes on the road ahead."
+        )
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(self.config.stream_chunk_tokens * 4, 1)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
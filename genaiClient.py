@@ -0,0 +1,45 @@
+"""
+GenAI Client Module - Lazily created, process-wide Gemini clients
+
+Importing google.genai and building a Client costs hundreds of milliseconds,
+so agents ask this module for a client the first time they actually make a
+call instead of building their own at import or construction time. One client
+is shared per API key across MasterAgent, plannerAgent and the tour writer.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+
+_clients: Dict[Optional[str], Any] = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key: Optional[str] = None):
+    """
+    Get the shared genai.Client for an API key, creating it on first use.
+
+    Args:
+        api_key (str, optional): Explicit API key. If None the client reads
+            GOOGLE_API_KEY / GEMINI_API_KEY from the environment.
+
+    Returns:
+        genai.Client: The shared client
+    """
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from google import genai
+
+            client = genai.Client(api_key=api_key) if api_key else genai.Client()
+            _clients[api_key] = client
+        return client
+
+
+def reset_clients() -> None:
+    """Forget every shared client (e.g. after a fork or a key rotation)."""
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,326 @@
+"""
+GuideAI Command Line Interface
+
+Single entry point for the tour pipeline:
+
+    python guideai.py plan  "Blacksburg, VA to New River Gorge, WV" -o agenda.md
+    python guideai.py plan  "Richmond, VA to Nashville, TN" --long-route -o agenda.json
+    python guideai.py write agenda.md -o tour_script.md
+    python guideai.py full  "Blacksburg, VA to New River Gorge, WV" -o tour_script.md
+    python guideai.py resume TOUR_ID --checkpoint tours.sqlite
+    python guideai.py batch routes.jsonl -o tours/ --workers 8
+    python guideai.py serve --port 8080 -o tours/
+
+Importing this module does no work; agents, clients and the LangGraph
+workflow are only created when a command runs.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+import argparse
+import json
+import logging
+import sys
+import uuid
+from typing import List, Optional
+
+
+def _plan(route: str, model: Optional[str], structured: bool = False, long_route: bool = False,
+          waypoints: Optional[str] = None, segment_km: float = 250.0) -> Optional[str]:
+    from masterAgent import MasterAgent
+
+    kwargs = {"model": model} if model else {}
+    agent = MasterAgent(structured_output=structured, **kwargs)
+    if not long_route:
+        return agent.generate_agenda(route)
+    start, separator, end = route.partition(" to ")
+    if not separator:
+        raise ValueError('--long-route needs a route of the form "START to END"')
+    places = [w.strip() for w in waypoints.split(";") if w.strip()] if waypoints else None
+    agenda = agent.generate_long_agenda(start.strip(), end.strip(), places, segment_km=segment_km)
+    print(f"Segments: {agent.segment_stats}", file=sys.stderr)
+    return agenda
+
+
+def _add_long_route_arguments(command: argparse.ArgumentParser) -> None:
+    command.add_argument("--long-route", action="store_true",
+                         help="Plan the route as corridor segments in parallel (JSON agenda)")
+    command.add_argument("--waypoints", metavar='"A; B; C"',
+                         help="Places along a --long-route in order; asked from the planner if omitted")
+    command.add_argument("--segment-km", type=float, default=250.0, help="Target segment length for --long-route")
+
+
+def _write(agenda: str, args: argparse.Namespace) -> int:
+    from wrtirAgent import TourArchitect, TourConfig
+
+    config = TourConfig(max_revisions=args.max_revisions, max_concurrency=args.concurrency,
+                        checkpoint_path=args.checkpoint, stop_library_path=args.library,
+                        fast_model_name=args.fast_model, adaptive_revisions=args.adaptive_revisions,
+                        revision_history_path=args.revision_history, draft_candidates=args.candidates,
+                        candidate_selection=args.selection)
+    architect = TourArchitect(config)
+    tour_id = None
+    if args.checkpoint:
+        tour_id = uuid.uuid4().hex[:12]
+        print(f"Tour id: {tour_id} (continue with: guideai.py resume {tour_id} --checkpoint {args.checkpoint})",
+              flush=True)
+    if args.previous:
+        if not args.checkpoint:
+            print("--previous requires --checkpoint", file=sys.stderr)
+            return 2
+        scripts = architect.regenerate(agenda, args.previous, filename=args.output, tour_id=tour_id)
+        print(f"Regeneration: {architect.regeneration_plan.counts() if architect.regeneration_plan else {}}",
+              flush=True)
+    elif args.stream:
+        drafting = []
+
+        def on_token(index: int, revision: int, chunk: str) -> None:
+            if drafting[-1:] != [(index, revision)]:
+                drafting.append((index, revision))
+                print(f"\n--- Stop {index+1}, draft {revision} ---", flush=True)
+            print(chunk, end="", flush=True)
+
+        scripts = []
+        for index, title, _ in architect.stream(agenda, filename=args.output, on_token=on_token, tour_id=tour_id):
+            print(f"\nStop {index+1} ready: {title}", flush=True)
+            scripts.append(title)
+    elif args.deadline:
+        etas = None
+        if args.etas:
+            from deadlineScheduler import estimate_etas
+
+            with open(args.etas, encoding="utf-8") as f:
+                schedule = json.load(f)
+            points, _ = architect.parse_route_data(agenda)
+            etas = [minutes * 60 for minutes in estimate_etas(points or [], args.avg_speed, schedule=schedule)]
+        scripts = architect.run_deadline(agenda, etas, filename=args.output, avg_speed_kmh=args.avg_speed,
+                                         tour_id=tour_id)
+        if scripts:
+            print(f"Deadlines: {architect.deadline_scheduler.stats.to_dict()}", flush=True)
+    elif args.pipelined:
+        scripts = architect.run_pipelined(agenda, filename=args.output, tour_id=tour_id)
+        if scripts:
+            print(f"Speculation: {architect.speculation_stats.to_dict()}", flush=True)
+    elif args.concurrency > 1:
+        scripts = architect.run_concurrent(agenda, filename=args.output, tour_id=tour_id)
+    else:
+        scripts = architect.run(agenda, filename=args.output, tour_id=tour_id)
+    if architect.library is not None:
+        print(f"Stop library: {architect.library.stats()}", flush=True)
+    if scripts and (args.fast_model or args.adaptive_revisions):
+        print(f"Model policy: {architect.policy_report()}", flush=True)
+    return 0 if scripts else 1
+
+
+def _resume(args: argparse.Namespace) -> int:
+    from wrtirAgent import TourArchitect, TourConfig
+
+    architect = TourArchitect(TourConfig(max_revisions=args.max_revisions, checkpoint_path=args.checkpoint))
+    if args.tour_id is None:
+        pending = architect.store.unfinished_tours()
+        print("\n".join(pending) if pending else "No unfinished tours.")
+        return 0
+    try:
+        scripts = architect.resume(args.tour_id)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    return 0 if scripts else 1
+
+
+def _batch(args: argparse.Namespace) -> int:
+    from batchRunner import BatchRunner, load_manifest
+    from wrtirAgent import TourConfig
+
+    items = load_manifest(args.manifest)
+    config = TourConfig(max_revisions=args.max_revisions, checkpoint_path=args.checkpoint)
+    runner = BatchRunner(args.output, workers=args.workers, use_processes=args.processes,
+                         base_config=config, stop_concurrency=args.concurrency)
+    try:
+        records = runner.run(items, resume=args.resume is not None, run_id=args.resume or None)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    failed = [r["id"] for r in records if r["status"] != "ok"]
+    print(f"Run {runner.run_id}: {len(records) - len(failed)} succeeded, {len(failed)} failed; "
+          f"status in {runner.status_path}")
+    return 1 if failed else 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from tourService import TourService
+    from wrtirAgent import TourConfig
+
+    async def serve() -> None:
+        config = TourConfig(max_revisions=args.max_revisions, checkpoint_path=args.checkpoint)
+        service = TourService(args.output, base_config=config, stop_concurrency=args.concurrency)
+        server = await service.start(args.host, args.port)
+        print(f"Serving on http://{args.host}:{server.sockets[0].getsockname()[1]}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser for the CLI.
+
+    Returns:
+        argparse.ArgumentParser: Parser with plan / write / full / resume / batch / serve subcommands
+    """
+    parser = argparse.ArgumentParser(prog="guideai", description="Generate audio tours for driving routes.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable INFO logging")
+    parser.add_argument("--trace", metavar="FILE", help="Append a JSON line per model call to FILE")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="Generate a tour agenda for a route")
+    plan.add_argument("route", help='Route description, e.g. "Blacksburg, VA to New River Gorge, WV"')
+    plan.add_argument("-o", "--output", help="Write the agenda to this file instead of stdout")
+    plan.add_argument("--model", help="Planner model override")
+    plan.add_argument("--structured", action="store_true", help="Request the agenda as schema-constrained JSON")
+    _add_long_route_arguments(plan)
+
+    for name, help_text in (("write", "Write tour scripts from a saved agenda"),
+                            ("full", "Plan a route and write its tour scripts")):
+        command = commands.add_parser(name, help=help_text)
+        if name == "write":
+            command.add_argument("agenda", help="Agenda file produced by 'plan' ('-' for stdin)")
+        else:
+            command.add_argument("route", help="Route description")
+            command.add_argument("--model", help="Planner model override")
+            command.add_argument("--structured", action="store_true",
+                                 help="Request the agenda as schema-constrained JSON")
+            _add_long_route_arguments(command)
+        command.add_argument("-o", "--output", default="tour_script.md", help="Markdown output file")
+        command.add_argument("--concurrency", type=int, default=1,
+                             help="Stops generated in parallel (the default run and --deadline)")
+        command.add_argument("--max-revisions", type=int, default=3, help="Writer/director rounds per stop")
+        mode = command.add_mutually_exclusive_group()
+        mode.add_argument("--stream", action="store_true",
+                          help="Print writer drafts as they stream in and append each stop to the output as it is "
+                               "approved")
+        mode.add_argument("--previous", metavar="TOUR_ID",
+                          help="Reuse unchanged stops of this earlier tour (needs --checkpoint)")
+        mode.add_argument("--pipelined", action="store_true",
+                          help="Start each stop from the previous stop's first draft, re-running it if that changes")
+        mode.add_argument("--deadline", action="store_true",
+                          help="Live drive: write stops earliest-ETA-first, with fewer revisions for late ones")
+        command.add_argument("--etas", metavar="FILE",
+                             help="JSON list of minutes from now to each marker for --deadline (null = estimate)")
+        command.add_argument("--avg-speed", type=float, default=70.0,
+                             help="km/h between markers when --deadline estimates ETAs from coordinates")
+        command.add_argument("--library", metavar="DB",
+                             help="SQLite stop library; approved stops from earlier tours are reused or adapted")
+        command.add_argument("--checkpoint", metavar="DB",
+                             help="SQLite file for checkpoints, so an interrupted run can be resumed")
+        command.add_argument("--fast-model", metavar="MODEL",
+                             help="Cheap model for first drafts and director reviews; revisions use the main model")
+        command.add_argument("--adaptive-revisions", action="store_true",
+                             help="Learn per-category revision caps from earlier stops")
+        command.add_argument("--revision-history", metavar="DB",
+                             help="SQLite file that keeps the revision history across runs")
+        command.add_argument("--candidates", type=int, default=1,
+                             help="Drafts written concurrently per writer round (best-of-N)")
+        command.add_argument("--selection", choices=["director", "local"], default="director",
+                             help="Pick among candidates by one batched director review or the local ranker")
+
+    batch = commands.add_parser("batch", help="Generate a tour for every route in a JSONL manifest")
+    batch.add_argument("manifest", help="JSONL file, one {start, end, preferences, config} object per line")
+    batch.add_argument("-o", "--output", default="tours", help="Output directory (also holds status.jsonl)")
+    batch.add_argument("--workers", type=int, default=4, help="Routes generated in parallel")
+    batch.add_argument("--processes", action="store_true", help="Use worker processes instead of threads")
+    batch.add_argument("--concurrency", type=int, default=1, help="Stops generated in parallel within each route")
+    batch.add_argument("--max-revisions", type=int, default=3, help="Writer/director rounds per stop")
+    batch.add_argument("--checkpoint", metavar="DB", help="SQLite checkpoint file, so failed routes resume mid-tour")
+    batch.add_argument("--resume", nargs="?", const="", metavar="RUN_ID",
+                       help="Continue a batch run (default: the latest) instead of starting a new one")
+
+    serve = commands.add_parser("serve", help="Serve tours over HTTP, streaming stops as Server-Sent Events")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve.add_argument("--port", type=int, default=8080, help="Port to bind")
+    serve.add_argument("-o", "--output", default="tours", help="Output directory for generated tours")
+    serve.add_argument("--concurrency", type=int, default=4, help="Stops generated in parallel within each tour")
+    serve.add_argument("--max-revisions", type=int, default=3, help="Writer/director rounds per stop")
+    serve.add_argument("--checkpoint", metavar="DB", help="SQLite checkpoint file")
+
+    resume = commands.add_parser("resume", help="Finish a tour an interrupted run left incomplete")
+    resume.add_argument("tour_id", nargs="?", help="Tour to resume; omit to list unfinished tours")
+    resume.add_argument("--checkpoint", metavar="DB", required=True, help="SQLite file the tour was checkpointed to")
+    resume.add_argument("--max-revisions", type=int, default=3, help="Writer/director rounds per stop")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the CLI.
+
+    Args:
+        argv (list, optional): Arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Process exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command in ("write", "full") and args.concurrency > 1 and (args.stream or args.pipelined or args.previous):
+        parser.error("--concurrency only applies to the default run and --deadline; "
+                     "--stream, --pipelined and --previous write one stop at a time")
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.trace:
+        from tracing import JsonlSpanExporter, get_tracer
+
+        get_tracer().add_hook(JsonlSpanExporter(args.trace))
+
+    if args.command == "resume":
+        return _resume(args)
+
+    if args.command == "batch":
+        return _batch(args)
+
+    if args.command == "serve":
+        return _serve(args)
+
+    if args.command == "write":
+        if args.agenda == "-":
+            agenda = sys.stdin.read()
+        else:
+            with open(args.agenda, encoding="utf-8") as f:
+                agenda = f.read()
+        return _write(agenda, args)
+
+    try:
+        agenda = _plan(args.route, args.model, args.structured, args.long_route, args.waypoints, args.segment_km)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not agenda:
+        print("No response from Planner Agent.", file=sys.stderr)
+        return 1
+
+    if args.command == "plan":
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(agenda)
+        else:
+            print(agenda)
+        return 0
+
+    return _write(agenda, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+LLM Backend Module - The interface every agent calls the model through
+
+MasterAgent, plannerAgent and TourContentGenerator never touch a genai
+client directly; they call an LLMBackend. GeminiBackend talks to the real
+API. Other backends (the offline FakeBackend) and wrappers (the
+response cache) implement the same four methods, so they can be stacked or
+swapped without touching the agents.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from genaiClient import get_client
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+
+ChunkCallback = Callable[[str], None]
+
+
+class LLMBackend:
+    """
+    Interface for generating content.
+
+    The signatures mirror client.models.generate_content. Streaming calls
+    deliver text chunks to on_chunk and return the joined response, so
+    callers and wrappers handle streamed and non-streamed results the same way.
+    """
+
+    def generate_content(
+        self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None
+    ) -> types.GenerateContentResponse:
+        """
+        Generate a complete response.
+
+        Args:
+            model (str): Model identifier
+            contents: Prompt contents
+            config (GenerateContentConfig, optional): Generation config
+
+        Returns:
+            GenerateContentResponse: The response
+        """
+        raise NotImplementedError
+
+    async def agenerate_content(
+        self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None
+    ) -> types.GenerateContentResponse:
+        """Async variant of generate_content."""
+        raise NotImplementedError
+
+    def stream_content(
+        self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None,
+        on_chunk: ChunkCallback
+    ) -> types.GenerateContentResponse:
+        """
+        Generate a response, passing each text chunk to on_chunk as it arrives.
+
+        Args:
+            model (str): Model identifier
+            contents: Prompt contents
+            config (GenerateContentConfig, optional): Generation config
+            on_chunk (callable): Receives each text chunk
+
+        Returns:
+            GenerateContentResponse: The joined response
+        """
+        raise NotImplementedError
+
+    async def astream_content(
+        self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None,
+        on_chunk: ChunkCallback
+    ) -> types.GenerateContentResponse:
+        """Async variant of stream_content."""
+        raise NotImplementedError
+
+    def create_cached_content(
+        self, *, model: str, prefix: Dict[str, Any], ttl_seconds: int, display_name: Optional[str] = None
+    ) -> str:
+        """
+        Store a request prefix in a server-side context cache.
+
+        Backends without context caching keep this default; callers then send the prefix inline.
+
+        Args:
+            model (str): Model identifier the cache is created for
+            prefix (dict): system_instruction, tools and tool_config to cache
+            ttl_seconds (int): Lifetime of the cache
+            display_name (str, optional): Label shown in cache listings
+
+        Returns:
+            str: Cache name to pass as GenerateContentConfig.cached_content
+        """
+        raise NotImplementedError
+
+    def delete_cached_content(self, name: str) -> None:
+        """
+        Delete a cache created by create_cached_content.
+
+        Args:
+            name (str): Cache name
+        """
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Backend for the Gemini API using the shared genai.Client.
+
+    Attributes:
+        api_key (str): Explicit API key, or None to read it from the environment
+    """
+
+    def __init__(self, api_key: Optional[str] = None) -> None:
+        """
+        Initialize the backend. The client is created on the first call.
+
+        Args:
+            api_key (str, optional): Explicit API key
+        """
+        self.api_key = api_key
+
+    @property
+    def client(self):
+        """
+        The shared genai.Client for this backend's API key.
+
+        Returns:
+            genai.Client: Google Generative AI client
+        """
+        return get_client(self.api_key)
+
+    def generate_content(self, *, model, contents, config=None):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        return await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        chunks: List[str] = []
+        last = None
+        for last in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+            if last.text:
+                chunks.append(last.text)
+                on_chunk(last.text)
+        return join_chunks(chunks, last)
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        chunks: List[str] = []
+        last = None
+        stream = await self.client.aio.models.generate_content_stream(model=model, contents=contents, config=config)
+        async for last in stream:
+            if last.text:
+                chunks.append(last.text)
+                on_chunk(last.text)
+        return join_chunks(chunks, last)
+
+    def create_cached_content(self, *, model, prefix, ttl_seconds, display_name=None):
+        from google.genai import types
+
+        cached = self.client.caches.create(model=model, config=types.CreateCachedContentConfig(
+            ttl=f"{int(ttl_seconds)}s",
+            display_name=display_name,
+            **{key: value for key, value in prefix.items() if value is not None}
+        ))
+        return cached.name
+
+    def delete_cached_content(self, name):
+        self.client.caches.delete(name=name)
+
+
+def join_chunks(chunks: List[str], last: Optional[types.GenerateContentResponse]) -> types.GenerateContentResponse:
+    """
+    Join streamed text chunks into a single response.
+
+    Finish reason and usage metadata are taken from the final chunk.
+
+    Args:
+        chunks (list): Text chunks in arrival order
+        last (GenerateContentResponse, optional): The final chunk
+
+    Returns:
+        GenerateContentResponse: Response carrying the full text
+    """
+    from google.genai import types
+
+    candidate = types.Candidate(content=types.Content(role="model", parts=[types.Part(text="".join(chunks))]))
+    if last is not None and last.candidates:
+        candidate.finish_reason = last.candidates[0].finish_reason
+    return types.GenerateContentResponse(
+        candidates=[candidate],
+        usage_metadata=last.usage_metadata if last is not None else None
+    )
+
+
+_default_backend: Optional[LLMBackend] = None
+_default_lock = threading.Lock()
+
+
+def get_default_backend() -> LLMBackend:
+    """
+    Get the process-wide backend used by agents that were not given one.
+
+    Returns:
+        LLMBackend: A GeminiBackend behind the shared rate limiter, unless set_default_backend replaced it
+    """
+    from rateLimiter import rate_limited
+
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = rate_limited(GeminiBackend())
+        return _default_backend
+
+
+def set_default_backend(backend: Optional[LLMBackend]) -> None:
+    """
+    Replace the process-wide backend (e.g. with a FakeBackend for benchmarks).
+
+    Args:
+        backend (LLMBackend, optional): New default; None restores the rate-limited GeminiBackend
+    """
+    global _default_backend
+    with _default_lock:
+        _default_backend = backend
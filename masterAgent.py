@@ -9,17 +9,17 @@ Author: GuideAI Team
 Version: 1.0.0
 """
 
+import asyncio
+import json
 import logging
-from typing import Optional
-from google import genai
-from google.genai import types
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from llmBackend import LLMBackend, get_default_backend
+from responseCache import ResponseCache, get_shared_cache, with_cache
+from routeSegments import Segment, Waypoint, merge_segment_agendas, split_route
+from tracing import Tracer, trace_context, traced
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -31,9 +31,12 @@ class MasterAgent:
     route by identifying narrative markers, historical facts, and points of interest.
     
     Attributes:
-        client (genai.Client): Google Generative AI client
+        backend (LLMBackend): Backend the agent generates content through
         model (str): The model to use for content generation
         system_prompt (str): System instruction for the AI model
+        cache (ResponseCache): Response cache consulted before each API call, or None
+        structured_output (bool): Whether agendas are requested as schema-constrained JSON
+        segment_stats (dict): Segments, waypoints and merge counts of the last long-route agenda
     """
     
     DEFAULT_MODEL = 'gemini-2.0-flash-exp'
@@ -42,7 +45,12 @@ class MasterAgent:
     def __init__(
         self,
         model: str = DEFAULT_MODEL,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+        backend: Optional[LLMBackend] = None,
+        tracer: Optional[Tracer] = None,
+        structured_output: bool = False
     ) -> None:
         """
         Initialize the MasterAgent.
@@ -50,10 +58,19 @@ class MasterAgent:
         Args:
             model (str): The model identifier to use. Defaults to gemini-2.0-flash-exp
             system_prompt (str, optional): Custom system prompt. Uses default if None.
+            cache (ResponseCache, optional): Response cache. Uses the shared cache if None.
+            use_cache (bool): Set to False to always call the API
+            backend (LLMBackend, optional): Backend to call. Uses the process default if None.
+            tracer (Tracer, optional): Destination for call spans. Uses the shared tracer if None.
+            structured_output (bool): Constrain the agenda to the agendaSchema.TourAgenda JSON schema
         """
-        self.client = genai.Client()
+        self.cache = (cache or get_shared_cache()) if use_cache else None
+        # No context cache: the planner's prefix (about 380 tokens) is below the API's minimum cacheable size.
+        self.backend = traced(with_cache(backend or get_default_backend(), self.cache), tracer)
         self.model = model
         self.system_prompt = system_prompt or self._get_default_system_prompt()
+        self.structured_output = structured_output
+        self.segment_stats: Dict = {}
         logger.info(f"MasterAgent initialized with model: {self.model}")
     
     @staticmethod
@@ -106,21 +123,13 @@ Additionally if the user has any specific requests, incorporate them into the ag
         try:
             logger.info(f"Generating agenda for route: {user_prompt}")
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=user_prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=self.system_prompt,
-                    max_output_tokens=self.MAX_OUTPUT_TOKENS,
-                    tools=[types.Tool(google_maps=types.GoogleMaps())],
-                    safety_settings=[
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                            threshold="BLOCK_ONLY_HIGH"
-                        )
-                    ]
-                ),
-            )
+            config = self._request_config(self.structured_output)
+            with trace_context(role="planner"):
+                response = self.backend.generate_content(
+                    model=self.model,
+                    contents=user_prompt,
+                    config=config,
+                )
             
             if response.text:
                 logger.info("Agenda generated successfully")
@@ -134,6 +143,199 @@ Additionally if the user has any specific requests, incorporate them into the ag
             logger.error(f"Error generating agenda: {e}", exc_info=True)
             raise
     
+    def generate_long_agenda(
+        self,
+        start: str,
+        end: str,
+        waypoints: Optional[Sequence[Union[str, Waypoint]]] = None,
+        preferences: str = "",
+        segment_km: float = 250.0,
+        max_concurrency: int = 4,
+        min_spacing_km: float = 5.0
+    ) -> Optional[str]:
+        """
+        Plan a long route as concurrently planned corridor segments (see routeSegments).
+
+        Runs its own event loop, so it cannot be called from async code (e.g. TourService);
+        await agenerate_long_agenda there instead.
+
+        Args:
+            start (str): Starting point
+            end (str): Destination
+            waypoints (list, optional): Places along the route, in order; asked from the planner if None
+            preferences (str): Free-text user preferences
+            segment_km (float): Target segment length when waypoint coordinates are known
+            max_concurrency (int): Segments planned at once
+            min_spacing_km (float): Smallest distance between consecutive markers
+
+        Returns:
+            str: A JSON agenda (agendaSchema.TourAgenda), or None if no segment produced markers
+
+        Raises:
+            RuntimeError: If called while an event loop is running in this thread
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("generate_long_agenda cannot run inside an event loop; "
+                               "await agenerate_long_agenda instead")
+        return asyncio.run(self.agenerate_long_agenda(
+            start, end, waypoints, preferences, segment_km, max_concurrency, min_spacing_km
+        ))
+
+    async def agenerate_long_agenda(
+        self,
+        start: str,
+        end: str,
+        waypoints: Optional[Sequence[Union[str, Waypoint]]] = None,
+        preferences: str = "",
+        segment_km: float = 250.0,
+        max_concurrency: int = 4,
+        min_spacing_km: float = 5.0
+    ) -> Optional[str]:
+        """
+        Async variant of generate_long_agenda, the entry point for code already running in an event loop.
+
+        A segment whose planner call fails is logged and left out; the
+        error is raised only if every segment fails.
+        """
+        from agendaSchema import ROUTE_NOT_FOUND
+
+        if waypoints:
+            route_points = [w if isinstance(w, Waypoint) else Waypoint(w) for w in waypoints]
+            if route_points[0].name != start:
+                route_points.insert(0, Waypoint(start))
+            if route_points[-1].name != end:
+                route_points.append(Waypoint(end))
+        else:
+            route_points = await self._route_waypoints(start, end)
+        segments = split_route(route_points, segment_km)
+        logger.info(f"Planning {start} to {end} as {len(segments)} segments")
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results = await asyncio.gather(
+            *(self._plan_segment(segment, len(segments), start, end, preferences, semaphore) for segment in segments),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if len(failures) == len(results):
+            raise failures[0]
+        for segment, result in zip(segments, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Segment {segment.index + 1} ({segment.start.name} to {segment.end.name}) failed: "
+                             f"{result}")
+
+        route, points, counts = merge_segment_agendas(
+            [r for r in results if not isinstance(r, BaseException)], min_spacing_km
+        )
+        self.segment_stats = dict(counts, segments=len(segments), waypoints=len(route_points),
+                                  failed_segments=len(failures))
+        if not points:
+            logger.warning("No markers in any segment")
+            return None
+        return json.dumps({"primary_route": route or ROUTE_NOT_FOUND, "markers": points})
+
+    async def _route_waypoints(self, start: str, end: str) -> List[Waypoint]:
+        """
+        Ask the planner for the towns and junctions along the route.
+
+        Args:
+            start (str): Starting point
+            end (str): Destination
+
+        Returns:
+            list: Waypoints from start to end
+        """
+        from agendaSchema import parse_agenda
+
+        prompt = (
+            f"List the towns and junctions a driver passes from {start} to {end}, in driving order, starting "
+            f"with {start} and ending with {end}, roughly one every 50-100 km. Return each as a marker whose "
+            "title is the place name, with its coordinates; the summary names the road to the next one."
+        )
+        with trace_context(role="planner", segment="waypoints"):
+            response = await self.backend.agenerate_content(
+                model=self.model, contents=prompt, config=self._request_config(structured=True)
+            )
+        points, _ = parse_agenda(response.text)
+        waypoints = [Waypoint(p['title'], p.get('latitude'), p.get('longitude')) for p in points or []]
+        if len(waypoints) < 2:
+            return [Waypoint(start), Waypoint(end)]
+        return waypoints
+
+    async def _plan_segment(self, segment: Segment, total: int, start: str, end: str, preferences: str,
+                            semaphore: asyncio.Semaphore) -> Tuple[Segment, Optional[str], Optional[List[Dict]]]:
+        """
+        Plan one corridor segment.
+
+        Returns:
+            tuple: (segment, primary route, points)
+        """
+        from agendaSchema import parse_agenda
+
+        via = f", passing {', '.join(w.name for w in segment.via)}" if segment.via else ""
+        prompt = f"I am travelling from {start} to {end}."
+        if preferences:
+            prompt += f" My preferences: {preferences}"
+        prompt += (
+            f"\nThis request covers only segment {segment.index + 1} of {total}: from {segment.start.describe()} "
+            f"to {segment.end.describe()}{via}.\nIdentify {segment.markers} Narrative Markers on this segment only, "
+            "in driving order, with coordinates. The other segments are planned separately."
+        )
+        async with semaphore:
+            with trace_context(role="planner", segment=segment.index):
+                response = await self.backend.agenerate_content(
+                    model=self.model, contents=prompt, config=self._request_config(structured=True)
+                )
+        points, route = parse_agenda(response.text)
+        return segment, route, points
+
+    def _request_config(self, structured: bool):
+        """
+        Generation config for a planner call.
+
+        Args:
+            structured (bool): Request schema-constrained JSON
+
+        Returns:
+            GenerateContentConfig: The config
+        """
+        from google.genai import types
+
+        config = types.GenerateContentConfig(
+            system_instruction=self.system_prompt,
+            max_output_tokens=self.MAX_OUTPUT_TOKENS,
+            tools=[types.Tool(google_maps=types.GoogleMaps())],
+            safety_settings=[
+                types.SafetySetting(
+                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                    threshold="BLOCK_ONLY_HIGH"
+                )
+            ]
+        )
+        if structured:
+            self._use_structured_output(config)
+        return config
+
+    def _use_structured_output(self, config) -> None:
+        """
+        Switch a request config to schema-constrained JSON output.
+
+        The API does not combine a response schema with the Maps tool, so
+        structured requests rely on the model's own route knowledge.
+
+        Args:
+            config (GenerateContentConfig): Config to modify in place
+        """
+        from agendaSchema import STRUCTURED_OUTPUT_INSTRUCTIONS, TourAgenda
+
+        config.system_instruction = self.system_prompt + STRUCTURED_OUTPUT_INSTRUCTIONS
+        config.response_mime_type = "application/json"
+        config.response_json_schema = TourAgenda.model_json_schema()
+        config.tools = None
+
     @staticmethod
     def _log_response_details(response) -> None:
         """
@@ -150,6 +352,10 @@ Additionally if the user has any specific requests, incorporate them into the ag
 
 def main() -> None:
     """Main entry point for testing the MasterAgent."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     agent = MasterAgent()
     user_route = "I am travelling from Blacksburg, Virginia to New River Gorge National Park, West Virginia."
     
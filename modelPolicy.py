@@ -0,0 +1,457 @@
+"""
+Model Policy Module - Model cascade and adaptive revision caps
+
+Most stops are approved on the first or second draft, so giving every
+stop the strongest model and the full revision budget wastes capacity.
+ModelPolicy decides, per call and per stop:
+
+  - model cascade: first drafts and every director review go to a fast,
+    cheap model; a writer revision after a rejection escalates to the
+    strong model (TourConfig.model_name)
+  - revision cap: stops are grouped into categories (history, industry,
+    nature, lore, pit stop, other). RevisionHistory records for each stop
+    the revision it was approved on, or that it ran out of rounds. Once a
+    category has min_samples approvals, its cap is the lowest that would
+    still have allowed target_approval of them. Stops
+    that ran under a lower cap are censored past it, so only stops that
+    had room for more revisions count towards that. Every explore_every-th
+    stop of a category still runs with the full cap, so the history keeps
+    seeing late approvals.
+
+savings() compares a tour's trace summary with a uniform run - every call
+on the strong model, every stop with the full revision cap - in cost (list
+prices per million tokens, MODEL_PRICES), call latency and tokens, per
+role. The uniform run is either recorded (its own trace summary) or
+estimated from the tour: the same tokens per call, strong-model speed, and
+the drafts that lowered caps cut off added back.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from agendaDiff import normalize
+
+
+HISTORY = "history"
+INDUSTRY = "industry"
+NATURE = "nature"
+LORE = "lore"
+PIT_STOP = "pit_stop"
+OTHER = "other"
+
+# Trace span names of the writer and director calls (see TourContentGenerator).
+_WRITER = "writer"
+_DIRECTOR = "director"
+
+# Keywords of the planner's marker types (see MasterAgent's system prompt), most specific first.
+_CATEGORY_TERMS: List[Tuple[str, Tuple[str, ...]]] = [
+    (PIT_STOP, ("cafe", "diner", "restaurant", "bakery", "store", "shop", "brewery", "pit stop", "viewpoint",
+                "overlook", "vista", "lookout")),
+    (LORE, ("legend", "ghost", "lore", "myth", "folklore", "haunted", "tale", "trivia")),
+    (INDUSTRY, ("coal", "mine", "mining", "railroad", "railway", "industry", "factory", "mill", "furnace",
+                "company", "economic", "steel", "quarry")),
+    (NATURE, ("river", "gorge", "falls", "mountain", "forest", "ridge", "canyon", "creek", "lake", "geology",
+              "fault", "flora", "wildlife", "park")),
+    (HISTORY, ("history", "historic", "founded", "war", "battle", "century", "settlers", "frontier", "courthouse",
+               "museum", "treaty", "civil")),
+]
+
+# USD per million (input, output) tokens.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revision_outcomes (
+    category TEXT NOT NULL, cap INTEGER NOT NULL, revisions INTEGER NOT NULL, approved INTEGER NOT NULL
+);
+"""
+
+
+def categorize(point: Dict) -> str:
+    """
+    Category of an agenda point, from an explicit "category" field or keywords in its text.
+
+    Args:
+        point (dict): Agenda point
+
+    Returns:
+        str: One of HISTORY, INDUSTRY, NATURE, LORE, PIT_STOP or OTHER
+    """
+    explicit = normalize(point.get('category')).replace(" ", "_")
+    if explicit in (HISTORY, INDUSTRY, NATURE, LORE, PIT_STOP, OTHER):
+        return explicit
+    text = normalize(" ".join(str(point.get(k) or "") for k in ('title', 'summary', 'directive')))
+    words = set(text.split())
+    scores = {category: sum(1 for term in terms if (term in words if " " not in term else term in text))
+              for category, terms in _CATEGORY_TERMS}
+    best = max(scores.values())
+    if not best:
+        return OTHER
+    return next(category for category, _ in _CATEGORY_TERMS if scores[category] == best)
+
+
+class RevisionHistory:
+    """
+    Outcomes of finished stops, in memory or persisted to SQLite.
+
+    Only the latest window outcomes per category are kept in memory and used
+    for decisions, so caps follow drift in approval rates.
+
+    Attributes:
+        path (str): SQLite file, or ":memory:"
+        window (int): Outcomes per category used for decisions
+    """
+
+    def __init__(self, path: str = ":memory:", window: int = 500) -> None:
+        """
+        Open (or create) the history.
+
+        Args:
+            path (str): SQLite file; ":memory:" keeps it for this process only
+            window (int): Outcomes per category used for decisions
+        """
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._outcomes: Dict[str, Deque[Tuple[int, int, bool]]] = defaultdict(lambda: deque(maxlen=window))
+        for category, cap, revisions, approved in self._db.execute(
+                "SELECT category, cap, revisions, approved FROM revision_outcomes ORDER BY rowid"):
+            self._outcomes[category].append((cap, revisions, bool(approved)))
+
+    def record(self, category: str, cap: int, revisions: int, approved: bool) -> None:
+        """
+        Add the outcome of one stop.
+
+        Args:
+            category (str): Stop category
+            cap (int): Revision cap the stop ran under
+            revisions (int): Writer drafts it took
+            approved (bool): Whether the director approved the last draft
+        """
+        with self._lock:
+            self._outcomes[category].append((cap, revisions, approved))
+            self._db.execute("INSERT INTO revision_outcomes VALUES (?, ?, ?, ?)",
+                             (category, cap, revisions, int(approved)))
+            self._db.commit()
+
+    def outcomes(self, category: str) -> List[Tuple[int, int, bool]]:
+        """
+        Recorded (cap, revisions, approved) tuples of a category.
+
+        Returns:
+            list: Outcomes in recording order
+        """
+        with self._lock:
+            return list(self._outcomes[category])
+
+    def approval_rates(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-category first-draft and overall approval rates.
+
+        Returns:
+            dict: category -> {"stops", "first_draft", "approved"}
+        """
+        with self._lock:
+            rates = {}
+            for category, outcomes in self._outcomes.items():
+                stops = len(outcomes)
+                rates[category] = {
+                    "stops": stops,
+                    "first_draft": round(sum(1 for _, r, a in outcomes if a and r == 1) / stops, 4),
+                    "approved": round(sum(1 for _, _, a in outcomes if a) / stops, 4),
+                }
+            return rates
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._db.close()
+
+
+class ModelPolicy:
+    """
+    Picks the model for each call and the revision cap for each stop.
+
+    Attributes:
+        strong_model (str): Model for writer revisions (and everything when there is no fast model)
+        fast_model (str): Model for first drafts and director reviews, or None to disable the cascade
+        max_revisions (int): Upper bound for every cap
+        adaptive (bool): Whether caps are learned from history
+        target_approval (float): Share of past approvals a lowered cap must still allow
+        min_samples (int): Approvals a category needs before its cap is lowered
+        explore_every (int): Every n-th stop of a category runs with the full cap
+        history (RevisionHistory): Recorded stop outcomes
+    """
+
+    def __init__(self, strong_model: str, fast_model: Optional[str] = None, max_revisions: int = 3,
+                 adaptive: bool = False, target_approval: float = 0.95, min_samples: int = 5,
+                 explore_every: int = 10, history: Optional[RevisionHistory] = None) -> None:
+        """
+        Initialize the policy.
+
+        Args:
+            strong_model (str): Escalation model
+            fast_model (str, optional): Cheap model; None sends every call to strong_model
+            max_revisions (int): Largest revision cap
+            adaptive (bool): Learn caps per category instead of always using max_revisions
+            target_approval (float): Share of past approvals a lowered cap must still allow
+            min_samples (int): Approvals needed before a category's cap is lowered
+            explore_every (int): Full-cap stop interval per category (0 disables exploration)
+            history (RevisionHistory, optional): Outcome store; an in-memory one if None
+        """
+        self.strong_model = strong_model
+        self.fast_model = fast_model
+        self.max_revisions = max_revisions
+        self.adaptive = adaptive
+        self.target_approval = target_approval
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.history = history or RevisionHistory()
+        self._lock = threading.Lock()
+        self._assigned: Dict[str, int] = defaultdict(int)
+        self._capped = 0
+        self._drafts_avoided = 0
+
+    def writer_model(self, revision_count: int) -> str:
+        """
+        Model for a writer call.
+
+        Args:
+            revision_count (int): Drafts already written for the stop
+
+        Returns:
+            str: The fast model for a first draft, the strong model for a revision
+        """
+        if self.fast_model and revision_count == 0:
+            return self.fast_model
+        return self.strong_model
+
+    def director_model(self) -> str:
+        """Model for director reviews."""
+        return self.fast_model or self.strong_model
+
+    def revision_cap(self, point: Dict) -> int:
+        """
+        Revision cap for a stop that is about to start.
+
+        Args:
+            point (dict): Agenda point
+
+        Returns:
+            int: Writer drafts the stop may take
+        """
+        if not self.adaptive:
+            return self.max_revisions
+        category = categorize(point)
+        with self._lock:
+            self._assigned[category] += 1
+            explore = self.explore_every and self._assigned[category] % self.explore_every == 0
+        if explore:
+            return self.max_revisions
+        return self.learned_cap(category)
+
+    def learned_cap(self, category: str) -> int:
+        """
+        Lowest cap that would still have allowed target_approval of the category's past approvals.
+
+        Args:
+            category (str): Stop category
+
+        Returns:
+            int: Cap between 1 and max_revisions
+        """
+        outcomes = self.history.outcomes(category)
+        for cap in range(1, self.max_revisions):
+            # Only stops that were allowed more than `cap` drafts show whether the extra rounds mattered.
+            # Stops that ran out of rounds are not approvals, so they do not count towards the share kept.
+            approvals = [revisions for run_cap, revisions, approved in outcomes if run_cap > cap and approved]
+            if len(approvals) < self.min_samples:
+                break
+            later = sum(1 for revisions in approvals if revisions > cap)
+            if later / len(approvals) <= 1 - self.target_approval:
+                return cap
+        return self.max_revisions
+
+    def record(self, point: Dict, cap: int, revisions: int, approved: bool, policy_cap: Optional[int] = None) -> None:
+        """
+        Record how a finished stop went.
+
+        Args:
+            point (dict): Agenda point
+            cap (int): Revision cap it ran under
+            revisions (int): Writer drafts it took
+            approved (bool): Whether the director approved it
+            policy_cap (int): Cap this policy chose, when the caller (e.g. the deadline scheduler) ran the stop under
+                a lower one; drafts that caller cut off are not counted as avoided by the policy
+        """
+        cut_by_caller = policy_cap is not None and cap < policy_cap
+        if not approved and revisions >= cap and cap < self.max_revisions and not cut_by_caller:
+            with self._lock:
+                self._capped += 1
+                self._drafts_avoided += self.max_revisions - cap
+        self.history.record(categorize(point), cap, revisions, approved)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Policy state.
+
+        Returns:
+            dict: fast/strong models, caps per category, approval rates, stops stopped early by a lowered cap and
+                  the writer drafts that cut off (at most; a full cap might have approved a stop sooner)
+        """
+        rates = self.history.approval_rates()
+        with self._lock:
+            capped, avoided = self._capped, self._drafts_avoided
+        return {
+            "fast_model": self.fast_model,
+            "strong_model": self.strong_model,
+            "caps": {category: self.learned_cap(category) if self.adaptive else self.max_revisions
+                     for category in rates},
+            "approval_rates": rates,
+            "stops_capped_early": capped,
+            "drafts_avoided": avoided,
+        }
+
+
+def call_cost(model: str, prompt_tokens: int, response_tokens: int, cached_tokens: int = 0) -> float:
+    """
+    Estimated USD cost of a call at list prices; cached input is billed at a quarter of the input price.
+
+    Unknown models are priced like the strong default (gemini-2.5-flash).
+    """
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES["gemini-2.5-flash"])
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * input_price / 4 + response_tokens * output_price) / 1e6
+
+
+def savings(summary: Dict, strong_model: str, drafts_avoided: int = 0, baseline: Optional[Dict] = None,
+            model_speedups: Optional[Dict[str, float]] = None) -> Dict[str, object]:
+    """
+    Cost, call latency and tokens of a tour against a uniform run: every call on the strong model, every stop
+    with the full revision cap.
+
+    With baseline, the trace summary of a recorded uniform run of the same agenda, the comparison is measured.
+    Otherwise the uniform run is estimated per role from this tour. Every call keeps its tokens. A call on another
+    model takes its seconds times that model's speedup: model_speedups, else the ratio of seconds per token measured
+    on both models in this tour, else 1.0. The drafts_avoided writer drafts are added back, each with a director
+    review, at their role's mean tokens and strong-model seconds per call.
+
+    Args:
+        summary (dict): Tracer.tour_summary() of the tour
+        strong_model (str): Model a uniform policy would use
+        drafts_avoided (int): Writer drafts lowered caps cut off (ModelPolicy.stats()["drafts_avoided"])
+        baseline (dict, optional): Tracer.tour_summary() of a recorded uniform run
+        model_speedups (dict, optional): Model -> how many times faster its calls are than the strong model's
+
+    Returns:
+        dict: cost_usd, uniform_cost_usd, saved_usd, saved_share; call_seconds, uniform_call_seconds,
+              saved_seconds; tokens, uniform_tokens, saved_tokens; drafts_avoided; calls/seconds on non-strong
+              models; by_role (calls, seconds and tokens of both runs per role); uniform ("recorded" or "estimated")
+    """
+    roles = summary.get("roles", {})
+    actual = {role: _role_totals(models) for role, models in roles.items()}
+    cost = sum(call_cost(model, u["prompt_tokens"], u["response_tokens"], u["cached_tokens"])
+               for model, u in summary.get("models", {}).items())
+    offloaded_calls = sum(u["calls"] for model, u in summary.get("models", {}).items() if model != strong_model)
+    offloaded_seconds = sum(u["call_seconds"] for model, u in summary.get("models", {}).items()
+                            if model != strong_model)
+
+    if baseline is not None:
+        uniform = {role: _role_totals(models) for role, models in baseline.get("roles", {}).items()}
+        uniform_cost = sum(call_cost(model, u["prompt_tokens"], u["response_tokens"], u["cached_tokens"])
+                           for model, u in baseline.get("models", {}).items())
+        drafts_avoided = max(0, uniform.get(_WRITER, {}).get("calls", 0) - actual.get(_WRITER, {}).get("calls", 0))
+    else:
+        speedups = dict(_measured_speedups(roles, strong_model), **(model_speedups or {}))
+        uniform = {}
+        uniform_cost = sum(call_cost(strong_model, u["prompt_tokens"], u["response_tokens"], u["cached_tokens"])
+                           for u in summary.get("models", {}).values())
+        for role, models in roles.items():
+            totals = _role_totals(models)
+            totals["seconds"] = sum(u["call_seconds"] * (1.0 if model == strong_model else speedups.get(model, 1.0))
+                                    for model, u in models.items())
+            totals["cost"] = sum(call_cost(strong_model, u["prompt_tokens"], u["response_tokens"], u["cached_tokens"])
+                                 for u in models.values())
+            uniform[role] = totals
+        for role in (_WRITER, _DIRECTOR):
+            totals = uniform.get(role)
+            if drafts_avoided and totals and totals["calls"]:
+                per_call = {key: totals[key] / totals["calls"] for key in ("seconds", "tokens", "cost")}
+                totals["calls"] += drafts_avoided
+                totals["seconds"] += per_call["seconds"] * drafts_avoided
+                totals["tokens"] += per_call["tokens"] * drafts_avoided
+                uniform_cost += per_call["cost"] * drafts_avoided
+
+    seconds = sum(t["seconds"] for t in actual.values())
+    uniform_seconds = sum(t["seconds"] for t in uniform.values())
+    tokens = sum(t["tokens"] for t in actual.values())
+    uniform_tokens = sum(t["tokens"] for t in uniform.values())
+    by_role = {
+        role: {
+            "calls": actual.get(role, {}).get("calls", 0),
+            "uniform_calls": uniform.get(role, {}).get("calls", 0),
+            "seconds": round(actual.get(role, {}).get("seconds", 0.0), 6),
+            "uniform_seconds": round(uniform.get(role, {}).get("seconds", 0.0), 6),
+            "tokens": actual.get(role, {}).get("tokens", 0),
+            "uniform_tokens": round(uniform.get(role, {}).get("tokens", 0)),
+        }
+        for role in sorted(set(actual) | set(uniform))
+    }
+    return {
+        "cost_usd": round(cost, 6),
+        "uniform_cost_usd": round(uniform_cost, 6),
+        "saved_usd": round(uniform_cost - cost, 6),
+        "saved_share": round((uniform_cost - cost) / uniform_cost, 4) if uniform_cost else 0.0,
+        "call_seconds": round(seconds, 6),
+        "uniform_call_seconds": round(uniform_seconds, 6),
+        "saved_seconds": round(uniform_seconds - seconds, 6),
+        "tokens": tokens,
+        "uniform_tokens": round(uniform_tokens),
+        "saved_tokens": round(uniform_tokens - tokens),
+        "drafts_avoided": drafts_avoided,
+        "fast_model_calls": offloaded_calls,
+        "fast_model_seconds": round(offloaded_seconds, 6),
+        "by_role": by_role,
+        "uniform": "recorded" if baseline is not None else "estimated",
+    }
+
+
+def _role_totals(models: Dict[str, Dict]) -> Dict[str, float]:
+    return {
+        "calls": sum(u["calls"] for u in models.values()),
+        "seconds": sum(u["call_seconds"] for u in models.values()),
+        "tokens": sum(u["prompt_tokens"] + u["response_tokens"] for u in models.values()),
+    }
+
+
+def _measured_speedups(roles: Dict[str, Dict[str, Dict]], strong_model: str) -> Dict[str, float]:
+    # Seconds per token on the strong model over seconds per token on each other model, pooled over the roles
+    # that used both.
+    pooled: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0, 0.0, 0.0])
+    for models in roles.values():
+        strong = models.get(strong_model)
+        if not strong:
+            continue
+        for model, u in models.items():
+            if model != strong_model:
+                totals = pooled[model]
+                totals[0] += strong["call_seconds"]
+                totals[1] += strong["prompt_tokens"] + strong["response_tokens"]
+                totals[2] += u["call_seconds"]
+                totals[3] += u["prompt_tokens"] + u["response_tokens"]
+    return {model: (s_sec / s_tok) / (m_sec / m_tok)
+            for model, (s_sec, s_tok, m_sec, m_tok) in pooled.items() if s_tok and m_sec and m_tok}
@@ -0,0 +1,322 @@
+"""
+Pipeline Scheduler Module - Speculative writer/director pipelining across stops
+
+A sequential run waits for stop i's whole writer/director loop before stop
+i+1's writer starts. SpeculativePipeline starts stop i+1 as soon as stop i
+has a draft that passed the local screen, using that draft as if it were
+approved. Each attempt records the predecessor drafts it assumed (its
+context basis).
+
+When a stop is approved, every running attempt that assumed a draft of it
+is checked. The approved script "matches" the assumed draft when the
+continuity digest entries they produce - summary plus topics, which is what
+the next writer actually sees - are near-identical. A match keeps the
+speculative attempt. A material difference cancels it and every later
+attempt, and they restart from the approved context. Approved stops are
+released strictly in route order, so callers see the same ordering and
+context semantics as TourArchitect.run.
+
+With a stop library, stops it can reuse are approved before the run starts
+and adapted stops start from the library script; every approved stop is
+added to the library. Only the attempt that is kept counts towards the
+generator's stop outcomes and adaptive revision caps.
+
+A stop whose predecessors are all approved runs on the stop's own
+checkpoint thread, as in the other modes, so an interrupted tour continues
+it on resume. Speculative attempts run on threads named per run, and the
+threads of cancelled attempts are deleted.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+
+from continuityContext import ContinuityDigest
+from draftScreen import shingles
+from tracing import trace_context
+
+if TYPE_CHECKING:
+    from wrtirAgent import TourArchitect
+
+
+@dataclass
+class _Attempt:
+    index: int
+    number: int
+    basis: Dict[int, str]
+    draft: asyncio.Future
+    thread_id: str
+    task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Outcome counters for one pipelined run.
+
+    Attributes:
+        attempts (int): Stop attempts started, including restarts
+        speculative (int): Attempts started before every predecessor was approved
+        confirmed (int): Assumed predecessor drafts that matched the approved script
+        invalidated (int): Assumed predecessor drafts that did not match
+        restarted (int): Attempts cancelled and re-run because their basis was invalidated
+        restarts_by_stop (dict): Stop index -> times it was restarted
+    """
+    attempts: int = 0
+    speculative: int = 0
+    confirmed: int = 0
+    invalidated: int = 0
+    restarted: int = 0
+    restarts_by_stop: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def success_rate(self) -> float:
+        """Share of checked speculative assumptions that held."""
+        checked = self.confirmed + self.invalidated
+        return round(self.confirmed / checked, 4) if checked else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        """Counters plus success_rate, for reports."""
+        return {
+            "attempts": self.attempts,
+            "speculative": self.speculative,
+            "confirmed": self.confirmed,
+            "invalidated": self.invalidated,
+            "restarted": self.restarted,
+            "success_rate": self.success_rate,
+        }
+
+
+def digest_similarity(title: str, speculated: str, approved: str, ngram: int = 3) -> float:
+    """
+    How closely two scripts agree as continuity context for later stops.
+
+    Args:
+        title (str): Marker title of the stop
+        speculated (str): Draft a later stop was started from
+        approved (str): Script the director approved
+        ngram (int): Word n-gram size for the comparison
+
+    Returns:
+        float: Jaccard similarity (0.0 - 1.0) of the two rendered digest entries
+    """
+    if speculated == approved:
+        return 1.0
+    digest = ContinuityDigest()
+    a = shingles(digest.add_stop(0, title, speculated).render(), ngram)
+    b = shingles(digest.add_stop(0, title, approved).render(), ngram)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SpeculativePipeline:
+    """
+    Runs a tour's stops with up to `lookahead` stops started ahead of the oldest unapproved one.
+
+    Attributes:
+        architect (TourArchitect): Supplies the async workflow, store and config
+        lookahead (int): Stops allowed to run ahead of the oldest unapproved stop (0 = sequential)
+        threshold (float): Digest similarity at or above which a speculated draft counts as matching
+        stats (SpeculationStats): Counters for the current run
+    """
+
+    def __init__(self, architect: "TourArchitect", lookahead: int = 1, threshold: float = 0.6) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            architect (TourArchitect): Architect whose generator runs each stop
+            lookahead (int): Stops allowed to run ahead of the oldest unapproved stop
+            threshold (float): Digest similarity needed to keep a speculative attempt
+        """
+        if lookahead < 0:
+            raise ValueError("lookahead must be at least 0")
+        self.architect = architect
+        self.lookahead = lookahead
+        self.threshold = threshold
+        self.stats = SpeculationStats()
+        self._numbers = 0
+        self._nonce = ""
+        self._matches: Dict[int, object] = {}
+
+    async def run(self, parsed_points: List[Dict], route_name: str,
+                  tour_id: str) -> AsyncIterator[Tuple[int, str, str]]:
+        """
+        Generate every stop, yielding (index, title, script) in route order as each is approved.
+
+        Stops already approved for tour_id, or reused as-is from the stop library, are yielded without regeneration.
+
+        Args:
+            parsed_points (list): Agenda points
+            route_name (str): Primary route
+            tour_id (str): Tour the stops belong to
+
+        Yields:
+            tuple: (stop_index, title, approved script)
+        """
+        from stopLibrary import REUSE
+
+        approved: Dict[int, str] = dict(self.architect._approved_stops(tour_id))
+        matches = {}
+        for i, point in enumerate(parsed_points):
+            if i in approved:
+                continue
+            match = self.architect._library_match(parsed_points, i, tour_id)
+            if match is not None and match.action == REUSE:
+                self.architect._record_stop(tour_id, i, point['title'], match.script)
+                approved[i] = match.script
+            elif match is not None:
+                matches[i] = match
+        self._matches = matches
+        # Speculative attempt threads are named per run, so a resumed tour never continues a dead run's attempt.
+        self._nonce = uuid.uuid4().hex[:8]
+        attempts: Dict[int, _Attempt] = {}
+        oldest = 0
+        try:
+            while oldest < len(parsed_points):
+                if oldest in approved:
+                    yield oldest, parsed_points[oldest]['title'], approved[oldest]
+                    oldest += 1
+                    continue
+
+                self._start_ready(parsed_points, route_name, tour_id, approved, attempts, oldest)
+                head = attempts[oldest]
+                waiting = {future for a in attempts.values() for future in (a.task, a.draft)
+                           if not future.done()}
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if not head.task.done():
+                    for attempt in attempts.values():
+                        if attempt.task.done() and attempt.task.exception():
+                            raise attempt.task.exception()
+                    continue
+
+                del attempts[oldest]
+                result = head.task.result()
+                transcript = result['transcript']
+                title = parsed_points[oldest]['title']
+                approved[oldest] = transcript
+                if result.get('defer_outcome'):
+                    self.architect.generator.record_outcome(result)
+                self.architect._record_stop(tour_id, oldest, title, transcript)
+                self.architect._library_add(parsed_points, oldest, route_name, tour_id, transcript)
+                self._validate(oldest, title, transcript, attempts)
+                yield oldest, title, transcript
+                oldest += 1
+        finally:
+            for attempt in attempts.values():
+                attempt.task.cancel()
+
+    def _start_ready(self, parsed_points: List[Dict], route_name: str, tour_id: str,
+                     approved: Dict[int, str], attempts: Dict[int, _Attempt], oldest: int) -> None:
+        for index in range(oldest, min(len(parsed_points), oldest + self.lookahead + 1)):
+            if index in approved or index in attempts:
+                continue
+            if index > oldest and index - 1 not in approved:
+                previous = attempts.get(index - 1)
+                if previous is None or not previous.draft.done() or previous.draft.cancelled():
+                    return
+            basis = {k: attempts[k].draft.result() for k in range(oldest, index) if k not in approved}
+            self._start(index, parsed_points, route_name, tour_id, approved, basis, attempts)
+
+    def _start(self, index: int, parsed_points: List[Dict], route_name: str, tour_id: str,
+               approved: Dict[int, str], basis: Dict[int, str], attempts: Dict[int, _Attempt]) -> None:
+        digest = ContinuityDigest(self.architect.config.context_token_budget)
+        sections = []
+        for k in range(index):
+            script = approved[k] if k in approved else basis[k]
+            title = parsed_points[k]['title']
+            sections.append(f"STOP {k+1}: {title}\n{script}")
+            digest.add_stop(k, title, script)
+
+        self._numbers += 1
+        self.stats.attempts += 1
+        if basis:
+            self.stats.speculative += 1
+        match = self._matches.get(index)
+        # An attempt with every predecessor approved is the stop itself: it runs on the stop's own thread, like the
+        # other modes, so an interrupted run continues it. Speculative attempts get a thread of their own.
+        thread_id = f"{tour_id}:stop-{index}"
+        if basis:
+            thread_id += f":attempt-{self._nonce}-{self._numbers}"
+        attempt = _Attempt(index, self._numbers, basis, asyncio.get_running_loop().create_future(), thread_id)
+        initial_input = {
+            "point_data": parsed_points[index],
+            "route": route_name,
+            "completed_sections": sections,
+            **self.architect.generator.share_agenda(tour_id, parsed_points),
+            "continuity": digest.render(),
+            "transcript": match.script if match else "",
+            "feedback": match.feedback if match else "",
+            "revision_count": 1 if match else 0,
+            "is_ready": False,
+            # Outcomes are counted in run() for the attempt that is kept; a cancelled attempt must not count.
+            "defer_outcome": True
+        }
+        print(f"\nProcessing Point {index+1}: {parsed_points[index]['title']}"
+              f"{' (speculative)' if basis else ''}...")
+        attempt.task = asyncio.ensure_future(self._run_attempt(attempt, initial_input, tour_id))
+        attempts[index] = attempt
+
+    async def _run_attempt(self, attempt: _Attempt, initial_input: Dict, tour_id: str) -> Dict:
+        workflow = self.architect.generator.async_workflow
+        screening = self.architect.generator.screener is not None
+        thread_config = {"configurable": {"thread_id": attempt.thread_id}}
+        draft = ""
+        try:
+            if not attempt.basis:
+                snapshot = await workflow.aget_state(thread_config)
+                if snapshot.next:
+                    initial_input = None
+                elif snapshot.values.get('transcript'):
+                    self._draft_ready(attempt, snapshot.values['transcript'])
+                    return snapshot.values
+            with trace_context(tour_id=tour_id, stop_index=attempt.index, speculative=bool(attempt.basis)):
+                async for update in workflow.astream(initial_input, config=thread_config, stream_mode="updates"):
+                    if "writer" in update:
+                        draft = update["writer"]["transcript"]
+                        if not screening:
+                            self._draft_ready(attempt, draft)
+                    elif update.get("screen", {}).get("screen_passed"):
+                        # With best-of-N drafting the screen picks which candidate goes on.
+                        self._draft_ready(attempt, update["screen"].get("transcript", draft))
+                state = await workflow.aget_state(thread_config)
+            values = state.values
+            self.architect.generator.compact(thread_config)
+            self._draft_ready(attempt, values["transcript"])
+            return values
+        finally:
+            if not attempt.draft.done():
+                attempt.draft.cancel()
+
+    def _discard(self, thread_id: str) -> None:
+        self.architect.generator.checkpointer.delete_thread(thread_id)
+
+    @staticmethod
+    def _draft_ready(attempt: _Attempt, draft: str) -> None:
+        if not attempt.draft.done():
+            attempt.draft.set_result(draft)
+
+    def _validate(self, index: int, title: str, transcript: str, attempts: Dict[int, _Attempt]) -> None:
+        for later in sorted(attempts):
+            attempt = attempts[later]
+            if index not in attempt.basis:
+                continue
+            if digest_similarity(title, attempt.basis.pop(index), transcript) >= self.threshold:
+                self.stats.confirmed += 1
+                continue
+            self.stats.invalidated += 1
+            for stale in [k for k in attempts if k >= later]:
+                dropped = attempts.pop(stale)
+                dropped.task.cancel()
+                # A cancelled attempt is never continued; drop its checkpoints once it has stopped writing them.
+                dropped.task.add_done_callback(lambda _, thread_id=dropped.thread_id: self._discard(thread_id))
+                self.stats.restarted += 1
+                self.stats.restarts_by_stop[stale] = self.stats.restarts_by_stop.get(stale, 0) + 1
+            return
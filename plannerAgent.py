@@ -1,9 +1,8 @@
 
 # from pandas import api
-from google import genai
-from google.genai import types
-
-client = genai.Client()
+from llmBackend import get_default_backend
+from responseCache import get_shared_cache, with_cache
+from tracing import trace_context, traced
 
 # This is where you define the persona and grounding behavior
 # system_prompt = """Generate a route for the user"""
@@ -41,13 +40,12 @@ user_prompt = "I am travelling from Blacksburg, Virginia to New River Gorge Nati
 model = 'gemini-2.0-flash-exp' 
 
 
-def Agentcall(system_prompt=system_prompt,user_prompt=user_prompt,model=model):
+def Agentcall(system_prompt=system_prompt,user_prompt=user_prompt,model=model,cache=None,backend=None):
+    from google.genai import types
     
     try:
-        response = client.models.generate_content(
-        model=model,
-        contents=user_prompt,
-        config=types.GenerateContentConfig(
+        llm = traced(with_cache(backend or get_default_backend(), cache if cache is not None else get_shared_cache()))
+        config = types.GenerateContentConfig(
             system_instruction=system_prompt,
             max_output_tokens=8192, 
             tools=[types.Tool(google_maps=types.GoogleMaps())],
@@ -55,8 +53,9 @@ def Agentcall(system_prompt=system_prompt,user_prompt=user_prompt,model=model):
                 category="HARM_CATEGORY_DANGEROUS_CONTENT",
                 threshold="BLOCK_ONLY_HIGH"
             )]
-        ),
-    )
+        )
+        with trace_context(role="planner"):
+            response = llm.generate_content(model=model, contents=user_prompt, config=config)
         if response.text:
             return response.text
         else:
@@ -70,8 +69,9 @@ def Agentcall(system_prompt=system_prompt,user_prompt=user_prompt,model=model):
         print(f"Error occurred: {e}")
         return None
 
-ans = Agentcall()
-print(ans)
+if __name__ == "__main__":
+    ans = Agentcall()
+    print(ans)
 
 
 # # Grounding metadata processing...
@@ -0,0 +1,560 @@
+"""
+Rate Limiter Module - Shared client-side quota, retry and adaptive concurrency
+
+Every model call made through the default backend passes through one
+process-wide RateLimiter:
+
+  - Token buckets for requests/minute and tokens/minute. A call reserves
+    its estimated tokens up front; the estimate is corrected from the
+    response's usage metadata afterwards. Reservations may drive a bucket
+    negative, so callers queue in arrival order instead of racing.
+  - Retries with full-jitter exponential backoff for throttling (429 /
+    RESOURCE_EXHAUSTED), overload (503) and transient network/server
+    errors. A server retry hint (RetryInfo.retryDelay or Retry-After)
+    takes precedence over backoff and pauses all callers, not just the
+    one that was throttled.
+  - AIMD concurrency: the in-flight limit grows by one per window of
+    successful calls and is halved on each throttle.
+
+Queue wait, throttle events and retries are exported as metrics and
+attached to the current trace span.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from continuityContext import estimate_tokens
+from llmBackend import LLMBackend
+from tracing import annotate
+
+
+THROTTLE_CODES = {429}
+OVERLOAD_CODES = {503}
+TRANSIENT_CODES = {408, 500, 502, 504}
+
+
+@dataclass
+class RateLimitConfig:
+    """
+    Quota and retry settings.
+
+    Attributes:
+        requests_per_minute (float): Request quota
+        tokens_per_minute (float): Input + output token quota
+        expected_output_tokens (int): Output tokens reserved when the config sets no max_output_tokens
+        max_retries (int): Retries after the first attempt
+        base_delay (float): Backoff for the first retry, in seconds
+        max_delay (float): Backoff cap, in seconds
+        initial_concurrency (int): Starting in-flight limit
+        min_concurrency (int): Floor the limit is never cut below
+        max_concurrency (int): Ceiling the limit never grows above
+        decrease_factor (float): Multiplier applied to the limit on throttle
+    """
+    requests_per_minute: float = 1000.0
+    tokens_per_minute: float = 1_000_000.0
+    expected_output_tokens: int = 1000
+    max_retries: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    initial_concurrency: int = 8
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    decrease_factor: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        """
+        Defaults overridden by GUIDEAI_RPM, GUIDEAI_TPM and GUIDEAI_MAX_CONCURRENCY.
+
+        Returns:
+            RateLimitConfig: The configuration
+        """
+        config = cls()
+        if os.environ.get("GUIDEAI_RPM"):
+            config.requests_per_minute = float(os.environ["GUIDEAI_RPM"])
+        if os.environ.get("GUIDEAI_TPM"):
+            config.tokens_per_minute = float(os.environ["GUIDEAI_TPM"])
+        if os.environ.get("GUIDEAI_MAX_CONCURRENCY"):
+            config.max_concurrency = int(os.environ["GUIDEAI_MAX_CONCURRENCY"])
+            config.initial_concurrency = min(config.initial_concurrency, config.max_concurrency)
+        return config
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most one minute of quota.
+
+    Attributes:
+        rate (float): Refill rate per second
+        capacity (float): Bucket size
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount from the bucket now.
+
+        Args:
+            amount (float): Tokens needed; capped at the capacity
+
+        Returns:
+            float: Seconds the caller must wait before using the reservation
+        """
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self.capacity)
+            return -self._level / self.rate if self._level < 0 else 0.0
+
+    def adjust(self, amount: float) -> None:
+        """
+        Take (positive) or refund (negative) tokens after the fact.
+
+        Args:
+            amount (float): Correction to an earlier reservation
+        """
+        with self._lock:
+            self._refill()
+            self._level = min(self._level - amount, self.capacity)
+
+    @property
+    def level(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._level
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Process-wide admission control for model calls.
+
+    Attributes:
+        config (RateLimitConfig): Quotas and retry policy
+        limit (float): Current AIMD in-flight limit
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        Initialize the limiter.
+
+        Args:
+            config (RateLimitConfig, optional): Settings, defaults from the environment
+            sleep (callable): Blocking sleep, replaceable in tests
+        """
+        self.config = config or RateLimitConfig.from_env()
+        self.requests = TokenBucket(self.config.requests_per_minute)
+        self.tokens = TokenBucket(self.config.tokens_per_minute)
+        self.limit = float(self.config.initial_concurrency)
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._metrics: Dict[str, float] = {
+            "requests": 0, "queue_wait_seconds": 0.0, "queue_wait_max_seconds": 0.0,
+            "throttle_events": 0, "retries": 0, "failures": 0,
+        }
+
+    # --- admission ---
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until a concurrency slot and quota for tokens are available.
+
+        Args:
+            tokens (int): Estimated input + output tokens
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            while not self._try_slot():
+                self._cond.wait(0.05)
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                self._sleep(wait)
+            except BaseException:
+                self.release()
+                raise
+        return self._record_wait(time.monotonic() - start)
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async variant of acquire."""
+        import asyncio
+
+        start = time.monotonic()
+        poll = 0.001
+        while True:
+            with self._cond:
+                if self._try_slot():
+                    break
+            await asyncio.sleep(poll)
+            poll = min(poll * 2, 0.05)
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                # Cancelled while waiting for quota: the slot taken above is given back.
+                self.release()
+                raise
+        return self._record_wait(time.monotonic() - start)
+
+    def backoff(self, delay: float) -> None:
+        """Blocking wait between attempts."""
+        self._sleep(delay)
+
+    def release(self) -> None:
+        """Free the slot taken by acquire."""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def _try_slot(self) -> bool:
+        if self._in_flight < max(int(self.limit), 1):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _reserve(self, tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._cond:
+            return max(wait, self._paused_until - time.monotonic())
+
+    def _record_wait(self, waited: float) -> float:
+        with self._cond:
+            self._metrics["requests"] += 1
+            self._metrics["queue_wait_seconds"] += waited
+            self._metrics["queue_wait_max_seconds"] = max(self._metrics["queue_wait_max_seconds"], waited)
+        return waited
+
+    # --- outcomes ---
+
+    def on_success(self, estimated_tokens: int, response: Any) -> None:
+        """
+        Grow the limit additively and correct the token reservation from usage metadata.
+
+        Args:
+            estimated_tokens (int): Tokens reserved for the call
+            response (GenerateContentResponse): The response
+        """
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None) if usage is not None else None
+        if actual:
+            self.tokens.adjust(actual - estimated_tokens)
+        with self._cond:
+            self.limit = min(float(self.config.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify()
+
+    def on_error(self, error: BaseException, attempt: int, estimated_tokens: int) -> Optional[float]:
+        """
+        Decide whether to retry a failed call.
+
+        Throttling and overload halve the limit and refund the token reservation,
+        since the server rejected the request. A retry hint pauses every caller.
+
+        Args:
+            error (Exception): What the call raised
+            attempt (int): Zero-based attempt number that failed
+            estimated_tokens (int): Tokens reserved for the call
+
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        code = error_code(error)
+        retryable = code in THROTTLE_CODES | OVERLOAD_CODES | TRANSIENT_CODES or is_transient_network_error(error)
+        if not retryable or attempt >= self.config.max_retries:
+            with self._cond:
+                self._metrics["failures"] += 1
+            return None
+
+        hint = retry_hint(error)
+        delay = hint if hint is not None else random.uniform(
+            0, min(self.config.max_delay, self.config.base_delay * 2 ** attempt))
+        with self._cond:
+            self._metrics["retries"] += 1
+            if code in THROTTLE_CODES | OVERLOAD_CODES:
+                self._metrics["throttle_events"] += 1
+                self.limit = max(float(self.config.min_concurrency), self.limit * self.config.decrease_factor)
+            if hint is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + hint)
+        if code in THROTTLE_CODES | OVERLOAD_CODES:
+            self.tokens.adjust(-estimated_tokens)
+        return delay
+
+    # --- metrics ---
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Current counters and gauges.
+
+        Returns:
+            dict: requests, queue wait, throttle events, retries, failures, limit and in-flight
+        """
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["concurrency_limit"] = round(self.limit, 3)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def to_prometheus(self) -> str:
+        """
+        Render the limiter metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        stats = self.stats()
+        rows = [
+            ("guideai_ratelimit_requests_total", "counter", "Calls admitted by the rate limiter.", "requests"),
+            ("guideai_ratelimit_queue_wait_seconds_total", "counter",
+             "Time calls spent waiting for a slot or quota.", "queue_wait_seconds"),
+            ("guideai_ratelimit_queue_wait_max_seconds", "gauge",
+             "Longest single wait for a slot or quota.", "queue_wait_max_seconds"),
+            ("guideai_ratelimit_throttle_events_total", "counter",
+             "429/503 responses that triggered a backoff.", "throttle_events"),
+            ("guideai_ratelimit_retries_total", "counter", "Retried calls.", "retries"),
+            ("guideai_ratelimit_failures_total", "counter", "Calls that failed after retries.", "failures"),
+            ("guideai_ratelimit_concurrency_limit", "gauge", "Current AIMD in-flight limit.", "concurrency_limit"),
+            ("guideai_ratelimit_in_flight", "gauge", "Calls currently in flight.", "in_flight"),
+        ]
+        lines = []
+        for name, kind, help_text, key in rows:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"]
+        return "\n".join(lines) + "\n"
+
+
+def error_code(error: BaseException) -> Optional[int]:
+    """
+    HTTP status of a google.genai APIError (or anything with a numeric code).
+
+    Args:
+        error (Exception): Raised error
+
+    Returns:
+        int: Status code, or None
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    if getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return 429
+    return None
+
+
+def is_transient_network_error(error: BaseException) -> bool:
+    """
+    Whether the error is a connection/timeout failure worth retrying.
+
+    Args:
+        error (Exception): Raised error
+
+    Returns:
+        bool: True for socket, timeout and httpx transport errors
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ == "TransportError" and cls.__module__.startswith("httpx") for cls in type(error).__mro__)
+
+
+def retry_hint(error: BaseException) -> Optional[float]:
+    """
+    Server-suggested delay from RetryInfo.retryDelay or a Retry-After header.
+
+    Args:
+        error (Exception): Raised error
+
+    Returns:
+        float: Seconds to wait, or None
+    """
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in (details.get("error") or {}).get("details") or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if delay:
+                match = re.fullmatch(r"\s*([\d.]+)s\s*", str(delay))
+                if match:
+                    return float(match.group(1))
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+    return None
+
+
+def estimate_request_tokens(contents: Any, config: Any, expected_output_tokens: int) -> int:
+    """
+    Tokens to reserve for a call: prompt, system instruction and expected output.
+
+    Args:
+        contents: Prompt contents
+        config (GenerateContentConfig, optional): Generation config
+        expected_output_tokens (int): Output estimate when the config sets no max_output_tokens
+
+    Returns:
+        int: Token estimate
+    """
+    instruction = str(getattr(config, "system_instruction", "") or "")
+    output = getattr(config, "max_output_tokens", None) or expected_output_tokens
+    return estimate_tokens(str(contents)) + estimate_tokens(instruction) + output
+
+
+class RateLimitedBackend(LLMBackend):
+    """
+    LLMBackend wrapper that admits every call through a RateLimiter and retries transient failures.
+
+    Streaming calls are only retried if no chunk has been delivered yet.
+
+    Attributes:
+        inner (LLMBackend): Backend being limited
+        limiter (RateLimiter): Shared limiter
+    """
+
+    def __init__(self, inner: LLMBackend, limiter: RateLimiter) -> None:
+        self.inner = inner
+        self.limiter = limiter
+
+    def generate_content(self, *, model, contents, config=None):
+        return self._call(lambda: self.inner.generate_content(model=model, contents=contents, config=config),
+                          contents, config)
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        return await self._acall(
+            lambda: self.inner.agenerate_content(model=model, contents=contents, config=config), contents, config)
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        delivered = []
+
+        def forward(chunk):
+            delivered.append(True)
+            on_chunk(chunk)
+        return self._call(
+            lambda: self.inner.stream_content(model=model, contents=contents, config=config, on_chunk=forward),
+            contents, config, lambda: not delivered)
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        delivered = []
+
+        def forward(chunk):
+            delivered.append(True)
+            on_chunk(chunk)
+        return await self._acall(
+            lambda: self.inner.astream_content(model=model, contents=contents, config=config, on_chunk=forward),
+            contents, config, lambda: not delivered)
+
+    def create_cached_content(self, *, model, prefix, ttl_seconds, display_name=None):
+        return self.inner.create_cached_content(model=model, prefix=prefix, ttl_seconds=ttl_seconds,
+                                                display_name=display_name)
+
+    def delete_cached_content(self, name):
+        return self.inner.delete_cached_content(name)
+
+    def _call(self, send, contents, config, can_retry=lambda: True):
+        tokens = estimate_request_tokens(contents, config, self.limiter.config.expected_output_tokens)
+        waited = 0.0
+        for attempt in range(self.limiter.config.max_retries + 1):
+            waited += self.limiter.acquire(tokens)
+            error = None
+            try:
+                response = send()
+            except Exception as e:
+                error = e
+            finally:
+                # Also runs on cancellation or KeyboardInterrupt, so an abandoned call never keeps its slot.
+                self.limiter.release()
+            if error is not None:
+                delay = self.limiter.on_error(error, attempt, tokens) if can_retry() else None
+                if delay is None:
+                    annotate(queue_wait=round(waited, 6), retries=attempt)
+                    raise error
+                self.limiter.backoff(delay)
+                continue
+            self.limiter.on_success(tokens, response)
+            annotate(queue_wait=round(waited, 6), retries=attempt)
+            return response
+
+    async def _acall(self, send, contents, config, can_retry=lambda: True):
+        import asyncio
+
+        tokens = estimate_request_tokens(contents, config, self.limiter.config.expected_output_tokens)
+        waited = 0.0
+        for attempt in range(self.limiter.config.max_retries + 1):
+            waited += await self.limiter.aacquire(tokens)
+            error = None
+            try:
+                response = await send()
+            except Exception as e:
+                error = e
+            finally:
+                self.limiter.release()
+            if error is not None:
+                delay = self.limiter.on_error(error, attempt, tokens) if can_retry() else None
+                if delay is None:
+                    annotate(queue_wait=round(waited, 6), retries=attempt)
+                    raise error
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.on_success(tokens, response)
+            annotate(queue_wait=round(waited, 6), retries=attempt)
+            return response
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide limiter shared by every agent.
+
+    Returns:
+        RateLimiter: The shared limiter, configured from the environment on first use
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+
+def rate_limited(backend: LLMBackend, limiter: Optional[RateLimiter] = None) -> LLMBackend:
+    """
+    Wrap a backend so its calls go through a limiter.
+
+    Args:
+        backend (LLMBackend): Backend to wrap
+        limiter (RateLimiter, optional): Limiter, defaults to the shared one
+
+    Returns:
+        LLMBackend: The rate-limited backend
+    """
+    return RateLimitedBackend(backend, limiter or get_rate_limiter())
@@ -0,0 +1,355 @@
+"""
+Response Cache Module - Content-addressed cache for Gemini calls
+
+Responses are keyed by a hash of model, system instruction, contents and
+generation config, so an identical request (same route, prompt, model and
+temperature) is served locally instead of going back to the API. The cache
+has two tiers: an in-memory LRU and an optional SQLite store on disk, both
+with size- and TTL-based eviction.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from llmBackend import LLMBackend
+from tracing import annotate
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH_ENV = "GUIDEAI_CACHE_PATH"
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of serialized API responses.
+
+    Attributes:
+        path (str): SQLite file backing the disk tier, or None for memory only
+        ttl_seconds (float): Entries older than this are treated as misses
+        hits (int): Lookups served from either tier
+        memory_hits (int): Lookups served from the in-memory tier
+        disk_hits (int): Lookups served from the SQLite tier
+        misses (int): Lookups that had to go to the API
+        evictions (int): Entries dropped for size or age
+    """
+
+    DEFAULT_TTL_SECONDS = 24 * 60 * 60
+    DEFAULT_MEMORY_ENTRIES = 256
+    DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            path (str, optional): SQLite file for the disk tier. Memory only if None.
+            ttl_seconds (float): Time-to-live for entries in both tiers
+            max_memory_entries (int): Capacity of the in-memory LRU tier
+            max_disk_bytes (int): Total size of stored values allowed on disk
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, contents: Any, config: Optional[types.GenerateContentConfig]) -> str:
+        """
+        Build the content address for a request.
+
+        The system instruction is part of the config, so it is covered by the hash.
+
+        Args:
+            model (str): Model identifier
+            contents: Prompt string or list of content objects
+            config (GenerateContentConfig, optional): Generation config
+
+        Returns:
+            str: Hex SHA-256 digest of the request
+        """
+        payload = {
+            "model": model,
+            "contents": _to_jsonable(contents),
+            "config": _to_jsonable(config),
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a serialized response, promoting disk hits into memory.
+
+        Args:
+            key (str): Key from make_key
+
+        Returns:
+            str: The stored value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+                self.evictions += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if now - created <= self.ttl_seconds:
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, created, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.evictions += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """
+        Store a serialized response in both tiers.
+
+        Args:
+            key (str): Key from make_key
+            value (str): Serialized response
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, now, now, len(value.encode("utf-8")))
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get hit/miss counters.
+
+        Returns:
+            dict: Counters and current memory tier size
+        """
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, created: float, value: str) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self.evictions += max(expired, 0)
+
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+_shared_caches: Dict[Optional[str], ResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache(path: Optional[str] = None) -> ResponseCache:
+    """
+    Get the process-wide cache for a path, creating it on first use.
+
+    Args:
+        path (str, optional): SQLite file. Falls back to $GUIDEAI_CACHE_PATH,
+            then to a memory-only cache.
+
+    Returns:
+        ResponseCache: The shared instance
+    """
+    path = path or os.environ.get(CACHE_PATH_ENV) or None
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = ResponseCache(path)
+        return _shared_caches[path]
+
+
+class CachingBackend(LLMBackend):
+    """
+    LLMBackend wrapper that serves repeated requests from a ResponseCache.
+
+    Only responses that carry text are stored, so blocked or empty
+    generations are retried on the next call. A streamed call that hits the
+    cache delivers the whole text as a single chunk.
+
+    Attributes:
+        inner (LLMBackend): Backend called on a miss
+        cache (ResponseCache): Cache consulted before each call
+    """
+
+    def __init__(self, inner: LLMBackend, cache: ResponseCache) -> None:
+        """
+        Initialize the wrapper.
+
+        Args:
+            inner (LLMBackend): Backend called on a miss
+            cache (ResponseCache): Cache consulted before each call
+        """
+        self.inner = inner
+        self.cache = cache
+
+    def generate_content(self, *, model, contents, config=None):
+        key, response = self._lookup(model, contents, config)
+        if response is None:
+            response = self.inner.generate_content(model=model, contents=contents, config=config)
+            _store(self.cache, key, response)
+        return response
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        key, response = self._lookup(model, contents, config)
+        if response is None:
+            response = await self.inner.agenerate_content(model=model, contents=contents, config=config)
+            _store(self.cache, key, response)
+        return response
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        key, response = self._lookup(model, contents, config)
+        if response is not None:
+            on_chunk(response.text)
+            return response
+        response = self.inner.stream_content(model=model, contents=contents, config=config, on_chunk=on_chunk)
+        _store(self.cache, key, response)
+        return response
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        key, response = self._lookup(model, contents, config)
+        if response is not None:
+            on_chunk(response.text)
+            return response
+        response = await self.inner.astream_content(model=model, contents=contents, config=config, on_chunk=on_chunk)
+        _store(self.cache, key, response)
+        return response
+
+    def _lookup(self, model, contents, config) -> Tuple[str, Optional[types.GenerateContentResponse]]:
+        key = self.cache.make_key(model, contents, config)
+        cached = self.cache.get(key)
+        annotate(cache="hit" if cached is not None else "miss")
+        return key, _load(cached) if cached is not None else None
+
+
+def with_cache(backend: LLMBackend, cache: Optional[ResponseCache]) -> LLMBackend:
+    """
+    Wrap a backend in a CachingBackend, or return it unchanged if cache is None.
+
+    Args:
+        backend (LLMBackend): Backend to wrap
+        cache (ResponseCache, optional): Cache to consult
+
+    Returns:
+        LLMBackend: The wrapped (or original) backend
+    """
+    return CachingBackend(backend, cache) if cache is not None else backend
+
+
+def _load(value: str) -> types.GenerateContentResponse:
+    from google.genai import types
+
+    return types.GenerateContentResponse.model_validate_json(value)
+
+
+def _store(cache: ResponseCache, key: str, response: types.GenerateContentResponse) -> None:
+    try:
+        if response.text:
+            cache.put(key, response.model_dump_json(exclude_none=True))
+    except Exception as e:
+        logger.warning(f"Could not cache response: {e}")
@@ -0,0 +1,211 @@
+"""
+Route Segments Module - Split long routes for parallel planning and merge the results
+
+A single planner call covers a cross-country route poorly: the output cap
+truncates it or the 5-8 marker budget leaves hours without a stop, and
+the call gets slower as the route gets longer. For long routes,
+MasterAgent plans corridor segments concurrently. This module holds the
+pure parts of that:
+
+  - split_route(): cut an ordered waypoint list into segments of about
+    segment_km. When waypoints have no coordinates, each pair of
+    consecutive waypoints is a segment. Each segment gets a marker budget
+    from its drive time.
+  - merge_segment_agendas(): put the segment agendas back together in
+    route order. Markers inside a segment are ordered by their position
+    along it. Markers that repeat one kept earlier are dropped (similar
+    title, which happens at segment boundaries), and so are markers less
+    than min_spacing_km from the previous kept marker.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from stopLibrary import distance_km, jaccard, trigrams
+
+
+@dataclass
+class Waypoint:
+    """
+    A town or junction the route passes, in driving order.
+
+    Attributes:
+        name (str): Place name
+        latitude (float): Optional latitude
+        longitude (float): Optional longitude
+    """
+    name: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @property
+    def location(self) -> Optional[Tuple[float, float]]:
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    def describe(self) -> str:
+        """Name plus coordinates when known, as used in segment prompts."""
+        if self.location is None:
+            return self.name
+        return f"{self.name} ({self.latitude:.4f}, {self.longitude:.4f})"
+
+
+@dataclass
+class Segment:
+    """
+    One corridor to plan.
+
+    Attributes:
+        index (int): Position along the route
+        start (Waypoint): Where the segment begins
+        end (Waypoint): Where it ends
+        via (list): Waypoints passed in between
+        distance_km (float): Length along the waypoints, if coordinates are known
+        markers (int): Marker budget for the segment
+    """
+    index: int
+    start: Waypoint
+    end: Waypoint
+    via: List[Waypoint]
+    distance_km: Optional[float]
+    markers: int
+
+
+def _leg_lengths(waypoints: Sequence[Waypoint]) -> Optional[List[float]]:
+    if len(waypoints) < 2 or any(w.location is None for w in waypoints):
+        return None
+    return [distance_km(a.location, b.location) for a, b in zip(waypoints, waypoints[1:])]
+
+
+def marker_budget(distance: Optional[float], avg_speed_kmh: float = 90.0, minutes_per_marker: float = 20.0,
+                  min_markers: int = 2, max_markers: int = 8) -> int:
+    """
+    Markers for a stretch of road: one per minutes_per_marker of driving, clamped.
+
+    Args:
+        distance (float): Length in km, or None when unknown
+        avg_speed_kmh (float): Assumed average speed
+        minutes_per_marker (float): Drive time between markers
+        min_markers (int): Lower bound
+        max_markers (int): Upper bound, also used when the length is unknown
+
+    Returns:
+        int: Marker budget
+    """
+    if distance is None:
+        return max_markers
+    minutes = distance / avg_speed_kmh * 60
+    return max(min_markers, min(max_markers, round(minutes / minutes_per_marker)))
+
+
+def split_route(waypoints: Sequence[Waypoint], segment_km: float = 250.0, max_segments: int = 12,
+                avg_speed_kmh: float = 90.0, minutes_per_marker: float = 20.0,
+                max_markers: int = 8) -> List[Segment]:
+    """
+    Cut a route into corridor segments.
+
+    Args:
+        waypoints (list): At least start and end, in driving order
+        segment_km (float): Target segment length when coordinates are known
+        max_segments (int): Upper bound; the target length grows to respect it
+        avg_speed_kmh (float): Assumed average speed for marker budgets
+        minutes_per_marker (float): Drive time between markers
+        max_markers (int): Marker budget cap per segment
+
+    Returns:
+        list: Segments in route order
+
+    Raises:
+        ValueError: With fewer than two waypoints
+    """
+    if len(waypoints) < 2:
+        raise ValueError("a route needs at least a start and an end waypoint")
+    legs = _leg_lengths(waypoints)
+    budget = dict(avg_speed_kmh=avg_speed_kmh, minutes_per_marker=minutes_per_marker, max_markers=max_markers)
+
+    if legs is None:
+        # Without coordinates every leg is a segment; neighbouring legs are paired up to respect max_segments.
+        per_segment = -(-(len(waypoints) - 1) // max_segments)
+        cuts = list(range(0, len(waypoints) - 1, per_segment)) + [len(waypoints) - 1]
+        return [
+            Segment(i, waypoints[a], waypoints[b], list(waypoints[a + 1:b]), None, marker_budget(None, **budget))
+            for i, (a, b) in enumerate(zip(cuts, cuts[1:]))
+        ]
+
+    segment_km = max(segment_km, sum(legs) / max_segments)
+    cuts, length = [0], 0.0
+    for i, leg in enumerate(legs, 1):
+        length += leg
+        if length >= segment_km and i < len(waypoints) - 1:
+            cuts.append(i)
+            length = 0.0
+    # A short tail is folded into the previous segment instead of being planned on its own.
+    if len(cuts) > 1 and length < segment_km / 3:
+        cuts.pop()
+    cuts.append(len(waypoints) - 1)
+
+    segments = []
+    for i, (a, b) in enumerate(zip(cuts, cuts[1:])):
+        distance = sum(legs[a:b])
+        segments.append(Segment(i, waypoints[a], waypoints[b], list(waypoints[a + 1:b]), round(distance, 1),
+                                marker_budget(distance, **budget)))
+    return segments
+
+
+def _position(point: Dict, segment: Segment) -> float:
+    # Fraction along the segment's chord; an equirectangular projection is plenty at this scale.
+    if 'latitude' not in point or segment.start.location is None or segment.end.location is None:
+        return 0.0
+    (lat_a, lon_a), (lat_b, lon_b) = segment.start.location, segment.end.location
+    dx, dy = lon_b - lon_a, lat_b - lat_a
+    length = dx * dx + dy * dy
+    if not length:
+        return 0.0
+    return ((point['longitude'] - lon_a) * dx + (point['latitude'] - lat_a) * dy) / length
+
+
+def merge_segment_agendas(results: Sequence[Tuple[Segment, Optional[str], Optional[List[Dict]]]],
+                          min_spacing_km: float = 5.0,
+                          title_similarity: float = 0.8) -> Tuple[str, List[Dict], Dict[str, int]]:
+    """
+    Merge per-segment agendas into one ordered, deduplicated agenda.
+
+    Args:
+        results (list): (segment, primary route, points) per segment; points may be None for a failed segment
+        min_spacing_km (float): Smallest distance between consecutive markers that both have coordinates
+        title_similarity (float): Trigram Jaccard similarity at which two titles are the same marker
+
+    Returns:
+        tuple: (primary route, points, counts of markers kept / duplicate / too_close)
+    """
+    routes: List[str] = []
+    kept: List[Dict] = []
+    kept_titles = []
+    counts = {"kept": 0, "duplicate": 0, "too_close": 0}
+    for segment, route, points in sorted(results, key=lambda r: r[0].index):
+        for part in (route or "").split(" / "):
+            if part and part not in routes:
+                routes.append(part)
+        ordered = sorted(enumerate(points or []), key=lambda p: (_position(p[1], segment), p[0]))
+        for _, point in ordered:
+            title = trigrams(point['title'])
+            if any(jaccard(title, other) >= title_similarity for other in kept_titles):
+                counts["duplicate"] += 1
+                continue
+            previous = kept[-1] if kept else None
+            if (previous is not None and 'latitude' in point and 'latitude' in previous
+                    and distance_km((point['latitude'], point['longitude']),
+                                    (previous['latitude'], previous['longitude'])) < min_spacing_km):
+                counts["too_close"] += 1
+                continue
+            # A segment's planner ETAs count from the segment start; deadlineScheduler re-estimates them.
+            kept.append({key: value for key, value in point.items() if key != 'eta_minutes'})
+            kept_titles.append(title)
+    counts["kept"] = len(kept)
+    return " / ".join(routes), kept, counts
@@ -0,0 +1,438 @@
+"""
+Stop Library Module - Approved stop scripts shared across tours
+
+Routes through the same region keep hitting the same landmarks. StopLibrary
+keeps every approved script in a local SQLite file. For each script it
+records the marker's normalized title, summary, directive, optional
+coordinates and the stop that followed it. A new agenda point is looked up
+before any model call:
+
+  - reuse:  a near-identical marker (same landmark, same angle) whose script
+            is fresh, already leads into the same next stop and mentions no
+            earlier stop the new tour lacks; the script is used as-is and the
+            writer/director loop is skipped
+  - adapt:  a similar marker, a stale entry, a different next stop, or a
+            script that refers back to a stop of its source tour that the new
+            tour does not visit first; the library script becomes the writer's first draft, with feedback
+            describing what to change, so one revision replaces a fresh
+            research-and-write loop
+  - miss:   nothing similar enough
+
+Lookup uses character-trigram MinHash signatures with LSH banding to find
+candidates. Candidates are scored by exact trigram Jaccard similarity of
+title and summary. Markers with coordinates only match within
+max_distance_km. Entries older than stale_after_seconds are only adapted,
+never reused verbatim. Entries past max_age_seconds, and the least recently
+used entries beyond max_entries, are evicted.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from agendaDiff import normalize
+
+
+REUSE = "reuse"
+ADAPT = "adapt"
+
+_PRIME = (1 << 61) - 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS library (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL, summary TEXT NOT NULL, directive TEXT NOT NULL,
+    latitude REAL, longitude REAL, next_title TEXT, previous_titles TEXT, route TEXT, source TEXT,
+    script TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, uses INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS library_last_used ON library (last_used);
+"""
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """
+    Character trigrams of normalized text, padded so short words still produce some.
+
+    Args:
+        text (str): Text to shingle
+
+    Returns:
+        frozenset: Trigram strings
+    """
+    padded = f"  {normalize(text)} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2)) if padded.strip() else frozenset()
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Exact Jaccard similarity of two sets (1.0 for two empty sets)."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance between two (latitude, longitude) pairs."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class MinHasher:
+    """
+    MinHash signatures over string shingles, with LSH band keys.
+
+    Attributes:
+        num_perm (int): Signature length
+        bands (int): LSH bands; two signatures are candidates if any band matches
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1) -> None:
+        """
+        Initialize the hash family.
+
+        Args:
+            num_perm (int): Signature length; must be divisible by bands
+            bands (int): LSH bands
+            seed (int): Seed for the permutation coefficients
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._coefficients = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingles: FrozenSet[str]) -> Tuple[int, ...]:
+        """
+        MinHash signature of a shingle set.
+
+        Args:
+            shingles (frozenset): Shingles to hash
+
+        Returns:
+            tuple: num_perm minimum hash values (all equal to the prime for an empty set)
+        """
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+        if not hashes:
+            return (_PRIME,) * self.num_perm
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._coefficients)
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        """
+        LSH bucket keys of a signature.
+
+        Returns:
+            list: (band index, hash of the band's rows) per band
+        """
+        rows = self._rows
+        return [(band, hash(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+
+@dataclass
+class LibraryMatch:
+    """
+    Result of a library lookup.
+
+    Attributes:
+        action (str): REUSE or ADAPT
+        entry_id (int): Library row
+        title (str): Title of the matched entry
+        score (float): Weighted title/summary similarity, 0.0 - 1.0
+        script (str): The matched approved script
+        feedback (str): Writer instructions when adapting
+    """
+    action: str
+    entry_id: int
+    title: str
+    score: float
+    script: str
+    feedback: str = ""
+
+
+@dataclass
+class _Indexed:
+    title: str
+    summary: str
+    directive: str
+    location: Optional[Tuple[float, float]]
+    next_key: str
+    previous: Tuple[str, ...]
+    source: Optional[str]
+    created: float
+    title_grams: FrozenSet[str]
+    summary_grams: FrozenSet[str]
+    bands: List[Tuple[int, int]]
+
+
+class StopLibrary:
+    """
+    Persistent, similarity-indexed library of approved stop scripts.
+
+    Attributes:
+        path (str): SQLite file, or ":memory:"
+        reuse_threshold (float): Score at or above which a fresh entry may be reused verbatim
+        adapt_threshold (float): Score at or above which an entry is offered as a first draft
+        title_weight (float): Share of the score from title similarity (the rest is summary)
+        max_distance_km (float): Largest distance between markers that both have coordinates
+        stale_after_seconds (float): Age after which entries are only adapted
+        max_age_seconds (float): Age after which entries are evicted
+        max_entries (int): Capacity; least recently used entries are evicted beyond it
+    """
+
+    DAY = 24 * 60 * 60
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        reuse_threshold: float = 0.85,
+        adapt_threshold: float = 0.55,
+        title_weight: float = 0.6,
+        max_distance_km: float = 10.0,
+        stale_after_seconds: float = 90 * DAY,
+        max_age_seconds: float = 365 * DAY,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+        hasher: Optional[MinHasher] = None
+    ) -> None:
+        """
+        Open (or create) the library and build the in-memory index.
+
+        Args:
+            path (str): SQLite file; ":memory:" for a throwaway library
+            reuse_threshold (float): Minimum score for verbatim reuse
+            adapt_threshold (float): Minimum score for adapting an entry
+            title_weight (float): Weight of title similarity in the score
+            max_distance_km (float): Location gate for markers with coordinates
+            stale_after_seconds (float): Entries older than this are adapted, not reused
+            max_age_seconds (float): Entries older than this are evicted
+            max_entries (int): Capacity
+            clock (callable): Time source, for tests
+            hasher (MinHasher, optional): Signature/LSH parameters
+        """
+        self.path = path
+        self.reuse_threshold = reuse_threshold
+        self.adapt_threshold = adapt_threshold
+        self.title_weight = title_weight
+        self.max_distance_km = max_distance_km
+        self.stale_after_seconds = stale_after_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._hasher = hasher or MinHasher()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        if "previous_titles" not in {row[1] for row in self._db.execute("PRAGMA table_info(library)")}:
+            self._db.execute("ALTER TABLE library ADD COLUMN previous_titles TEXT")  # older library files
+        self._entries: Dict[int, _Indexed] = {}
+        self._buckets: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._counts = {"lookups": 0, "reused": 0, "adapted": 0, "misses": 0, "added": 0, "evicted": 0}
+        for row in self._db.execute(
+                "SELECT id, title, summary, directive, latitude, longitude, next_title, previous_titles, source, created"
+                " FROM library"):
+            self._index(row[0], *row[1:7], json.loads(row[7] or "[]"), *row[8:])
+        self.evict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, point: Dict, next_title: Optional[str] = None, exclude_source: Optional[str] = None,
+               previous_titles: Optional[Sequence[str]] = None) -> Optional[LibraryMatch]:
+        """
+        Find an approved script for an agenda point.
+
+        Args:
+            point (dict): Agenda point (title, summary, directive, optional latitude/longitude)
+            next_title (str, optional): Title of the stop that follows in the new tour
+            exclude_source (str, optional): Ignore entries added by this source (the tour being generated)
+            previous_titles (list, optional): Titles of the stops before this one in the new tour; a script that
+                mentions an earlier stop of its source tour missing from them is adapted, not reused
+
+        Returns:
+            LibraryMatch: How to use the best entry, or None on a miss
+        """
+        title_grams, summary_grams = trigrams(point.get('title')), trigrams(point.get('summary'))
+        bands = self._hasher.band_keys(self._hasher.signature(self._features(title_grams, summary_grams)))
+        location = self._location(point)
+        now = self._clock()
+        with self._lock:
+            self._counts["lookups"] += 1
+            candidates = set().union(*(self._buckets.get(key, ()) for key in bands))
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if exclude_source is not None and entry.source == exclude_source:
+                    continue
+                if location and entry.location and distance_km(location, entry.location) > self.max_distance_km:
+                    continue
+                score = (self.title_weight * jaccard(title_grams, entry.title_grams)
+                         + (1 - self.title_weight) * jaccard(summary_grams, entry.summary_grams))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None or best_score < self.adapt_threshold:
+                self._counts["misses"] += 1
+                return None
+
+            entry = self._entries[best_id]
+            script = self._db.execute("SELECT script FROM library WHERE id = ?", (best_id,)).fetchone()[0]
+            notes = self._adaptation_notes(point, entry, best_score, next_title, previous_titles, script, now)
+            action = ADAPT if notes else REUSE
+            self._counts["adapted" if notes else "reused"] += 1
+            self._db.execute("UPDATE library SET last_used = ?, uses = uses + 1 WHERE id = ?", (now, best_id))
+            self._db.commit()
+        feedback = ""
+        if notes:
+            feedback = ("This is an approved segment from an earlier tour of the same place. Keep what still "
+                        "fits and make these changes: " + " ".join(notes))
+        return LibraryMatch(action, best_id, entry.title, round(best_score, 4), script, feedback)
+
+    def add(self, point: Dict, script: str, next_title: Optional[str] = None, route: Optional[str] = None,
+            source: Optional[str] = None, previous_titles: Optional[Sequence[str]] = None) -> int:
+        """
+        Store an approved script. An entry for the same title, summary and next stop is replaced.
+
+        Args:
+            point (dict): Agenda point the script was approved for
+            script (str): Approved script
+            next_title (str, optional): Title of the stop that followed it
+            route (str, optional): Primary route, for reference
+            source (str, optional): Tour id that produced the script
+            previous_titles (list, optional): Titles of the stops before it in that tour
+
+        Returns:
+            int: Library row id
+        """
+        now = self._clock()
+        title, summary = point.get('title') or "", point.get('summary') or ""
+        directive = point.get('directive') or ""
+        location = self._location(point)
+        previous = tuple(previous_titles or ())
+        with self._lock:
+            for entry_id, entry in list(self._entries.items()):
+                if (normalize(entry.title), normalize(entry.summary), entry.next_key) == \
+                        (normalize(title), normalize(summary), normalize(next_title)):
+                    self._remove(entry_id)
+            cursor = self._db.execute(
+                "INSERT INTO library (title, summary, directive, latitude, longitude, next_title, previous_titles,"
+                " route, source, script, created, last_used, uses) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (title, summary, directive, location[0] if location else None, location[1] if location else None,
+                 next_title, json.dumps(previous), route, source, script, now, now)
+            )
+            entry_id = cursor.lastrowid
+            self._index(entry_id, title, summary, directive, *(location or (None, None)), next_title, previous,
+                        source, now)
+            self._counts["added"] += 1
+            self._db.commit()
+            self._evict_locked(now)
+        return entry_id
+
+    def evict(self) -> int:
+        """
+        Drop expired entries and the least recently used ones beyond capacity.
+
+        Returns:
+            int: Entries removed
+        """
+        with self._lock:
+            removed = self._evict_locked(self._clock())
+            self._db.commit()
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Library usage so far.
+
+        Returns:
+            dict: entries, lookups, reused, adapted, misses, added, evicted and hit_rate (reused or adapted)
+        """
+        with self._lock:
+            stats: Dict[str, object] = dict(self._counts, entries=len(self._entries))
+            hits = self._counts["reused"] + self._counts["adapted"]
+            stats["hit_rate"] = round(hits / self._counts["lookups"], 4) if self._counts["lookups"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._db.close()
+
+    def _adaptation_notes(self, point: Dict, entry: _Indexed, score: float, next_title: Optional[str],
+                          previous_titles: Optional[Sequence[str]], script: str, now: float) -> List[str]:
+        notes = []
+        if score < self.reuse_threshold or normalize(point.get('directive')) != normalize(entry.directive):
+            notes.append(f"This stop is now '{point.get('title')}': {point.get('summary')} "
+                         f"Directive: {point.get('directive')}")
+        if now - entry.created > self.stale_after_seconds:
+            notes.append("The segment was written a while ago; check that its facts, hours and current details "
+                         "still hold.")
+        if normalize(next_title) != entry.next_key:
+            notes.append(f"The next stop is now '{next_title}'. Rewrite the closing transition to lead into it."
+                         if next_title else "This is the final stop of the tour. End with a sign-off for the whole "
+                                            "tour instead of a transition.")
+        if previous_titles is not None:
+            visited = {normalize(title) for title in previous_titles}
+            text = f" {normalize(script)} "
+            missing = [title for title in entry.previous
+                       if normalize(title) and normalize(title) not in visited and f" {normalize(title)} " in text]
+            if missing:
+                notes.append("This tour does not visit " + ", ".join(f"'{title}'" for title in missing)
+                             + " before this stop. Remove or replace the references to it.")
+        return notes
+
+    @staticmethod
+    def _features(title_grams: FrozenSet[str], summary_grams: FrozenSet[str]) -> FrozenSet[str]:
+        return frozenset(["t" + g for g in title_grams] + ["s" + g for g in summary_grams])
+
+    @staticmethod
+    def _location(point: Dict) -> Optional[Tuple[float, float]]:
+        latitude, longitude = point.get('latitude'), point.get('longitude')
+        return (latitude, longitude) if latitude is not None and longitude is not None else None
+
+    def _index(self, entry_id: int, title: str, summary: str, directive: str, latitude: Optional[float],
+               longitude: Optional[float], next_title: Optional[str], previous: Sequence[str], source: Optional[str],
+               created: float) -> None:
+        title_grams, summary_grams = trigrams(title), trigrams(summary)
+        bands = self._hasher.band_keys(self._hasher.signature(self._features(title_grams, summary_grams)))
+        location = (latitude, longitude) if latitude is not None and longitude is not None else None
+        self._entries[entry_id] = _Indexed(title, summary, directive, location, normalize(next_title),
+                                           tuple(previous), source, created, title_grams, summary_grams, bands)
+        for key in bands:
+            self._buckets[key].add(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for key in entry.bands:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._db.execute("DELETE FROM library WHERE id = ?", (entry_id,))
+
+    def _evict_locked(self, now: float) -> int:
+        expired = [entry_id for entry_id, entry in self._entries.items()
+                   if now - entry.created > self.max_age_seconds]
+        for entry_id in expired:
+            self._remove(entry_id)
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            rows = self._db.execute("SELECT id FROM library ORDER BY last_used, uses LIMIT ?", (overflow,)).fetchall()
+            for (entry_id,) in rows:
+                self._remove(entry_id)
+        removed = len(expired) + max(overflow, 0)
+        self._counts["evicted"] += removed
+        return removed
@@ -0,0 +1,114 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendaDiff import ADDED, CHANGED, GENERATE, RECHECK, REUSE, plan_regeneration  # noqa: E402
+from fakeBackend import WRITER, FakeBackend  # noqa: E402
+from tourOutput import patch_markdown, render_tour_markdown  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+TITLES = ["Blacksburg Town Square", "Pandapas Pond", "New River Overlook", "Pearisburg Depot",
+          "Bluestone Dam", "Sandstone Falls"]
+
+
+def point(title, summary=None):
+    return {"title": title, "summary": summary or f"History of {title}.", "directive": f"Describe {title}."}
+
+
+def agenda(points):
+    lines = ["Primary Route: US-460 E and WV-20 N", ""]
+    for i, p in enumerate(points, 1):
+        lines += [f"{i}. **{p['title']}**", f"   Summary: {p['summary']}",
+                  f"   Script Writer Directive: {p['directive']}", ""]
+    return "\n".join(lines)
+
+
+class PlanRegenerationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.old = [point(t) for t in TITLES]
+        self.scripts = {i: f"Welcome to {t}. A quiet stretch of road." for i, t in enumerate(TITLES)}
+        self.scripts[3] += " Remember the New River Overlook we passed?"
+
+    def test_dropping_a_marker_rechecks_its_neighbors_only(self):
+        new = [p for p in self.old if p["title"] != "New River Overlook"]
+        plan = plan_regeneration(self.old, self.scripts, new)
+
+        actions = [(s.title, s.action) for s in plan.stops]
+        self.assertEqual(actions, [("Blacksburg Town Square", REUSE), ("Pandapas Pond", RECHECK),
+                                   ("Pearisburg Depot", RECHECK), ("Bluestone Dam", REUSE),
+                                   ("Sandstone Falls", REUSE)])
+        self.assertIn("next stop is now 'Pearisburg Depot'", plan.stops[1].feedback)
+        self.assertIn("New River Overlook", plan.stops[2].feedback)
+        self.assertEqual(plan.removed, [2])
+        self.assertEqual(plan.counts(), {REUSE: 3, RECHECK: 2, GENERATE: 0, "removed": 1})
+
+    def test_added_and_changed_markers_are_generated(self):
+        new = [dict(p) for p in self.old] + [point("Hawks Nest")]
+        new[1]["directive"] = "Focus on the pond's beaver dams."
+        new[4]["title"] = "  bluestone DAM: "
+        plan = plan_regeneration(self.old, self.scripts, new)
+
+        self.assertEqual((plan.stops[1].status, plan.stops[1].action), (CHANGED, GENERATE))
+        self.assertEqual((plan.stops[6].status, plan.stops[6].action), (ADDED, GENERATE))
+        self.assertEqual(plan.stops[4].action, REUSE)
+        self.assertEqual(plan.stops[5].action, RECHECK)
+        self.assertIn("'Hawks Nest'", plan.stops[5].feedback)
+
+    def test_unfinished_previous_tour_generates_missing_stops(self):
+        scripts = {i: s for i, s in self.scripts.items() if i < 2}
+        plan = plan_regeneration(self.old, scripts, self.old)
+        self.assertEqual([s.action for s in plan.stops], [REUSE, REUSE] + [GENERATE] * 4)
+
+
+class RegenerateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(time_to_first_token=0, approval_rate=1.0)
+        config = TourConfig(enable_cache=False, checkpoint_path=os.path.join(self.tmpdir, "tours.db"))
+        self.architect = TourArchitect(config, backend=self.backend)
+        self.filename = os.path.join(self.tmpdir, "tour.md")
+
+    def test_only_affected_stops_are_regenerated_and_the_file_is_patched(self):
+        points = [point(t) for t in TITLES]
+        first = self.architect.run(agenda(points), filename=self.filename, tour_id="v1")
+        self.backend.reset_stats()
+
+        edited = points[:5] + [point("Hawks Nest")]
+        scripts = self.architect.regenerate(agenda(edited), "v1", tour_id="v2")
+        plan = self.architect.regeneration_plan
+
+        self.assertEqual(plan.counts(), {REUSE: 4, RECHECK: 1, GENERATE: 1, "removed": 1})
+        self.assertEqual(self.backend.calls[WRITER], 2)
+        self.assertEqual(scripts[:4], first[:4])
+        with open(self.filename, encoding="utf-8") as f:
+            self.assertEqual(f.read(), render_tour_markdown("US-460 E and WV-20 N", scripts))
+
+    def test_patch_rewrites_from_the_first_change(self):
+        scripts = [f"STOP {i+1}: {t}\nScript for {t}." for i, t in enumerate(TITLES)]
+        self.assertGreater(patch_markdown(self.filename, "US-460", scripts), 0)
+        self.assertEqual(patch_markdown(self.filename, "US-460", scripts), 0)
+
+        scripts[-1] = scripts[-1].replace("Script for", "A longer, revised script for")
+        written = patch_markdown(self.filename, "US-460", scripts)
+        with open(self.filename, encoding="utf-8") as f:
+            text = f.read()
+        self.assertEqual(text, render_tour_markdown("US-460", scripts))
+        self.assertLess(written, len(text) // 4)
+
+    def test_regenerate_needs_a_stored_previous_tour(self):
+        with self.assertRaises(KeyError):
+            self.architect.regenerate(agenda([point("A")]), "missing")
+        with self.assertRaises(ValueError):
+            TourArchitect(TourConfig(enable_cache=False), backend=self.backend).regenerate("", "v1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendaSchema import ROUTE_NOT_FOUND, parse_agenda, parse_legacy_agenda  # noqa: E402
+from benchmarks.bench_agenda_parse import baseline_parse, build_agendas  # noqa: E402
+from fakeBackend import FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from wrtirAgent import TourArchitect  # noqa: E402
+
+
+DRIFTED = """**Primary Route:** I-64 W and US-19 N
+
+### 1. Blacksburg History
+- **Summary:** Founding of the town.
+- **Script Writer Directive:** Cover William Black's 16 blocks.
+
+2) **Pocahontas Coalfield:** the smokeless coal boom
+   Summary: Smokeless coal boom.
+
+Some closing prose with 3. numbers and a Summary: mention outside any marker.
+"""
+
+
+class AgendaParsingTests(unittest.TestCase):
+
+    def test_legacy_parser_matches_the_original_on_clean_agendas(self):
+        for size in (1, 7, 50):
+            agenda = build_agendas(size)["legacy"]
+            self.assertEqual(parse_legacy_agenda(agenda), baseline_parse(agenda))
+
+    def test_fields_on_the_marker_line_match_the_original(self):
+        agenda = """Primary Route: US-460 W
+
+1. **Blacksburg** - Summary: Founded in 1798 on 16 blocks. Script Writer Directive: Cover William Black's plan.
+
+2. **Pearisburg** - Summary: Where the Appalachian Trail crosses the New River.
+   Script Writer Directive: Invite the driver to spot the white blazes.
+"""
+        points, route = parse_legacy_agenda(agenda)
+
+        self.assertEqual((points, route), baseline_parse(agenda))
+        self.assertEqual([p["title"] for p in points], ["Blacksburg", "Pearisburg"])
+        self.assertEqual(points[0]["directive"], "Cover William Black's plan.")
+
+    def test_legacy_parser_tolerates_formatting_drift(self):
+        points, route = parse_agenda(DRIFTED)
+
+        self.assertEqual(route, "I-64 W and US-19 N")
+        self.assertEqual([p["title"] for p in points], ["Blacksburg History", "Pocahontas Coalfield:"])
+        self.assertEqual(points[0]["directive"], "Cover William Black's 16 blocks.")
+        self.assertEqual(points[1]["directive"], "Not Found")
+
+    def test_json_agenda(self):
+        agenda = json.loads(build_agendas(3)["json"])
+        agenda["markers"][0].update(latitude=37.23, longitude=-80.41, eta_minutes=12)
+        text = "```json\n" + json.dumps(agenda) + "\n```"
+
+        points, route = parse_agenda(text)
+
+        self.assertEqual(route, "I-64 W and US-19 N")
+        self.assertEqual(len(points), 3)
+        self.assertEqual((points[0]["latitude"], points[0]["longitude"]), (37.23, -80.41))
+        self.assertEqual(points[0]["eta_minutes"], 12)
+        self.assertNotIn("latitude", points[1])
+        self.assertNotIn("eta_minutes", points[1])
+
+    def test_json_that_misses_the_schema_falls_back(self):
+        points, route = parse_agenda('{"route": "I-64", "stops": []}')
+        self.assertEqual((points, route), ([], ROUTE_NOT_FOUND))
+        self.assertEqual(parse_agenda(None), (None, None))
+
+    def test_structured_planner_mode(self):
+        configs = []
+
+        class RecordingBackend(FakeBackend):
+            def generate_content(self, *, model, contents, config=None):
+                configs.append(config)
+                return super().generate_content(model=model, contents=contents, config=config)
+
+        agent = MasterAgent(backend=RecordingBackend(markers=4, time_to_first_token=0),
+                            use_cache=False, structured_output=True)
+        agenda = agent.generate_agenda("Blacksburg to Beckley")
+
+        self.assertEqual(configs[0].response_mime_type, "application/json")
+        self.assertIn("markers", configs[0].response_json_schema["properties"])
+        self.assertIsNone(configs[0].tools)
+        points, route = TourArchitect().parse_route_data(agenda)
+        self.assertEqual(route, json.loads(agenda)["primary_route"])
+        self.assertEqual(len(points), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
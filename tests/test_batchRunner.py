@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batchRunner import BatchItem, BatchRunner, load_manifest  # noqa: E402
+from fakeBackend import PLANNER, FakeBackend  # noqa: E402
+from wrtirAgent import TourConfig  # noqa: E402
+
+
+MANIFEST = [
+    {"id": "bburg-nrg", "start": "Blacksburg, VA", "end": "New River Gorge, WV", "preferences": ["coal", "diners"]},
+    {"start": "Roanoke, VA", "end": "Lexington, VA", "config": {"max_revisions": 1}},
+    {"id": "broken", "start": "Charleston, WV", "end": "Beckley, WV", "config": {"no_such_field": 1}},
+]
+
+
+class BatchRunnerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.manifest = os.path.join(self.tmp, "routes.jsonl")
+        with open(self.manifest, "w", encoding="utf-8") as f:
+            f.write("# nightly routes\n\n")
+            f.writelines(json.dumps(record) + "\n" for record in MANIFEST)
+        self.output = os.path.join(self.tmp, "tours")
+
+    def runner(self, backend):
+        return BatchRunner(self.output, workers=3, base_config=TourConfig(enable_cache=False), backend=backend)
+
+    def test_load_manifest(self):
+        items = load_manifest(self.manifest)
+
+        self.assertEqual([item.id for item in items][0::2], ["bburg-nrg", "broken"])
+        self.assertEqual(items[0].preferences, "coal, diners")
+        self.assertIn("My preferences: coal, diners", items[0].prompt())
+        # Derived ids are stable across runs.
+        self.assertEqual(items[1].id, BatchItem.from_dict(MANIFEST[1]).id)
+
+        with open(self.manifest, "a", encoding="utf-8") as f:
+            f.write('{"start": "Nowhere"}\n')
+        with self.assertRaisesRegex(ValueError, r"routes.jsonl:6"):
+            load_manifest(self.manifest)
+
+    def test_failures_are_isolated_and_rerun_skips_completed_items(self):
+        backend = FakeBackend(markers=3, time_to_first_token=0, approval_rate=1.0)
+        records = {r["id"]: r for r in self.runner(backend).run(load_manifest(self.manifest))}
+
+        self.assertEqual(records["bburg-nrg"]["status"], "ok")
+        self.assertEqual(records["bburg-nrg"]["stops"], 3)
+        self.assertEqual(records["bburg-nrg"]["calls_by_role"], {"planner": 1, "writer": 3, "director": 3})
+        self.assertGreater(records["bburg-nrg"]["prompt_tokens"], 0)
+        self.assertEqual(records["broken"]["status"], "failed")
+        self.assertIn("no_such_field", records["broken"]["error"])
+        self.assertTrue(os.path.exists(os.path.join(self.output, "bburg-nrg.md")))
+
+        with open(os.path.join(self.output, "status.jsonl"), encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        backend.reset_stats()
+        rerun = self.runner(backend).run(load_manifest(self.manifest), resume=True)
+
+        self.assertEqual([r["id"] for r in rerun], ["broken"])
+        self.assertEqual(rerun[0]["run_id"], records["broken"]["run_id"])
+        self.assertEqual(backend.calls[PLANNER], 0)  # the invalid config is rejected before any model call
+
+    def test_new_run_does_not_resume_an_earlier_run_from_a_shared_checkpoint(self):
+        backend = FakeBackend(markers=3, time_to_first_token=0, approval_rate=1.0)
+        config = TourConfig(enable_cache=False, checkpoint_path=os.path.join(self.tmp, "tours.sqlite"))
+        items = load_manifest(self.manifest)[:1]
+        first = BatchRunner(self.output, base_config=config, backend=backend).run(items)
+
+        backend.reset_stats()
+        runner = BatchRunner(self.output, base_config=config, backend=backend)
+        second = runner.run(items)
+
+        self.assertEqual(second[0]["status"], "ok")
+        self.assertNotEqual(second[0]["run_id"], first[0]["run_id"])
+        self.assertEqual(second[0]["tour_id"], f"{runner.run_id}:bburg-nrg")
+        # Replanned and rewritten, not last night's stops.
+        self.assertEqual(second[0]["calls_by_role"], {"planner": 1, "writer": 3, "director": 3})
+
+        with self.assertRaises(ValueError):
+            BatchRunner(os.path.join(self.tmp, "empty"), backend=backend).run(items, resume=True)
+
+    def test_process_pool_rejects_shared_backend(self):
+        with self.assertRaises(ValueError):
+            BatchRunner(self.output, use_processes=True, backend=FakeBackend())
+
+
+if __name__ == "__main__":
+    unittest.main()
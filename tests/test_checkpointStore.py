@@ -0,0 +1,198 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpointStore import BoundedMemorySaver, TourStore  # noqa: E402
+from fakeBackend import DIRECTOR, WRITER, FakeBackend  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+class Preempted(Exception):
+    pass
+
+
+class CrashingBackend(FakeBackend):
+    '''
+    FakeBackend that raises once the given number of calls has been made, like a worker being preempted.
+    '''
+
+    def __init__(self, crash_after=None, **overrides):
+        super().__init__(**overrides)
+        self.crash_after = crash_after
+
+    def _respond(self, model, contents, config):
+        if self.crash_after is not None and len(self.call_log) >= self.crash_after:
+            raise Preempted()
+        return super()._respond(model, contents, config)
+
+
+class CheckpointResumeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp, "tours.sqlite")
+        self.output = os.path.join(self.tmp, "tour.md")
+        self.agenda = FakeBackend(markers=4, time_to_first_token=0).generate_content(
+            model="m", contents="route", config=_planner_config()).text
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def architect(self, backend):
+        config = TourConfig(enable_cache=False, checkpoint_path=self.db, max_revisions=3)
+        return TourArchitect(config, backend=backend)
+
+    def test_resume_skips_approved_stops_and_continues_in_flight_one(self):
+        # Stop 1 takes a writer and a director call; crash after the third call (stop 2's first draft).
+        first = CrashingBackend(crash_after=3, approval_rate=1.0, time_to_first_token=0)
+        architect = self.architect(first)
+        with self.assertRaises(Preempted):
+            architect.run(self.agenda, filename=self.output, tour_id="tour-a")
+
+        store = TourStore(self.db)
+        self.assertEqual(list(store.approved_stops("tour-a")), [0])
+        self.assertEqual(store.unfinished_tours(), ["tour-a"])
+
+        second = CrashingBackend(approval_rate=1.0, time_to_first_token=0)
+        scripts = self.architect(second).resume("tour-a")
+
+        self.assertEqual(len(scripts), 4)
+        # Stop 2's draft was checkpointed, so only its director call is repeated, then 2 calls for stops 3 and 4.
+        self.assertEqual(second.calls[WRITER], 2)
+        self.assertEqual(second.calls[DIRECTOR], 3)
+        self.assertEqual(store.unfinished_tours(), [])
+        with open(self.output, encoding="utf-8") as f:
+            self.assertEqual(f.read().count("## <a name='stop-"), 4)
+
+    def test_concurrent_tours_use_separate_threads(self):
+        backend = FakeBackend(approval_rate=1.0, time_to_first_token=0)
+        architect = self.architect(backend)
+        architect.run(self.agenda, filename=self.output, tour_id="tour-a")
+        architect.run(self.agenda, filename=self.output, tour_id="tour-b")
+
+        # A second tour must not inherit the first tour's finished threads.
+        self.assertEqual(backend.calls[WRITER], 8)
+
+    def test_async_resume(self):
+        first = CrashingBackend(crash_after=4, approval_rate=1.0, time_to_first_token=0)
+        with self.assertRaises(Preempted):
+            asyncio.run(self.architect(first).arun(self.agenda, max_concurrency=1,
+                                                    filename=self.output, tour_id="tour-c"))
+
+        second = CrashingBackend(approval_rate=1.0, time_to_first_token=0)
+        scripts = asyncio.run(self.architect(second).arun(self.agenda, max_concurrency=1,
+                                                           filename=self.output, tour_id="tour-c"))
+
+        self.assertEqual(len(scripts), 4)
+        self.assertEqual(second.calls[WRITER], 2)
+
+    def test_pipelined_resume_continues_in_flight_stop(self):
+        first = CrashingBackend(crash_after=3, approval_rate=1.0, time_to_first_token=0)
+        with self.assertRaises(Preempted):
+            self.architect(first).run_pipelined(self.agenda, filename=self.output, tour_id="tour-d", lookahead=0)
+
+        second = CrashingBackend(approval_rate=1.0, time_to_first_token=0)
+        scripts = self.architect(second).run_pipelined(self.agenda, filename=self.output, tour_id="tour-d",
+                                                       lookahead=0)
+
+        self.assertEqual(len(scripts), 4)
+        self.assertEqual((second.calls[WRITER], second.calls[DIRECTOR]), (2, 3))
+
+    def test_cancelled_speculative_attempts_are_deleted(self):
+        backend = FakeBackend(markers=6, approval_rate=0.4, seed=5, time_to_first_token=0.002)
+        agenda = backend.generate_content(model="m", contents="route", config=_planner_config()).text
+        architect = self.architect(backend)
+        architect.run_pipelined(agenda, filename=self.output, tour_id="tour-e", lookahead=2)
+        stats = architect.speculation_stats
+
+        db = sqlite3.connect(self.db)
+        threads = {row[0] for row in db.execute("SELECT DISTINCT thread_id FROM checkpoints")}
+        db.close()
+        self.assertGreater(stats.restarted, 0)
+        # Only the speculative attempts that were kept still have checkpoints.
+        self.assertEqual(len([t for t in threads if ":attempt-" in t]), stats.speculative - stats.restarted)
+
+    def test_resume_requires_checkpoint_path(self):
+        with self.assertRaises(ValueError):
+            TourArchitect(TourConfig(enable_cache=False), backend=FakeBackend()).resume("tour-a")
+        with self.assertRaises(KeyError):
+            self.architect(FakeBackend()).resume("missing")
+
+
+class BoundedCheckpointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.output = os.path.join(self.tmp, "tour.md")
+        self.agenda = FakeBackend(markers=4, time_to_first_token=0).generate_content(
+            model="m", contents="route", config=_planner_config()).text
+
+    def test_finished_stops_keep_one_checkpoint_and_reference_the_sections(self):
+        backend = FakeBackend(approval_rate=0.5, time_to_first_token=0, seed=3)
+        architect = TourArchitect(TourConfig(enable_cache=False), backend=backend)
+        points, route = architect.parse_route_data(self.agenda)
+        stops = architect._generate_sequential(points, route, tour_id="tour-a")
+        next(stops)
+        next(stops)
+
+        stats = architect.memory_stats()
+        self.assertEqual((stats["threads"], stats["checkpoints"], stats["section_lists"]), (2, 2, 1))
+        self.assertGreater(stats["pruned_checkpoints"], 0)
+        state = architect.generator.workflow.get_state({"configurable": {"thread_id": "tour-a:stop-1"}}).values
+        self.assertNotIn("completed_sections", state)
+        self.assertEqual(architect.generator._completed_sections(state), architect.generator.sections["tour-a"])
+
+    def test_finished_tours_are_released(self):
+        architect = TourArchitect(TourConfig(enable_cache=False), backend=FakeBackend(time_to_first_token=0))
+        for tour_id in ("tour-a", "tour-b"):
+            architect.run(self.agenda, filename=self.output, tour_id=tour_id)
+
+        stats = architect.memory_stats()
+        self.assertEqual((stats["threads"], stats["blobs"], stats["bytes"], stats["section_lists"]), (0, 0, 0, 0))
+        self.assertEqual(stats["evicted_threads"], 8)
+        self.assertGreater(stats["rss_bytes"], 0)
+
+    def test_thread_bound_and_history_opt_out(self):
+        saver = BoundedMemorySaver(max_threads=2)
+        config = TourConfig(enable_cache=False, checkpoint_max_threads=2)
+        architect = TourArchitect(config, backend=FakeBackend(time_to_first_token=0))
+        architect.generator._checkpointer = saver
+        points, route = architect.parse_route_data(self.agenda)
+        list(architect._generate_sequential(points, route, tour_id="tour-a"))
+        self.assertEqual((saver.memory_stats()["threads"], saver.evicted_threads), (2, 2))
+
+        config = TourConfig(enable_cache=False, keep_checkpoint_history=True)
+        architect = TourArchitect(config, backend=FakeBackend(time_to_first_token=0))
+        architect.run(self.agenda, filename=self.output, tour_id="tour-a")
+        self.assertEqual(len(architect.generator.checkpointer.storage), 4)
+
+    def test_sqlite_file_is_compacted_but_keeps_finished_threads(self):
+        db = os.path.join(self.tmp, "tours.sqlite")
+        config = TourConfig(enable_cache=False, checkpoint_path=db)
+        architect = TourArchitect(config, backend=FakeBackend(approval_rate=0.5, time_to_first_token=0))
+        architect.run(self.agenda, filename=self.output, tour_id="tour-a")
+
+        self.assertEqual(architect.memory_stats()["threads"], 0)
+        with sqlite3.connect(db) as connection:
+            rows = connection.execute("SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id").fetchall()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(count == 1 for _, count in rows))
+        state = architect.generator.workflow.get_state({"configurable": {"thread_id": "tour-a:stop-3"}})
+        self.assertTrue(state.values["transcript"])
+
+
+def _planner_config():
+    from google.genai import types
+
+    return types.GenerateContentConfig(system_instruction="Route Narrative Architect")
+
+
+if __name__ == "__main__":
+    unittest.main()
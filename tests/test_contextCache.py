@@ -0,0 +1,157 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types  # noqa: E402
+
+from contextCache import (  # noqa: E402
+    TOO_SMALL, UNSUPPORTED, WORKER, ContextCache, ContextCacheConfig, ContextCachingBackend
+)
+from fakeBackend import FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from tracing import Tracer  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+REALISTIC_AGENDA = """\
+Primary Route: US-460 W, I-77 N and US-19 N
+
+1. **Smithfield Plantation, Blacksburg**
+   Summary: Built by Colonel William Preston in 1774 on the edge of the frontier, Smithfield was home to three Virginia governors. It later became the core of the land that Virginia Tech grew from, and the house still stands on the campus edge.
+   Script Writer Directive: Frame the house as the frontier's front door and connect the Preston family to the university the driver is leaving behind.
+
+2. **Huckleberry Trail and the Virginian Railway**
+   Summary: The rail-trail beside US-460 follows the old Virginian Railway spur that carried students and coal between Blacksburg and Christiansburg. Locals nicknamed the train the Huckleberry because it moved slowly enough to pick berries from the cars.
+   Script Writer Directive: Tell the nickname story and contrast the slow train with the four-lane highway the driver is on now.
+
+3. **Pearisburg and the Appalachian Trail Crossing**
+   Summary: The Appalachian Trail crosses the New River just outside Pearisburg, one of the few towns the trail passes straight through. Thru-hikers resupply here around mile 630, and the town has hosted hikers since the trail opened in 1937.
+   Script Writer Directive: Describe the river crossing as hikers experience it and invite the driver to spot the white blazes near the bridge.
+
+4. **The New River, Older Than the Mountains**
+   Summary: Despite its name, the New River is one of the oldest rivers in North America, flowing north across the Appalachian ridges instead of around them. Geologists believe it kept its course while the mountains slowly rose around it.
+   Script Writer Directive: Explain the geology with a simple image a listener can picture and point out where the highway follows the water.
+
+5. **Bluefield and the Smokeless Coal Boom**
+   Summary: Bluefield grew almost overnight when the Norfolk and Western Railway reached the Pocahontas coalfield in 1883. The low-smoke coal fueled the US Navy, and the city's rail yards once rivalled any in the South.
+   Script Writer Directive: Use the navy connection as the hook and describe what the rail yards looked like at their busiest.
+
+6. **East River Mountain Tunnel**
+   Summary: Interstate 77 passes under East River Mountain through a 5,412-foot tunnel that crosses the Virginia and West Virginia state line partway through. It opened in 1974 after years of difficult digging through fractured rock and underground springs.
+   Script Writer Directive: Time the segment to the tunnel approach and mention the state line the driver crosses underground.
+
+7. **Bluestone Gorge and the Camp Creek Forest**
+   Summary: North of Princeton the highway skirts Camp Creek State Forest and the deep Bluestone gorge, where logging railroads once hauled timber out of steep hollows. Much of the land has since grown back into mixed hardwood forest.
+   Script Writer Directive: Paint the forest's recovery over the last century and suggest a waterfall stop for drivers who have time.
+
+8. **New River Gorge Bridge, Fayetteville**
+   Summary: Completed in 1977, the bridge spans the gorge 876 feet above the river and was the longest single-span arch bridge in the world for decades. Every October on Bridge Day, it closes to traffic so BASE jumpers can leap from the deck.
+   Script Writer Directive: Build up to the crossing, give the scale in terms a driver can feel, and end the tour with the Bridge Day tradition.
+"""
+
+
+def registry(min_tokens: int = 0) -> ContextCache:
+    return ContextCache(ContextCacheConfig(min_tokens=min_tokens))
+
+
+class ContextCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeBackend(time_to_first_token=0)
+        self.config = types.GenerateContentConfig(system_instruction="ROLE: Tour Director " * 50, temperature=0.2)
+
+    def test_prefix_is_cached_once_and_stripped_from_requests(self):
+        cache = registry()
+        wrapped = ContextCachingBackend(self.backend, cache)
+        for _ in range(3):
+            response = wrapped.generate_content(model="m", contents="Review this draft.", config=self.config)
+
+        self.assertEqual(len(self.backend.cached_contents), 1)
+        self.assertGreater(response.usage_metadata.cached_content_token_count, 0)
+        self.assertLess(self.backend.call_log[0]["prompt_bytes"], len(self.config.system_instruction))
+        stats = cache.stats()
+        self.assertEqual((stats["requests"], stats["cached_requests"], stats["created"]), (3, 3, 1))
+
+    def test_fallbacks_send_the_prefix_inline(self):
+        small = registry(min_tokens=10_000)
+        ContextCachingBackend(self.backend, small).generate_content(model="m", contents="x", config=self.config)
+        self.assertEqual(small.stats()["fallbacks"], {TOO_SMALL: 1})
+
+        unsupported = registry()
+        plain = FakeBackend(time_to_first_token=0, context_caching=False)
+        wrapped = ContextCachingBackend(plain, unsupported)
+        for _ in range(2):
+            response = wrapped.generate_content(model="m", contents="x", config=self.config)
+        self.assertEqual(unsupported.stats()["fallbacks"], {UNSUPPORTED: 2})
+        self.assertIsNone(response.usage_metadata.cached_content_token_count)
+
+    def test_expired_server_cache_is_retried_inline_and_recreated(self):
+        cache = registry()
+        wrapped = ContextCachingBackend(self.backend, cache)
+        wrapped.generate_content(model="m", contents="x", config=self.config)
+        self.backend.cached_contents.clear()
+
+        response = wrapped.generate_content(model="m", contents="x", config=self.config)
+        self.assertIsNone(response.usage_metadata.cached_content_token_count)
+        wrapped.generate_content(model="m", contents="x", config=self.config)
+        self.assertEqual(cache.stats()["created"], 2)
+
+    def test_ttl_expiry_recreates_the_cache(self):
+        now = [0.0]
+        cache = ContextCache(ContextCacheConfig(min_tokens=0, ttl_seconds=60), clock=lambda: now[0])
+        wrapped = ContextCachingBackend(self.backend, cache)
+        wrapped.generate_content(model="m", contents="x", config=self.config)
+        now[0] = 45.0
+        wrapped.generate_content(model="m", contents="x", config=self.config)
+        self.assertEqual(cache.stats()["created"], 2)
+
+
+class ContextCacheInPipelineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def run_tour(self, cache):
+        backend = FakeBackend(markers=4, time_to_first_token=0, approval_rate=0.6, seed=2)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        tracer = Tracer()
+        architect = TourArchitect(TourConfig(enable_cache=False, enable_context_cache=cache is not None),
+                                  backend=backend, tracer=tracer, context_cache=cache)
+        scripts = architect.run(agenda, filename=os.path.join(self.tmpdir, "tour.md"))
+        return backend, architect, scripts
+
+    def test_tour_scoped_caches_report_cached_tokens_and_are_released(self):
+        cache = registry()
+        backend, architect, scripts = self.run_tour(cache)
+        _, _, uncached_scripts = self.run_tour(None)
+        summary = architect.summary()
+
+        self.assertEqual(scripts, uncached_scripts)
+        self.assertGreater(summary["cached_tokens"], 0)
+        self.assertEqual(summary["uncached_prompt_tokens"], summary["prompt_tokens"] - summary["cached_tokens"])
+        # Writer and director prefixes were released with the tour.
+        self.assertEqual(cache.stats()["released"], 2)
+        self.assertEqual(backend.cached_contents, {})
+
+    def test_realistic_agenda_makes_the_writer_prefix_cacheable(self):
+        # The default minimum applies: the agenda outline in the tour prefix is what pushes it over.
+        cache = ContextCache(ContextCacheConfig())
+        backend = FakeBackend(time_to_first_token=0, approval_rate=1.0)
+        architect = TourArchitect(TourConfig(enable_cache=False), backend=backend, tracer=Tracer(),
+                                  context_cache=cache)
+        architect.run(REALISTIC_AGENDA, filename=os.path.join(self.tmpdir, "tour.md"))
+        stats = cache.stats()
+
+        # One prefix each for the writer and the director; the director's is just over the minimum.
+        self.assertEqual(stats["created"], 2)
+        self.assertEqual(stats["cached_requests"], 16)
+        self.assertEqual(stats["fallbacks"], {})
+        self.assertGreater(architect.summary()["cached_tokens"], 16 * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from continuityContext import ContinuityDigest, estimate_tokens, truncate_to_budget  # noqa: E402
+
+
+SCRIPT = (
+    "Welcome to Beckley! Today we head underground at the Beckley Exhibition Coal Mine. "
+    "The Beckley Exhibition Coal Mine opened to visitors in 1962. "
+    "Veteran miners from the Phillips family guide every tour, and the Phillips family still tells stories of 1962."
+)
+
+
+class TestContinuityDigest(unittest.TestCase):
+
+    def test_summary_and_topics(self):
+        digest = ContinuityDigest()
+        entry = digest.add_stop(0, "Beckley", SCRIPT)
+        self.assertTrue(entry.summary.startswith("Welcome to Beckley!"))
+        self.assertIn("Phillips", " ".join(entry.topics))
+        self.assertIn("1962", entry.topics)
+        self.assertIn("STOP 1: Beckley", digest.render())
+
+    def test_render_respects_budget_and_keeps_latest(self):
+        digest = ContinuityDigest(token_budget=120)
+        for i in range(20):
+            digest.add_stop(i, f"Marker {i}", SCRIPT)
+        rendered = digest.render()
+        self.assertLessEqual(estimate_tokens(rendered), 120)
+        self.assertIn("STOP 20: Marker 19", rendered)
+        self.assertNotIn("STOP 1: Marker 0", rendered)
+
+    def test_from_sections(self):
+        digest = ContinuityDigest.from_sections(["STOP 1: Beckley\n" + SCRIPT])
+        self.assertEqual(digest.stops[0].title, "Beckley")
+
+    def test_truncate_to_budget(self):
+        self.assertEqual(truncate_to_budget("short", 10), "short")
+        cut = truncate_to_budget(SCRIPT, 20)
+        self.assertTrue(cut.endswith("[...]"))
+        self.assertLessEqual(len(cut), 20 * 4 + 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
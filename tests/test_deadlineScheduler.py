@@ -0,0 +1,124 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadlineScheduler import DeadlineStats, estimate_etas  # noqa: E402
+from fakeBackend import FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+class EstimateEtasTests(unittest.TestCase):
+
+    def test_schedule_then_planner_eta_then_distance(self):
+        points = [
+            {"title": "A", "latitude": 37.0, "longitude": -80.0},
+            {"title": "B", "latitude": 37.0, "longitude": -80.0, "eta_minutes": 30},
+            {"title": "C", "latitude": 37.9, "longitude": -80.0},
+            {"title": "D"},
+        ]
+        etas = estimate_etas(points, avg_speed_kmh=100.0, minutes_per_stop=10.0, start=(37.0, -80.0),
+                             schedule=[5, None, None, None])
+
+        self.assertEqual(etas[:2], [5.0, 30.0])
+        # 0.9 degrees of latitude is about 100 km: an hour at 100 km/h.
+        self.assertAlmostEqual(etas[2], 90.0, delta=0.5)
+        self.assertEqual(etas[3], etas[2] + 10.0)
+
+    def test_etas_never_go_backwards(self):
+        etas = estimate_etas([{"title": "A", "eta_minutes": 20}, {"title": "B", "eta_minutes": 10}])
+        self.assertEqual(etas, [20.0, 20.0])
+
+    def test_missed_rate(self):
+        stats = DeadlineStats(on_time=3, missed=1, lateness_seconds=[4.0])
+        self.assertEqual(stats.missed_rate, 0.25)
+        self.assertEqual(stats.to_dict()["max_lateness_seconds"], 4.0)
+
+
+class DeadlineRunTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(markers=6, time_to_first_token=0.002, approval_rate=0.5, seed=3)
+        self.agenda = MasterAgent(backend=self.backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        self.filename = os.path.join(self.tmpdir, "tour.md")
+
+    def architect(self, **config) -> TourArchitect:
+        return TourArchitect(TourConfig(enable_cache=False, **config), backend=self.backend)
+
+    def test_stops_start_earliest_deadline_first(self):
+        architect = self.architect()
+        etas = [600.0 - 60 * i for i in range(6)]
+        scripts = architect.run_deadline(self.agenda, etas, filename=self.filename, max_concurrency=1)
+        stats = architect.deadline_scheduler.stats
+
+        self.assertEqual([s.split(":", 1)[0] for s in scripts], [f"STOP {i}" for i in range(6, 0, -1)])
+        self.assertEqual((stats.generated, stats.on_time, stats.missed, stats.downgraded), (6, 6, 0, 0))
+        # Stops are ready last-to-first, but the file reads in route order.
+        with open(self.filename, encoding="utf-8") as f:
+            headings = [line.split("</a> ")[1].split(":")[0] for line in f if line.startswith("## <a name='stop-")]
+        self.assertEqual(headings, [f"Stop {i}" for i in range(1, 7)])
+
+    def test_stops_at_risk_run_with_fewer_revisions(self):
+        architect = self.architect(max_revisions=3, deadline_round_seconds=10.0)
+        etas = [1000.0, 15.0, 0.0, 1000.0, 1000.0, 1000.0]
+        scripts = architect.run_deadline(self.agenda, etas, filename=self.filename, max_concurrency=1)
+        stats = architect.deadline_scheduler.stats
+
+        # Stop 3 is already due; it waits behind the stops that can still make their ETA.
+        self.assertEqual(scripts[0].split(":", 1)[0], "STOP 2")
+        self.assertEqual(scripts[-1].split(":", 1)[0], "STOP 3")
+        self.assertEqual(stats.downgraded, 2)
+        self.assertEqual(stats.missed_stops, [2])
+
+    def test_deadline_cuts_are_not_counted_as_drafts_avoided_by_the_policy(self):
+        architect = self.architect(max_revisions=3, deadline_round_seconds=10.0, adaptive_revisions=True)
+        architect.run_deadline(self.agenda, [1000.0, 15.0, 0.0, 1000.0, 1000.0, 1000.0], filename=self.filename,
+                               max_concurrency=1)
+        policy = architect.generator.policy.stats()
+
+        self.assertEqual(architect.deadline_scheduler.stats.downgraded, 2)
+        self.assertEqual((policy["stops_capped_early"], policy["drafts_avoided"]), (0, 0))
+
+    def test_eta_update_replans_stops_not_started(self):
+        architect = self.architect()
+
+        async def drive():
+            order = []
+            etas = [100.0 * (i + 1) for i in range(6)]
+            async for index, _, _ in architect.astream_deadline(self.agenda, etas, self.filename, max_concurrency=1):
+                if not order:
+                    # The car takes a shortcut that puts the last marker next.
+                    architect.update_etas({5: 50.0})
+                order.append(index)
+            return order
+
+        self.assertEqual(asyncio.run(drive()), [0, 5, 1, 2, 3, 4])
+        self.assertEqual(architect.deadline_scheduler.stats.replans, 1)
+
+    def test_agenda_without_points_leaves_empty_stats(self):
+        architect = self.architect()
+
+        self.assertIsNone(architect.run_deadline("no markers here", filename=self.filename))
+        self.assertEqual(architect.deadline_scheduler.stats.stops, 0)
+
+    def test_library_stops_are_ready_first(self):
+        library = os.path.join(self.tmpdir, "stops.sqlite")
+        self.architect(stop_library_path=library).run(self.agenda, filename=self.filename)
+
+        architect = self.architect(stop_library_path=library)
+        scripts = architect.run_deadline(self.agenda, [60.0] * 6, filename=self.filename)
+        stats = architect.deadline_scheduler.stats
+
+        self.assertEqual(len(scripts), 6)
+        self.assertEqual((stats.ready_at_start, stats.generated, stats.on_time), (6, 0, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from draftScreen import (  # noqa: E402
+    EASTER_EGG, EMPTY, OUTRO, OVERLAP, STRUCTURE, TOO_SHORT, DraftScreener, ScreenConfig
+)
+from fakeBackend import DIRECTOR, WRITER, FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+def draft(seed: int, words: int = 240) -> str:
+    rng = random.Random(seed)
+    vocabulary = "river bridge miners valley ridge tunnel town legend settlers arch canyon creek".split()
+    body = [" ".join(rng.choice(vocabulary) for _ in range(words // 3)) + "." for _ in range(3)]
+    return (f"Welcome to the gorge! {body[0]}\n\n{body[1]}\n\n"
+            f"Here's a fun fact: {body[2]}\n\nUp next, the canyon rim.")
+
+
+class DraftScreenerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.screener = DraftScreener(ScreenConfig(min_words=100, max_words=600))
+
+    def test_good_draft_passes(self):
+        result = self.screener.screen(draft(1), [f"STOP 1: Blacksburg\n{draft(2)}"])
+        self.assertTrue(result.passed, result.reasons)
+        self.assertLess(result.overlap, 0.1)
+
+    def test_obvious_failures_are_caught_with_feedback(self):
+        self.assertEqual(self.screener.screen("").reasons, [EMPTY])
+
+        stub = self.screener.screen("Blacksburg was founded in 1798.")
+        self.assertEqual(stub.reasons, [TOO_SHORT])
+        self.assertIn("at least 100 words", stub.feedback)
+
+    def test_structure_checks_are_advisory_unless_required(self):
+        plain = draft(1).replace("Here's a fun fact: ", "").replace("\n\n", " ")
+        advisory = self.screener.screen(plain)
+        self.assertTrue(advisory.passed)
+        self.assertEqual(advisory.advisories, [STRUCTURE, EASTER_EGG])
+        self.assertEqual(self.screener.stats()["advisories"], {STRUCTURE: 1, EASTER_EGG: 1})
+
+        strict = DraftScreener(ScreenConfig(min_words=100, max_words=600, require_structure=True))
+        required = strict.screen(plain)
+        self.assertEqual(required.reasons, [STRUCTURE, EASTER_EGG])
+        self.assertIn("Easter Egg", required.feedback)
+        self.assertEqual(required.advisories, [])
+
+    def test_repeating_an_earlier_stop_is_rejected(self):
+        earlier = draft(3)
+        repeated = earlier.replace("Welcome to the gorge!", "Welcome back!")
+        result = self.screener.screen(repeated, ["STOP 1: Intro\nshort", f"STOP 2: Gorge\n{earlier}"])
+
+        self.assertEqual(result.reasons, [OVERLAP])
+        self.assertEqual(result.overlap_stop, 2)
+        self.assertIn("repeats STOP 2", result.feedback)
+
+    def test_rank_orders_candidates_best_first(self):
+        earlier = f"STOP 1: Gorge\n{draft(3)}"
+        repeated = draft(3).replace("Welcome to the gorge!", "Welcome back!")
+        ranked = self.screener.rank(["Too short.", repeated, draft(4)], [earlier])
+        self.assertEqual([d for d, _ in ranked], [draft(4), repeated, "Too short."])
+        self.assertEqual([r.passed for _, r in ranked], [True, False, False])
+        stats = self.screener.stats()
+        # One round with a passing candidate: the director is still called, so nothing counts as a local rejection.
+        self.assertEqual((stats["screened"], stats["passed"], stats["rejected"]), (1, 1, 0))
+        self.assertEqual((stats["candidates"], stats["candidates_rejected"]), (3, 2))
+
+    def test_stats_report_hit_rate(self):
+        self.screener.screen(draft(1))
+        self.screener.screen("")
+        stats = self.screener.stats()
+        self.assertEqual((stats["screened"], stats["rejected"], stats["hit_rate"]), (2, 1, 0.5))
+        self.assertEqual(stats["reasons"], {EMPTY: 1})
+
+
+class ScreenInWorkflowTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def run_tour(self, screening: bool):
+        backend = FakeBackend(markers=6, time_to_first_token=0, approval_rate=1.0, bad_draft_rate=0.4, seed=4)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        architect = TourArchitect(TourConfig(enable_cache=False, enable_screening=screening), backend=backend)
+        scripts = architect.run(agenda, filename=os.path.join(self.tmpdir, "tour.md"))
+        return backend, architect, scripts
+
+    def test_rejected_drafts_skip_the_director(self):
+        backend, architect, scripts = self.run_tour(screening=True)
+        stats = architect.generator.screener.stats()
+
+        self.assertEqual(len(scripts), 6)
+        self.assertGreater(stats["rejected"], 0)
+        self.assertEqual(backend.calls[WRITER], stats["screened"])
+        self.assertEqual(backend.calls[DIRECTOR], stats["passed"])
+
+        unscreened, _, _ = self.run_tour(screening=False)
+        self.assertLess(sum(backend.calls.values()), sum(unscreened.calls.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import DIRECTOR, PLANNER, WRITER, FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from plannerAgent import Agentcall  # noqa: E402
+from responseCache import ResponseCache, with_cache  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+class TestFakeBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(markers=4, time_to_first_token=0.0, approval_rate=0.5)
+
+    def test_planner_output_parses(self):
+        agenda = Agentcall(backend=self.backend, cache=ResponseCache(max_memory_entries=0))
+        points, route = TourArchitect(backend=self.backend).parse_route_data(agenda)
+        self.assertEqual(len(points), 4)
+        self.assertNotEqual(route, "Route not found")
+        self.assertEqual(self.backend.calls[PLANNER], 1)
+
+    def test_responses_are_deterministic(self):
+        agent = MasterAgent(backend=self.backend, use_cache=False)
+        first = agent.generate_agenda("Blacksburg to Beckley")
+        second = MasterAgent(backend=FakeBackend(markers=4), use_cache=False).generate_agenda("Blacksburg to Beckley")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, agent.generate_agenda("Blacksburg to Roanoke"))
+
+    def test_full_tour_offline(self):
+        agenda = MasterAgent(backend=self.backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        architect = TourArchitect(TourConfig(enable_cache=False, max_revisions=3), backend=self.backend)
+        scripts = architect.run(agenda, filename=os.path.join(self.tmpdir, "tour.md"))
+        self.assertEqual(len(scripts), 4)
+        self.assertEqual(self.backend.calls[WRITER], self.backend.calls[DIRECTOR])
+        self.assertGreaterEqual(self.backend.calls[WRITER], 4)
+        self.assertLessEqual(self.backend.calls[WRITER], 12)
+
+    def test_streaming_and_cache_layer(self):
+        cached = with_cache(self.backend, ResponseCache())
+        chunks = []
+        from google.genai import types
+        config = types.GenerateContentConfig(system_instruction="writer")
+        first = cached.stream_content(model="m", contents="Point Title: Beckley", config=config, on_chunk=chunks.append)
+        self.assertEqual("".join(chunks), first.text)
+        second = cached.generate_content(model="m", contents="Point Title: Beckley", config=config)
+        self.assertEqual(first.text, second.text)
+        self.assertEqual(self.backend.calls[WRITER], 1)
+
+    def test_director_verdict_is_json(self):
+        from google.genai import types
+        response = self.backend.generate_content(
+            model="m", contents="draft", config=types.GenerateContentConfig(response_mime_type="application/json"))
+        self.assertIn("is_ready", json.loads(response.text))
+
+
+if __name__ == "__main__":
+    unittest.main()
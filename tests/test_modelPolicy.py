@@ -0,0 +1,160 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import DIRECTOR, WRITER, FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from modelPolicy import (  # noqa: E402
+    HISTORY, INDUSTRY, NATURE, OTHER, PIT_STOP, ModelPolicy, RevisionHistory, categorize, savings
+)
+from tracing import Tracer  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+def point(title, summary="", directive=""):
+    return {"title": title, "summary": summary, "directive": directive}
+
+
+class ModelPolicyTests(unittest.TestCase):
+
+    def test_categorize(self):
+        self.assertEqual(categorize(point("Tudor's Biscuit World", "A diner famous for biscuits.")), PIT_STOP)
+        self.assertEqual(categorize(point("Kaymoor Mine", "Coal mining town of the gorge.")), INDUSTRY)
+        self.assertEqual(categorize(point("Sandstone Falls", "Widest waterfall on the New River.")), NATURE)
+        self.assertEqual(categorize(point("Smithfield Plantation", "Founded before the Revolutionary War.")),
+                         HISTORY)
+        self.assertEqual(categorize(dict(point("Anything"), category="Pit Stop")), PIT_STOP)
+        self.assertEqual(categorize(point("Exit 45")), OTHER)
+
+    def test_cascade_routes_first_drafts_and_reviews_to_the_fast_model(self):
+        policy = ModelPolicy("strong", "fast")
+        self.assertEqual((policy.writer_model(0), policy.writer_model(1), policy.director_model()),
+                         ("fast", "strong", "fast"))
+        uniform = ModelPolicy("strong")
+        self.assertEqual((uniform.writer_model(0), uniform.director_model()), ("strong", "strong"))
+
+    def test_caps_are_learned_per_category_with_censoring_and_exploration(self):
+        policy = ModelPolicy("strong", max_revisions=3, adaptive=True, min_samples=5, explore_every=4)
+        falls = point("Sandstone Falls")
+        self.assertEqual(policy.revision_cap(falls), 3)
+
+        for _ in range(5):
+            policy.record(falls, 3, 1, True)
+        self.assertEqual(policy.learned_cap(NATURE), 1)
+        # Stops that ran under cap 1 say nothing about later rounds, so they never lower it further on their own.
+        for _ in range(20):
+            policy.record(falls, 1, 1, False)
+        self.assertEqual(policy.learned_cap(NATURE), 1)
+        self.assertEqual([policy.revision_cap(falls) for _ in range(3)], [1, 1, 3])
+
+        mine = point("Kaymoor Mine", "Coal mining town.")
+        for revisions in (1, 2, 2, 3, 1):
+            policy.record(mine, 3, revisions, True)
+        self.assertEqual(policy.learned_cap(INDUSTRY), 3)
+        self.assertEqual(policy.stats()["stops_capped_early"], 20)
+
+    def test_cap_keeps_the_target_share_of_approvals_not_of_stops(self):
+        policy = ModelPolicy("strong", max_revisions=3, adaptive=True, min_samples=5, target_approval=0.95)
+        falls = point("Sandstone Falls")
+        for _ in range(10):
+            policy.record(falls, 3, 1, True)
+        policy.record(falls, 3, 2, True)
+        for _ in range(9):
+            policy.record(falls, 3, 3, False)
+
+        # Cap 1 would keep only 10 of the 11 approvals; cap 2 keeps them all.
+        self.assertEqual(policy.learned_cap(NATURE), 2)
+
+    def test_stops_cut_short_by_the_caller_are_not_credited_to_the_policy(self):
+        policy = ModelPolicy("strong", max_revisions=3, adaptive=True)
+        falls = point("Sandstone Falls")
+        policy.record(falls, 1, 1, False, policy_cap=3)
+        self.assertEqual((policy.stats()["stops_capped_early"], policy.stats()["drafts_avoided"]), (0, 0))
+        policy.record(falls, 2, 2, False, policy_cap=2)
+        self.assertEqual((policy.stats()["stops_capped_early"], policy.stats()["drafts_avoided"]), (1, 1))
+
+    def test_history_persists_and_keeps_a_window(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "revisions.sqlite")
+        history = RevisionHistory(path, window=3)
+        for revisions in (3, 3, 1, 1, 1):
+            history.record(NATURE, 3, revisions, True)
+        history.close()
+
+        reopened = RevisionHistory(path, window=3)
+        self.assertEqual(reopened.outcomes(NATURE), [(3, 1, True)] * 3)
+        self.assertEqual(reopened.approval_rates()[NATURE]["first_draft"], 1.0)
+
+    def test_savings_against_the_strong_model(self):
+        summary = {"models": {
+            "gemini-2.5-flash-lite": {"calls": 2, "prompt_tokens": 2_000_000, "cached_tokens": 0,
+                                      "response_tokens": 0, "call_seconds": 1.0},
+            "gemini-2.5-flash": {"calls": 1, "prompt_tokens": 1_000_000, "cached_tokens": 0,
+                                 "response_tokens": 0, "call_seconds": 2.0},
+        }}
+        report = savings(summary, "gemini-2.5-flash")
+        self.assertAlmostEqual(report["cost_usd"], 0.5)
+        self.assertAlmostEqual(report["uniform_cost_usd"], 0.9)
+        self.assertEqual((report["fast_model_calls"], report["fast_model_seconds"]), (2, 1.0))
+
+    def test_latency_and_tokens_against_a_uniform_fixed_cap_run(self):
+        def usage(calls, tokens, seconds):
+            return {"calls": calls, "prompt_tokens": tokens, "cached_tokens": 0, "response_tokens": 0,
+                    "call_seconds": seconds}
+
+        roles = {
+            # First drafts on the fast model; revisions on the strong one run at half its speed per token.
+            "writer": {"fast": usage(4, 4000, 2.0), "gemini-2.5-flash": usage(2, 2000, 2.0)},
+            "director": {"fast": usage(6, 600, 0.6)},
+        }
+        summary = {"models": {"fast": usage(10, 4600, 2.6), "gemini-2.5-flash": usage(2, 2000, 2.0)}, "roles": roles}
+
+        # 2 drafts avoided: 2 more writer calls and 2 more reviews at each role's mean strong-model figures.
+        report = savings(summary, "gemini-2.5-flash", drafts_avoided=2)
+        self.assertEqual(report["uniform"], "estimated")
+        self.assertEqual(report["by_role"]["writer"]["uniform_calls"], 8)
+        self.assertAlmostEqual(report["by_role"]["writer"]["uniform_seconds"], (4.0 + 2.0) * 8 / 6)
+        self.assertAlmostEqual(report["by_role"]["director"]["uniform_seconds"], 1.2 * 8 / 6)
+        self.assertEqual(report["uniform_tokens"], 6000 * 8 // 6 + 600 * 8 // 6)
+        self.assertAlmostEqual(report["saved_seconds"], 8.0 + 1.6 - 4.6)
+        self.assertEqual(report["drafts_avoided"], 2)
+
+        recorded = {"models": {"gemini-2.5-flash": usage(16, 8000, 10.0)},
+                    "roles": {"writer": {"gemini-2.5-flash": usage(8, 7200, 9.0)},
+                              "director": {"gemini-2.5-flash": usage(8, 800, 1.0)}}}
+        measured = savings(summary, "gemini-2.5-flash", baseline=recorded)
+        self.assertEqual(measured["uniform"], "recorded")
+        self.assertEqual((measured["saved_seconds"], measured["saved_tokens"]), (5.4, 1400))
+        self.assertEqual(measured["drafts_avoided"], 2)
+
+
+class ModelPolicyInArchitectTests(unittest.TestCase):
+
+    def test_cascade_and_adaptive_caps_in_a_tour(self):
+        backend = FakeBackend(markers=6, time_to_first_token=0, approval_rate=0.5, seed=1)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("A to B")
+        backend.reset_stats()
+        config = TourConfig(enable_cache=False, enable_context_cache=False, fast_model_name="gemini-2.5-flash-lite",
+                            adaptive_revisions=True)
+        architect = TourArchitect(config, backend=backend, tracer=Tracer())
+        architect.run(agenda, filename=os.path.join(tempfile.mkdtemp(), "tour.md"))
+
+        models = {(entry["role"], entry["model"]) for entry in backend.call_log}
+        self.assertIn((WRITER, "gemini-2.5-flash-lite"), models)
+        self.assertIn((WRITER, "gemini-2.5-flash"), models)
+        self.assertNotIn((DIRECTOR, "gemini-2.5-flash"), models)
+
+        report = architect.policy_report()
+        self.assertGreater(report["saved_share"], 0)
+        self.assertGreaterEqual(report["uniform_tokens"], report["tokens"])
+        self.assertEqual(set(report["by_role"]), {"writer", "director"})
+        self.assertEqual(sum(r["stops"] for r in report["approval_rates"].values()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
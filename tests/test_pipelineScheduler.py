@@ -0,0 +1,107 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from pipelineScheduler import SpeculativePipeline, digest_similarity  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+def make_backend(approval_rate: float, seed: int = 5) -> FakeBackend:
+    return FakeBackend(markers=6, time_to_first_token=0.002, approval_rate=approval_rate, seed=seed)
+
+
+class DigestSimilarityTests(unittest.TestCase):
+
+    def test_identical_and_rewritten_scripts(self):
+        script = "Welcome to the New River Gorge Bridge. Built in 1977, it spans the gorge. Up next, Fayetteville."
+        self.assertEqual(digest_similarity("Bridge", script, script), 1.0)
+        self.assertGreater(digest_similarity("Bridge", script, script + " Keep your eyes on the road."), 0.6)
+        rewritten = "Sandstone Falls roars below Hinton. The Chesapeake and Ohio line hugged the river here."
+        self.assertLess(digest_similarity("Bridge", script, rewritten), 0.2)
+
+
+class PipelinedRunTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def run_tour(self, approval_rate: float, pipelined: bool, lookahead=None, **config):
+        backend = make_backend(approval_rate)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        architect = TourArchitect(TourConfig(enable_cache=False, **config), backend=backend)
+        filename = os.path.join(self.tmpdir, "tour.md")
+        if pipelined:
+            scripts = architect.run_pipelined(agenda, filename=filename, lookahead=lookahead)
+        else:
+            scripts = architect.run(agenda, filename=filename)
+        return architect, scripts
+
+    def test_confirmed_speculation_matches_the_sequential_run(self):
+        _, sequential = self.run_tour(1.0, pipelined=False)
+        architect, pipelined = self.run_tour(1.0, pipelined=True)
+        stats = architect.speculation_stats
+
+        self.assertEqual(pipelined, sequential)
+        self.assertEqual((stats.speculative, stats.confirmed, stats.restarted), (5, 5, 0))
+        self.assertEqual(stats.success_rate, 1.0)
+
+    def test_invalidated_speculation_is_rerun(self):
+        architect, scripts = self.run_tour(0.4, pipelined=True, lookahead=2)
+        stats = architect.speculation_stats
+
+        self.assertEqual(len(scripts), 6)
+        self.assertEqual([s.split("\n", 1)[0][:7] for s in scripts], [f"STOP {i}:" for i in range(1, 7)])
+        self.assertGreater(stats.invalidated, 0)
+        self.assertEqual(stats.attempts, 6 + stats.restarted)
+        self.assertLess(stats.success_rate, 1.0)
+        # Cancelled attempts do not count towards the outcomes.
+        self.assertEqual(sum(architect.generator.stop_outcomes.values()), 6)
+
+    def test_lookahead_zero_is_sequential(self):
+        _, sequential = self.run_tour(0.5, pipelined=False)
+        architect, pipelined = self.run_tour(0.5, pipelined=True, lookahead=0)
+
+        self.assertEqual(pipelined, sequential)
+        self.assertEqual(architect.speculation_stats.speculative, 0)
+        with self.assertRaises(ValueError):
+            SpeculativePipeline(architect, lookahead=-1)
+
+    def test_stop_library_is_used_and_filled(self):
+        library = os.path.join(self.tmpdir, "stops.sqlite")
+        architect, first = self.run_tour(1.0, pipelined=True, stop_library_path=library)
+        self.assertEqual(architect.library.stats()["added"], 6)
+
+        backend = make_backend(1.0)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        backend.reset_stats()
+        again = TourArchitect(TourConfig(enable_cache=False, stop_library_path=library), backend=backend)
+        scripts = again.run_pipelined(agenda, filename=os.path.join(self.tmpdir, "again.md"))
+
+        self.assertEqual(scripts, first)
+        self.assertEqual(again.library.stats()["reused"], 6)
+        self.assertEqual(backend.stats()["total_calls"], 0)
+
+    def test_approved_stops_are_not_regenerated_on_resume(self):
+        checkpoint = os.path.join(self.tmpdir, "tour.db")
+        architect, first = self.run_tour(1.0, pipelined=True, checkpoint_path=checkpoint)
+        backend = make_backend(1.0)
+        agenda = MasterAgent(backend=backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        backend.reset_stats()
+
+        again = TourArchitect(TourConfig(enable_cache=False, checkpoint_path=checkpoint), backend=backend)
+        scripts = again.run_pipelined(agenda, filename=os.path.join(self.tmpdir, "again.md"),
+                                      tour_id=architect.tour_id)
+
+        self.assertEqual(scripts, first)
+        self.assertEqual(backend.stats()["total_calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors  # noqa: E402
+
+from fakeBackend import FakeBackend  # noqa: E402
+from rateLimiter import (  # noqa: E402
+    RateLimitConfig, RateLimiter, TokenBucket, rate_limited, retry_hint
+)
+from tracing import Tracer, traced  # noqa: E402
+from wrtirAgent import TourContentGenerator  # noqa: E402
+
+
+def quota_error(delay=None):
+    details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": delay}] if delay else []
+    return errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                              "message": "Quota exceeded", "details": details}})
+
+
+class FlakyBackend(FakeBackend):
+    '''
+    FakeBackend that raises the queued errors before answering normally.
+    '''
+
+    def __init__(self, failures, **overrides):
+        super().__init__(time_to_first_token=0, **overrides)
+        self.failures = list(failures)
+        self.attempts = 0
+
+    def generate_content(self, *, model, contents, config=None):
+        self.attempts += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return super().generate_content(model=model, contents=contents, config=config)
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        self.attempts += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return await super().agenerate_content(model=model, contents=contents, config=config)
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        self.attempts += 1
+        on_chunk("partial ")
+        raise errors.ServerError(503, {"error": {"code": 503, "status": "UNAVAILABLE"}})
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_reservations_queue_in_order(self):
+        now = [0.0]
+        bucket = TokenBucket(60, clock=lambda: now[0])  # one token per second
+
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0)
+        self.assertAlmostEqual(bucket.reserve(1), 2.0)
+        now[0] = 2.0
+        self.assertAlmostEqual(bucket.level, 0.0)
+        bucket.adjust(-10)
+        self.assertAlmostEqual(bucket.level, 10.0)
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.limiter = RateLimiter(RateLimitConfig(initial_concurrency=8, base_delay=0.5), sleep=self.sleeps.append)
+
+    def test_retry_honors_server_hint_and_halves_concurrency(self):
+        backend = FlakyBackend([quota_error("7s")])
+        tracer = Tracer()
+        response = traced(rate_limited(backend, self.limiter), tracer).generate_content(model="m", contents="hi")
+
+        self.assertTrue(response.text)
+        self.assertEqual(backend.attempts, 2)
+        self.assertIn(7.0, self.sleeps)
+        stats = self.limiter.stats()
+        self.assertEqual(stats["throttle_events"], 1)
+        self.assertEqual(stats["retries"], 1)
+        self.assertLess(stats["concurrency_limit"], 8)
+        self.assertEqual(tracer.spans[-1].attributes["retries"], 1)
+        self.assertIn("guideai_ratelimit_throttle_events_total 1", self.limiter.to_prometheus())
+
+    def test_backoff_is_jittered_and_capped(self):
+        failures = [errors.ServerError(500, {"error": {"code": 500, "status": "INTERNAL"}}) for _ in range(3)]
+        rate_limited(FlakyBackend(failures), self.limiter).generate_content(model="m", contents="hi")
+
+        for attempt, delay in enumerate(self.sleeps):
+            self.assertLessEqual(delay, 0.5 * 2 ** attempt)
+        self.assertEqual(self.limiter.stats()["throttle_events"], 0)
+
+    def test_non_retryable_errors_and_exhausted_retries_raise(self):
+        backend = FlakyBackend([errors.ClientError(400, {"error": {"code": 400, "status": "INVALID_ARGUMENT"}})])
+        with self.assertRaises(errors.ClientError):
+            rate_limited(backend, self.limiter).generate_content(model="m", contents="hi")
+        self.assertEqual(backend.attempts, 1)
+
+        limiter = RateLimiter(RateLimitConfig(max_retries=2), sleep=lambda s: None)
+        backend = FlakyBackend([quota_error() for _ in range(5)])
+        with self.assertRaises(errors.ClientError):
+            rate_limited(backend, limiter).generate_content(model="m", contents="hi")
+        self.assertEqual(backend.attempts, 3)
+        self.assertEqual(limiter.stats()["failures"], 1)
+
+    def test_stream_is_not_retried_after_chunks_were_delivered(self):
+        backend = FlakyBackend([])
+        with self.assertRaises(errors.ServerError):
+            rate_limited(backend, self.limiter).stream_content(model="m", contents="hi", on_chunk=lambda c: None)
+        self.assertEqual(backend.attempts, 1)
+
+    def test_async_calls_respect_the_concurrency_limit(self):
+        limiter = RateLimiter(RateLimitConfig(initial_concurrency=2, max_concurrency=2))
+        backend = FakeBackend(time_to_first_token=0.02)
+        limited = rate_limited(backend, limiter)
+        peak = []
+
+        async def call():
+            await limited.agenerate_content(model="m", contents="hi")
+            peak.append(limiter.stats()["in_flight"])
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(6)))
+        asyncio.run(main())
+
+        self.assertEqual(limiter.stats()["requests"], 6)
+        self.assertLessEqual(max(peak), 2)
+        self.assertGreater(limiter.stats()["queue_wait_seconds"], 0)
+
+    def test_cancelled_calls_give_back_their_slot(self):
+        limiter = RateLimiter(RateLimitConfig(initial_concurrency=2, max_concurrency=2, requests_per_minute=1))
+        limited = rate_limited(FakeBackend(time_to_first_token=5.0), limiter)
+
+        async def main():
+            # The first call is in flight; the second holds a slot while it waits for request quota.
+            calls = [asyncio.ensure_future(limited.agenerate_content(model="m", contents="hi")) for _ in range(2)]
+            await asyncio.sleep(0.1)
+            self.assertEqual(limiter.stats()["in_flight"], 2)
+            for call in calls:
+                call.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+        asyncio.run(main())
+
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    def test_retry_hint_from_header(self):
+        error = errors.ClientError(429, {"error": {"code": 429}})
+        error.response = type("Response", (), {"headers": {"retry-after": "3"}})()
+        self.assertEqual(retry_hint(error), 3.0)
+
+
+class DirectorParsingTests(unittest.TestCase):
+
+    def test_unparseable_verdict_requests_a_revision(self):
+        response = type("Response", (), {"text": "not json"})()
+        result = TourContentGenerator._parse_director_response(response)
+
+        self.assertFalse(result["is_ready"])
+        self.assertIn("Parsing Error", result["feedback"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types  # noqa: E402
+
+from responseCache import CachingBackend, ResponseCache  # noqa: E402
+
+
+def text_response(text: str) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))]
+    )
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, "cache.sqlite")
+
+    def test_key_covers_system_instruction_and_temperature(self):
+        base = ResponseCache.make_key("m", "route", types.GenerateContentConfig(system_instruction="a", temperature=0.7))
+        self.assertEqual(base, ResponseCache.make_key(
+            "m", "route", types.GenerateContentConfig(system_instruction="a", temperature=0.7)))
+        self.assertNotEqual(base, ResponseCache.make_key(
+            "m", "route", types.GenerateContentConfig(system_instruction="b", temperature=0.7)))
+        self.assertNotEqual(base, ResponseCache.make_key(
+            "m", "route", types.GenerateContentConfig(system_instruction="a", temperature=0.2)))
+
+    def test_disk_tier_survives_restart(self):
+        cache = ResponseCache(self.path)
+        cache.put("k", "v")
+        cache.close()
+
+        reopened = ResponseCache(self.path)
+        self.assertEqual(reopened.get("k"), "v")
+        self.assertEqual(reopened.disk_hits, 1)
+        self.assertEqual(reopened.get("k"), "v")
+        self.assertEqual(reopened.memory_hits, 1)
+        reopened.close()
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(self.path, ttl_seconds=10)
+        with mock.patch("responseCache.time.time", return_value=1000.0):
+            cache.put("k", "v")
+        with mock.patch("responseCache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.misses, 1)
+        cache.close()
+
+    def test_memory_lru_and_disk_size_eviction(self):
+        cache = ResponseCache(self.path, max_memory_entries=2, max_disk_bytes=10)
+        for key in ("a", "b", "c"):
+            cache.put(key, "12345")
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "12345")
+        cache.close()
+
+    def test_caching_backend_calls_api_once(self):
+        inner = mock.MagicMock()
+        inner.generate_content.return_value = text_response("agenda")
+        cache = ResponseCache()
+        backend = CachingBackend(inner, cache)
+        config = types.GenerateContentConfig(system_instruction="planner")
+
+        first = backend.generate_content(model="m", contents="route", config=config)
+        second = backend.generate_content(model="m", contents="route", config=config)
+
+        self.assertEqual(first.text, "agenda")
+        self.assertEqual(second.text, "agenda")
+        inner.generate_content.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import PLANNER, FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from routeSegments import Segment, Waypoint, marker_budget, merge_segment_agendas, split_route  # noqa: E402
+
+# Richmond, VA to Nashville, TN: about 880 km as the crow flies.
+ROUTE = [
+    Waypoint("Richmond, VA", 37.54, -77.44),
+    Waypoint("Charlottesville, VA", 38.03, -78.48),
+    Waypoint("Lexington, VA", 37.78, -79.44),
+    Waypoint("Blacksburg, VA", 37.23, -80.41),
+    Waypoint("Bristol, TN", 36.59, -82.19),
+    Waypoint("Knoxville, TN", 35.96, -83.92),
+    Waypoint("Nashville, TN", 36.16, -86.78),
+]
+
+
+def marker(title, latitude, longitude):
+    return {"title": title, "summary": "", "directive": "", "latitude": latitude, "longitude": longitude}
+
+
+class SplitRouteTests(unittest.TestCase):
+
+    def test_segments_follow_distance_and_cover_the_route(self):
+        segments = split_route(ROUTE, segment_km=250)
+        self.assertEqual([(s.start.name, s.end.name) for s in segments],
+                         [("Richmond, VA", "Blacksburg, VA"), ("Blacksburg, VA", "Knoxville, TN"),
+                          ("Knoxville, TN", "Nashville, TN")])
+        self.assertEqual(segments[0].via, ROUTE[1:3])
+        self.assertTrue(all(2 <= s.markers <= 8 for s in segments))
+
+    def test_max_segments_and_missing_coordinates(self):
+        # The target length grows to a third of the route, so the cuts land after Bristol only.
+        self.assertEqual([s.end.name for s in split_route(ROUTE, segment_km=10, max_segments=3)],
+                         ["Bristol, TN", "Nashville, TN"])
+        names = [Waypoint(w.name) for w in ROUTE]
+        segments = split_route(names, max_segments=4)
+        self.assertEqual([(s.start.name, s.end.name) for s in segments][0], ("Richmond, VA", "Lexington, VA"))
+        self.assertEqual((len(segments), segments[0].markers), (3, 8))
+        with self.assertRaises(ValueError):
+            split_route(ROUTE[:1])
+
+    def test_marker_budget(self):
+        self.assertEqual(marker_budget(30), 2)
+        self.assertEqual(marker_budget(180), 6)
+        self.assertEqual(marker_budget(2000), 8)
+        self.assertEqual(marker_budget(None, max_markers=5), 5)
+
+    def test_merge_orders_and_drops_boundary_duplicates(self):
+        first = Segment(0, ROUTE[0], ROUTE[3], [], 300.0, 3)
+        second = Segment(1, ROUTE[3], ROUTE[6], [], 600.0, 3)
+        results = [
+            (second, "I-81 S / I-40 W", [marker("Knoxville Bridges", 35.96, -83.92),
+                                         marker("Smithfield Plantation House", 37.30, -80.30)]),
+            (first, "I-64 W / I-81 S", [marker("Natural Bridge", 37.63, -79.54),
+                                        marker("Richmond Canal Walk", 37.53, -77.43),
+                                        marker("Smithfield Plantation House", 37.23, -80.42),
+                                        marker("Canal Lock Ruins", 37.535, -77.435)]),
+            (Segment(2, ROUTE[6], ROUTE[6], [], 0.0, 2), None, None),
+        ]
+        route, points, counts = merge_segment_agendas(results, min_spacing_km=5)
+        self.assertEqual(route, "I-64 W / I-81 S / I-40 W")
+        self.assertEqual([p["title"] for p in points],
+                         ["Richmond Canal Walk", "Natural Bridge", "Smithfield Plantation House",
+                          "Knoxville Bridges"])
+        self.assertEqual(counts, {"kept": 4, "duplicate": 1, "too_close": 1})
+
+
+class LongAgendaTests(unittest.TestCase):
+
+    def test_segments_are_planned_concurrently_and_merged(self):
+        backend = FakeBackend(time_to_first_token=0.05, seed=2)
+        agent = MasterAgent(backend=backend, use_cache=False)
+        agenda = json.loads(agent.generate_long_agenda("Richmond, VA", "Nashville, TN", ROUTE, max_concurrency=3))
+
+        self.assertEqual(agent.segment_stats["segments"], 3)
+        self.assertEqual(backend.calls[PLANNER], 3)
+        self.assertEqual(len(agenda["markers"]), agent.segment_stats["kept"])
+        longitudes = [m["longitude"] for m in agenda["markers"]]
+        self.assertEqual(longitudes, sorted(longitudes, reverse=True))
+        self.assertLess(longitudes[0], -77.44)
+        self.assertGreater(longitudes[-1], -86.78)
+
+    def test_waypoints_come_from_the_planner_when_not_given(self):
+        backend = FakeBackend(time_to_first_token=0, seed=2, markers=5, marker_step_degrees=1.0)
+        agent = MasterAgent(backend=backend, use_cache=False)
+        agenda = json.loads(agent.generate_long_agenda("A", "B", segment_km=200))
+        # Five fake waypoints one degree apart, plus one planner call per segment.
+        self.assertEqual(agent.segment_stats["waypoints"], 5)
+        self.assertEqual(backend.calls[PLANNER], 1 + agent.segment_stats["segments"])
+        self.assertGreater(agent.segment_stats["segments"], 1)
+        self.assertTrue(agenda["markers"])
+
+    def test_async_callers_use_the_async_entry_point(self):
+        backend = FakeBackend(time_to_first_token=0, seed=2, markers=5, marker_step_degrees=1.0)
+        agent = MasterAgent(backend=backend, use_cache=False)
+
+        async def plan():
+            with self.assertRaisesRegex(RuntimeError, "agenerate_long_agenda"):
+                agent.generate_long_agenda("A", "B", segment_km=200)
+            return await agent.agenerate_long_agenda("A", "B", segment_km=200)
+
+        self.assertTrue(json.loads(asyncio.run(plan()))["markers"])
+
+
+if __name__ == "__main__":
+    unittest.main()
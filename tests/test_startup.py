@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_startup import measure_once  # noqa: E402
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_and_construction_are_side_effect_free(self):
+        result = measure_once()
+        self.assertEqual(result["heavy_loaded"], [])
+        self.assertLess(result["construct_ms"], 50)
+
+    def test_cli_parser(self):
+        import guideai
+
+        args = guideai.build_parser().parse_args(["write", "agenda.md", "--concurrency", "4"])
+        self.assertEqual((args.command, args.agenda, args.concurrency, args.output),
+                         ("write", "agenda.md", 4, "tour_script.md"))
+
+    def test_cli_run_modes_are_exclusive(self):
+        import contextlib
+        import io
+
+        import guideai
+
+        for argv in (["write", "agenda.md", "--stream", "--pipelined"],
+                     ["write", "agenda.md", "--previous", "abc", "--deadline"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                guideai.build_parser().parse_args(argv)
+        for argv in (["write", "agenda.md", "--stream", "--concurrency", "4"],
+                     ["full", "A to B", "--previous", "abc", "--concurrency", "2"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as exit_:
+                guideai.main(argv)
+            self.assertEqual(exit_.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
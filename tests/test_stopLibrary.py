@@ -0,0 +1,141 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import DIRECTOR, WRITER, FakeBackend  # noqa: E402
+from stopLibrary import ADAPT, REUSE, MinHasher, StopLibrary, jaccard, trigrams  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+def point(title, summary=None, **extra):
+    return dict({"title": title, "summary": summary or f"History of {title}.", "directive": f"Describe {title}."},
+                **extra)
+
+
+def agenda(points):
+    lines = ["Primary Route: US-460 E and WV-20 N", ""]
+    for i, p in enumerate(points, 1):
+        lines += [f"{i}. **{p['title']}**", f"   Summary: {p['summary']}",
+                  f"   Script Writer Directive: {p['directive']}", ""]
+    return "\n".join(lines)
+
+
+class StopLibraryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.library = StopLibrary(clock=lambda: self.now[0])
+        self.library.add(point("New River Gorge Bridge", "The longest single-span arch bridge in the Americas."),
+                         "Bridge script.", next_title="Hawks Nest")
+        self.library.add(point("Pandapas Pond", "A quiet pond in Jefferson National Forest."), "Pond script.")
+
+    def test_minhash_estimates_jaccard(self):
+        a, b = trigrams("New River Gorge Bridge"), trigrams("The New River Gorge Bridge Overlook")
+        hasher = MinHasher(num_perm=256, bands=64)
+        sig_a, sig_b = hasher.signature(a), hasher.signature(b)
+        estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / 256
+        self.assertAlmostEqual(estimate, jaccard(a, b), delta=0.1)
+
+    def test_same_marker_same_next_stop_is_reused(self):
+        match = self.library.lookup(point("  new river gorge BRIDGE: ",
+                                          "The longest single-span arch bridge in the Americas."), "Hawks Nest")
+        self.assertEqual((match.action, match.script), (REUSE, "Bridge script."))
+
+    def test_similar_marker_or_new_transition_is_adapted(self):
+        moved = self.library.lookup(point("New River Gorge Bridge",
+                                          "The longest single-span arch bridge in the Americas."), "Fayetteville")
+        self.assertEqual(moved.action, ADAPT)
+        self.assertIn("next stop is now 'Fayetteville'", moved.feedback)
+
+        similar = self.library.lookup(point("New River Gorge Bridge Overlook",
+                                            "Views of the longest single-span arch bridge in the Americas."),
+                                      "Hawks Nest")
+        self.assertEqual(similar.action, ADAPT)
+        self.assertIn("New River Gorge Bridge Overlook", similar.feedback)
+
+        self.assertIsNone(self.library.lookup(point("Bluestone Dam"), None))
+        stats = self.library.stats()
+        self.assertEqual((stats["lookups"], stats["adapted"], stats["misses"]), (3, 2, 1))
+
+    def test_script_that_mentions_a_stop_the_new_tour_skips_is_adapted(self):
+        self.library.add(point("Hawks Nest", "A cliffside overlook above the New River."),
+                         "Leaving the New River Gorge Bridge behind, Hawks Nest rises above the river.",
+                         next_title="Ansted", previous_titles=["Fayette Station", "New River Gorge Bridge"])
+        hawks_nest = point("Hawks Nest", "A cliffside overlook above the New River.")
+
+        same_route = self.library.lookup(hawks_nest, "Ansted", previous_titles=["New River Gorge Bridge"])
+        self.assertEqual(same_route.action, REUSE)
+
+        other_route = self.library.lookup(hawks_nest, "Ansted", previous_titles=["Gauley Bridge"])
+        self.assertEqual(other_route.action, ADAPT)
+        self.assertIn("does not visit 'New River Gorge Bridge'", other_route.feedback)
+        self.assertNotIn("Fayette Station", other_route.feedback)  # not mentioned, so it does not matter
+
+    def test_coordinates_must_be_close(self):
+        self.library.add(point("Main Street", latitude=37.23, longitude=-80.41), "Blacksburg Main Street.")
+        near = self.library.lookup(point("Main Street", latitude=37.24, longitude=-80.42))
+        self.assertEqual(near.script, "Blacksburg Main Street.")
+        self.assertIsNone(self.library.lookup(point("Main Street", latitude=37.78, longitude=-81.19)))
+
+    def test_stale_entries_are_adapted_then_evicted(self):
+        lookup = point("Pandapas Pond", "A quiet pond in Jefferson National Forest.")
+        self.now[0] = StopLibrary.DAY * 100
+        match = self.library.lookup(lookup)
+        self.assertEqual(match.action, ADAPT)
+        self.assertIn("written a while ago", match.feedback)
+
+        self.now[0] = StopLibrary.DAY * 400
+        self.assertEqual(self.library.evict(), 2)
+        self.assertIsNone(self.library.lookup(lookup))
+
+    def test_capacity_evicts_least_recently_used_and_persists(self):
+        path = os.path.join(tempfile.mkdtemp(), "stops.sqlite")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        library = StopLibrary(path, max_entries=2, clock=lambda: self.now[0])
+        for t, title in enumerate(["Bluestone Dam", "Sandstone Falls", "Hawks Nest"]):
+            self.now[0] = t
+            if title == "Hawks Nest":
+                library.lookup(point("Bluestone Dam"))
+            library.add(point(title), f"{title} script.")
+        library.close()
+
+        reopened = StopLibrary(path, max_entries=2, clock=lambda: self.now[0])
+        self.assertEqual(len(reopened), 2)
+        self.assertIsNone(reopened.lookup(point("Sandstone Falls")))
+        self.assertEqual(reopened.lookup(point("Hawks Nest")).script, "Hawks Nest script.")
+
+
+class StopLibraryInArchitectTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(time_to_first_token=0, approval_rate=1.0)
+        config = TourConfig(enable_cache=False, stop_library_path=os.path.join(self.tmpdir, "stops.sqlite"))
+        self.architect = TourArchitect(config, backend=self.backend)
+
+    def test_second_tour_reuses_and_adapts_shared_stops(self):
+        titles = ["Blacksburg Town Square", "Pandapas Pond", "New River Overlook", "Pearisburg Depot"]
+        first = self.architect.run(agenda([point(t) for t in titles]), filename=os.path.join(self.tmpdir, "a.md"))
+        self.assertEqual(self.architect.library.stats()["misses"], 4)
+        self.backend.reset_stats()
+
+        second_titles = titles[:2] + ["Mountain Lake Lodge"] + titles[3:]
+        second = self.architect.run_concurrent(agenda([point(t) for t in second_titles]), max_concurrency=2,
+                                               filename=os.path.join(self.tmpdir, "b.md"))
+        stats = self.architect.library.stats()
+        self.assertEqual((stats["reused"], stats["adapted"], stats["misses"]), (2, 1, 5))
+        self.assertEqual(stats["entries"], 6)
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[3], first[3])
+        # The new marker is written from scratch; Pandapas Pond gets one revision for its new transition.
+        self.assertEqual(self.backend.calls[WRITER], 2)
+        self.assertEqual(self.backend.calls[DIRECTOR], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import PLANNER, WRITER, FakeBackend  # noqa: E402
+from tourService import CANCELLED, TourService, request_key  # noqa: E402
+from batchRunner import BatchItem  # noqa: E402
+from wrtirAgent import TourConfig  # noqa: E402
+
+
+ROUTE = {"start": "Blacksburg, VA", "end": "Beckley, WV", "preferences": "coal history"}
+
+
+async def send(port, method, path, body=None, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write(head.encode() + b"\r\n" + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    return reader, writer, status, response_headers
+
+
+async def read_events(reader, until=None):
+    events, frame = [], {}
+    while line := await reader.readline():
+        line = line.decode().rstrip("\n")
+        if line and not line.startswith(":"):
+            name, _, value = line.partition(": ")
+            frame[name] = value
+        elif not line and frame:
+            events.append((int(frame["id"]), frame["event"], json.loads(frame["data"])))
+            frame = {}
+            if events[-1][1] == until:
+                break
+    return events
+
+
+async def stream_tour(port, body):
+    reader, writer, status, headers = await send(port, "POST", "/tours", body)
+    events = await read_events(reader)
+    writer.close()
+    return status, headers, events
+
+
+class TourServiceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(markers=4, time_to_first_token=0.01, approval_rate=1.0)
+
+    def serve(self, scenario, **kwargs):
+        async def main():
+            service = TourService(self.tmpdir, base_config=TourConfig(enable_cache=False, enable_context_cache=False),
+                                  backend=self.backend, **kwargs)
+            server = await service.start(port=0)
+            try:
+                return await scenario(service, server.sockets[0].getsockname()[1])
+            finally:
+                await service.close()
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(main())
+
+    def test_identical_requests_share_one_generation(self):
+        async def scenario(service, port):
+            variant = dict(ROUTE, start="  blacksburg VA ", preferences="Coal history.")
+            results = await asyncio.gather(stream_tour(port, ROUTE), stream_tour(port, variant),
+                                           stream_tour(port, ROUTE))
+            return results, service.stats()
+
+        results, stats = self.serve(scenario)
+        self.assertEqual(self.backend.calls[PLANNER], 1)
+        self.assertEqual((stats["requests"], stats["coalesced"], stats["generations"], stats["done"]), (3, 2, 1, 1))
+        self.assertEqual(stats["active_jobs"], 0)
+        job_ids = {headers["x-tour-job"] for _, headers, _ in results}
+        self.assertEqual(len(job_ids), 1)
+        self.assertEqual(sorted(headers["x-coalesced"] for _, headers, _ in results), ["0", "1", "1"])
+
+        events = results[0][2]
+        self.assertEqual([e[1] for e in events], ["agenda"] + ["stop"] * 4 + ["done"])
+        self.assertEqual([e[0] for e in events], list(range(6)))
+        self.assertTrue(all(r[2] == events for r in results))
+        self.assertEqual(request_key(BatchItem.from_dict(ROUTE)),
+                         request_key(BatchItem.from_dict(dict(ROUTE, end="BECKLEY,  WV"))))
+
+    def test_reconnect_resumes_after_last_event_id(self):
+        async def scenario(service, port):
+            reader, writer, _, headers = await send(port, "POST", "/tours", ROUTE)
+            first = await read_events(reader, until="stop")
+            rejoin, rewriter, status, _ = await send(port, "GET", f"/tours/{headers['x-tour-job']}/events",
+                                                     headers={"Last-Event-ID": first[-1][0]})
+            rest = await read_events(rejoin)
+            writer.close()
+            rewriter.close()
+            return first, status, rest
+
+        first, status, rest = self.serve(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual([e[0] for e in first + rest], list(range(6)))
+
+    def test_generation_is_cancelled_when_every_client_disconnects(self):
+        async def scenario(service, port):
+            reader, writer, _, _ = await send(port, "POST", "/tours", ROUTE)
+            await read_events(reader, until="agenda")
+            writer.close()
+            for _ in range(200):
+                if service.stats()[CANCELLED]:
+                    break
+                await asyncio.sleep(0.01)
+            return service.stats()
+
+        stats = self.serve(scenario, linger_seconds=0)
+        self.assertEqual((stats[CANCELLED], stats["done"], stats["active_jobs"]), (1, 0, 0))
+
+    def test_lagging_subscriber_is_dropped_and_generation_continues(self):
+        async def scenario(service, port):
+            job, _ = service.submit(ROUTE)
+            stalled = service.subscribe(job)
+            await stalled.__anext__()  # consume the agenda, then stop reading
+            reader, writer, _, _ = await send(port, "GET", f"/tours/{job.id}/events")
+            events = await read_events(reader)
+            writer.close()
+            await stalled.aclose()
+            return events, service.stats()
+
+        events, stats = self.serve(scenario, max_buffered_events=1, slow_client_timeout=0.05)
+        self.assertEqual(events[-1][1], "done")
+        self.assertEqual(stats["dropped_subscribers"], 1)
+
+    def test_stalled_subscriber_holds_back_stop_generation(self):
+        async def scenario(service, port):
+            job, _ = service.submit(ROUTE)
+            stalled = service.subscribe(job)
+            await stalled.__anext__()  # consume the agenda, then stop reading
+            await asyncio.sleep(0.5)
+            writer_calls = self.backend.calls[WRITER]
+            await stalled.aclose()
+            return writer_calls
+
+        # Publishing stop 1 waits for the subscriber, and stops 2 - 4 are not started meanwhile.
+        writer_calls = self.serve(scenario, stop_concurrency=1, max_buffered_events=1, slow_client_timeout=30)
+        self.assertEqual(writer_calls, 1)
+
+    def test_bad_requests(self):
+        async def scenario(service, port):
+            statuses = []
+            for method, path, body in (("POST", "/tours", {"start": "Nowhere"}), ("GET", "/tours", None),
+                                       ("GET", "/tours/unknown/events", None), ("GET", "/stats", None)):
+                _, writer, status, _ = await send(port, method, path, body)
+                writer.close()
+                statuses.append(status)
+            return statuses
+
+        self.assertEqual(self.serve(scenario), [400, 405, 404, 200])
+
+    def test_only_whitelisted_config_overrides_are_accepted(self):
+        route = {"start": "Blacksburg, VA", "end": "Beckley, WV"}
+
+        async def scenario(service, port):
+            statuses = []
+            for config in ({"checkpoint_path": "/tmp/elsewhere.sqlite"}, {"max_concurrency": 10000},
+                           {"draft_candidates": 50}, {"max_revisions": "3"}, {"no_such_field": 1}):
+                _, writer, status, _ = await send(port, "POST", "/tours", dict(route, config=config))
+                writer.close()
+                statuses.append(status)
+            status, _, events = await stream_tour(port, dict(route, config={"max_revisions": 2,
+                                                                            "writer_temperature": 1}))
+            return statuses, status, events[-1][1], service.stats()["generations"]
+
+        self.assertEqual(self.serve(scenario), ([400] * 5, 200, "done", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakeBackend import FakeBackend  # noqa: E402
+from masterAgent import MasterAgent  # noqa: E402
+from responseCache import ResponseCache, with_cache  # noqa: E402
+from tracing import Tracer, trace_context, traced  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.backend = FakeBackend(markers=3, time_to_first_token=0.001, approval_rate=0.5)
+        self.tracer = Tracer()
+
+    def run_tour(self, concurrent=False):
+        agenda = MasterAgent(backend=self.backend, use_cache=False).generate_agenda("Blacksburg to Beckley")
+        architect = TourArchitect(TourConfig(enable_cache=False), backend=self.backend, tracer=self.tracer)
+        output = os.path.join(self.tmpdir, "tour.md")
+        if concurrent:
+            architect.run_concurrent(agenda, filename=output)
+        else:
+            architect.run(agenda, filename=output)
+        return architect
+
+    def test_spans_carry_stop_and_revision(self):
+        seen = []
+        self.tracer.add_hook(seen.append)
+        architect = self.run_tour()
+
+        self.assertEqual(len(seen), self.backend.stats()["total_calls"] - 1)
+        self.assertEqual({s.stop_index for s in seen}, {0, 1, 2})
+        self.assertEqual({s.tour_id for s in seen}, {architect.tour_id})
+        writers = [s for s in seen if s.name == "writer"]
+        directors = [s for s in seen if s.name == "director"]
+        self.assertEqual(len(writers), len(directors))
+        self.assertEqual(min(s.revision for s in writers), 1)
+        self.assertTrue(all(s.prompt_tokens > 0 and s.response_tokens > 0 for s in seen))
+
+        summary = architect.summary()
+        self.assertEqual(summary["total_calls"], len(seen))
+        self.assertEqual(summary["calls"]["writer"], len(writers))
+        # Sequential run: every call is on the critical path.
+        self.assertEqual(len(summary["critical_path"]), len(seen))
+
+    def test_concurrent_critical_path_is_shorter(self):
+        architect = self.run_tour(concurrent=True)
+        summary = architect.summary()
+        self.assertLess(len(summary["critical_path"]), summary["total_calls"])
+        self.assertLessEqual(summary["critical_path_seconds"], summary["call_seconds"])
+
+    def test_exports(self):
+        self.run_tour()
+        out = io.StringIO()
+        written = self.tracer.export_jsonl(out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), written)
+        self.assertIn("duration", records[0])
+
+        metrics = self.tracer.to_prometheus()
+        self.assertIn('guideai_llm_calls_total{role="writer",cache="off"}', metrics)
+        self.assertIn('guideai_llm_tokens_total{role="director",kind="prompt"}', metrics)
+
+    def test_cache_status_recorded(self):
+        from google.genai import types
+
+        backend = traced(with_cache(self.backend, ResponseCache()), self.tracer)
+        config = types.GenerateContentConfig(system_instruction="writer")
+        with trace_context(role="writer"):
+            backend.generate_content(model="m", contents="Point Title: A", config=config)
+            backend.generate_content(model="m", contents="Point Title: A", config=config)
+        self.assertEqual([s.cache for s in self.tracer.spans], ["miss", "hit"])
+
+
+if __name__ == "__main__":
+    unittest.main()
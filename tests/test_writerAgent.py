@@ -1,4 +1,277 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
 import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types  # noqa: E402
+
+import llmBackend  # noqa: E402
+from fakeBackend import DIRECTOR, WRITER, FakeBackend  # noqa: E402
+from tracing import Tracer  # noqa: E402
+from wrtirAgent import TourArchitect, TourConfig  # noqa: E402
+
+
+PLANNER_OUTPUT = """Primary Route: I-64 W and US-19 N
+
+1. **Blacksburg History:**
+   Summary: Founding of the town.
+   Script Writer Directive: Cover William Black's 16 blocks.
+
+2. **Pocahontas Coalfield:**
+   Summary: Smokeless coal boom.
+   Script Writer Directive: Focus on the N&W railway.
+
+3. **New River Gorge Bridge:**
+   Summary: Arch bridge construction.
+   Script Writer Directive: Describe Bridge Day.
+"""
+
+
+def text_response(text: str) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))]
+    )
+
+
+class FakeAsyncModels:
+    '''
+    Stands in for client.aio.models: the writer echoes the point title, the director always approves.
+    '''
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.prompts = []
+
+    async def generate_content(self, model, contents, config):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.prompts.append(contents)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if config.response_mime_type == "application/json":
+            return text_response(json.dumps({"is_ready": True, "feedback": "Great."}))
+        title = contents.split("Point Title:")[1].split("\n")[0].strip()
+        return text_response(f"Script about {title}")
+
+    async def generate_content_stream(self, model, contents, config):
+        response = await self.generate_content(model=model, contents=contents, config=config)
+
+        async def chunks():
+            for word in response.text.split(" "):
+                yield text_response(word + " ")
+        return chunks()
+
+
+class FakeModels:
+    '''
+    Synchronous counterpart of FakeAsyncModels for client.models.
+    '''
+
+    def __init__(self, script_length: int = 4000):
+        self.script_length = script_length
+        self.prompts = []
+
+    def generate_content(self, model, contents, config):
+        self.prompts.append(contents)
+        if config.response_mime_type == "application/json":
+            return text_response(json.dumps({"is_ready": True, "feedback": "Great."}))
+        title = contents.split("Point Title:")[1].split("\n")[0].strip()
+        filler = f"The Old Mill at {title} opened in 1883. " * (self.script_length // 40)
+        return text_response(f"Script about {title}. {filler}")
+
+    def generate_content_stream(self, model, contents, config):
+        text = self.generate_content(model=model, contents=contents, config=config).text
+        for start in range(0, len(text), 64):
+            yield text_response(text[start:start + 64])
+
 
 class TestAgentContents(unittest.TestCase):
-    
\ No newline at end of file
+
+    def setUp(self):
+        self.models = FakeAsyncModels()
+        client = mock.MagicMock()
+        client.aio.models = self.models
+        self.sync_models = FakeModels()
+        client.models = self.sync_models
+        patcher = mock.patch.object(llmBackend, "get_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_parse_route_data(self):
+        points, route = TourArchitect().parse_route_data(PLANNER_OUTPUT)
+        self.assertEqual(route, "I-64 W and US-19 N")
+        self.assertEqual([p["title"] for p in points],
+                         ["Blacksburg History:", "Pocahontas Coalfield:", "New River Gorge Bridge:"])
+
+    def test_concurrent_run_keeps_route_order(self):
+        architect = TourArchitect(TourConfig(enable_screening=False, max_concurrency=2, enable_cache=False))
+        with mock.patch.object(architect, "save_to_markdown") as save:
+            scripts = architect.run_concurrent(PLANNER_OUTPUT)
+        self.assertEqual(len(scripts), 3)
+        for i, title in enumerate(["Blacksburg History:", "Pocahontas Coalfield:", "New River Gorge Bridge:"]):
+            self.assertTrue(scripts[i].startswith(f"STOP {i+1}: {title}"))
+            self.assertIn(f"Script about {title}", scripts[i])
+        self.assertLessEqual(self.models.peak, 2)
+        self.assertGreater(self.models.peak, 1)
+        save.assert_called_once()
+
+    def test_cached_run_skips_api(self):
+        architect = TourArchitect(TourConfig(enable_screening=False,
+                                             cache_path=os.path.join(self.tmpdir, "cache.sqlite")))
+        with mock.patch.object(architect, "save_to_markdown"):
+            first = architect.run_concurrent(PLANNER_OUTPUT)
+            calls = len(self.models.prompts)
+            second = architect.run_concurrent(PLANNER_OUTPUT)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.models.prompts), calls)
+        self.assertEqual(architect.generator.cache.hits, 6)
+
+    def test_sequential_context_stays_within_budget(self):
+        many_points = "Primary Route: I-64\n" + "".join(
+            f"\n{i}. **Marker {i}:**\n   Summary: Fact {i}.\n   Script Writer Directive: Angle {i}.\n"
+            for i in range(1, 9)
+        )
+        config = TourConfig(enable_screening=False, enable_cache=False, context_token_budget=300)
+        architect = TourArchitect(config)
+        with mock.patch.object(architect, "save_to_markdown"):
+            scripts = architect.run(many_points)
+        self.assertEqual(len(scripts), 8)
+        writer_prompts = [p for p in self.sync_models.prompts if "GENERATE TOUR SEGMENT" in p]
+        context_sizes = [len(p.split("CONTEXT (Previously written stops):")[-1]) for p in writer_prompts[1:]]
+        self.assertLessEqual(max(context_sizes), 300 * 4 + 10)
+        self.assertIn("STOP 7: Marker 7:", writer_prompts[-1])
+
+    def test_stream_appends_each_stop_before_yielding(self):
+        architect = TourArchitect(TourConfig(enable_screening=False, enable_cache=False))
+        output = os.path.join(self.tmpdir, "tour.md")
+        tokens = []
+        seen = []
+        for index, title, script in architect.stream(PLANNER_OUTPUT, output, on_token=lambda *t: tokens.append(t)):
+            with open(output, encoding="utf-8") as f:
+                body = f.read()
+            self.assertIn(f"Stop {index+1}: {title}", body)
+            self.assertIn("*(generating...)*", body)
+            seen.append(index)
+        self.assertEqual(seen, [0, 1, 2])
+        self.assertEqual({t[0] for t in tokens}, {0, 1, 2})
+        self.assertEqual({t[1] for t in tokens}, {1})
+
+        with open(output, encoding="utf-8") as f:
+            final = f.read()
+        self.assertNotIn("generating", final)
+        self.assertIn("3. [New River Gorge Bridge:](#stop-3)", final)
+        self.assertLess(final.index("(#stop-3)"), final.index("Stop 1: Blacksburg History:"))
+
+    def test_astream_yields_in_route_order(self):
+        architect = TourArchitect(TourConfig(enable_screening=False, enable_cache=False, max_concurrency=3))
+        output = os.path.join(self.tmpdir, "tour.md")
+        chunks = []
+
+        async def collect():
+            return [item async for item in architect.astream(
+                PLANNER_OUTPUT, filename=output, on_token=lambda *t: chunks.append(t))]
+
+        stops = asyncio.run(collect())
+        self.assertEqual([s[0] for s in stops], [0, 1, 2])
+        self.assertEqual(stops[1][2], "Script about Pocahontas Coalfield: ")
+        self.assertTrue(chunks)
+
+    def test_concurrent_context_is_agenda_outline(self):
+        points, _ = TourArchitect().parse_route_data(PLANNER_OUTPUT)
+        context = TourArchitect._agenda_context(points, 2)
+        self.assertEqual(context, [
+            "STOP 1: Blacksburg History:\nFounding of the town.",
+            "STOP 2: Pocahontas Coalfield:\nSmokeless coal boom.",
+        ])
+
+
+
+class PromptRecordingBackend(FakeBackend):
+
+    def __init__(self, **overrides):
+        super().__init__(**overrides)
+        self.prompts = []
+
+    def _respond(self, model, contents, config):
+        self.prompts.append((self.role_of(config), contents))
+        return super()._respond(model, contents, config)
+
+
+class BestOfNTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def run_tour(self, selection="director", concurrent=False, **fake):
+        backend = PromptRecordingBackend(time_to_first_token=0, seed=5, **fake)
+        config = TourConfig(enable_cache=False, enable_context_cache=False, draft_candidates=3,
+                            candidate_selection=selection)
+        architect = TourArchitect(config, backend=backend, tracer=Tracer())
+        output = os.path.join(self.tmpdir, "tour.md")
+        scripts = (architect.run_concurrent if concurrent else architect.run)(PLANNER_OUTPUT, filename=output)
+        return backend, architect, scripts
+
+    def director_prompts(self, backend):
+        return [prompt for role, prompt in backend.prompts if role == DIRECTOR]
+
+    def test_one_batched_review_per_round(self):
+        for concurrent in (False, True):
+            backend, architect, scripts = self.run_tour(approval_rate=0.6, concurrent=concurrent)
+            self.assertEqual(len(scripts), 3)
+            self.assertEqual(backend.calls[WRITER], 3 * backend.calls[DIRECTOR])
+            self.assertTrue(all("--- DRAFT 3 ---" in prompt for prompt in self.director_prompts(backend)))
+            writers = [prompt for role, prompt in backend.prompts if role == WRITER]
+            self.assertEqual(len({prompt for prompt in writers}), len(writers))
+            candidates = {span.attributes.get("candidate") for span in architect.generator.tracer.spans
+                          if span.name == "writer"}
+            self.assertEqual(candidates, {0, 1, 2})
+
+    def test_writer_is_called_again_only_when_every_candidate_fails_the_screen(self):
+        backend, architect, scripts = self.run_tour(bad_draft_rate=0.5, approval_rate=1.0)
+        stats = architect.generator.screener.stats()
+        self.assertEqual(stats["candidates"], backend.calls[WRITER])
+        self.assertEqual(backend.calls[DIRECTOR], 3)
+        # Only rounds where every candidate failed saved a director call.
+        self.assertEqual(stats["passed"], backend.calls[DIRECTOR])
+        self.assertEqual(architect.generator.stop_outcomes, {"approved": 3, "max_revisions": 0})
+        self.assertTrue(all(len(script.split()) > 100 for script in scripts))
+        # Stub candidates that failed the screen never reach the batched review.
+        for prompt in self.director_prompts(backend):
+            drafts = re.split(r"--- DRAFT \d+ ---", prompt.split("Review these")[0])[1:]
+            self.assertTrue(all(len(draft.split()) > 100 for draft in drafts))
+
+    def test_candidates_are_not_streamed(self):
+        backend = FakeBackend(time_to_first_token=0, seed=5, approval_rate=1.0)
+        config = TourConfig(enable_cache=False, enable_context_cache=False, draft_candidates=3)
+        architect = TourArchitect(config, backend=backend)
+        chunks = []
+        stops = list(architect.stream(PLANNER_OUTPUT, filename=os.path.join(self.tmpdir, "tour.md"),
+                                      on_token=lambda *chunk: chunks.append(chunk)))
+
+        self.assertEqual(len(stops), 3)
+        self.assertEqual(chunks, [])
+
+    def test_local_selection_reviews_only_the_ranked_best(self):
+        backend, architect, scripts = self.run_tour(selection="local", bad_draft_rate=0.3, approval_rate=1.0)
+        self.assertEqual(backend.calls[DIRECTOR], 3)
+        prompts = self.director_prompts(backend)
+        self.assertTrue(all("CURRENT DRAFT TO REVIEW" in prompt and "--- DRAFT" not in prompt for prompt in prompts))
+        self.assertTrue(all(script.split("\n", 1)[1] in " ".join(prompts) for script in scripts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Tour Output Module - Incremental Markdown writer for tour scripts
+
+StreamingMarkdownWriter produces the same layout as
+TourArchitect.save_to_markdown, but writes each stop to disk (flushed and
+fsynced) as soon as it is approved, so a player can start on stop 1 while
+later stops are still being generated and a crash keeps every finished
+stop. The table of contents lives in a fixed-size block reserved at the top
+of the file and is patched in place by finalize(); the body is never
+rewritten. The body is kept in route order: a stop that arrives before an
+earlier one (deadline-driven runs finish stops by ETA) is held until the
+gap is filled, and whatever is still held is written out on finalize or
+close.
+
+render_tour_markdown() builds the same layout in memory, and patch_markdown()
+updates an existing tour file in place. It rewrites only the bytes from the
+first difference onward, so a regeneration that changed the last stops leaves
+the start of the file untouched.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def render_tour_markdown(route_name: str, scripts: List[str]) -> str:
+    """
+    The Markdown document for a finished tour.
+
+    Args:
+        route_name (str): Route shown in the heading
+        scripts (list): "STOP n: title\nscript" sections in route order
+
+    Returns:
+        str: Heading, linked table of contents and one section per stop
+    """
+    parts = [f"# Audio Tour: {route_name}\n", "*Generated by AI Narrative Architect & Script Writer*\n\n", "---\n\n",
+             "## Tour Stops\n"]
+    for i, script in enumerate(scripts):
+        title = script.split('\n')[0].replace(f"STOP {i+1}: ", "")
+        parts.append(f"{i+1}. [{title}](#stop-{i+1})\n")
+    parts.append("\n---\n\n")
+    for i, script in enumerate(scripts):
+        parts.append(script.replace(f"STOP {i+1}: ", f"## <a name='stop-{i+1}'></a> Stop {i+1}: "))
+        parts.append("\n\n---\n\n")
+    return "".join(parts)
+
+
+def patch_markdown(filename: str, route_name: str, scripts: List[str]) -> int:
+    """
+    Bring a tour file up to date, writing only from the first changed byte.
+
+    Args:
+        filename (str): Output path; created if missing
+        route_name (str): Route shown in the heading
+        scripts (list): "STOP n: title\nscript" sections in route order
+
+    Returns:
+        int: Bytes written
+    """
+    new = render_tour_markdown(route_name, scripts).encode("utf-8")
+    if not os.path.exists(filename):
+        with open(filename, "wb") as f:
+            f.write(new)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(new)
+
+    with open(filename, "r+b") as f:
+        old = f.read()
+        limit = min(len(old), len(new))
+        start = next((i for i in range(limit) if old[i] != new[i]), limit)
+        if start == len(old) == len(new):
+            return 0
+        f.seek(start)
+        f.write(new[start:])
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+    return len(new) - start
+
+
+class StreamingMarkdownWriter:
+    """
+    Append-only Markdown writer for one tour.
+
+    Attributes:
+        filename (str): Output path
+        route_name (str): Route shown in the heading
+        titles (list): Planned stop titles in route order
+        written (set): Indices of stops already written to the file
+    """
+
+    PENDING_SUFFIX = " *(generating...)*"
+
+    def __init__(self, filename: str, route_name: str, titles: List[str]) -> None:
+        """
+        Create the file and write the heading and a placeholder table of contents.
+
+        Args:
+            filename (str): Output path; an existing file is replaced
+            route_name (str): Route shown in the heading
+            titles (list): Planned stop titles in route order
+        """
+        self.filename = filename
+        self.route_name = route_name
+        self.titles = list(titles)
+        self.written: Set[int] = set()
+        self._held: Dict[int, Tuple[str, str]] = {}
+        self._next = 0
+        self._file = open(filename, "w", encoding="utf-8", newline="")
+        self._file.write(f"# Audio Tour: {route_name}\n")
+        self._file.write(f"*Generated by AI Narrative Architect & Script Writer*\n\n")
+        self._file.write("---\n\n")
+        self._toc_offset = self._file.tell()
+        self._toc_size = max(
+            len(self._render_toc(final=True, written=set(range(len(self.titles)))).encode("utf-8")),
+            len(self._render_toc(final=False, written=set()).encode("utf-8"))
+        )
+        self._write_toc(final=False)
+        self._file.write("\n---\n\n")
+        self._sync()
+
+    def append_stop(self, index: int, title: str, script: str) -> None:
+        """
+        Append one approved stop and flush it to disk, once every earlier stop has been appended.
+
+        Args:
+            index (int): Zero-based stop position
+            title (str): Stop title
+            script (str): Approved script text (without the STOP header line)
+        """
+        self._held[index] = (title, script)
+        while self._next in self._held:
+            self._write_stop(self._next, *self._held.pop(self._next))
+            self._next += 1
+        self._sync()
+
+    def finalize(self) -> None:
+        """Write any held stops, rewrite the reserved table of contents block with links and close the file."""
+        if self._file.closed:
+            return
+        self._flush_held()
+        end = self._file.tell()
+        self._file.seek(self._toc_offset)
+        self._write_toc(final=True)
+        self._file.seek(end)
+        self._sync()
+        self._file.close()
+
+    def close(self) -> None:
+        """Write any held stops and close without finalizing (the placeholder table of contents stays)."""
+        if not self._file.closed:
+            self._flush_held()
+            self._sync()
+            self._file.close()
+
+    def __enter__(self) -> "StreamingMarkdownWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.finalize()
+        else:
+            self.close()
+
+    def _write_stop(self, index: int, title: str, script: str) -> None:
+        self._file.write(f"## <a name='stop-{index+1}'></a> Stop {index+1}: {title}\n")
+        self._file.write(script)
+        self._file.write("\n\n---\n\n")
+        self.written.add(index)
+
+    def _flush_held(self) -> None:
+        # Stops after a gap that was never filled (a failed run) still go to disk, in route order.
+        for index in sorted(self._held):
+            self._write_stop(index, *self._held.pop(index))
+
+    def _render_toc(self, final: bool, written: Optional[Set[int]] = None) -> str:
+        written = self.written if written is None else written
+        lines = ["## Tour Stops\n"]
+        for i, title in enumerate(self.titles):
+            if i in written:
+                lines.append(f"{i+1}. [{title}](#stop-{i+1})\n")
+            elif final:
+                lines.append(f"{i+1}. {title}\n")
+            else:
+                lines.append(f"{i+1}. {title}{self.PENDING_SUFFIX}\n")
+        return "".join(lines)
+
+    def _write_toc(self, final: bool) -> None:
+        toc = self._render_toc(final=final)
+        padding = self._toc_size - len(toc.encode("utf-8"))
+        # Markdown ignores a whitespace-only line, so the reserved bytes are padded with spaces.
+        self._file.write(toc + " " * padding + "\n")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
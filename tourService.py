@@ -0,0 +1,514 @@
+"""
+Tour Service Module - Async HTTP service with request coalescing and SSE
+
+Serves tour generation over HTTP using only asyncio streams:
+
+    POST /tours                    JSON route request -> text/event-stream of the tour
+    GET  /tours/<job_id>/events    join (or reconnect to) a running generation
+    GET  /stats                    service counters as JSON
+
+The request body uses the batch manifest format ({"start", "end",
+"preferences", "config", "planner_model"}); config may only override the
+fields in CONFIG_OVERRIDES, within their bounds. Identical requests that arrive
+while a generation is running are coalesced: route, preferences, config
+overrides and planner model are normalized into a key, and every request
+with the same key subscribes to the one in-flight job instead of starting
+its own planner + writer/director run.
+
+Each job keeps its events (agenda, one per approved stop, done or error)
+so late subscribers replay what they missed. Event ids let a client that
+reconnects with Last-Event-ID continue where it left off. Generation is
+held back while any subscriber is more than max_buffered_events behind:
+stops are started lazily, at most that many ahead of what was published,
+so a stalled subscriber also pauses the model calls.
+Subscribers that stay that far behind for slow_client_timeout seconds are
+dropped. When the last subscriber disconnects, the job is cancelled after
+linger_seconds unless someone rejoins.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from agendaDiff import normalize
+from batchRunner import BatchItem
+from llmBackend import LLMBackend
+from tracing import Tracer, trace_context
+
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+MAX_BODY_BYTES = 64 * 1024
+
+# TourConfig fields a request may override, with their type and bounds. Everything else (file paths,
+# concurrency, caching) is the operator's: a request that names it is rejected.
+CONFIG_OVERRIDES: Dict[str, Tuple[type, float, float]] = {
+    "writer_temperature": (float, 0.0, 2.0),
+    "director_temperature": (float, 0.0, 2.0),
+    "max_revisions": (int, 1, 5),
+    "draft_candidates": (int, 1, 4),
+}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def check_config(overrides: Any) -> Dict[str, Any]:
+    """
+    Validate a request's config overrides against CONFIG_OVERRIDES.
+
+    Args:
+        overrides (dict): TourConfig field overrides from the request body
+
+    Returns:
+        dict: The overrides, ints widened to float where the field is a float
+
+    Raises:
+        ValueError: If a field may not be overridden, or a value has the wrong type or is out of bounds
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError("config must be an object")
+    checked = {}
+    for name, value in overrides.items():
+        if name not in CONFIG_OVERRIDES:
+            raise ValueError(f"config field {name!r} cannot be overridden (allowed: {', '.join(CONFIG_OVERRIDES)})")
+        kind, low, high = CONFIG_OVERRIDES[name]
+        allowed = (int, float) if kind is float else (int,)
+        if isinstance(value, bool) or not isinstance(value, allowed) or not low <= value <= high:
+            raise ValueError(f"config field {name!r} must be {kind.__name__} between {low:g} and {high:g}")
+        checked[name] = kind(value)
+    return checked
+
+
+def request_key(item: BatchItem) -> str:
+    """
+    Coalescing key of a route request.
+
+    Start, end and preferences are compared case-, punctuation- and
+    whitespace-insensitively; config overrides by value.
+
+    Args:
+        item (BatchItem): Parsed request
+
+    Returns:
+        str: Hex digest identifying equivalent requests
+    """
+    parts = [normalize(item.start), normalize(item.end), normalize(item.preferences),
+             json.dumps(item.config, sort_keys=True), item.planner_model or ""]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def format_event(event_id: int, event: str, data: Dict[str, Any]) -> bytes:
+    """
+    Encode one Server-Sent Event.
+
+    Args:
+        event_id (int): Position in the job's event log
+        event (str): Event name
+        data (dict): JSON payload
+
+    Returns:
+        bytes: The event frame
+    """
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+@dataclass
+class TourJob:
+    """
+    One in-flight generation and its subscribers.
+
+    Attributes:
+        id (str): Job id, also the tour id and output file name
+        key (str): Coalescing key
+        item (BatchItem): The request that started it
+        status (str): RUNNING, DONE, FAILED or CANCELLED
+        events (list): (event, data) published so far
+        subscribers (dict): Subscriber id -> index of the next event it has not consumed
+        requests (int): Requests served by this job, including the first
+    """
+    id: str
+    key: str
+    item: BatchItem
+    status: str = RUNNING
+    events: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    subscribers: Dict[int, int] = field(default_factory=dict)
+    requests: int = 1
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+
+class TourService:
+    """
+    Coalescing tour generator with an SSE front end.
+
+    Attributes:
+        output_dir (str): Where tour Markdown files are written
+        base_config (TourConfig): Defaults that request config overrides apply to
+        backend (LLMBackend): Backend for the planner and writer/director, or the process default
+        stop_concurrency (int): Stops generated in parallel within a tour (TourConfig.max_concurrency if None)
+        max_buffered_events (int): How far a subscriber may fall behind before generation waits for it
+        slow_client_timeout (float): Seconds generation waits for a lagging subscriber before dropping it
+        linger_seconds (float): Grace period before a job without subscribers is cancelled
+        heartbeat_seconds (float): Idle time after which an SSE comment is sent to keep the stream alive
+        coalesce (bool): Join identical in-flight requests; False gives every request its own generation
+    """
+
+    def __init__(self, output_dir: str = "tours", base_config: Any = None, backend: Optional[LLMBackend] = None,
+                 stop_concurrency: Optional[int] = None, max_buffered_events: int = 16,
+                 slow_client_timeout: float = 30.0, linger_seconds: float = 5.0, heartbeat_seconds: float = 15.0,
+                 tracer: Optional[Tracer] = None, coalesce: bool = True) -> None:
+        """
+        Initialize the service.
+
+        Args:
+            output_dir (str): Output directory, created if missing
+            base_config (TourConfig, optional): Defaults for every request
+            backend (LLMBackend, optional): Shared backend
+            stop_concurrency (int, optional): Stops generated in parallel within a tour
+            max_buffered_events (int): Subscriber lag that pauses generation
+            slow_client_timeout (float): Seconds before a lagging subscriber is dropped
+            linger_seconds (float): Grace period before an abandoned job is cancelled
+            heartbeat_seconds (float): SSE keep-alive interval
+            tracer (Tracer, optional): Destination for call spans. Uses the shared tracer if None.
+            coalesce (bool): Set to False to disable request coalescing
+        """
+        self.output_dir = output_dir
+        self.base_config = base_config
+        self.backend = backend
+        self.stop_concurrency = stop_concurrency
+        self.max_buffered_events = max_buffered_events
+        self.slow_client_timeout = slow_client_timeout
+        self.linger_seconds = linger_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.tracer = tracer
+        self.coalesce = coalesce
+        self._jobs: Dict[str, TourJob] = {}
+        self._by_key: Dict[str, TourJob] = {}
+        self._subscriber_ids = itertools.count(1)
+        self._job_numbers = itertools.count(1)
+        self._counts = {"requests": 0, "coalesced": 0, "generations": 0, DONE: 0, FAILED: 0, CANCELLED: 0,
+                        "dropped_subscribers": 0}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def submit(self, record: Dict[str, Any]) -> Tuple[TourJob, bool]:
+        """
+        Start a generation for a request, or join an identical one in flight.
+
+        Must be called from the event loop the service runs on.
+
+        Args:
+            record (dict): Route request in batch manifest format
+
+        Returns:
+            tuple: (job, whether the request was coalesced into an existing job)
+
+        Raises:
+            ValueError: If start or end is missing, or config overrides a field outside CONFIG_OVERRIDES
+        """
+        if not isinstance(record, dict):
+            raise ValueError("request body must be a JSON object")
+        item = BatchItem.from_dict(record)
+        item.config = check_config(item.config)
+        key = request_key(item)
+        self._counts["requests"] += 1
+        job = self._by_key.get(key)
+        if self.coalesce and job is not None and not job.finished:
+            job.requests += 1
+            self._counts["coalesced"] += 1
+            return job, True
+
+        job = TourJob(id=f"{key[:12]}-{next(self._job_numbers)}", key=key, item=item)
+        self._jobs[job.id] = job
+        self._by_key[key] = job
+        self._counts["generations"] += 1
+        job.task = asyncio.get_running_loop().create_task(self._generate(job))
+        return job, False
+
+    def get_job(self, job_id: str) -> Optional[TourJob]:
+        """
+        Look up a job that is still running or still has subscribers.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            TourJob: The job, or None
+        """
+        return self._jobs.get(job_id)
+
+    async def subscribe(self, job: TourJob, after: int = -1) -> AsyncIterator[Tuple[Optional[int], str, Dict]]:
+        """
+        Follow a job's events from the start (or after a given event id) until it finishes.
+
+        Args:
+            job (TourJob): Job to follow
+            after (int): Last event id the client already has
+
+        Yields:
+            tuple: (event id, event, data); (None, "heartbeat", {}) while idle
+        """
+        subscriber = next(self._subscriber_ids)
+        cursor = max(after + 1, 0)
+        async with job.changed:
+            job.subscribers[subscriber] = cursor
+        try:
+            while True:
+                async with job.changed:
+                    if cursor >= len(job.events) and not job.finished and subscriber in job.subscribers:
+                        try:
+                            await asyncio.wait_for(job.changed.wait(), self.heartbeat_seconds)
+                        except asyncio.TimeoutError:
+                            pass
+                    if subscriber not in job.subscribers:
+                        return  # dropped for lagging
+                    batch = job.events[cursor:]
+                    finished = job.finished
+                if not batch:
+                    if finished:
+                        return
+                    yield None, "heartbeat", {}
+                    continue
+                for offset, (event, data) in enumerate(batch):
+                    yield cursor + offset, event, data
+                cursor += len(batch)
+                async with job.changed:
+                    if subscriber in job.subscribers:
+                        job.subscribers[subscriber] = cursor
+                        job.changed.notify_all()
+        finally:
+            async with job.changed:
+                job.subscribers.pop(subscriber, None)
+                job.changed.notify_all()
+            self._release(job)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Service counters.
+
+        Returns:
+            dict: requests, coalesced, generations, done, failed, cancelled, dropped_subscribers,
+                  plus active_jobs, subscribers and rss_bytes gauges
+        """
+        from checkpointStore import rss_bytes
+
+        stats = dict(self._counts)
+        stats["active_jobs"] = sum(1 for job in self._jobs.values() if not job.finished)
+        stats["subscribers"] = sum(len(job.subscribers) for job in self._jobs.values())
+        stats["rss_bytes"] = rss_bytes()
+        return stats
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        """
+        Start listening.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind; 0 picks a free one
+
+        Returns:
+            asyncio.AbstractServer: The running server
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        """Cancel every running generation."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _generate(self, job: TourJob) -> None:
+        from masterAgent import MasterAgent
+        from wrtirAgent import TourArchitect, TourConfig
+
+        started = time.time()
+        output_path = os.path.join(self.output_dir, f"{job.id}.md")
+        try:
+            config = dataclasses.replace(self.base_config or TourConfig(), **job.item.config)
+            planner_kwargs = {"model": job.item.planner_model} if job.item.planner_model else {}
+            planner = MasterAgent(backend=self.backend, use_cache=config.enable_cache, tracer=self.tracer,
+                                  **planner_kwargs)
+            with trace_context(tour_id=job.id):
+                agenda = await asyncio.to_thread(planner.generate_agenda, job.item.prompt())
+            if not agenda:
+                raise RuntimeError("planner returned no agenda")
+
+            architect = TourArchitect(config, backend=self.backend, tracer=self.tracer)
+            points, route_name = architect.parse_route_data(agenda)
+            if not points:
+                raise RuntimeError("no stops could be parsed from the agenda")
+            await self._publish(job, "agenda", {"route": route_name, "stops": [p['title'] for p in points]})
+            # Stops start lazily, no further ahead of the slowest subscriber than it may lag, so a stalled
+            # client holds back model calls and not just the publishing of finished stops.
+            ahead = max(self.stop_concurrency or config.max_concurrency, self.max_buffered_events)
+            async for i, title, script in architect.astream(agenda, self.stop_concurrency, filename=output_path,
+                                                            tour_id=job.id, max_ahead=ahead):
+                await self._publish(job, "stop", {"index": i, "title": title, "script": script})
+            await self._finish(job, DONE, "done", {"stops": len(points), "output": output_path,
+                                                   "seconds": round(time.time() - started, 3)})
+        except asyncio.CancelledError:
+            await self._finish(job, CANCELLED)
+            raise
+        except Exception as e:
+            await self._finish(job, FAILED, "error", {"error": f"{type(e).__name__}: {e}"})
+
+    async def _publish(self, job: TourJob, event: str, data: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        async with job.changed:
+            job.events.append((event, data))
+            job.changed.notify_all()
+            deadline = loop.time() + self.slow_client_timeout
+            while self._lagging(job):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    for subscriber in self._lagging(job):
+                        del job.subscribers[subscriber]
+                        self._counts["dropped_subscribers"] += 1
+                    job.changed.notify_all()
+                    break
+                try:
+                    await asyncio.wait_for(job.changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _lagging(self, job: TourJob) -> List[int]:
+        return [subscriber for subscriber, cursor in job.subscribers.items()
+                if len(job.events) - cursor > self.max_buffered_events]
+
+    async def _finish(self, job: TourJob, status: str, event: Optional[str] = None,
+                      data: Optional[Dict[str, Any]] = None) -> None:
+        async with job.changed:
+            if event is not None:
+                job.events.append((event, data or {}))
+            job.status = status
+            job.changed.notify_all()
+        self._counts[status] += 1
+        if self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        if not job.subscribers:
+            self._jobs.pop(job.id, None)
+
+    def _release(self, job: TourJob) -> None:
+        if job.subscribers:
+            return
+        if job.finished:
+            self._jobs.pop(job.id, None)
+        else:
+            asyncio.get_running_loop().call_later(self.linger_seconds, self._cancel_if_abandoned, job)
+
+    def _cancel_if_abandoned(self, job: TourJob) -> None:
+        if not job.subscribers and not job.finished and job.task is not None:
+            job.task.cancel()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await self._read_request(reader, writer)
+            if request is None:
+                return
+            method, path, headers, body = request
+            parts = [part for part in path.split("?", 1)[0].split("/") if part]
+            if parts == ["stats"]:
+                if method != "GET":
+                    await self._respond(writer, 405, {"error": "use GET"})
+                    return
+                await self._respond(writer, 200, self.stats())
+            elif parts == ["tours"]:
+                if method != "POST":
+                    await self._respond(writer, 405, {"error": "use POST"})
+                    return
+                try:
+                    record = json.loads(body or b"{}")
+                    job, coalesced = self.submit(record)
+                except (ValueError, TypeError, AttributeError) as e:
+                    await self._respond(writer, 400, {"error": str(e)})
+                    return
+                await self._stream(reader, writer, job, coalesced)
+            elif len(parts) == 3 and parts[0] == "tours" and parts[2] == "events":
+                job = self.get_job(parts[1])
+                if job is None:
+                    await self._respond(writer, 404, {"error": f"no running job {parts[1]}"})
+                    return
+                try:
+                    after = int(headers.get("last-event-id", -1))
+                except ValueError:
+                    after = -1
+                await self._stream(reader, writer, job, True, after)
+            else:
+                await self._respond(writer, 404, {"error": f"no route for {path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            await self._respond(writer, 400, {"error": "malformed request line"})
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            await self._respond(writer, 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"})
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return request_line[0].upper(), request_line[1], headers, body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, job: TourJob,
+                      coalesced: bool, after: int = -1) -> None:
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     f"Connection: close\r\nX-Tour-Job: {job.id}\r\nX-Coalesced: {int(coalesced)}\r\n\r\n"
+                     .encode("latin-1"))
+        await writer.drain()
+        # SSE clients send nothing after the request, so EOF on the reader means they went away.
+        disconnected = asyncio.ensure_future(reader.read())
+        events = self.subscribe(job, after)
+        try:
+            while True:
+                next_event = asyncio.ensure_future(events.__anext__())
+                await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_event.done():
+                    next_event.cancel()
+                    await asyncio.gather(next_event, return_exceptions=True)
+                    return
+                try:
+                    event_id, event, data = next_event.result()
+                except StopAsyncIteration:
+                    return
+                writer.write(b": heartbeat\n\n" if event_id is None else format_event(event_id, event, data))
+                await writer.drain()
+        finally:
+            disconnected.cancel()
+            await events.aclose()
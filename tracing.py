@@ -0,0 +1,417 @@
+"""
+Tracing Module - Per-call spans and token/latency metrics
+
+Every planner, writer and director call is recorded as a Span with wall
+time, prompt/response/cached token counts, cache status, stop index and
+revision. Spans are delivered to registered hooks as they finish, can be
+exported as JSON lines, and are aggregated into Prometheus text-format
+metrics and per-tour summaries (calls, tokens, critical path).
+
+Call attributes that the backend cannot see (which agent is calling, for
+which stop and revision) are carried in a context variable set with
+trace_context(), so they flow through LangGraph nodes and asyncio tasks
+without changing any call signatures.
+
+Author: GuideAI Team
+Version: 1.0.0
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TextIO
+
+from llmBackend import LLMBackend
+
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("guideai_trace_context", default={})
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("guideai_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """
+    One model call.
+
+    Attributes:
+        name (str): Agent role: planner, writer or director
+        tour_id (str): Tour the call belongs to, if any
+        stop_index (int): Zero-based stop, if any
+        revision (int): Writer/director round within the stop
+        model (str): Model identifier
+        start (float): Epoch seconds when the call started
+        end (float): Epoch seconds when the call finished
+        prompt_tokens (int): Input tokens reported by the API
+        response_tokens (int): Output tokens reported by the API
+        cached_tokens (int): Input tokens served from a context cache
+        cache (str): Response cache status: hit, miss or off
+        streamed (bool): Whether the call streamed
+        error (str): Exception text if the call failed
+        attributes (dict): Any other context attributes
+    """
+    name: str
+    tour_id: Optional[str] = None
+    stop_index: Optional[int] = None
+    revision: Optional[int] = None
+    model: Optional[str] = None
+    start: float = 0.0
+    end: float = 0.0
+    prompt_tokens: int = 0
+    response_tokens: int = 0
+    cached_tokens: int = 0
+    cache: str = "off"
+    streamed: bool = False
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Wall time of the call in seconds."""
+        return max(self.end - self.start, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = asdict(self)
+        record["duration"] = round(self.duration, 6)
+        return record
+
+
+@contextmanager
+def trace_context(**attributes) -> Iterator[None]:
+    """
+    Attach attributes (role, tour_id, stop_index, revision, ...) to calls made inside the block.
+
+    Args:
+        **attributes: Values merged over any enclosing trace_context
+    """
+    token = _context.set({**_context.get(), **attributes})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def context_attributes() -> Dict[str, Any]:
+    """
+    Attributes set by the enclosing trace_context blocks.
+
+    Returns:
+        dict: A copy of the current attributes (tour_id, stop_index, role, ...)
+    """
+    return dict(_context.get())
+
+
+def annotate(**attributes) -> None:
+    """
+    Set fields on the span of the call currently in progress, if any.
+
+    Lets inner backend layers (e.g. the response cache) report what they did.
+
+    Args:
+        **attributes: Span fields or extra attributes to set
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+    for key, value in attributes.items():
+        if hasattr(span, key) and key != "attributes":
+            setattr(span, key, value)
+        else:
+            span.attributes[key] = value
+
+
+class Tracer:
+    """
+    Collects spans, notifies hooks and aggregates metrics.
+
+    Attributes:
+        spans (deque): Most recent finished spans
+    """
+
+    def __init__(self, max_spans: int = 10000) -> None:
+        """
+        Initialize the tracer.
+
+        Args:
+            max_spans (int): Finished spans kept in memory for summaries
+        """
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._hooks: List[Callable[[Span], None]] = []
+        self._lock = threading.Lock()
+        self._calls: Dict[tuple, int] = defaultdict(int)
+        self._tokens: Dict[tuple, int] = defaultdict(int)
+        self._seconds: Dict[str, float] = defaultdict(float)
+        self._errors: Dict[str, int] = defaultdict(int)
+
+    def add_hook(self, hook: Callable[[Span], None]) -> None:
+        """
+        Register a callable invoked with every finished span.
+
+        Args:
+            hook (callable): Receives the Span
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Span], None]) -> None:
+        """Unregister a hook added with add_hook."""
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    @contextmanager
+    def span(self, **fields) -> Iterator[Span]:
+        """
+        Time a call. The span picks up the current trace_context.
+
+        Args:
+            **fields: Span fields set up front (e.g. model, streamed)
+
+        Yields:
+            Span: The open span; fill in token counts before the block ends
+        """
+        context = dict(_context.get())
+        name = context.pop("role", fields.pop("name", "llm"))
+        span = Span(name=name)
+        for key, value in {**context, **fields}.items():
+            if hasattr(span, key) and key != "attributes":
+                setattr(span, key, value)
+            else:
+                span.attributes[key] = value
+        token = _current_span.set(span)
+        span.start = time.time()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            self._calls[(span.name, span.cache)] += 1
+            self._tokens[(span.name, "prompt")] += span.prompt_tokens
+            self._tokens[(span.name, "response")] += span.response_tokens
+            self._tokens[(span.name, "cached")] += span.cached_tokens
+            self._seconds[span.name] += span.duration
+            if span.error:
+                self._errors[span.name] += 1
+        for hook in list(self._hooks):
+            hook(span)
+
+    def to_prometheus(self) -> str:
+        """
+        Render aggregate metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        with self._lock:
+            lines = [
+                "# HELP guideai_llm_calls_total Model calls by agent role and response cache status.",
+                "# TYPE guideai_llm_calls_total counter",
+            ]
+            lines += [f'guideai_llm_calls_total{{role="{role}",cache="{cache}"}} {count}'
+                      for (role, cache), count in sorted(self._calls.items())]
+            lines += [
+                "# HELP guideai_llm_tokens_total Tokens by agent role and kind (prompt, response, cached).",
+                "# TYPE guideai_llm_tokens_total counter",
+            ]
+            lines += [f'guideai_llm_tokens_total{{role="{role}",kind="{kind}"}} {count}'
+                      for (role, kind), count in sorted(self._tokens.items())]
+            lines += [
+                "# HELP guideai_llm_call_seconds_total Wall time spent in model calls by agent role.",
+                "# TYPE guideai_llm_call_seconds_total counter",
+            ]
+            lines += [f'guideai_llm_call_seconds_total{{role="{role}"}} {seconds:.6f}'
+                      for role, seconds in sorted(self._seconds.items())]
+            lines += [
+                "# HELP guideai_llm_errors_total Failed model calls by agent role.",
+                "# TYPE guideai_llm_errors_total counter",
+            ]
+            lines += [f'guideai_llm_errors_total{{role="{role}"}} {count}'
+                      for role, count in sorted(self._errors.items())]
+        return "\n".join(lines) + "\n"
+
+    def export_jsonl(self, out: TextIO, tour_id: Optional[str] = None) -> int:
+        """
+        Write recorded spans as JSON lines.
+
+        Args:
+            out (file): Text stream to write to
+            tour_id (str, optional): Only export spans of this tour
+
+        Returns:
+            int: Number of spans written
+        """
+        count = 0
+        for span in self._spans_for(tour_id):
+            out.write(json.dumps(span.to_dict()) + "\n")
+            count += 1
+        return count
+
+    def tour_summary(self, tour_id: str) -> Dict[str, Any]:
+        """
+        Summarize one tour: calls, tokens, time and critical path.
+
+        The critical path is rebuilt from timing alone: starting from the
+        last span to finish, repeatedly step to the span that finished most
+        recently before the current one started.
+
+        Args:
+            tour_id (str): Tour to summarize
+
+        Returns:
+            dict: Summary metrics
+        """
+        spans = sorted(self._spans_for(tour_id), key=lambda s: s.end)
+        calls: Dict[str, int] = defaultdict(int)
+        models: Dict[str, Dict[str, float]] = {}
+        roles: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for span in spans:
+            calls[span.name] += 1
+            model = span.model or "unknown"
+            role_models = roles.setdefault(span.name, {})
+            for usage in (models.setdefault(model, _usage()), role_models.setdefault(model, _usage())):
+                usage["calls"] += 1
+                usage["prompt_tokens"] += span.prompt_tokens
+                usage["cached_tokens"] += span.cached_tokens
+                usage["response_tokens"] += span.response_tokens
+                usage["call_seconds"] = round(usage["call_seconds"] + span.duration, 6)
+
+        path: List[Span] = []
+        current = spans[-1] if spans else None
+        while current is not None:
+            path.append(current)
+            earlier = [s for s in spans if s.end <= current.start]
+            current = earlier[-1] if earlier else None
+        path.reverse()
+
+        wall = (spans[-1].end - min(s.start for s in spans)) if spans else 0.0
+        return {
+            "tour_id": tour_id,
+            "calls": dict(calls),
+            "models": models,
+            "roles": roles,
+            "total_calls": len(spans),
+            "prompt_tokens": sum(s.prompt_tokens for s in spans),
+            "response_tokens": sum(s.response_tokens for s in spans),
+            "cached_tokens": sum(s.cached_tokens for s in spans),
+            "uncached_prompt_tokens": sum(max(s.prompt_tokens - s.cached_tokens, 0) for s in spans),
+            "cache_hits": sum(1 for s in spans if s.cache == "hit"),
+            "errors": sum(1 for s in spans if s.error),
+            "wall_seconds": round(wall, 6),
+            "call_seconds": round(sum(s.duration for s in spans), 6),
+            "critical_path_seconds": round(sum(s.duration for s in path), 6),
+            "critical_path": [
+                {"name": s.name, "stop_index": s.stop_index, "revision": s.revision, "duration": round(s.duration, 6)}
+                for s in path
+            ],
+        }
+
+    def _spans_for(self, tour_id: Optional[str]) -> List[Span]:
+        with self._lock:
+            return [s for s in self.spans if tour_id is None or s.tour_id == tour_id]
+
+
+class JsonlSpanExporter:
+    """
+    Hook that appends each finished span to a JSON-lines file.
+
+    Attributes:
+        path (str): Output file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(span.to_dict()) + "\n")
+
+
+class TracingBackend(LLMBackend):
+    """
+    LLMBackend wrapper that records a Span for every call.
+
+    Attributes:
+        inner (LLMBackend): Backend being traced
+        tracer (Tracer): Destination for spans
+    """
+
+    def __init__(self, inner: LLMBackend, tracer: Tracer) -> None:
+        self.inner = inner
+        self.tracer = tracer
+
+    def generate_content(self, *, model, contents, config=None):
+        with self.tracer.span(model=model) as span:
+            response = self.inner.generate_content(model=model, contents=contents, config=config)
+            _record_usage(span, response)
+            return response
+
+    async def agenerate_content(self, *, model, contents, config=None):
+        with self.tracer.span(model=model) as span:
+            response = await self.inner.agenerate_content(model=model, contents=contents, config=config)
+            _record_usage(span, response)
+            return response
+
+    def stream_content(self, *, model, contents, config=None, on_chunk):
+        with self.tracer.span(model=model, streamed=True) as span:
+            response = self.inner.stream_content(model=model, contents=contents, config=config, on_chunk=on_chunk)
+            _record_usage(span, response)
+            return response
+
+    async def astream_content(self, *, model, contents, config=None, on_chunk):
+        with self.tracer.span(model=model, streamed=True) as span:
+            response = await self.inner.astream_content(
+                model=model, contents=contents, config=config, on_chunk=on_chunk)
+            _record_usage(span, response)
+            return response
+
+
+def _usage() -> Dict[str, float]:
+    return {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "response_tokens": 0, "call_seconds": 0.0}
+
+
+def _record_usage(span: Span, response) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    span.prompt_tokens = usage.prompt_token_count or 0
+    span.response_tokens = usage.candidates_token_count or 0
+    span.cached_tokens = usage.cached_content_token_count or 0
+
+
+_default_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer the agents report to.
+
+    Returns:
+        Tracer: The shared tracer
+    """
+    return _default_tracer
+
+
+def traced(backend: LLMBackend, tracer: Optional[Tracer] = None) -> LLMBackend:
+    """
+    Wrap a backend so its calls are recorded.
+
+    Args:
+        backend (LLMBackend): Backend to wrap
+        tracer (Tracer, optional): Destination, defaults to the shared tracer
+
+    Returns:
+        LLMBackend: The traced backend
+    """
+    return TracingBackend(backend, tracer or _default_tracer)
@@ -1,22 +1,95 @@
-import re
+from __future__ import annotations
+
+import asyncio
+import contextvars
 import json
-import os
-from typing import List, Dict, TypedDict, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator, List, Dict, TypedDict, Optional, Tuple
 from dataclasses import dataclass
-from plannerAgent import Agentcall
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-from google import genai
-from google.genai import types
+from llmBackend import LLMBackend, get_default_backend
+from responseCache import get_shared_cache, with_cache
+from contextCache import TOUR, ContextCache, get_context_cache, with_context_cache
+from tracing import Tracer, get_tracer, trace_context, traced
+from continuityContext import ContinuityDigest, truncate_to_budget
+from tourOutput import StreamingMarkdownWriter, patch_markdown, render_tour_markdown
+from draftScreen import DraftScreener, ScreenConfig
+from modelPolicy import ModelPolicy, RevisionHistory, savings
+
+# google.genai and langgraph take most of a second to import; they are loaded on first use.
+if TYPE_CHECKING:
+    from google.genai import types
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.graph.state import CompiledStateGraph
+
+# System prompts are module constants so every call (and every context cache) sees the same prefix.
+WRITER_SYSTEM_PROMPT = """
+ROLE: You are an award-winning Audio Tour Script Writer and Local Historian. Your goal is to turn dry facts into "theatre for the ears."
+
+TONE: 
+- Engaging, warm, and slightly witty. 
+- Think "National Geographic meets a friendly local pub guide."
+- Use "Verbal Signposting" (e.g., "If you look to your left," "Now, notice the brickwork...").
+
+CONTENT GUIDELINES:
+1. SENSORY DETAILS: Don't just tell history; describe the smell of the coal smoke, the sound of the frontier wagons, or the vibe of a modern college game day.
+2. THE "HUMOR QUOTA": Include 1-2 subtle, tasteful jokes or "fun facts" per segment. (e.g., "Blacksburg was so remote back then that even the squirrels needed a map.")
+3. RESEARCH INTEGRITY: Use your search tool to find specific, non-obvious details (names of founding families, specific dates, or quirky local legends).
+4. PACING: Write for the ear. Use shorter sentences. Avoid complex jargon unless you explain it immediately.
+5. TRANSITIONS: Always end the segment by hinting at the next destination to keep the listener moving.
+
+STRUCTURE:
+- Intro: Hook the listener immediately.
+- The "Meat": Deep dive into the history/directive.
+- The "Easter Egg": One weird/funny fact nobody knows.
+- Outro: A smooth transition statement.
+"""
+
+DIRECTOR_SYSTEM_PROMPT = """
+ROLE: You are the Tour Director and Senior Editor. 
+GOAL: Ensure the script is cohesive, accurate, and flows well.
+
+CONTINUITY CHECK:
+You have access to 'PREVIOUS_SECTIONS'. If the current script discusses a topic (e.g., earthquakes) that was introduced in a previous section, 
+instruct the writer to refer back to it (e.g., "Remember the anti-seismic bracing we saw at the Golden Gate?").
+
+OUTPUT FORMAT:
+You must return a JSON object with these fields:
+1. "is_ready": boolean (true if approved, false if needs changes)
+2. "feedback": string (If false, specific instructions for the writer. If true, a brief commendation.)
+3. "best": integer, only when you are given several candidate drafts: the number of the best draft.
+   "is_ready" and "feedback" are then about that draft.
+"""
+
+# Openings that make best-of-N candidates differ; candidate 1 keeps the plain prompt.
+CANDIDATE_ANGLES = (
+    "",
+    "Open with the most striking thing a driver can see from the road.",
+    "Open with a person from this story and tell it through them.",
+    "Open with the most surprising fact about this place.",
+    "Open with a question the segment then answers.",
+)
+
+# Receives (revision, text_chunk) while a writer draft streams in.
+TokenCallback = Callable[[int, str], None]
 
 class AgentState(TypedDict):
     point_data: dict 
     route: str
     completed_sections: List[str] 
+    sections_ref: str
+    agenda_outline: str
+    agenda_ref: str
+    continuity: str
     transcript: str
     feedback: str
     revision_count: int
     is_ready: bool
+    screen_passed: bool
+    revision_cap: int
+    policy_cap: int
+    candidates: List[str]
+    defer_outcome: bool
     
 @dataclass
 class TourConfig:
@@ -27,6 +100,32 @@ class TourConfig:
     max_revisions: int = 3
     writer_temperature: float = 0.7
     director_temperature: float = 0.2
+    max_concurrency: int = 4
+    enable_cache: bool = True
+    cache_path: Optional[str] = None
+    context_token_budget: int = 600
+    revision_draft_token_budget: int = 1500
+    checkpoint_path: Optional[str] = None
+    enable_screening: bool = True
+    require_draft_structure: bool = False
+    min_draft_words: int = 120
+    max_draft_words: int = 1500
+    max_draft_overlap: float = 0.5
+    speculation_lookahead: int = 1
+    speculation_threshold: float = 0.6
+    enable_context_cache: bool = True
+    stop_library_path: Optional[str] = None
+    library_reuse_threshold: float = 0.85
+    library_adapt_threshold: float = 0.55
+    fast_model_name: Optional[str] = None
+    adaptive_revisions: bool = False
+    revision_history_path: Optional[str] = None
+    revision_target_approval: float = 0.95
+    checkpoint_max_threads: int = 1000
+    keep_checkpoint_history: bool = False
+    draft_candidates: int = 1
+    candidate_selection: str = "director"
+    deadline_round_seconds: float = 20.0
     
 # --- Core Logic Classes ---
 
@@ -34,36 +133,215 @@ class TourContentGenerator:
     '''
     Handles the Langgraph workflow and agent nodes
     '''
-    def __init__(self, config: TourConfig):
+    def __init__(self, config: TourConfig, backend: Optional[LLMBackend] = None, tracer: Optional[Tracer] = None,
+                 context_cache: Optional[ContextCache] = None):
         self.config = config if config else TourConfig()
-        self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
-        self.workflow = self._build_graph()
+        self.cache = get_shared_cache(self.config.cache_path) if self.config.enable_cache else None
+        self.tracer = tracer or get_tracer()
+        self.context_cache = (context_cache or get_context_cache()) if self.config.enable_context_cache else None
+        self.backend = traced(with_cache(
+            with_context_cache(backend or get_default_backend(), self.context_cache, TOUR), self.cache
+        ), self.tracer)
+        self.screener = DraftScreener(ScreenConfig(
+            min_words=self.config.min_draft_words,
+            max_words=self.config.max_draft_words,
+            max_overlap=self.config.max_draft_overlap,
+            require_structure=self.config.require_draft_structure
+        )) if self.config.enable_screening else None
+        self.policy = ModelPolicy(
+            self.config.model_name,
+            self.config.fast_model_name,
+            self.config.max_revisions,
+            adaptive=self.config.adaptive_revisions,
+            target_approval=self.config.revision_target_approval,
+            history=RevisionHistory(self.config.revision_history_path) if self.config.revision_history_path else None
+        )
+        self._workflow = None
+        self._async_workflow = None
+        self._checkpointer = None
+        self._tools = None
+        # Approved sections per tour, shared with stop threads by reference instead of copied into their checkpoints
+        self.sections: Dict[str, List[str]] = {}
+        # Agenda outline per tour, the shared part of every writer and director prefix (see _tour_instruction)
+        self.outlines: Dict[str, str] = {}
+        # Ranks best-of-N candidates when the screen is off; its counters are not reported
+        self.ranker = self.screener or DraftScreener(ScreenConfig(
+            min_words=self.config.min_draft_words,
+            max_words=self.config.max_draft_words,
+            max_overlap=self.config.max_draft_overlap,
+            require_structure=self.config.require_draft_structure
+        ))
+        self.stop_outcomes: Dict[str, int] = {"approved": 0, "max_revisions": 0}
+
+    @property
+    def checkpointer(self):
+        '''
+        Checkpointer shared by both graphs: SQLite when config.checkpoint_path is set, in-memory otherwise.
+        Both are bounded (see checkpointStore) unless config.keep_checkpoint_history asks for a plain MemorySaver.
+        '''
+        if self._checkpointer is None:
+            if self.config.checkpoint_path:
+                from checkpointStore import SqliteCheckpointSaver
+                self._checkpointer = SqliteCheckpointSaver(self.config.checkpoint_path,
+                                                           max_threads=self.config.checkpoint_max_threads)
+            elif self.config.keep_checkpoint_history:
+                from langgraph.checkpoint.memory import MemorySaver
+                self._checkpointer = MemorySaver()
+            else:
+                from checkpointStore import BoundedMemorySaver
+                self._checkpointer = BoundedMemorySaver(self.config.checkpoint_max_threads)
+        return self._checkpointer
+
+    def share_sections(self, tour_id: str, sections: List[str]) -> Dict:
+        '''
+        State fields that give a stop access to the tour's approved sections.
+        The list is registered under the tour id and passed by reference; with keep_checkpoint_history it is copied
+        into the state as before.
+        '''
+        if self.config.keep_checkpoint_history:
+            return {"completed_sections": sections}
+        self.sections[tour_id] = sections
+        return {"sections_ref": tour_id}
+
+    def share_agenda(self, tour_id: str, parsed_points: List[Dict]) -> Dict:
+        '''
+        State fields that give a stop the tour's agenda outline, passed by reference like share_sections
+        '''
+        outline = self.outlines.get(tour_id) or self._render_outline(parsed_points)
+        if self.config.keep_checkpoint_history:
+            return {"agenda_outline": outline}
+        self.outlines[tour_id] = outline
+        return {"agenda_ref": tour_id}
+
+    @staticmethod
+    def _render_outline(parsed_points: List[Dict]) -> str:
+        return "\n".join(
+            f"STOP {k+1}: {point['title']}\nSummary: {point['summary']}\nDirective: {point['directive']}"
+            for k, point in enumerate(parsed_points)
+        )
+
+    def _completed_sections(self, state: AgentState) -> List[str]:
+        return state.get('completed_sections') or self.sections.get(state.get('sections_ref'), [])
+
+    def compact(self, thread_config: Dict):
+        '''
+        Keeps only the latest checkpoint of a stop whose graph has finished
+        '''
+        if hasattr(self.checkpointer, "prune_thread"):
+            self.checkpointer.prune_thread(thread_config["configurable"]["thread_id"])
+
+    def release(self, tour_id: str):
+        '''
+        Drops a finished tour's stop threads and shared sections from memory
+        '''
+        self.sections.pop(tour_id, None)
+        self.outlines.pop(tour_id, None)
+        if self._checkpointer is not None and hasattr(self._checkpointer, "release"):
+            self._checkpointer.release(tour_id)
+
+    def memory_stats(self) -> Dict:
+        '''
+        Checkpoint gauges (see BoundedMemorySaver.memory_stats) plus the shared section lists
+        '''
+        stats = self.checkpointer.memory_stats() if hasattr(self.checkpointer, "memory_stats") else {}
+        stats["section_lists"] = len(self.sections)
+        stats["section_bytes"] = sum(len(s) for sections in self.sections.values() for s in sections)
+        return stats
+
+    @property
+    def workflow(self) -> CompiledStateGraph:
+        '''
+        Compiled synchronous graph, built on first use
+        '''
+        if self._workflow is None:
+            self._workflow = self._build_graph()
+        return self._workflow
+
+    @property
+    def async_workflow(self) -> CompiledStateGraph:
+        '''
+        Compiled async graph, built on first use
+        '''
+        if self._async_workflow is None:
+            self._async_workflow = self._build_graph(use_async=True)
+        return self._async_workflow
         
     def _should_continue(self, state: AgentState) -> str:
         '''
         Routing logic for the conditional edge 
         Returns 'loop' to go back to writer or 'end' to finish
+        Runs with defer_outcome set leave record_outcome to the caller, which may still discard the attempt.
         '''
-        if state.get('revision_count',0) >= self.config.max_revisions:
-            print("Max revisions ({self.config.max_revisions} reached. Ending process.")      
-            return "end"
-        
+        cap = state.get('revision_cap') or self.config.max_revisions
         if state.get('is_ready'):
             print("Director approved the script. Ending process.")
-            return "end"
-        
-        return "loop"
+        elif state.get('revision_count',0) >= cap:
+            print(f"Max revisions ({cap}) reached. Ending process.")
+        else:
+            return "loop"
+
+        if not state.get('defer_outcome'):
+            self.record_outcome(state)
+        return "end"
+
+    def record_outcome(self, state: AgentState):
+        '''
+        Counts a finished stop in stop_outcomes and feeds it into the revision history the adaptive caps are learned from
+        '''
+        cap = state.get('revision_cap') or self.config.max_revisions
+        self.stop_outcomes["approved" if state.get('is_ready') else "max_revisions"] += 1
+        if self.policy.adaptive:
+            self.policy.record(state['point_data'], cap, state.get('revision_count', 0), bool(state.get('is_ready')),
+                               policy_cap=state.get('policy_cap'))
+
+    def _writer_update(self, state: AgentState, texts: List[str]) -> Dict:
+        '''
+        State update for a finished writer round; the stop's revision cap is fixed when its first draft is written.
+        With best-of-N drafting all candidates are kept for the screen and director to choose from.
+        '''
+        update = {
+            "transcript": texts[0],
+            "revision_count": state['revision_count'] + 1,
+            "revision_cap": state.get('revision_cap') or self.policy.revision_cap(state['point_data'])
+        }
+        if self.config.draft_candidates > 1:
+            update["candidates"] = texts
+        return update
+
+    def _after_screen(self, state: AgentState) -> str:
+        '''
+        Routing after the local screen: 'director' for drafts that passed, otherwise as _should_continue
+        '''
+        if state.get('screen_passed'):
+            return "director"
+        return self._should_continue(state)
             
                  
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self, use_async: bool = False) -> CompiledStateGraph:
         '''
-        Constructs the state machine for the writing process
+        Constructs the state machine for the writing process.
+        With use_async the nodes await the async backend calls, so the graph must be driven with ainvoke.
         '''
+        from langgraph.graph import StateGraph, END
+
         workflow = StateGraph(AgentState)
-        workflow.add_node("writer", self.writer_node)
-        workflow.add_node("director", self.director_node)
+        workflow.add_node("writer", self.awriter_node if use_async else self.writer_node)
+        workflow.add_node("director", self.adirector_node if use_async else self.director_node)
         workflow.set_entry_point("writer")
-        workflow.add_edge("writer", "director")
+        if self.screener is not None:
+            workflow.add_node("screen", self.screen_node)
+            workflow.add_edge("writer", "screen")
+            workflow.add_conditional_edges(
+                "screen",
+                self._after_screen,
+                {
+                    "director": "director",
+                    "loop": "writer",
+                    "end": END
+                }
+            )
+        else:
+            workflow.add_edge("writer", "director")
         workflow.add_conditional_edges(
             "director",
             self._should_continue,
@@ -73,94 +351,225 @@ class TourContentGenerator:
             }
         )
 
-        return workflow.compile(checkpointer=MemorySaver())
+        return workflow.compile(checkpointer=self.checkpointer)
     
-    def writer_node(self,state: AgentState) -> Dict:
+    def _continuity_text(self, state: AgentState) -> str:
         '''
-        Creative writer Agent Logic
+        Size-capped digest of the earlier stops.
+        Uses the incrementally maintained digest from the caller when present, otherwise summarizes completed_sections.
         '''
-        tools = [types.Tool(google_search=types.GoogleSearch())]
-        
-        WRITER_SYSTEM_PROMPT = """
-        ROLE: You are an award-winning Audio Tour Script Writer and Local Historian. Your goal is to turn dry facts into "theatre for the ears."
-
-        TONE: 
-        - Engaging, warm, and slightly witty. 
-        - Think "National Geographic meets a friendly local pub guide."
-        - Use "Verbal Signposting" (e.g., "If you look to your left," "Now, notice the brickwork...").
-
-        CONTENT GUIDELINES:
-        1. SENSORY DETAILS: Don't just tell history; describe the smell of the coal smoke, the sound of the frontier wagons, or the vibe of a modern college game day.
-        2. THE "HUMOR QUOTA": Include 1-2 subtle, tasteful jokes or "fun facts" per segment. (e.g., "Blacksburg was so remote back then that even the squirrels needed a map.")
-        3. RESEARCH INTEGRITY: Use your search tool to find specific, non-obvious details (names of founding families, specific dates, or quirky local legends).
-        4. PACING: Write for the ear. Use shorter sentences. Avoid complex jargon unless you explain it immediately.
-        5. TRANSITIONS: Always end the segment by hinting at the next destination to keep the listener moving.
-
-        STRUCTURE:
-        - Intro: Hook the listener immediately.
-        - The "Meat": Deep dive into the history/directive.
-        - The "Easter Egg": One weird/funny fact nobody knows.
-        - Outro: A smooth transition statement.
-    """
+        if state.get('continuity'):
+            return state['continuity']
+        sections = self._completed_sections(state)
+        if sections:
+            return ContinuityDigest.from_sections(sections, self.config.context_token_budget).render()
+        return ""
+
+    @staticmethod
+    def _token_callback(state: AgentState, config: Optional[RunnableConfig]) -> Optional[Callable[[str], None]]:
+        '''
+        Binds the run's on_token callback to the revision being written, if one was supplied
+        '''
+        on_token = ((config or {}).get("configurable") or {}).get("on_token")
+        if on_token is None:
+            return None
+        revision = state['revision_count'] + 1
+        return lambda chunk: on_token(revision, chunk)
+
+    def _tour_instruction(self, system_prompt: str, state: AgentState) -> str:
+        '''
+        System instruction for one tour: the role prompt plus the route and the agenda outline, which are shared by
+        every call of the tour and so belong in the cacheable prefix rather than the per-stop prompt
+        '''
+        instruction = f"{system_prompt}\nTOUR ROUTE: {state['route']}\n"
+        outline = state.get('agenda_outline') or self.outlines.get(state.get('agenda_ref'), "")
+        if outline:
+            instruction += f"\nTOUR AGENDA (every stop of this tour, in driving order):\n{outline}\n"
+        return instruction
+
+    def _writer_tools(self) -> list:
+        '''
+        Search tool for the writer, built once per generator
+        '''
+        if self._tools is None:
+            from google.genai import types
+
+            self._tools = [types.Tool(google_search=types.GoogleSearch())]
+        return self._tools
+
+    def _writer_request(self, state: AgentState) -> tuple[str, types.GenerateContentConfig]:
+        '''
+        Builds the prompt and generation config for a writer call
+        '''
+        from google.genai import types
+
         prompt = f"""
             GENERATE TOUR SEGMENT:
-            Route Name: {state['route']}
             Point Title: {state['point_data']['title']}
             Summary: {state['point_data']['summary']}
             Specific Directive: {state['point_data']['directive']}
             """
         
         if state.get('feedback'):
+            previous_draft = truncate_to_budget(state['transcript'], self.config.revision_draft_token_budget)
             prompt += f"\n\n*** CRITICAL FEEDBACK FROM DIRECTOR ***\n{state['feedback']}"
-            prompt += f"\n\nPREVIOUS DRAFT (For Reference):\n{state['transcript']}"
+            prompt += f"\n\nPREVIOUS DRAFT (For Reference):\n{previous_draft}"
     
     # Add context of previous sections if available (so writer knows what was already said)
-        if state.get('completed_sections'):
-            history_text = "\n---\n".join(state['completed_sections'])
+        history_text = self._continuity_text(state)
+        if history_text:
             prompt += f"\n\nCONTEXT (Previously written stops):\n{history_text}"
             
         
-        response = self.client.models.generate_content(
-            model=self.config.model_name, 
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=WRITER_SYSTEM_PROMPT,
-                tools=tools,
-                temperature=self.config.writer_temperature
-            )
+        return prompt, types.GenerateContentConfig(
+            system_instruction=self._tour_instruction(WRITER_SYSTEM_PROMPT, state),
+            tools=self._writer_tools(),
+            temperature=self.config.writer_temperature
         )
+
+    @staticmethod
+    def _candidate_prompt(prompt: str, index: int, count: int) -> str:
+        '''
+        Prompt for best-of-N candidate index; candidate 0 is the plain prompt, the others ask for a different opening
+        '''
+        if index == 0:
+            return prompt
+        angle = CANDIDATE_ANGLES[index % len(CANDIDATE_ANGLES)] or CANDIDATE_ANGLES[1]
+        return f"{prompt}\n\nCANDIDATE {index + 1} OF {count}: {angle}"
+
+    def _candidate_attributes(self, index: int) -> Dict:
+        return {"candidate": index} if self.config.draft_candidates > 1 else {}
+
+    def _write_candidate(self, state: AgentState, prompt: str, gen_config, index: int,
+                         on_token: Optional[Callable[[str], None]]) -> str:
+        model = self.policy.writer_model(state['revision_count'])
+        contents = self._candidate_prompt(prompt, index, self.config.draft_candidates)
+        with trace_context(role="writer", revision=state['revision_count'] + 1, **self._candidate_attributes(index)):
+            if on_token:
+                response = self.backend.stream_content(
+                    model=model,
+                    contents=contents,
+                    config=gen_config,
+                    on_chunk=on_token
+                )
+            else:
+                response = self.backend.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=gen_config
+                )
+        return response.text
+
+    async def _awrite_candidate(self, state: AgentState, prompt: str, gen_config, index: int,
+                                on_token: Optional[Callable[[str], None]]) -> str:
+        model = self.policy.writer_model(state['revision_count'])
+        contents = self._candidate_prompt(prompt, index, self.config.draft_candidates)
+        with trace_context(role="writer", revision=state['revision_count'] + 1, **self._candidate_attributes(index)):
+            if on_token:
+                response = await self.backend.astream_content(
+                    model=model,
+                    contents=contents,
+                    config=gen_config,
+                    on_chunk=on_token
+                )
+            else:
+                response = await self.backend.agenerate_content(
+                    model=model,
+                    contents=contents,
+                    config=gen_config
+                )
+        return response.text
+
+    def writer_node(self,state: AgentState, config: Optional[RunnableConfig] = None) -> Dict:
+        '''
+        Creative writer Agent Logic.
+        Streams the draft when an on_token callback is set in the run's configurable.
+        With config.draft_candidates > 1 the candidates are written concurrently and nothing streams: the director
+        may pick any of them, so no draft is known to be the one the listener will hear until it has reviewed them.
+        '''
+        prompt, gen_config = self._writer_request(state)
+        count = max(1, self.config.draft_candidates)
+        on_token = self._token_callback(state, config) if count == 1 else None
+        if count == 1:
+            return self._writer_update(state, [self._write_candidate(state, prompt, gen_config, 0, on_token)])
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix="guideai-candidate") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._write_candidate, state, prompt, gen_config, i,
+                            on_token)
+                for i in range(count)
+            ]
+            texts = [future.result() for future in futures]
+        return self._writer_update(state, texts)
+
+    async def awriter_node(self, state: AgentState, config: Optional[RunnableConfig] = None) -> Dict:
+        '''
+        Async variant of writer_node
+        '''
+        prompt, gen_config = self._writer_request(state)
+        count = max(1, self.config.draft_candidates)
+        on_token = self._token_callback(state, config) if count == 1 else None
+        texts = await asyncio.gather(*(
+            self._awrite_candidate(state, prompt, gen_config, i, on_token) for i in range(count)
+        ))
+        return self._writer_update(state, list(texts))
         
-        return {
-            "transcript": response.text,
-            "revision_count": state['revision_count'] + 1
-        }
-        
-    def director_node(self,state: AgentState) -> Dict:
+    def screen_node(self, state: AgentState) -> Dict:
         '''
-        Critical director Agent Logic
+        Local pre-director checks (length, repetition of earlier stops, and structure if required).
+        A failing draft goes back to the writer with feedback, skipping the director call.
+        Best-of-N candidates are ranked; the ones that pass go on to the director, best first, and the writer is only
+        called again if none passes.
+        '''
+        if state.get('candidates'):
+            ranked = self.screener.rank(state['candidates'], self._completed_sections(state))
+            passing = [draft for draft, result in ranked if result.passed]
+            if passing:
+                return {"screen_passed": True, "transcript": passing[0], "candidates": passing}
+            best, result = ranked[0]
+            print(f"Screen sent all {len(ranked)} candidates of draft {state['revision_count']} back to the writer: "
+                  f"{', '.join(result.reasons)}")
+            return {"screen_passed": False, "is_ready": False, "feedback": result.feedback, "transcript": best,
+                    "candidates": []}
+        result = self.screener.screen(state['transcript'], self._completed_sections(state))
+        if result.passed:
+            return {"screen_passed": True}
+        print(f"Screen sent draft {state['revision_count']} back to the writer: {', '.join(result.reasons)}")
+        return {"screen_passed": False, "is_ready": False, "feedback": result.feedback}
+
+    def _director_request(self, state: AgentState) -> tuple[str, types.GenerateContentConfig]:
         '''
-        DIRECTOR_SYSTEM_PROMPT = """
-        ROLE: You are the Tour Director and Senior Editor. 
-        GOAL: Ensure the script is cohesive, accurate, and flows well.
+        Builds the prompt and generation config for a director call
+        '''
+        from google.genai import types
+
         
-        CONTINUITY CHECK:
-        You have access to 'PREVIOUS_SECTIONS'. If the current script discusses a topic (e.g., earthquakes) that was introduced in a previous section, 
-        instruct the writer to refer back to it (e.g., "Remember the anti-seismic bracing we saw at the Golden Gate?").
+        prev_context = self._continuity_text(state) or "No previous sections."
+        candidates = self._review_candidates(state)
+
+        if len(candidates) > 1:
+            drafts = "\n".join(f"--- DRAFT {i} ---\n{draft}" for i, draft in enumerate(candidates, 1))
+            prompt = f"""
+        PREVIOUS SECTIONS (Context):
+        {prev_context}
         
-        OUTPUT FORMAT:
-        You must return a JSON object with two fields:
-        1. "is_ready": boolean (true if approved, false if needs changes)
-        2. "feedback": string (If false, specific instructions for the writer. If true, a brief commendation.)
-        """
+        CANDIDATE DRAFTS TO REVIEW:
+        {drafts}
         
-        prev_context = "\n---\n".join(state['completed_sections']) if state['completed_sections'] else "No previous sections."
-
-        prompt = f"""
+        Review these alternative drafts of the same segment and pick the best one.
+        1. Is the tone correct?
+        2. Does it ignore context from previous sections?
+        3. Is it accurate and not misleading?
+        
+        Provide your decision in JSON, with an extra "best" field holding the number of the best draft;
+        "is_ready" and "feedback" are about that draft.
+        """
+        else:
+            prompt = f"""
         PREVIOUS SECTIONS (Context):
         {prev_context}
         
         CURRENT DRAFT TO REVIEW:
-        {state['transcript']}
+        {candidates[0] if candidates else state['transcript']}
         
         Review this draft. 
         1. Is the tone correct?
@@ -170,25 +579,79 @@ class TourContentGenerator:
         Provide your decision in JSON.
         """
         
-        response = self.client.models.generate_content(
-            model=self.config.model_name,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=DIRECTOR_SYSTEM_PROMPT,
-                response_mime_type="application/json", 
-                temperature=self.config.director_temperature
-            )
+        return prompt, types.GenerateContentConfig(
+            system_instruction=self._tour_instruction(DIRECTOR_SYSTEM_PROMPT, state),
+            response_mime_type="application/json", 
+            temperature=self.config.director_temperature
         )
-        
+
+    def _review_candidates(self, state: AgentState) -> List[str]:
+        '''
+        Drafts the director reviews: every best-of-N candidate in one batched review, or with
+        candidate_selection "local" only the best one by the local ranker (already ranked when the screen ran)
+        '''
+        candidates = state.get('candidates') or []
+        if len(candidates) < 2 or self.config.candidate_selection == "director":
+            return candidates
+        if self.screener is None:
+            return [self.ranker.rank(candidates, self._completed_sections(state))[0][0]]
+        return candidates[:1]
+
+    def _director_update(self, state: AgentState, response) -> Dict:
+        '''
+        Director decision as a state update; a batched review also makes its pick the stop's transcript
+        '''
+        update = self._parse_director_response(response)
+        candidates = self._review_candidates(state)
+        if candidates:
+            best = update.pop("best", 1)
+            update["transcript"] = candidates[best - 1 if isinstance(best, int) and 0 < best <= len(candidates) else 0]
+            update["candidates"] = []
+        return update
+
+    def director_node(self,state: AgentState) -> Dict:
+        '''
+        Critical director Agent Logic
+        '''
+        prompt, config = self._director_request(state)
+        with trace_context(role="director", revision=state['revision_count']):
+            response = self.backend.generate_content(
+                model=self.policy.director_model(),
+                contents=prompt,
+                config=config
+            )
+        return self._director_update(state, response)
+
+    async def adirector_node(self, state: AgentState) -> Dict:
+        '''
+        Async variant of director_node
+        '''
+        prompt, config = self._director_request(state)
+        with trace_context(role="director", revision=state['revision_count']):
+            response = await self.backend.agenerate_content(
+                model=self.policy.director_model(),
+                contents=prompt,
+                config=config
+            )
+        return self._director_update(state, response)
+
+    @staticmethod
+    def _parse_director_response(response) -> Dict:
+        '''
+        Extracts the director decision from the JSON response
+        '''
         try:
             result = json.loads(response.text)
-            return {
+            decision = {
             "is_ready": result['is_ready'],
             "feedback": result['feedback']
         }
+            if "best" in result:
+                decision["best"] = result["best"]
+            return decision
         
         except Exception as e:
-            result = {"is_ready": False, "feedback": f"Parsing Error: {str(e)}. Please ensure your response is valid JSON."}
+            return {"is_ready": False, "feedback": f"Parsing Error: {str(e)}. Please ensure your response is valid JSON."}
         
 
     
@@ -197,70 +660,188 @@ class TourArchitect:
     Orchestrates the overall tour generation process and parses the llm output from the architect agent.
     '''
     
-    def __init__(self,config: Optional[TourConfig] = None):
-        self.config = config
-        self.generator = TourContentGenerator(config)
+    def __init__(self,config: Optional[TourConfig] = None, backend: Optional[LLMBackend] = None,
+                 tracer: Optional[Tracer] = None, context_cache: Optional[ContextCache] = None):
+        self.config = config if config else TourConfig()
+        self.generator = TourContentGenerator(self.config, backend, tracer, context_cache)
+        self.tour_id: Optional[str] = None
+        self.speculation_stats = None
+        self.deadline_scheduler = None
+        self.regeneration_plan = None
+        self.store = None
+        if self.config.checkpoint_path:
+            from checkpointStore import TourStore
+            self.store = TourStore(self.config.checkpoint_path)
+        self.library = None
+        if self.config.stop_library_path:
+            from stopLibrary import StopLibrary
+            self.library = StopLibrary(self.config.stop_library_path,
+                                       reuse_threshold=self.config.library_reuse_threshold,
+                                       adapt_threshold=self.config.library_adapt_threshold)
+
+    def summary(self, tour_id: Optional[str] = None) -> Dict:
+        '''
+        Per-tour trace summary (calls, tokens, critical path) for the given or most recent tour.
+        '''
+        return self.generator.tracer.tour_summary(tour_id or self.tour_id)
+
+    def memory_stats(self) -> Dict:
+        '''
+        Memory gauges: checkpoint store contents and the process's resident set size
+        '''
+        from checkpointStore import rss_bytes
+        return dict(self.generator.memory_stats(), rss_bytes=rss_bytes())
+
+    def policy_report(self, tour_id: Optional[str] = None, baseline: Optional[Dict] = None,
+                      model_speedups: Optional[Dict[str, float]] = None) -> Dict:
+        '''
+        Model cascade and revision cap outcome for the given or most recent tour: cost, call latency and tokens
+        against a uniform run (every call on the strong model with the full revision cap; recorded as baseline, a
+        trace summary of such a run, or estimated - see modelPolicy.savings), plus the learned caps and per-category
+        approval rates
+        '''
+        policy = self.generator.policy.stats()
+        report = savings(self.summary(tour_id), self.config.model_name, policy["drafts_avoided"], baseline,
+                         model_speedups)
+        policy.pop("drafts_avoided")
+        report.update(policy)
+        return report
+
+    def _start_tour(self, tour_id: Optional[str] = None, raw_input_data: str = "",
+                    filename: Optional[str] = None) -> str:
+        '''
+        Picks the tour id (new unless resuming) and records the tour's input when checkpointing is enabled
+        '''
+        self.tour_id = tour_id or uuid.uuid4().hex[:12]
+        if self.store is not None:
+            self.store.start_tour(self.tour_id, raw_input_data, filename)
+        return self.tour_id
+
+    def _approved_stops(self, tour_id: str) -> Dict[int, str]:
+        '''
+        Stops of this tour already approved by an earlier (interrupted) run
+        '''
+        return self.store.approved_stops(tour_id) if self.store is not None else {}
+
+    def _record_stop(self, tour_id: str, index: int, title: str, transcript: str):
+        if self.store is not None:
+            self.store.save_stop(tour_id, index, title, transcript)
+
+    @staticmethod
+    def _next_title(parsed_points: List[Dict], index: int) -> Optional[str]:
+        return parsed_points[index + 1]['title'] if index + 1 < len(parsed_points) else None
+
+    def _library_match(self, parsed_points: List[Dict], index: int, tour_id: str):
+        '''
+        Approved script from an earlier tour to reuse or adapt for this stop (see stopLibrary), if any
+        '''
+        if self.library is None:
+            return None
+        match = self.library.lookup(parsed_points[index], self._next_title(parsed_points, index),
+                                    exclude_source=tour_id,
+                                    previous_titles=[p['title'] for p in parsed_points[:index]])
+        if match is not None:
+            print(f"Library {match.action} for point {index+1}: {match.title} (similarity {match.score:.2f})")
+        return match
+
+    def _library_add(self, parsed_points: List[Dict], index: int, route_name: str, tour_id: str, transcript: str):
+        if self.library is not None:
+            self.library.add(parsed_points[index], transcript, self._next_title(parsed_points, index),
+                             route_name, tour_id, [p['title'] for p in parsed_points[:index]])
+
+    def _finish_tour(self, tour_id: str):
+        if self.store is not None:
+            self.store.finish_tour(tour_id)
+        self.generator.release(tour_id)
+        if self.generator.context_cache is not None:
+            self.generator.context_cache.release(tour_id)
+
+    def resume(self, tour_id: str) -> Optional[List[str]]:
+        '''
+        Completes a tour an earlier run left unfinished.
+        Approved stops are reused as-is; a stop that was in flight continues from its last writer/director checkpoint.
+        '''
+        if self.store is None:
+            raise ValueError("resume requires TourConfig.checkpoint_path")
+        tour = self.store.get_tour(tour_id)
+        if tour is None:
+            raise KeyError(f"Unknown tour: {tour_id}")
+        print(f"Resuming tour {tour_id}")
+        return self.run(tour['raw_input'], filename=tour['filename'] or "tour_script.md", tour_id=tour_id)
     
-    def parse_route_data(self,raw_response: str) -> tuple[List[Dict], str]:
+    def regenerate(self, raw_input_data: str, previous_tour_id: str, filename: Optional[str] = None,
+                   tour_id: Optional[str] = None) -> Optional[List[str]]:
         '''
-        Parses the raw response from the architect agent to extract route and points data.
+        Regenerates a tour after its agenda was edited, reusing the approved scripts of unchanged stops.
+        Added or changed markers are written from scratch; kept stops whose closing transition or callbacks to
+        earlier stops are affected by the edit go back to the writer with targeted feedback (see agendaDiff).
+        The result is stored as a new tour, and filename is patched in place. The plan is kept in regeneration_plan.
         '''
-        if raw_response is None:
-            return None, None
-        
-        route_match = re.search(r"(?:Primary [Rr]oute):\s*(.*)", raw_response, re.IGNORECASE)
-        primary_route = route_match.group(1).strip() if route_match else "Route not found"
+        from agendaDiff import GENERATE, RECHECK, REUSE, plan_regeneration
 
-        points_raw = re.split(r'\n(?=\d+\.\s+\*\*)', raw_response)
+        if self.store is None:
+            raise ValueError("regenerate requires TourConfig.checkpoint_path")
+        previous = self.store.get_tour(previous_tour_id)
+        if previous is None:
+            raise KeyError(f"Unknown tour: {previous_tour_id}")
+        if tour_id == previous_tour_id:
+            raise ValueError("regenerate stores the result as a new tour; pass a different tour_id")
 
-        parsed_points = []
-        for item in points_raw:
-            if "Summary:" not in item:
-                continue
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
 
-            def get_match(pattern, string):
-                match = re.search(pattern, string)
-                return match.group(1).replace('*', '').strip() if match else "Not Found"
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return None
 
-            title = get_match(r'\*\*(.*?)\*\*', item)
-            summary = get_match(r'Summary:\s*(.*)', item)
-            directive = get_match(r'Script Writer Directive:\s*(.*)', item)
-        
-            parsed_points.append({
-                "title": title,
-                "summary": summary,
-                "directive": directive
-            })
-            
-        return parsed_points, primary_route
+        old_points, _ = self.parse_route_data(previous['raw_input'])
+        plan = plan_regeneration(old_points or [], self.store.approved_stops(previous_tour_id), parsed_points)
+        self.regeneration_plan = plan
+        counts = plan.counts()
+        print(f"Regenerating tour for: {route_name} ({counts[REUSE]} reused, {counts[RECHECK]} to re-check, "
+              f"{counts[GENERATE]} to generate, {counts['removed']} removed)")
+
+        filename = filename or previous['filename'] or "tour_script.md"
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        for stop in plan.stops:
+            if stop.action == REUSE:
+                self._record_stop(tour_id, stop.index, stop.title, stop.script)
+        rechecks = {stop.index: (stop.script, stop.feedback) for stop in plan.stops if stop.action == RECHECK}
+
+        final_tour_scripts = [
+            f"STOP {i+1}: {title}\n{script}"
+            for i, title, script in self._generate_sequential(
+                parsed_points, route_name, tour_id=tour_id, raw_input_data=raw_input_data, filename=filename,
+                rechecks=rechecks)
+        ]
+
+        written = patch_markdown(filename, route_name, final_tour_scripts)
+        print(f"Patched {filename} ({written} bytes rewritten)")
+        self._finish_tour(tour_id)
+        return final_tour_scripts
+
+    def parse_route_data(self,raw_response: str) -> tuple[List[Dict], str]:
+        '''
+        Parses the raw response from the architect agent to extract route and points data.
+        Accepts structured JSON agendas as well as the legacy numbered Markdown list.
+        '''
+        from agendaSchema import parse_agenda
+
+        return parse_agenda(raw_response)
     
     def save_to_markdown(self,route_name: str, scripts: List[str], filename: str = "tour_script.md"):
         '''
         Saves the final tour script to a markdown file.
         '''
         with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"# Audio Tour: {route_name}\n")
-            f.write(f"*Generated by AI Narrative Architect & Script Writer*\n\n")
-            f.write("---\n\n")
-            
-            f.write("## Tour Stops\n")
-            for i, script in enumerate(scripts):
-                title = script.split('\n')[0].replace(f"STOP {i+1}: ", "")
-                f.write(f"{i+1}. [{title}](#stop-{i+1})\n")
-            
-            f.write("\n---\n\n")
-            
-            for i, script in enumerate(scripts):
-                content = script.replace(f"STOP {i+1}: ", f"## <a name='stop-{i+1}'></a> Stop {i+1}: ")
-                f.write(content)
-                f.write("\n\n---\n\n")
-                
+            f.write(render_tour_markdown(route_name, scripts))
+
         print(f"Tour script successfully saved to {filename}")
         
     
-    def run(self,raw_input_data : str ):
+    def run(self,raw_input_data : str, filename: str = "tour_script.md", tour_id: Optional[str] = None):
         '''
         Main method to run the tour generation process.
+        Passing the tour_id of an interrupted run resumes it (see resume).
         '''
         parsed_points, route_name = self.parse_route_data(raw_input_data)
 
@@ -270,26 +851,382 @@ class TourArchitect:
         
         print(f"Starting Tour Generation for: {route_name}")
         
+        final_tour_scripts = [
+            f"STOP {i+1}: {title}\n{script}"
+            for i, title, script in self._generate_sequential(
+                parsed_points, route_name, tour_id=tour_id, raw_input_data=raw_input_data, filename=filename)
+        ]
+            
+        self.save_to_markdown(route_name, final_tour_scripts, filename)
+        self._finish_tour(self.tour_id)
+        return final_tour_scripts
+
+    def stream(self, raw_input_data: str, filename: str = "tour_script.md",
+               on_token: Optional[Callable[[int, int, str], None]] = None,
+               tour_id: Optional[str] = None) -> Iterator[Tuple[int, str, str]]:
+        '''
+        Sequential run that yields (stop_index, title, script) as soon as each stop is approved.
+        Every approved stop is appended to filename before it is yielded; the table of contents is patched in at the end.
+        on_token, if given, receives (stop_index, revision, chunk) while writer drafts stream in
+        (not with best-of-N drafting, where no draft is streamed before the director has picked one).
+        '''
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
+
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return
+
+        print(f"Streaming Tour Generation for: {route_name}")
+
+        with StreamingMarkdownWriter(filename, route_name, [p['title'] for p in parsed_points]) as writer:
+            for i, title, script in self._generate_sequential(
+                    parsed_points, route_name, on_token, tour_id, raw_input_data, filename):
+                writer.append_stop(i, title, script)
+                yield i, title, script
+        self._finish_tour(self.tour_id)
+
+    def _generate_sequential(self, parsed_points: List[Dict], route_name: str,
+                             on_token: Optional[Callable[[int, int, str], None]] = None,
+                             tour_id: Optional[str] = None, raw_input_data: str = "",
+                             filename: Optional[str] = None,
+                             rechecks: Optional[Dict[int, Tuple[str, str]]] = None) -> Iterator[Tuple[int, str, str]]:
+        '''
+        Runs the writer/director graph for each point in order, feeding approved stops into the continuity digest.
+        Stops already approved for tour_id are not regenerated.
+        rechecks maps a stop index to (earlier script, feedback); that stop starts from the script as a first draft
+        the writer must revise instead of from a blank page.
+        With a stop library, other stops are looked up there first: a verbatim match is used without any model call
+        and a close match is adapted like a recheck. Every newly approved script is added to the library.
+        '''
+        from stopLibrary import REUSE
+
+        rechecks = rechecks or {}
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        approved = self._approved_stops(tour_id)
         final_tour_scripts = [] 
+        digest = ContinuityDigest(self.config.context_token_budget)
 
         for i, point in enumerate(parsed_points):
+            if i in approved:
+                print(f"\nPoint {i+1} already approved: {point['title']}")
+                final_tour_scripts.append(f"STOP {i+1}: {point['title']}\n{approved[i]}")
+                digest.add_stop(i, point['title'], approved[i])
+                yield i, point['title'], approved[i]
+                continue
+
             print(f"\nProcessing Point {i+1}: {point['title']}...")
-            
+
+            match = None if i in rechecks else self._library_match(parsed_points, i, tour_id)
+            if match is not None and match.action == REUSE:
+                self._record_stop(tour_id, i, point['title'], match.script)
+                final_tour_scripts.append(f"STOP {i+1}: {point['title']}\n{match.script}")
+                digest.add_stop(i, point['title'], match.script)
+                yield i, point['title'], match.script
+                continue
+
+            draft, feedback = (match.script, match.feedback) if match is not None else rechecks.get(i, ("", ""))
             initial_input = {
                 "point_data": point,
                 "route": route_name,
-                "completed_sections": final_tour_scripts,
-                "transcript": "",
-                "feedback": "",
-                "revision_count": 0,
+                **self.generator.share_sections(tour_id, final_tour_scripts),
+                **self.generator.share_agenda(tour_id, parsed_points),
+                "continuity": digest.render(),
+                "transcript": draft,
+                "feedback": feedback,
+                "revision_count": 1 if draft else 0,
                 "is_ready": False
             }
-            thread_config = {"configurable": {"thread_id": f"point_{i}"}}
-            result = self.generator.workflow.invoke(initial_input, config=thread_config)
+            thread_config = {"configurable": self._configurable(tour_id, i, on_token)}
+            with trace_context(tour_id=tour_id, stop_index=i):
+                result = self._invoke_stop(initial_input, thread_config)
+            self._record_stop(tour_id, i, point['title'], result['transcript'])
+            self._library_add(parsed_points, i, route_name, tour_id, result['transcript'])
             
             final_tour_scripts.append(f"STOP {i+1}: {point['title']}\n{result['transcript']}")
-            
-        self.save_to_markdown(route_name, final_tour_scripts)
+            digest.add_stop(i, point['title'], result['transcript'])
+            yield i, point['title'], result['transcript']
+
+    def _invoke_stop(self, initial_input: Dict, thread_config: Dict) -> Dict:
+        '''
+        Runs one stop's graph, or continues it from the last checkpoint if an earlier run stopped mid-stop
+        '''
+        workflow = self.generator.workflow
+        snapshot = workflow.get_state(thread_config)
+        if snapshot.next:
+            result = workflow.invoke(None, config=thread_config)
+        elif snapshot.values.get('transcript'):
+            return snapshot.values
+        else:
+            result = workflow.invoke(initial_input, config=thread_config)
+        self.generator.compact(thread_config)
+        return result
+
+    async def _ainvoke_stop(self, initial_input: Dict, thread_config: Dict) -> Dict:
+        '''
+        Async variant of _invoke_stop
+        '''
+        workflow = self.generator.async_workflow
+        snapshot = await workflow.aget_state(thread_config)
+        if snapshot.next:
+            result = await workflow.ainvoke(None, config=thread_config)
+        elif snapshot.values.get('transcript'):
+            return snapshot.values
+        else:
+            result = await workflow.ainvoke(initial_input, config=thread_config)
+        self.generator.compact(thread_config)
+        return result
+
+    @staticmethod
+    def _configurable(tour_id: str, index: int, on_token: Optional[Callable[[int, int, str], None]]) -> Dict:
+        '''
+        Per-stop graph configuration; the thread id is scoped to the tour and on_token is bound to the stop index
+        '''
+        configurable = {"thread_id": f"{tour_id}:stop-{index}"}
+        if on_token is not None:
+            configurable["on_token"] = lambda revision, chunk: on_token(index, revision, chunk)
+        return configurable
+
+    @staticmethod
+    def _agenda_context(parsed_points: List[Dict], index: int) -> List[str]:
+        '''
+        Continuity context for concurrent runs: the agenda outline of every earlier stop.
+        Unlike approved scripts it is known up front, so each stop sees the same context regardless of completion order.
+        '''
+        return [
+            f"STOP {k+1}: {point['title']}\n{point['summary']}"
+            for k, point in enumerate(parsed_points[:index])
+        ]
+
+    async def _agenerate_point(self, i: int, parsed_points: List[Dict], route_name: str, semaphore, tour_id: str,
+                               on_token: Optional[Callable[[int, int, str], None]] = None) -> str:
+        '''
+        Runs the async graph for one point once a concurrency slot is free; returns the approved transcript.
+        Stop library matches are reused or adapted as in _generate_sequential.
+        '''
+        from stopLibrary import REUSE
+
+        point = parsed_points[i]
+        approved = self._approved_stops(tour_id)
+        if i in approved:
+            return approved[i]
+        async with semaphore:
+            print(f"\nProcessing Point {i+1}: {point['title']}...")
+            match = self._library_match(parsed_points, i, tour_id)
+            if match is not None and match.action == REUSE:
+                self._record_stop(tour_id, i, point['title'], match.script)
+                return match.script
+            result = await self._agenerate_stop(i, parsed_points, route_name, tour_id, match, on_token)
+        return result['transcript']
+
+    async def _agenerate_stop(self, i: int, parsed_points: List[Dict], route_name: str, tour_id: str, match=None,
+                              on_token: Optional[Callable[[int, int, str], None]] = None,
+                              revision_cap: Optional[int] = None, policy_cap: Optional[int] = None) -> Dict:
+        '''
+        Runs the async graph for one point that needs writing, starting from a library match's script if given,
+        and records the result; returns the final state. revision_cap, if given, replaces the policy's cap;
+        policy_cap is the cap the policy chose, so a stop cut short below it is not credited to the policy.
+        '''
+        point = parsed_points[i]
+        initial_input = {
+            "point_data": point,
+            "route": route_name,
+            "completed_sections": self._agenda_context(parsed_points, i),
+            **self.generator.share_agenda(tour_id, parsed_points),
+            "continuity": "",
+            "transcript": match.script if match else "",
+            "feedback": match.feedback if match else "",
+            "revision_count": 1 if match else 0,
+            "is_ready": False
+        }
+        if revision_cap is not None:
+            initial_input["revision_cap"] = revision_cap
+        if policy_cap is not None:
+            initial_input["policy_cap"] = policy_cap
+        thread_config = {"configurable": self._configurable(tour_id, i, on_token)}
+        with trace_context(tour_id=tour_id, stop_index=i):
+            result = await self._ainvoke_stop(initial_input, thread_config)
+        self._record_stop(tour_id, i, point['title'], result['transcript'])
+        self._library_add(parsed_points, i, route_name, tour_id, result['transcript'])
+        return result
+
+    def _concurrency_limit(self, max_concurrency: Optional[int]) -> int:
+        limit = max_concurrency or self.config.max_concurrency
+        if limit < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        return limit
+
+    async def arun(self, raw_input_data: str, max_concurrency: Optional[int] = None,
+                   filename: str = "tour_script.md", tour_id: Optional[str] = None) -> Optional[List[str]]:
+        '''
+        Runs the tour generation with up to max_concurrency stops in flight at once.
+        Scripts are returned (and saved) in route order.
+        '''
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
+
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return None
+
+        limit = self._concurrency_limit(max_concurrency)
+        semaphore = asyncio.Semaphore(limit)
+        print(f"Starting Tour Generation for: {route_name} ({limit} stops in parallel)")
+
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        transcripts = await asyncio.gather(
+            *(self._agenerate_point(i, parsed_points, route_name, semaphore, tour_id) for i in range(len(parsed_points)))
+        )
+        final_tour_scripts = [
+            f"STOP {i+1}: {point['title']}\n{transcript}"
+            for i, (point, transcript) in enumerate(zip(parsed_points, transcripts))
+        ]
+
+        self.save_to_markdown(route_name, final_tour_scripts, filename)
+        self._finish_tour(tour_id)
+        return final_tour_scripts
+
+    async def astream(self, raw_input_data: str, max_concurrency: Optional[int] = None,
+                      filename: str = "tour_script.md",
+                      on_token: Optional[Callable[[int, int, str], None]] = None,
+                      tour_id: Optional[str] = None,
+                      max_ahead: Optional[int] = None) -> AsyncIterator[Tuple[int, str, str]]:
+        '''
+        Concurrent counterpart of stream: stops are generated in parallel but yielded (and appended to filename)
+        in route order, each as soon as it and every earlier stop are approved.
+        With max_ahead, stops start lazily: at most max_ahead stops are in flight or waiting to be yielded, so a
+        consumer that stops pulling also stops generation instead of letting the whole tour run ahead of it.
+        '''
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
+
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return
+
+        semaphore = asyncio.Semaphore(self._concurrency_limit(max_concurrency))
+        window = len(parsed_points) if max_ahead is None else max(1, max_ahead)
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        tasks: Dict[int, asyncio.Future] = {}
+        started = 0
+        try:
+            with StreamingMarkdownWriter(filename, route_name, [p['title'] for p in parsed_points]) as writer:
+                for i in range(len(parsed_points)):
+                    while started < min(len(parsed_points), i + window):
+                        tasks[started] = asyncio.ensure_future(self._agenerate_point(
+                            started, parsed_points, route_name, semaphore, tour_id, on_token))
+                        started += 1
+                    transcript = await tasks.pop(i)
+                    writer.append_stop(i, parsed_points[i]['title'], transcript)
+                    yield i, parsed_points[i]['title'], transcript
+            self._finish_tour(tour_id)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def astream_pipelined(self, raw_input_data: str, filename: str = "tour_script.md",
+                                lookahead: Optional[int] = None,
+                                tour_id: Optional[str] = None) -> AsyncIterator[Tuple[int, str, str]]:
+        '''
+        Sequential-context run that overlaps stops: stop i+1's writer starts from stop i's first screened draft
+        and is re-run only if the approved stop i differs materially (see pipelineScheduler).
+        Stops are yielded (and appended to filename) in route order; speculation_stats holds the outcome counts.
+        '''
+        from pipelineScheduler import SpeculativePipeline
+
+        pipeline = SpeculativePipeline(
+            self,
+            self.config.speculation_lookahead if lookahead is None else lookahead,
+            self.config.speculation_threshold
+        )
+        self.speculation_stats = pipeline.stats
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
+
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return
+
+        print(f"Pipelined Tour Generation for: {route_name}")
+
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        with StreamingMarkdownWriter(filename, route_name, [p['title'] for p in parsed_points]) as writer:
+            async for i, title, script in pipeline.run(parsed_points, route_name, tour_id):
+                writer.append_stop(i, title, script)
+                yield i, title, script
+        self._finish_tour(tour_id)
+
+    def run_pipelined(self, raw_input_data: str, filename: str = "tour_script.md",
+                      lookahead: Optional[int] = None, tour_id: Optional[str] = None) -> Optional[List[str]]:
+        '''
+        Synchronous entry point for astream_pipelined; returns the scripts in route order.
+        '''
+        async def collect():
+            return [
+                f"STOP {i+1}: {title}\n{script}"
+                async for i, title, script in self.astream_pipelined(raw_input_data, filename, lookahead, tour_id)
+            ]
+
+        return asyncio.run(collect()) or None
+
+    async def astream_deadline(self, raw_input_data: str, etas: Optional[List[Optional[float]]] = None,
+                               filename: str = "tour_script.md", max_concurrency: Optional[int] = None,
+                               avg_speed_kmh: float = 70.0,
+                               tour_id: Optional[str] = None) -> AsyncIterator[Tuple[int, str, str]]:
+        '''
+        Live-drive run: stops are generated earliest-ETA-first and yielded as each is ready, with fewer revisions for
+        stops at risk of being late (see deadlineScheduler). filename keeps route order: a stop is written once every
+        earlier stop is.
+        etas are seconds from now until each marker; if omitted they are estimated from the agenda.
+        While it runs, update_etas re-plans the stops not started yet; deadline_scheduler.stats holds the outcome.
+        '''
+        from deadlineScheduler import DeadlineScheduler, estimate_etas
+
+        scheduler = DeadlineScheduler(self, self._concurrency_limit(max_concurrency),
+                                      self.config.deadline_round_seconds)
+        self.deadline_scheduler = scheduler
+        parsed_points, route_name = self.parse_route_data(raw_input_data)
+
+        if not parsed_points:
+            print("No points extracted. Check your regex or input.")
+            return
+
+        if etas is None:
+            etas = [minutes * 60 for minutes in estimate_etas(parsed_points, avg_speed_kmh)]
+        print(f"Deadline-driven Tour Generation for: {route_name}")
+
+        tour_id = self._start_tour(tour_id, raw_input_data, filename)
+        with StreamingMarkdownWriter(filename, route_name, [p['title'] for p in parsed_points]) as writer:
+            async for i, title, script in scheduler.run(parsed_points, route_name, tour_id, etas):
+                writer.append_stop(i, title, script)
+                yield i, title, script
+        self._finish_tour(tour_id)
+
+    def update_etas(self, etas: Dict[int, float]):
+        '''
+        Passes fresh ETAs (stop index -> seconds from now) to the running astream_deadline.
+        '''
+        if self.deadline_scheduler is None:
+            raise RuntimeError("no deadline-driven run has started")
+        self.deadline_scheduler.update_etas(etas)
+
+    def run_deadline(self, raw_input_data: str, etas: Optional[List[Optional[float]]] = None,
+                     filename: str = "tour_script.md", max_concurrency: Optional[int] = None,
+                     avg_speed_kmh: float = 70.0, tour_id: Optional[str] = None) -> Optional[List[str]]:
+        '''
+        Synchronous entry point for astream_deadline; returns the scripts in the order they became ready.
+        '''
+        async def collect():
+            return [
+                f"STOP {i+1}: {title}\n{script}"
+                async for i, title, script in self.astream_deadline(raw_input_data, etas, filename, max_concurrency,
+                                                                    avg_speed_kmh, tour_id)
+            ]
+
+        return asyncio.run(collect()) or None
+
+    def run_concurrent(self, raw_input_data: str, max_concurrency: Optional[int] = None,
+                       filename: str = "tour_script.md", tour_id: Optional[str] = None) -> Optional[List[str]]:
+        '''
+        Synchronous entry point for arun.
+        '''
+        return asyncio.run(self.arun(raw_input_data, max_concurrency, filename, tour_id))
         
         
 # --- Execution ---